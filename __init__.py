@@ -7,16 +7,10 @@
  ***************************************************************************/
 """
 
-# Import der Ressourcen
-from . import resources_rc
-# ---- RC-Shim: macht "import Button_checkbox_rc" global verfügbar ----
-import sys
-try:
-    from .tools.leerrohr_verbinder import Button_checkbox_rc as _rc
-    sys.modules['Button_checkbox_rc'] = _rc
-except Exception:
-    pass
-# ---------------------------------------------------------------------
+# Keine Qt-Ressourcen und keine Tool-Module beim Laden des Plugins: die
+# Toolbar-Icons kommen aus icons/, die Tools werden erst beim ersten Klick
+# importiert (main.tool_class). Der Shim für "import Button_checkbox_rc"
+# steckt in tools/leerrohr_verbinder/__init__.py.
 
 # Import der Hauptklasse des Plugins
 from .main import ToolBoxSiegeleCoPlugin
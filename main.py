@@ -2,26 +2,29 @@ from PyQt5.QtWidgets import QAction, QLabel
 from qgis.PyQt.QtGui import QIcon
 from qgis.core import Qgis
 from PyQt5.QtCore import Qt, QSettings
-from . import resources
-from .tools.leerrohr_verlegen.leerrohr_verlegen import LeerrohrVerlegenTool
-from .tools.hauseinfuehrung_verlegen.hauseinfuehrung_verlegen import HauseinfuehrungsVerlegungsTool
-from .tools.leerrohr_verbinder.leerrohr_verbinden import LeerrohrVerbindenTool
+from .tools.common.instrumentation import metrics
+from .tools.common.lazy_import import import_attr
 import logging
+import os
 
-import sys, sip
-sys.path.append(r'C:\Users\marce\AppData\Roaming\QGIS\QGIS3\profiles\default\python\plugins\ToolBox_SiegeleCo')
+import sip
 
-try:
-    from tools.leerrohr_verlegen.leerrohr_verlegen import LeerrohrErfassenTool
-    print("LeerrohrErfassenTool erfolgreich importiert")
-except ImportError as e:
-    print("Fehler beim Import von LeerrohrErfassenTool:", e)
+# Tool-Dialoge werden erst beim ersten Klick importiert (siehe tools/common/lazy_import.py);
+# ebenso db_pool (psycopg2), lookup_catalog und topology_snapshot (sqlite3) erst bei Bedarf
+TOOL_MODULES = {
+    "LeerrohrVerlegenTool": ".tools.leerrohr_verlegen.leerrohr_verlegen",
+    "HauseinfuehrungsVerlegungsTool": ".tools.hauseinfuehrung_verlegen.hauseinfuehrung_verlegen",
+    "LeerrohrVerbindenTool": ".tools.leerrohr_verbinder.leerrohr_verbinden",
+    "KabelVerlegungsTool": ".tools.kabel_verlegen.kabel_verlegen",
+    "SetupTool": ".tools.setup_Toolbox.setup_tool",
+    "SpleissVerwaltenTool": ".tools.spleiss_verwalten.spleiss_verwalten",
+}
+
+
+def tool_class(name):
+    """Tool-Klasse ``name``; das Modul wird beim ersten Aufruf geladen."""
+    return import_attr(TOOL_MODULES[name], name, __package__)
 
-try:
-    from .tools.kabel_verlegen.kabel_verlegen import KabelVerlegungsTool
-    print("KabelVerlegungsTool erfolgreich importiert")
-except ImportError as e:
-    print("Fehler beim Import von KabelVerlegungsTool:", e)
 
 class ToolBoxSiegeleCoPlugin:
     def __init__(self, iface):
@@ -34,6 +37,8 @@ class ToolBoxSiegeleCoPlugin:
         self.settings = QSettings("SiegeleCo", "ToolBox")
         self.active_setup = {}  # Dict für aktives Setup
         self.conn = None  # Persistente Verbindung
+        self._db_pools = None  # Verbindungs-Pools je Umgebung, von allen Tools genutzt (siehe db_pools)
+        self.plugin_dir = os.path.dirname(__file__)
         self.iface.plugin = self  # Explizit Plugin-Instanz setzen
         self.logger = logging.getLogger(__name__)
         logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -57,6 +62,14 @@ class ToolBoxSiegeleCoPlugin:
         if not self.active_setup:
             self.logger.warning("Kein active_setup aus QSettings geladen")
 
+    @property
+    def db_pools(self):
+        """DbPoolManager der Sitzung; psycopg2 wird erst beim ersten Zugriff geladen."""
+        if self._db_pools is None:
+            from .tools.common.db_pool import DbPoolManager
+            self._db_pools = DbPoolManager()
+        return self._db_pools
+
     def initGui(self):
         self.toolbar = self.iface.addToolBar("Toolbox SiegeleCo")
         
@@ -64,19 +77,32 @@ class ToolBoxSiegeleCoPlugin:
         self.setup_label.setStyleSheet("color: black; padding: 5px; font-weight: bold;")
         self.toolbar.addWidget(self.setup_label)
         
-        self.add_toolbar_action("Setup Tool", self.run_setup_tool, ":/plugins/ToolBox_SiegeleCo/icons/setup_Toolbox.png")
-        self.add_toolbar_action("Leerrohr Verlegen/Verwalten Tool", self.run_leerrohr_erfassen, ":/plugins/ToolBox_SiegeleCo/icons/icon_leerrohr_verlegen_tool.png")
-        self.add_toolbar_action("Leerrohr Verbinden", self.run_leerrohrverbinden_tool, ":/plugins/ToolBox_SiegeleCo/icons/icon_leerohr_verbinden_tool.png")
-        self.add_toolbar_action("Hausanschluss Tool", self.run_hausanschluss_verlegen, ":/plugins/ToolBox_SiegeleCo/icons/icon_hausanschluesse.png")
-        self.add_toolbar_action("Kabel Verlegen Tool", self.run_kabel_verlegen, ":/plugins/ToolBox_SiegeleCo/icons/icon_kabel_verlegen.png")
-        self.add_toolbar_action("Spleiss Tool", self.run_spleisstool, ":/plugins/ToolBox_SiegeleCo/icons/icon_spleiss_tool.png")
-
-    def add_toolbar_action(self, name, function, icon_path):
+        self.add_toolbar_action("Setup Tool", self.run_setup_tool, "setup_Toolbox.png")
+        self.add_toolbar_action("Leerrohr Verlegen/Verwalten Tool", self.run_leerrohr_erfassen, "icon_leerrohr_verlegen_tool.png")
+        self.add_toolbar_action("Leerrohr Verbinden", self.run_leerrohrverbinden_tool, "icon_leerohr_verbinden_tool.png")
+        self.add_toolbar_action("Hausanschluss Tool", self.run_hausanschluss_verlegen, "icon_hausanschluesse.png")
+        self.add_toolbar_action("Kabel Verlegen Tool", self.run_kabel_verlegen, "icon_kabel_verlegen.png")
+        self.add_toolbar_action("Spleiss Tool", self.run_spleisstool, "icon_spleiss_tool.png")
+        self.preload_topology()
+
+    def preload_topology(self):
+        """Liest den Topologie-Schnappschuss der zuletzt genutzten Umgebung von der Platte (ohne DB-Abfrage)."""
+        # connection_umgebung wird in unload() entfernt; topologie_umgebung bleibt über den Neustart erhalten
+        umgebung = self.settings.value("connection_umgebung", "") or self.settings.value("topologie_umgebung", "")
+        if not umgebung:
+            return
+        try:
+            from .tools.common.topology_snapshot import get_topology_snapshot
+            get_topology_snapshot(umgebung)
+        except Exception as e:
+            self.logger.warning(f"Topologie-Schnappschuss für {umgebung} nicht geladen: {e}")
+
+    def add_toolbar_action(self, name, function, icon_file):
+        # Icons direkt aus dem Plugin-Ordner: die Qt-Ressourcen (resources_rc) müssen dafür nicht geladen werden
+        icon_path = os.path.join(self.plugin_dir, "icons", icon_file)
         icon = QIcon(icon_path)
         if icon.isNull():
-            print(f"Fehler: Icon {icon_path} konnte nicht geladen werden")
-        else:
-            print(f"Icon {icon_path} erfolgreich geladen")
+            self.logger.warning(f"Icon {icon_path} konnte nicht geladen werden")
         action = QAction(icon, name, self.iface.mainWindow())
         action.triggered.connect(function)
         self.toolbar.addAction(action)
@@ -109,10 +135,10 @@ class ToolBoxSiegeleCoPlugin:
         self.logger.info(f"Aktives Setup aktualisiert: {self.active_setup}")
 
     def run_setup_tool(self):
-        from .tools.setup_Toolbox.setup_tool import SetupTool
-        setup = SetupTool(self.iface)
+        setup = tool_class("SetupTool")(self.iface)
         setup.exec_()
         self.update_setup_label()
+        self.preload_topology()
 
 
     def run_leerrohrverbinden_tool(self):
@@ -120,6 +146,7 @@ class ToolBoxSiegeleCoPlugin:
             self.iface.messageBar().pushMessage("Fehler", "Bitte wählen Sie zuerst ein Setup im Setup-Tool aus!", level=Qgis.Critical)
             return
 
+        LeerrohrVerbindenTool = tool_class("LeerrohrVerbindenTool")
         if LeerrohrVerbindenTool.instance is not None:
             LeerrohrVerbindenTool.instance.raise_()
             LeerrohrVerbindenTool.instance.activateWindow()
@@ -135,7 +162,7 @@ class ToolBoxSiegeleCoPlugin:
             return
         self.iface.messageBar().pushMessage("Kabel Verlegen Tool aktiviert", level=Qgis.Info)
         if not self.kabel_tool:
-            self.kabel_tool = KabelVerlegungsTool(self.iface)
+            self.kabel_tool = tool_class("KabelVerlegungsTool")(self.iface)
         self.kabel_tool.run()
 
     def run_spleisstool(self):
@@ -143,6 +170,13 @@ class ToolBoxSiegeleCoPlugin:
             self.iface.messageBar().pushMessage("Fehler", "Bitte wählen Sie zuerst ein Setup im Setup-Tool aus aus!", level=Qgis.Critical)
             return
         self.iface.messageBar().pushMessage("Spleiss-Tool aktiviert", level=Qgis.Info)
+        SpleissVerwaltenTool = tool_class("SpleissVerwaltenTool")
+        if SpleissVerwaltenTool.instance is not None:
+            SpleissVerwaltenTool.instance.raise_()
+            SpleissVerwaltenTool.instance.activateWindow()
+            return
+        self.spleiss_dlg = SpleissVerwaltenTool(self.iface)
+        self.spleiss_dlg.show()
 
     def run_leerrohr_erfassen(self):
         if not self.settings.value("name"):
@@ -155,7 +189,7 @@ class ToolBoxSiegeleCoPlugin:
         self.iface.messageBar().pushMessage("Leerrohr Erfassen aktiviert", level=Qgis.Info)
         if self.leerrohr_tool and not sip.isdeleted(self.leerrohr_tool):
             self.leerrohr_tool.close()
-        self.leerrohr_tool = LeerrohrVerlegenTool(self.iface)
+        self.leerrohr_tool = tool_class("LeerrohrVerlegenTool")(self.iface)
         self.leerrohr_tool.setAttribute(Qt.WA_DeleteOnClose)
         self.leerrohr_tool.show()
         self.logger.info(f"LeerrohrVerlegenTool gestartet mit active_setup: {self.active_setup}")
@@ -164,6 +198,7 @@ class ToolBoxSiegeleCoPlugin:
         if not self.settings.value("name"):
             self.iface.messageBar().pushMessage("Fehler", "Bitte wählen Sie zuerst ein Setup im Setup-Tool aus aus!", level=Qgis.Critical)
             return
+        HauseinfuehrungsVerlegungsTool = tool_class("HauseinfuehrungsVerlegungsTool")
         if HauseinfuehrungsVerlegungsTool.instance is not None:
             HauseinfuehrungsVerlegungsTool.instance.raise_()
             HauseinfuehrungsVerlegungsTool.instance.activateWindow()
@@ -175,6 +210,10 @@ class ToolBoxSiegeleCoPlugin:
         if self.toolbar:
             self.iface.mainWindow().removeToolBar(self.toolbar)
             self.toolbar = None
+        # Umgebung für das Vorladen des Topologie-Schnappschusses beim nächsten Start merken
+        umgebung = self.settings.value("connection_umgebung", "")
+        if umgebung:
+            self.settings.setValue("topologie_umgebung", umgebung)
         # Reset QSettings bei Beenden
         self.settings.remove("connection_username")
         self.settings.remove("connection_password")
@@ -190,4 +229,19 @@ class ToolBoxSiegeleCoPlugin:
         self.settings.remove("qgis_project_path")
         self.settings.remove("db_connection")
         self.active_setup = {}  # Reset Setup-Dict
-        self.logger.info("Plugin entladen, Einstellungen zurückgesetzt")
\ No newline at end of file
+        if self._db_pools is not None:
+            self.logger.info(f"DB-Pool-Statistik: {self._db_pools.stats()}")
+        self.export_metrics()
+        if self._db_pools is not None:
+            self._db_pools.closeall()
+
+    def export_metrics(self):
+        """Loggt p50/p95 je Vorgang der Sitzung und legt sie als JSON im Cache-Ordner ab."""
+        from .tools.common.lookup_catalog import default_cache_dir
+        metrics.log_summary(self.logger)
+        try:
+            path = metrics.export(os.path.join(default_cache_dir(), "laufzeiten_letzte_sitzung.json"))
+            self.logger.info(f"Laufzeiten exportiert nach {path}")
+        except OSError as e:
+            self.logger.warning(f"Laufzeiten nicht exportiert: {e}")
+        self.logger.info("Plugin entladen, Einstellungen zurückgesetzt")
@@ -0,0 +1,29 @@
+-- Sequenz für lwl."LWL_Kabel_Verlegt"."KABEL_ID" (tools/common/kabel_id.py).
+--
+-- Das Plugin vergibt KABEL_IDs nur noch per nextval; die Sequenz und ihr
+-- Startwert kommen aus dieser Migration. Ist die Spalte bereits serial/identity,
+-- wird deren Sequenz verwendet, sonst lwl."LWL_Kabel_Verlegt_KABEL_ID_seq".
+-- Wiederholbar: stellt die Sequenz nur vor, nie zurück.
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS lwl."LWL_Kabel_Verlegt_KABEL_ID_seq";
+
+DO $$
+DECLARE
+    seq      text := coalesce(pg_get_serial_sequence('lwl."LWL_Kabel_Verlegt"', 'KABEL_ID'),
+                              'lwl."LWL_Kabel_Verlegt_KABEL_ID_seq"');
+    hoechste bigint;
+    naechste bigint;
+BEGIN
+    LOCK TABLE lwl."LWL_Kabel_Verlegt" IN SHARE MODE;
+    SELECT coalesce(max("KABEL_ID"), 0) INTO hoechste FROM lwl."LWL_Kabel_Verlegt";
+    EXECUTE format('SELECT CASE WHEN is_called THEN last_value + 1 ELSE last_value END FROM %s', seq)
+        INTO naechste;
+    IF naechste <= hoechste THEN
+        PERFORM setval(seq::regclass, hoechste);
+    END IF;
+END
+$$;
+
+COMMIT;
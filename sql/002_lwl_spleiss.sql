@@ -0,0 +1,22 @@
+-- Tabelle der Spleiße je Knoten (tools/common/spleiss_plan.py).
+--
+-- Das Spleiß-Tool legt die Tabelle nicht selbst an; ohne diese Migration
+-- meldet es beim Laden und Speichern, dass sie fehlt.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS lwl."LWL_Spleiss" (
+    id bigserial PRIMARY KEY,
+    "ID_KNOTEN" bigint NOT NULL,
+    "KABEL_1" bigint NOT NULL,
+    "FASER_1" integer NOT NULL,
+    "KABEL_2" bigint NOT NULL,
+    "FASER_2" integer NOT NULL,
+    "CREATEUSER" text,
+    "CREATETIME" timestamp DEFAULT now(),
+    "UPDATEUSER" text,
+    "UPDATETIME" timestamp,
+    UNIQUE ("ID_KNOTEN", "KABEL_1", "FASER_1", "KABEL_2", "FASER_2")
+);
+
+COMMIT;
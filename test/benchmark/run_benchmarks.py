@@ -0,0 +1,296 @@
+# coding=utf-8
+"""Benchmarks der Netz-Engines auf synthetischen Netzen verschiedener Größe.
+
+Aufruf (ohne QGIS)::
+
+    python test/benchmark/run_benchmarks.py --sizes 500,2000,8000 --out bench.json
+    python test/benchmark/run_benchmarks.py --compare alt.json --out neu.json
+
+Ohne Datenbank (Standard) werden gemessen:
+
+- ``routing_ksp`` / ``routing_via``: k-kürzeste Wege im Trassengraphen
+- ``verbundnummer_frei``: freie Verbundnummern je VKG (Dropdown/Prüfung)
+- ``rohrstatus``: Belegung/Palette der Hauseinführung (RohrGraph)
+- ``verbinder_nachfuehren``: Rohrgraph nach einem Verbinder-Import nachführen
+- ``topologie_schreiben`` / ``topologie_laden``: SQLite-Schnappschuss
+
+Mit ``--dsn`` (leere Scratch-Datenbank mit PostGIS, optional pgRouting) wird das
+Netz zusätzlich als Schema ``lwl`` angelegt und es kommen die DB-Varianten dazu
+(``db_*``: Graph laden, pgr_ksp, ROHRSTATUS_SQL, HE-Positionen,
+Verbundnummer-Reservierung, Verbinder-Import mit dem mengenbasierten Delta,
+Schnappschuss-Abgleich).
+
+Ergebnis: JSON mit p50/p95/max je Fall und Größe; ``--compare`` meldet Fälle,
+deren p50 um mehr als ``--threshold`` langsamer geworden ist.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+if __package__ in (None, ""):
+    # als Skript gestartet: Plugin-Ordner für ``tools.common`` (test/__init__ braucht qgis)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from synthetic_network import SyntheticNetwork
+else:
+    from .synthetic_network import SyntheticNetwork
+
+from tools.common.instrumentation import Metrics
+from tools.common.rohr_graph import ROHRSTATUS_SQL, RohrGraph, load_he_positions
+from tools.common.topology_snapshot import TopologySnapshot
+from tools.common.trassen_graph import TrassenGraph
+from tools.common.verbinder_delta import schreibe_verbinder_delta
+from tools.common.verbundnummer import VerbundnummerAllocator
+
+DEFAULT_SIZES = (500, 2000, 8000)
+
+
+def _messen(metrics, fall, fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    metrics.record(fall, time.perf_counter() - t0)
+    return result
+
+
+def bench_offline(net, proben, rnd):
+    """Fälle ohne Datenbank; Rückgabe: Metrics."""
+    m = Metrics()
+    knoten = list(net.knoten)
+
+    graph = TrassenGraph()
+    _messen(m, "routing_graph_aufbauen", graph.load_rows, net.trassen_rows())
+    for _ in range(proben):
+        a, b = rnd.sample(knoten, 2)
+        _messen(m, "routing_ksp", graph.k_shortest_paths, a, b, 3)
+        via = _umweg_knoten(graph, a, b, rnd)
+        if via is not None:
+            _messen(m, "routing_via", graph.k_shortest_paths_via, a, [via], b, 3)
+
+    allocator = VerbundnummerAllocator(None)
+    vkgs = net.vkgs()
+    for vkg in vkgs:
+        allocator._belegt[vkg] = net.verbundnummern(vkg)
+    for _ in range(proben):
+        _messen(m, "verbundnummer_frei", allocator.free, rnd.choice(vkgs))
+
+    rows = net.rohr_graph_rows()
+    rohr_graph = _messen(m, "rohrgraph_aufbauen", lambda: RohrGraph().load_rows(*rows))
+    he_lrs = sorted({he[1] for he in net.hauseinfuehrungen}) or list(net.leerrohre)
+    for _ in range(proben):
+        lr = rnd.choice(he_lrs)
+        _messen(m, "rohrstatus", rohr_graph.rohrstatus, lr, net.leerrohre[lr]["vkg"], net.he_positions(lr))
+
+    # Nach dem Verbinder-Import werden die Relationen der beteiligten Leerrohre neu gelesen;
+    # hier aus den erzeugten Zeilen statt aus der DB.
+    lr_ids = list(net.leerrohre)
+    for _ in range(proben):
+        betroffen = set(rnd.sample(lr_ids, min(4, len(lr_ids))))
+        rels = [r for r in net.lr_rels if r[1] in betroffen or r[2] in betroffen]
+        _messen(m, "verbinder_nachfuehren", _relationen_nachfuehren, rohr_graph, betroffen, rels)
+
+    tmp = tempfile.mkdtemp(prefix="lwl_bench_")
+    try:
+        path = os.path.join(tmp, "topologie_bench.sqlite")
+        snap = TopologySnapshot(path)
+        snap.meta = {"trasse": {"hwm": None, "anzahl": len(net.trassen), "voll_am": time.time()}}
+        _messen(m, "topologie_schreiben", _snapshot_schreiben, snap, net.trassen_rows())
+        for _ in range(min(proben, 5)):
+            _messen(m, "topologie_laden", TopologySnapshot(path).load)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return m
+
+
+def _umweg_knoten(graph, a, b, rnd):
+    # Zwischenknoten wie in der Praxis: Nachbar eines Knotens der kürzesten Route,
+    # der selbst nicht auf ihr liegt (beliebige Knoten quer durchs Netz treiben
+    # die Via-Suche bis an max_paths und messen dann nur diese Grenze)
+    route = graph.shortest_path(a, b)
+    if route is None or len(route[1]) < 3:
+        return None
+    auf_route = set(route[1])
+    mitte = route[1][len(route[1]) // 2]
+    kandidaten = sorted(nb for nb, _ in graph.adj[mitte].values() if nb not in auf_route)
+    return rnd.choice(kandidaten) if kandidaten else None
+
+
+def _relationen_nachfuehren(graph, betroffen, rels):
+    # wie RohrGraph.refresh_relations, ohne Cursor
+    for lr in betroffen:
+        for rel in graph.lr_adj.pop(lr, []):
+            for other in (rel[1], rel[2]):
+                if other in graph.lr_adj:
+                    graph.lr_adj[other] = [r for r in graph.lr_adj[other] if r[0] != rel[0]]
+    graph._add_lr_rels(rels)
+
+
+def _snapshot_schreiben(snap, rows):
+    snap._apply("trasse", rows)
+    snap._write("trasse", rows, replace=True)
+
+
+def bench_db(net, dsn, proben, rnd):
+    """DB-Varianten auf einer Scratch-Datenbank; Rückgabe: Metrics."""
+    import psycopg2
+    import psycopg2.errors
+
+    m = Metrics()
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            _messen(m, "db_netz_anlegen", net.write_postgres, cur)
+        conn.commit()
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = 10000")
+            _messen(m, "db_trassengraph_laden", TrassenGraph().load, cur)
+            rohr_graph = RohrGraph()
+            _messen(m, "db_rohrgraph_laden", rohr_graph.load, cur)
+
+            cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgrouting'")
+            pgrouting = cur.fetchone() is not None
+            knoten = list(net.knoten)
+            he_lrs = sorted({he[1] for he in net.hauseinfuehrungen}) or list(net.leerrohre)
+            allocator = VerbundnummerAllocator(None)
+            for _ in range(proben):
+                if pgrouting:
+                    a, b = rnd.sample(knoten, 2)
+                    _messen(m, "db_pgr_ksp", cur.execute, """
+                        SELECT path_id, edge FROM pgr_ksp(
+                            'SELECT id, "VONKNOTEN" AS source, "NACHKNOTEN" AS target, "LAENGE" AS cost
+                             FROM lwl."LWL_Trasse"', %s, %s, 3, directed := false)""", (a, b))
+                    cur.fetchall()
+                lr = rnd.choice(he_lrs)
+                vkg = net.leerrohre[lr]["vkg"]
+                try:
+                    _messen(m, "db_rohrstatus_sql", cur.execute, ROHRSTATUS_SQL, (lr, vkg))
+                    cur.fetchall()
+                except psycopg2.errors.QueryCanceled:
+                    # Die UNION-ALL-Suche der alten Abfrage endet in Ringen nicht
+                    conn.rollback()
+                    cur.execute("SET statement_timeout = 10000")
+                    m.record("db_rohrstatus_sql_abgebrochen", 10.0)
+                _messen(m, "db_he_positionen", load_he_positions, cur, lr)
+                _messen(m, "db_verbundnummer_reservieren", allocator.reserve, cur, vkg, 2)
+                conn.rollback()
+                cur.execute("SET statement_timeout = 10000")
+
+        # Verbinder-Import an einem Knoten: alle Rohre zweier Leerrohre verbinden, danach wieder trennen
+        rohre_je_lr = {}
+        for rohr_id, lr_id, _, _, _ in net.rohre:
+            rohre_je_lr.setdefault(lr_id, []).append(rohr_id)
+        with conn.cursor() as cur:
+            for _ in range(proben if net.lr_rels else 0):
+                _, lr_1, lr_2, kn = rnd.choice(net.lr_rels)
+                paare = set(zip(rohre_je_lr.get(lr_1, []), rohre_je_lr.get(lr_2, [])))
+                status = dict.fromkeys(paare, 1)
+                _messen(m, "db_verbinder_import", schreibe_verbinder_delta,
+                        cur, kn, "bench", paare, set(), set(), status, {(lr_1, lr_2)})
+                _messen(m, "db_verbinder_trennen", schreibe_verbinder_delta,
+                        cur, kn, "bench", set(), paare, set(), status, {(lr_1, lr_2)})
+                conn.rollback()
+
+        tmp = tempfile.mkdtemp(prefix="lwl_bench_")
+        try:
+            snap = TopologySnapshot(os.path.join(tmp, "topologie_bench.sqlite"))
+            with conn.cursor() as cur:
+                _messen(m, "db_topologie_voll", snap.refresh, cur, None, True)
+                _messen(m, "db_topologie_inkrementell", snap.refresh, cur)
+            conn.rollback()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    finally:
+        conn.close()
+    return m
+
+
+def _git_version():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, proben=50, seed=1, dsn=None):
+    ergebnisse = {}
+    for size in sizes:
+        rnd = random.Random(seed)
+        t0 = time.perf_counter()
+        net = SyntheticNetwork(knoten=size, seed=seed)
+        eintrag = {"netz": net.stats(), "erzeugen_ms": round((time.perf_counter() - t0) * 1000.0, 1)}
+        eintrag["faelle"] = bench_offline(net, proben, rnd).summary()
+        if dsn:
+            eintrag["faelle"].update(bench_db(net, dsn, proben, rnd).summary())
+        ergebnisse[str(size)] = eintrag
+        print(f"{size} Knoten: {net.stats()}", file=sys.stderr)
+    return {
+        "version": _git_version(),
+        "zeitpunkt": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plattform": platform.platform(),
+        "proben": proben,
+        "seed": seed,
+        "groessen": ergebnisse,
+    }
+
+
+def vergleiche(alt, neu, threshold=0.2):
+    """[(größe, fall, p50_alt, p50_neu)] für Fälle, deren p50 um mehr als ``threshold`` gestiegen ist."""
+    out = []
+    for size, eintrag in neu.get("groessen", {}).items():
+        alt_faelle = alt.get("groessen", {}).get(size, {}).get("faelle", {})
+        for fall, s in eintrag["faelle"].items():
+            vorher = alt_faelle.get(fall)
+            if vorher and vorher["p50_ms"] > 0 and s["p50_ms"] > vorher["p50_ms"] * (1.0 + threshold):
+                out.append((size, fall, vorher["p50_ms"], s["p50_ms"]))
+    return out
+
+
+def _tabelle(result):
+    for size, eintrag in result["groessen"].items():
+        print(f"\n== {size} Knoten ({eintrag['netz']['leerrohre']} Leerrohre, {eintrag['netz']['rohre']} Rohre)")
+        for fall, s in sorted(eintrag["faelle"].items()):
+            print(f"  {fall:32s} n={s['anzahl']:4d}  p50 {s['p50_ms']:9.2f}  p95 {s['p95_ms']:9.2f}  max {s['max_ms']:9.2f} ms")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                    help="Knotenzahlen, kommagetrennt")
+    ap.add_argument("--proben", type=int, default=50, help="Wiederholungen je Fall")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--dsn", default=os.environ.get("LWL_BENCH_DSN"),
+                    help="psycopg2-DSN einer leeren Scratch-Datenbank (PostGIS)")
+    ap.add_argument("--out", help="Ergebnis als JSON")
+    ap.add_argument("--compare", help="früheres Ergebnis (JSON) zum Vergleich")
+    ap.add_argument("--threshold", type=float, default=0.2, help="erlaubte p50-Verschlechterung (0.2 = 20 %%)")
+    args = ap.parse_args(argv)
+
+    result = run([int(s) for s in args.sizes.split(",") if s.strip()], args.proben, args.seed, args.dsn)
+    _tabelle(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=1, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            regressionen = vergleiche(json.load(fh), result, args.threshold)
+        for size, fall, vorher, jetzt in regressionen:
+            print(f"LANGSAMER: {size} Knoten, {fall}: p50 {vorher:.2f} -> {jetzt:.2f} ms")
+        return 1 if regressionen else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# coding=utf-8
+"""Synthetisches LWL-Netz für Benchmarks.
+
+``SyntheticNetwork`` erzeugt reproduzierbar (``seed``) ein Netz aus Knoten,
+Trassen, Leerrohren mit Rohren, Leerrohr-/Rohr-Verbindungen und
+Hauseinführungen. Die Zeilen haben dieselbe Form wie die Abfragen der
+Module in ``tools/common`` (``trassen_rows``, ``rohr_graph_rows`` ...), so
+dass die Benchmarks ohne Datenbank laufen.
+
+``write_postgres`` legt dasselbe Netz als minimales ``lwl``-Schema in einer
+leeren Scratch-Datenbank (PostGIS) an – nur für den DB-Modus der Benchmarks.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import json
+import math
+import random
+
+from tools.common.trassen_graph import TrassenGraph
+
+SRID = 31254
+BENCHMARK_MARKER = "lwl-benchmark"
+
+
+class SyntheticNetwork:
+    """Gitterartiges Trassennetz mit Leerrohr-Strängen ab den Verteilerkästen."""
+
+    def __init__(self, knoten=1000, leerrohre=None, rohre_pro_leerrohr=7, hauseinfuehrungen=None,
+                 vkg_abstand=25, rohr_rel_anteil=0.6, seed=1):
+        self.rnd = random.Random(seed)
+        self.params = {
+            "knoten": knoten,
+            "leerrohre": leerrohre if leerrohre is not None else max(4, knoten // 2),
+            "rohre_pro_leerrohr": rohre_pro_leerrohr,
+            "hauseinfuehrungen": hauseinfuehrungen if hauseinfuehrungen is not None else max(4, knoten // 4),
+            "vkg_abstand": vkg_abstand,
+            "rohr_rel_anteil": rohr_rel_anteil,
+            "seed": seed,
+        }
+        self.knoten = {}         # id -> (TYP, x, y)
+        self.trassen = {}        # id -> (von, nach, laenge)
+        self.leerrohre = {}      # id -> dict(von, nach, vkg, trassen [(id, reverse)], knoten [..], verbundnummer)
+        self.lr_rels = []        # (id, lr_1, lr_2, knoten)
+        self.rohre = []          # (id, lr_id, rohrnummer, from_pos, to_pos)
+        self.rohr_rels = []      # (id_rohr_1, id_rohr_2)
+        self.hauseinfuehrungen = []   # (id, lr_id, rohrnummer, vkg, pos 0..1, x, y)
+        self._generate()
+
+    # ---------- Erzeugung ----------
+    def _generate(self):
+        p = self.params
+        rnd = self.rnd
+        seite = max(2, int(math.ceil(math.sqrt(p["knoten"]))))
+        n = 0
+        for row in range(seite):
+            for col in range(seite):
+                n += 1
+                if n > p["knoten"]:
+                    break
+                typ = "Verteilerkasten" if n % p["vkg_abstand"] == 0 else "Schacht"
+                if n == 1:
+                    typ = "Ortszentrale"
+                self.knoten[n] = (typ, col * 50.0 + rnd.uniform(-10, 10), row * 50.0 + rnd.uniform(-10, 10))
+
+        def node_id(row, col):
+            i = row * seite + col + 1
+            return i if i in self.knoten else None
+
+        tid = 0
+        for row in range(seite):
+            for col in range(seite):
+                a = node_id(row, col)
+                if a is None:
+                    continue
+                # waagrecht immer, senkrecht außer in Spalte 0 nur zu 85 % -> zusammenhängend, aber unregelmäßig
+                for b, keep in ((node_id(row, col + 1) if col + 1 < seite else None, True),
+                                (node_id(row + 1, col), col == 0 or rnd.random() < 0.85)):
+                    if b is None or not keep:
+                        continue
+                    tid += 1
+                    (_, ax, ay), (_, bx, by) = self.knoten[a], self.knoten[b]
+                    self.trassen[tid] = (a, b, math.hypot(bx - ax, by - ay))
+
+        graph = TrassenGraph()
+        graph.load_rows((t, v, n_, l) for t, (v, n_, l) in self.trassen.items())
+        self.graph = graph
+        vkgs = [k for k, (typ, _, _) in self.knoten.items() if typ != "Schacht"]
+        alle = list(self.knoten)
+
+        lr_id = rel_id = rohr_id = 0
+        verbund = {}
+        while len(self.leerrohre) < p["leerrohre"]:
+            vkg = rnd.choice(vkgs)
+            ziel = rnd.choice(alle)
+            route = graph.shortest_path(vkg, ziel)
+            if route is None or len(route[2]) < 2:
+                continue
+            _, knoten_pfad, trassen_pfad = route
+            # Strang in Leerrohre zu je 3..8 Trassen teilen
+            i, vorher = 0, None
+            while i < len(trassen_pfad) and len(self.leerrohre) < p["leerrohre"]:
+                j = min(len(trassen_pfad), i + rnd.randint(3, 8))
+                lr_id += 1
+                teil = trassen_pfad[i:j]
+                knoten_teil = knoten_pfad[i:j + 1]
+                verlauf = [(t, self.trassen[t][0] != knoten_teil[k]) for k, t in enumerate(teil)]
+                verbund[vkg] = verbund.get(vkg, 0) + 1
+                self.leerrohre[lr_id] = {
+                    "von": knoten_teil[0], "nach": knoten_teil[-1], "vkg": vkg,
+                    "trassen": verlauf, "knoten": knoten_teil, "verbundnummer": verbund[vkg],
+                }
+                rohr_ids = []
+                for rnr in range(1, p["rohre_pro_leerrohr"] + 1):
+                    rohr_id += 1
+                    self.rohre.append((rohr_id, lr_id, rnr, 0.0, 1.0))
+                    rohr_ids.append(rohr_id)
+                if vorher is not None:
+                    rel_id += 1
+                    self.lr_rels.append((rel_id, vorher[0], lr_id, knoten_teil[0]))
+                    for a, b in zip(vorher[1], rohr_ids):
+                        if rnd.random() < p["rohr_rel_anteil"]:
+                            self.rohr_rels.append((a, b))
+                vorher = (lr_id, rohr_ids)
+                i = j
+
+        lr_ids = list(self.leerrohre)
+        for he_id in range(1, p["hauseinfuehrungen"] + 1):
+            lr = rnd.choice(lr_ids)
+            pos = rnd.random()
+            x, y = self.point_on_leerrohr(lr, pos)
+            self.hauseinfuehrungen.append(
+                (he_id, lr, rnd.randint(1, p["rohre_pro_leerrohr"]), self.leerrohre[lr]["vkg"], pos, x, y))
+
+    # ---------- Geometrie ----------
+    def leerrohr_coords(self, lr_id):
+        return [self.knoten[k][1:] for k in self.leerrohre[lr_id]["knoten"]]
+
+    def point_on_leerrohr(self, lr_id, pos):
+        pts = self.leerrohr_coords(lr_id)
+        seg = [math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(pts, pts[1:])]
+        rest = pos * sum(seg)
+        for (a, b), l in zip(zip(pts, pts[1:]), seg):
+            if rest <= l or l == 0:
+                t = rest / l if l else 0.0
+                return a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1])
+            rest -= l
+        return pts[-1]
+
+    # ---------- Zeilen wie aus der DB ----------
+    def trassen_rows(self):
+        """(id, VONKNOTEN, NACHKNOTEN, LAENGE) wie ``trassen_graph.TRASSEN_SQL``."""
+        return [(t, v, n, l) for t, (v, n, l) in self.trassen.items()]
+
+    def rohr_graph_rows(self):
+        """Argumente für ``RohrGraph.load_rows``."""
+        leerrohre = [(i, lr["von"], lr["nach"], [lr["vkg"]]) for i, lr in self.leerrohre.items()]
+        ha = [(lr, rnr, vkg) for _, lr, rnr, vkg, _, _, _ in self.hauseinfuehrungen]
+        return leerrohre, self.lr_rels, self.rohre, self.rohr_rels, ha
+
+    def he_positions(self, lr_id):
+        """{rohrnummer: (min, max)} wie ``rohr_graph.load_he_positions``."""
+        out = {}
+        for _, lr, rnr, _, pos, _, _ in self.hauseinfuehrungen:
+            if lr == lr_id:
+                mn, mx = out.get(rnr, (pos, pos))
+                out[rnr] = (min(mn, pos), max(mx, pos))
+        return out
+
+    def verbundnummern(self, vkg):
+        """{leerrohr_id: VERBUNDNUMMER} am VKG wie ``VerbundnummerAllocator._query``."""
+        return {i: lr["verbundnummer"] for i, lr in self.leerrohre.items() if lr["vkg"] == vkg}
+
+    def vkgs(self):
+        return sorted({lr["vkg"] for lr in self.leerrohre.values()})
+
+    def stats(self):
+        return {"knoten": len(self.knoten), "trassen": len(self.trassen), "leerrohre": len(self.leerrohre),
+                "rohre": len(self.rohre), "leerrohr_rel": len(self.lr_rels), "rohr_rel": len(self.rohr_rels),
+                "hauseinfuehrungen": len(self.hauseinfuehrungen)}
+
+    # ---------- PostgreSQL/PostGIS ----------
+    def write_postgres(self, cur):
+        """
+        Legt das Netz als Schema ``lwl`` an. Nur für leere Scratch-Datenbanken:
+        ein vorhandenes ``lwl`` wird ausschließlich ersetzt, wenn es selbst von
+        hier stammt (Kommentar ``BENCHMARK_MARKER``).
+        """
+        from psycopg2.extras import execute_values
+
+        cur.execute("SELECT obj_description(oid, 'pg_namespace') FROM pg_namespace WHERE nspname = 'lwl'")
+        row = cur.fetchone()
+        if row is not None:
+            if row[0] != BENCHMARK_MARKER:
+                raise RuntimeError("Schema lwl existiert und stammt nicht vom Benchmark – Abbruch.")
+            cur.execute("DROP SCHEMA lwl CASCADE")
+        cur.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+        cur.execute("CREATE SCHEMA lwl")
+        cur.execute(f"COMMENT ON SCHEMA lwl IS '{BENCHMARK_MARKER}'")
+        cur.execute(f"""
+            CREATE TABLE lwl."LWL_Knoten" (id bigint PRIMARY KEY, "TYP" text, "BEZEICHNUNG" text,
+                "UPDATETIME" timestamp DEFAULT now(), geom geometry(Point, {SRID}));
+            CREATE TABLE lwl."LWL_Trasse" (id bigint PRIMARY KEY, "VONKNOTEN" bigint, "NACHKNOTEN" bigint,
+                "LAENGE" double precision, "UPDATETIME" timestamp DEFAULT now(), geom geometry(LineString, {SRID}));
+            CREATE TABLE lwl."LWL_Leerrohr" (id bigint PRIMARY KEY, "VONKNOTEN" bigint, "NACHKNOTEN" bigint,
+                "VKG_LR" bigint[], "SUBTYP" integer, "TYP" integer, "VERBUNDNUMMER" integer, "ID_TRASSE_NEU" jsonb,
+                "UPDATETIME" timestamp DEFAULT now(), geom geometry(MultiLineString, {SRID}));
+            CREATE TABLE lwl."LWL_Rohr" (id bigint PRIMARY KEY, "ID_LEERROHR" bigint, "ROHRNUMMER" integer,
+                "FROM_POS" double precision, "TO_POS" double precision);
+            CREATE TABLE lwl."LWL_Leerrohr_Leerrohr_rel" (id bigserial PRIMARY KEY, "ID_LEERROHR_1" bigint,
+                "ID_LEERROHR_2" bigint, "ID_KNOTEN" bigint, "STATUS" integer, "VERBUND_TYP" text,
+                "CREATEUSER" text, "CREATETIME" timestamp, "UPDATEUSER" text, "UPDATETIME" timestamp);
+            CREATE TABLE lwl."LWL_Rohr_Rohr_rel" (id bigserial PRIMARY KEY, "ID_ROHR_1" bigint, "ID_ROHR_2" bigint,
+                "STATUS" integer, "ID_KNOTEN" bigint, "CREATEUSER" text, "CREATETIME" timestamp,
+                "UPDATEUSER" text, "UPDATETIME" timestamp);
+            CREATE TABLE lwl."LWL_Hauseinfuehrung" (id bigint PRIMARY KEY, "ID_LEERROHR" bigint,
+                "ROHRNUMMER" integer, "VKG_LR" bigint, "ID_KNOTEN" bigint);
+        """)
+
+        def wkt_line(pts):
+            return "LINESTRING(" + ", ".join(f"{x} {y}" for x, y in pts) + ")"
+
+        execute_values(cur, f'INSERT INTO lwl."LWL_Knoten" (id, "TYP", "BEZEICHNUNG", geom) VALUES %s',
+                       [(k, typ, f"K{k}", f"POINT({x} {y})") for k, (typ, x, y) in self.knoten.items()],
+                       template=f"(%s, %s, %s, ST_GeomFromText(%s, {SRID}))")
+        he_knoten0 = max(self.knoten) + 1
+        execute_values(cur, f'INSERT INTO lwl."LWL_Knoten" (id, "TYP", "BEZEICHNUNG", geom) VALUES %s',
+                       [(he_knoten0 + i, "Hausanschluss", f"HA{he}", f"POINT({x} {y})")
+                        for i, (he, _, _, _, _, x, y) in enumerate(self.hauseinfuehrungen)],
+                       template=f"(%s, %s, %s, ST_GeomFromText(%s, {SRID}))")
+        execute_values(cur, f'INSERT INTO lwl."LWL_Trasse" (id, "VONKNOTEN", "NACHKNOTEN", "LAENGE", geom) VALUES %s',
+                       [(t, v, n, l, wkt_line([self.knoten[v][1:], self.knoten[n][1:]]))
+                        for t, (v, n, l) in self.trassen.items()],
+                       template=f"(%s, %s, %s, %s, ST_GeomFromText(%s, {SRID}))")
+        execute_values(
+            cur,
+            'INSERT INTO lwl."LWL_Leerrohr" (id, "VONKNOTEN", "NACHKNOTEN", "VKG_LR", "SUBTYP", "TYP", '
+            '"VERBUNDNUMMER", "ID_TRASSE_NEU", geom) VALUES %s',
+            [(i, lr["von"], lr["nach"], [lr["vkg"]], 1, 3, lr["verbundnummer"],
+              json.dumps([{"id": t, "index": k, "reverse": rev} for k, (t, rev) in enumerate(lr["trassen"])]),
+              wkt_line(self.leerrohr_coords(i)))
+             for i, lr in self.leerrohre.items()],
+            template=f"(%s, %s, %s, %s, %s, %s, %s, %s::jsonb, ST_Multi(ST_GeomFromText(%s, {SRID})))")
+        execute_values(cur, 'INSERT INTO lwl."LWL_Rohr" VALUES %s', self.rohre)
+        execute_values(cur, 'INSERT INTO lwl."LWL_Leerrohr_Leerrohr_rel" VALUES %s', self.lr_rels)
+        execute_values(cur, 'INSERT INTO lwl."LWL_Rohr_Rohr_rel" ("ID_ROHR_1", "ID_ROHR_2") VALUES %s', self.rohr_rels)
+        execute_values(cur, 'INSERT INTO lwl."LWL_Hauseinfuehrung" VALUES %s',
+                       [(he, lr, rnr, vkg, he_knoten0 + i)
+                        for i, (he, lr, rnr, vkg, _, _, _) in enumerate(self.hauseinfuehrungen)])
+        cur.execute("""
+            CREATE INDEX ON lwl."LWL_Leerrohr_Leerrohr_rel" ("ID_LEERROHR_1");
+            CREATE INDEX ON lwl."LWL_Leerrohr_Leerrohr_rel" ("ID_LEERROHR_2");
+            CREATE INDEX ON lwl."LWL_Rohr" ("ID_LEERROHR");
+            CREATE INDEX ON lwl."LWL_Hauseinfuehrung" ("ID_LEERROHR");
+            SELECT setval(pg_get_serial_sequence('lwl."LWL_Leerrohr_Leerrohr_rel"', 'id'),
+                          (SELECT coalesce(max(id), 0) + 1 FROM lwl."LWL_Leerrohr_Leerrohr_rel"), false);
+            ANALYZE;
+        """)
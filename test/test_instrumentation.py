@@ -0,0 +1,81 @@
+# coding=utf-8
+"""Tests für Zeitmessung und Laufzeit-Zusammenfassung (instrumentation)."""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from tools.common.instrumentation import Metrics, lazy, metrics, record_sql, short, sql_key, timed
+
+
+class MetricsTest(unittest.TestCase):
+    """p50/p95 je Vorgang und Export."""
+
+    def test_perzentile(self):
+        m = Metrics()
+        for ms in range(1, 101):
+            m.record("Route berechnen", ms / 1000.0, rows=2)
+        s = m.summary()["Route berechnen"]
+        self.assertEqual(s["anzahl"], 100)
+        self.assertEqual(s["zeilen"], 200)
+        self.assertAlmostEqual(s["p50_ms"], 50.5, places=1)
+        self.assertAlmostEqual(s["p95_ms"], 95.0, places=0)
+        self.assertEqual(s["max_ms"], 100.0)
+
+    def test_export(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            m = Metrics()
+            m.record("Zeichnen", 0.01)
+            path = m.export(os.path.join(tmp, "x", "laufzeiten.json"))
+            with open(path, encoding="utf-8") as fh:
+                self.assertIn("Zeichnen", json.load(fh)["vorgaenge"])
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+class TimedTest(unittest.TestCase):
+    """Dekorator, Kontextmanager und SQL-Schlüssel."""
+
+    def setUp(self):
+        """Runs before each test."""
+        metrics.reset()
+
+    def test_dekorator_und_kontext(self):
+        @timed("test: dekoriert")
+        def f(x):
+            return x * 2
+
+        self.assertEqual(f(2), 4)
+        with timed("test: block"):
+            pass
+        s = metrics.summary()
+        self.assertEqual(s["test: dekoriert"]["anzahl"], 1)
+        self.assertEqual(s["test: block"]["anzahl"], 1)
+
+    def test_sql(self):
+        record_sql("SELECT id\n   FROM lwl.\"LWL_Trasse\"  WHERE id = %s", 0.002, 1)
+        record_sql("SELECT id FROM lwl.\"LWL_Trasse\" WHERE id = %s", 0.004, -1)
+        s = metrics.summary()[sql_key('SELECT id FROM lwl."LWL_Trasse" WHERE id = %s')]
+        self.assertEqual((s["anzahl"], s["zeilen"]), (2, 1))
+
+    def test_lazy_und_short(self):
+        aufrufe = []
+        wert = lazy(lambda: aufrufe.append(1) or "x")
+        self.assertEqual(aufrufe, [])
+        self.assertEqual(str(wert), "x")
+        self.assertTrue(short(list(range(1000))).startswith("1000 Einträge"))
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(MetricsTest))
+    suite.addTests(unittest.makeSuite(TimedTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
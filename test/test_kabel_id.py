@@ -0,0 +1,129 @@
+# coding=utf-8
+"""Tests für die KABEL_ID-Vergabe aus der Sequenz.
+
+Die Ermittlung der Sequenz wird ohne Datenbank gegen einen Cursor-Ersatz
+geprüft; der Parallel-Test und die echte Abfrage laufen nur mit ``LWL_TEST_DSN`` (psycopg2-DSN einer Test-Datenbank, mit
+eingespielter ``sql/001_kabel_id_sequenz.sql``); die Sequenz wird dabei
+weitergezählt, Kabel werden keine angelegt.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import os
+import threading
+import unittest
+from contextlib import contextmanager
+
+from tools.common.kabel_id import COLUMN, DEFAULT_SEQUENCE, TABLE, KabelIdAllocator
+
+
+class SequenzCursor:
+    """Cursor-Ersatz: merkt sich die Abfragen, liefert Sequenz und IDs."""
+
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self.abfragen = []
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        self.abfragen.append((sql, params))
+        if "pg_get_serial_sequence" in sql:
+            self.rows = [(self.sequence,)]
+        else:
+            self.rows = [(i,) for i in range(1, params[1] + 1)]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return list(self.rows)
+
+
+class SequenzPool:
+    def __init__(self, cur):
+        self.cur = cur
+
+    @contextmanager
+    def connection(self):
+        yield self
+
+    @contextmanager
+    def cursor(self):
+        yield self.cur
+
+
+class KabelIdSequenzTest(unittest.TestCase):
+    """Sequenz-Ermittlung ohne Datenbank: Spaltenname wörtlich, fehlende Sequenz gemeldet."""
+
+    def test_spaltenname_ohne_anfuehrungszeichen(self):
+        cur = SequenzCursor(DEFAULT_SEQUENCE)
+        self.assertEqual(KabelIdAllocator(SequenzPool(cur), block=3).take(2), [1, 2])
+        sql, params = cur.abfragen[0]
+        self.assertEqual(params, (TABLE, "KABEL_ID", DEFAULT_SEQUENCE))
+        self.assertNotIn('"KABEL_ID"', sql)
+        self.assertEqual(COLUMN, "KABEL_ID")
+        self.assertEqual(cur.abfragen[1][1], (DEFAULT_SEQUENCE, 3))
+
+    def test_sequenz_fehlt(self):
+        allocator = KabelIdAllocator(SequenzPool(SequenzCursor(None)))
+        with self.assertRaisesRegex(RuntimeError, "001_kabel_id_sequenz.sql"):
+            allocator.next_id()
+
+
+@unittest.skipUnless(os.environ.get("LWL_TEST_DSN"), "LWL_TEST_DSN nicht gesetzt")
+class KabelIdAllocatorTest(unittest.TestCase):
+    """Zwei Planer importieren gleichzeitig: keine ID doppelt, alle über MAX(KABEL_ID)."""
+
+    def test_sequenz_ermitteln(self):
+        import psycopg2
+
+        conn = psycopg2.connect(os.environ["LWL_TEST_DSN"])
+        try:
+            with conn.cursor() as cur:
+                sequence = KabelIdAllocator(None)._find_sequence(cur)
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (sequence,))
+                self.assertTrue(cur.fetchone()[0])
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_parallel_eindeutig(self):
+        import psycopg2.extensions
+        from tools.common.db_pool import DbPool
+
+        params = psycopg2.extensions.parse_dsn(os.environ["LWL_TEST_DSN"])
+        pools = [DbPool(params), DbPool(params)]
+        try:
+            with pools[0].connection() as conn, conn.cursor() as cur:
+                cur.execute('SELECT coalesce(max("KABEL_ID"), 0) FROM lwl."LWL_Kabel_Verlegt"')
+                hoechste = cur.fetchone()[0]
+
+            ergebnisse = [[], []]
+
+            def planer(i):
+                allocator = KabelIdAllocator(pools[i], block=3)
+                for _ in range(10):
+                    ergebnisse[i].append(allocator.next_id())
+
+            threads = [threading.Thread(target=planer, args=(i,)) for i in range(2)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            alle = ergebnisse[0] + ergebnisse[1]
+            self.assertEqual(len(alle), len(set(alle)))
+            self.assertGreater(min(alle), hoechste)
+            self.assertEqual(ergebnisse[0], sorted(ergebnisse[0]))
+        finally:
+            for pool in pools:
+                pool.closeall()
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([unittest.makeSuite(KabelIdSequenzTest),
+                                unittest.makeSuite(KabelIdAllocatorTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
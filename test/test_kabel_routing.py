@@ -0,0 +1,69 @@
+# coding=utf-8
+"""Tests für den automatischen Kabelverlauf durch das Leerrohrnetz."""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import unittest
+
+from tools.common.kabel_routing import KABEL_BEDARF, KABEL_LEERROHR_TYPEN, KabelRoutingGraph
+
+
+# (id, VONKNOTEN, NACHKNOTEN, TYP, PARENT_LEERROHR_ID, SUBTYP)
+LEERROHRE = [
+    (10, 1, 2, 1, None, 1),
+    (11, 3, 2, 1, None, 1),    # entgegen der Verlaufsrichtung erfasst
+    (12, 3, 4, 2, None, 1),
+    (13, 1, 5, 1, None, 2),    # Umweg 1-5-4
+    (14, 5, 4, 1, None, 2),
+    (20, 1, 6, 3, None, 3),    # Rohrverband ab VKG 1
+    (21, 6, 7, 3, None, 3),
+    (30, None, 8, 4, 21, 4),   # Hauseinführung, zweigt von 21 ab, endet am virtuellen Knoten 8
+]
+
+KAPAZITAET = {1: 1, 2: 2, 3: 7, 4: 1}.get
+
+
+class KabelRoutingGraphTest(unittest.TestCase):
+    """Kürzeste Leerrohrfolge mit freier Kapazität."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.graph = KabelRoutingGraph().load_rows(LEERROHRE)
+
+    def test_kuerzester_verlauf(self):
+        self.assertEqual(self.graph.route(1, 4, kapazitaet=KAPAZITAET), [13, 14])
+        self.assertEqual(self.graph.verlauf_knoten(1, [10, 11, 12]), [1, 2, 3, 4])
+
+    def test_belegte_leerrohre_werden_umgangen(self):
+        self.graph.set_belegung([(13, 2)])
+        self.assertEqual(self.graph.route(1, 4, kapazitaet=KAPAZITAET), [10, 11, 12])
+        self.graph.set_belegung([(13, 2), (11, 1)])
+        self.assertIsNone(self.graph.route(1, 4, kapazitaet=KAPAZITAET))
+
+    def test_zwischenknoten(self):
+        self.assertEqual(self.graph.route(1, 4, via=[3], kapazitaet=KAPAZITAET), [10, 11, 12])
+        self.assertEqual(self.graph.route(1, 4, via=[None], kapazitaet=KAPAZITAET), [13, 14])
+
+    def test_hauseinfuehrung_nur_ueber_parent(self):
+        typen = KABEL_LEERROHR_TYPEN["Hauseinführungskabel"]
+        self.assertEqual(self.graph.route(1, 8, typen, kapazitaet=KAPAZITAET), [20, 21, 30])
+        # Streckenkabel nutzen keine Rohrverbände/Hauseinführungen
+        self.assertIsNone(self.graph.route(1, 8, kapazitaet=KAPAZITAET))
+        self.graph.set_belegung([(30, 1)])
+        self.assertIsNone(self.graph.route(1, 8, typen, kapazitaet=KAPAZITAET))
+
+    def test_ein_kabel_je_rohr(self):
+        """Ein Kabel braucht genau ein freies Rohr, egal welcher Kabeltyp."""
+        self.assertEqual(KABEL_BEDARF, 1)
+        # 10 voll (1 Rohr, 1 Kabel), 13 hat noch 1 von 2 Rohren frei
+        self.graph.set_belegung([(10, 1), (13, 1)])
+        self.assertEqual(self.graph.route(1, 4, kapazitaet=KAPAZITAET), [13, 14])
+        self.assertIsNone(self.graph.route(1, 4, kapazitaet=KAPAZITAET, bedarf=2))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(KabelRoutingGraphTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,61 @@
+# coding=utf-8
+"""Tests für die Prüfung von Kabelverläufen (ohne QGIS)."""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import unittest
+
+from tools.common.kabel_verlauf import pruefe_hauseinfuehrung, pruefe_streckenkabel
+
+
+def _lr(lr_id, von, nach, typ, parent=None):
+    return lr_id, {"id": lr_id, "VONKNOTEN": von, "NACHKNOTEN": nach, "TYP": typ, "PARENT_LEERROHR_ID": parent}
+
+
+LEERROHRE = dict([
+    _lr(10, 1, 2, 1),
+    _lr(11, 3, 2, 1),
+    _lr(12, 3, 4, 2),
+    _lr(20, 1, 6, 3),
+    _lr(21, 6, 7, 3),
+    _lr(30, None, 8, 4, parent=21),
+])
+
+
+class KabelVerlaufTest(unittest.TestCase):
+    """Alle Fehler eines Verlaufs in einem Durchgang."""
+
+    def test_streckenkabel_korrekt(self):
+        self.assertEqual(pruefe_streckenkabel(1, 4, [10, 11, 12], LEERROHRE), [])
+
+    def test_streckenkabel_alle_fehler(self):
+        fehler = pruefe_streckenkabel(1, 5, [10, 12, 20, 99], LEERROHRE)
+        self.assertEqual(len(fehler), 4)
+        self.assertTrue(fehler[0].startswith("Lücke vor Leerrohr 12"))
+        self.assertIn("Leerrohr 20 hat TYP 3", fehler[1])
+        self.assertTrue(fehler[2].startswith("Lücke vor Leerrohr 20"))
+        self.assertEqual(fehler[3], "Leerrohr 99 nicht gefunden.")
+        self.assertEqual(pruefe_streckenkabel(1, 4, [10], LEERROHRE),
+                         ["Verlauf endet an Knoten 2, nicht am Endknoten 4."])
+
+    def test_unvollstaendig(self):
+        self.assertEqual(pruefe_streckenkabel(1, None, [10], LEERROHRE), ["Unvollständige Daten."])
+
+    def test_hauseinfuehrung(self):
+        hausanschluesse = {500: {"id": 500, "ID_KNOTEN": 8}}
+        self.assertEqual(pruefe_hauseinfuehrung(1, 8, 500, [20, 21, 30], LEERROHRE, hausanschluesse), [])
+        fehler = pruefe_hauseinfuehrung(1, 9, 500, [20, 30, 21], LEERROHRE, hausanschluesse)
+        self.assertEqual(len(fehler), 3)
+        self.assertIn("nicht vom vorherigen 20", fehler[0])
+        self.assertIn("letzte Leerrohr", fehler[1])
+        self.assertIn("virtuellen Knoten 9", fehler[2])
+        self.assertEqual(pruefe_hauseinfuehrung(1, 8, 501, [20, 21, 30], LEERROHRE, hausanschluesse),
+                         ["Hausanschluss 501 nicht gefunden."])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(KabelVerlaufTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
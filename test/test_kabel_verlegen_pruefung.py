@@ -0,0 +1,75 @@
+# coding=utf-8
+"""Test der Datenprüfung im Kabel-Verlegen-Tool (Tab 1, Streckenkabel).
+
+Prüft einen gültigen Verlauf auf einem Memory-Layer ``LWL_Leerrohr``: das
+Ergebnis steht in ``label_Pruefung`` und der Import-Button wird aktiviert.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import unittest
+
+from qgis.core import QgsFeature, QgsProject, QgsVectorLayer
+
+from .utilities import get_qgis_app
+QGIS_APP, CANVAS, IFACE, PARENT = get_qgis_app()
+
+from tools.kabel_verlegen.kabel_verlegen import KabelVerlegungsTool  # noqa: E402
+
+LEERROHRE = [
+    # id, VONKNOTEN, NACHKNOTEN, TYP
+    (10, 1, 2, 1),
+    (11, 3, 2, 1),
+    (12, 3, 4, 2),
+]
+
+
+def leerrohr_layer():
+    layer = QgsVectorLayer(
+        "LineString?crs=EPSG:31254&field=id:integer&field=VONKNOTEN:integer&field=NACHKNOTEN:integer"
+        "&field=TYP:integer&field=PARENT_LEERROHR_ID:integer", "LWL_Leerrohr", "memory")
+    features = []
+    for werte in LEERROHRE:
+        feature = QgsFeature(layer.fields())
+        feature.setAttributes(list(werte) + [None])
+        features.append(feature)
+    layer.dataProvider().addFeatures(features)
+    return layer
+
+
+class KabelVerlegenPruefungTest(unittest.TestCase):
+    """pruefe_verbindung schreibt in label_Pruefung und schaltet den Import frei."""
+
+    def setUp(self):
+        self.layer = leerrohr_layer()
+        QgsProject.instance().addMapLayer(self.layer)
+        self.dialog = KabelVerlegungsTool(IFACE)
+        self.dialog.ui.comboBox_kabel_typ.addItem("A-DQ(ZN)B2Y 12x12E9/125")
+        self.dialog.ui.comboBox_kabel_typ.setCurrentIndex(0)
+        self.dialog.ui.pushButton_Import.setEnabled(False)
+        self.dialog.startpunkt_id = 1
+        self.dialog.endpunkt_id = 4
+
+    def tearDown(self):
+        QgsProject.instance().removeMapLayer(self.layer.id())
+        self.dialog = None
+
+    def test_gueltiger_verlauf(self):
+        self.dialog.verlauf_ids = [10, 11, 12]
+        self.dialog.pruefe_verbindung()
+        self.assertTrue(self.dialog.ui.pushButton_Import.isEnabled())
+        self.assertIn("korrekt verbunden", self.dialog.ui.label_Pruefung.toPlainText())
+
+    def test_luecke(self):
+        self.dialog.verlauf_ids = [10, 12]
+        self.dialog.pruefe_verbindung()
+        self.assertFalse(self.dialog.ui.pushButton_Import.isEnabled())
+        self.assertIn("Lücke vor Leerrohr 12", self.dialog.ui.label_Pruefung.toPlainText())
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(KabelVerlegenPruefungTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
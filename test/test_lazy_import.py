@@ -0,0 +1,72 @@
+# coding=utf-8
+"""Tests für das verzögerte Laden der Tool-Module und den Import-Profiler.
+
+Der Start-Test lädt das Plugin in einem eigenen Interpreter (sonst hätten
+andere Tests psycopg2 längst importiert); er braucht eine QGIS-Umgebung.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+
+from tools.common.lazy_import import IMPORT_TIMES, ImportProfiler, import_attr
+
+
+class LazyImportTest(unittest.TestCase):
+    """Import erst beim Zugriff, Zeiten je Modul."""
+
+    def test_import_attr_relativ(self):
+        sys.modules.pop("tools.common.verbundnummer", None)
+        cls = import_attr(".verbundnummer", "VerbundnummerAllocator", "tools.common")
+        self.assertEqual(cls.__module__, "tools.common.verbundnummer")
+        self.assertIn("tools.common.verbundnummer", IMPORT_TIMES)
+
+    def test_profiler_misst_untermodule(self):
+        for name in [n for n in sys.modules if n == "xml.dom" or n.startswith("xml.dom.")]:
+            sys.modules.pop(name)
+        with ImportProfiler("test") as prof:
+            import xml.dom.minidom  # noqa: F401
+        self.assertIn("xml.dom.minidom", prof.results)
+        gesamt, eigen = prof.results["xml.dom"]
+        self.assertLessEqual(eigen, gesamt)
+        self.assertNotIn(prof, sys.meta_path)
+
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Plugin als Paket laden wie QGIS (main.py importiert relativ)
+PLUGIN_LADEN = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location(
+    "toolbox_plugin", sys.argv[1] + "/__init__.py", submodule_search_locations=[sys.argv[1]])
+mod = importlib.util.module_from_spec(spec)
+sys.modules["toolbox_plugin"] = mod
+spec.loader.exec_module(mod)
+import toolbox_plugin.main
+print("psycopg2" in sys.modules)
+"""
+
+
+@unittest.skipUnless(importlib.util.find_spec("qgis"), "QGIS nicht installiert")
+class PluginStartTest(unittest.TestCase):
+    """Beim Laden des Plugins werden weder psycopg2 noch die Tool-Module importiert."""
+
+    def test_kein_psycopg2_beim_start(self):
+        ergebnis = subprocess.run([sys.executable, "-c", PLUGIN_LADEN, PLUGIN_DIR],
+                                  capture_output=True, text=True, timeout=120)
+        self.assertEqual(ergebnis.returncode, 0, ergebnis.stderr)
+        self.assertEqual(ergebnis.stdout.split()[-1], "False")
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(LazyImportTest))
+    suite.addTests(unittest.makeSuite(PluginStartTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
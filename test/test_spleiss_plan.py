@@ -0,0 +1,194 @@
+# coding=utf-8
+"""Tests für den Spleißplan (Faserstruktur, Vorschlag, Speichern).
+
+Die DB-Tests (Laden über ``KABEL_SQL``, Speichern) laufen nur mit
+``LWL_TEST_DSN`` (mit eingespielter ``sql/002_lwl_spleiss.sql``); sie arbeiten
+mit synthetischen Kabeln in einer Transaktion, die am Ende zurückgerollt wird.
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import os
+import time
+import unittest
+
+from tools.common.spleiss_plan import SpleissPlan, faser_farben, faser_struktur
+
+KNOTEN = 900001
+KABEL_TYPEN = {
+    1: {"id": 1, "BEZEICHNUNG": "A-DQ(ZN)B2Y 24x12E9/125"},   # 288 Fasern
+    2: {"id": 2, "BEZEICHNUNG": "A-DQ(ZN)B2Y 12x12E9/125"},   # 144 Fasern
+    3: {"id": 3, "BEZEICHNUNG": "Mini 4x12E9"},               # 48 Fasern
+    4: {"id": 4, "BEZEICHNUNG": "HE-Kabel 4E9"},              # 4 Fasern
+}
+
+
+def kabel_zeile(kabel_id, kabeltyp):
+    return (kabel_id, kabeltyp, "Streckenkabel", 1, KNOTEN, 7, KNOTEN, 7, [kabel_id * 10], [1], f"K{kabel_id}", True)
+
+
+def durchgehend_zeilen(kabel_id, kabeltyp):
+    """Kabel von Knoten 6 nach 8, das mit zwei Segmenten über KNOTEN läuft."""
+    return [(kabel_id, kabeltyp, "Streckenkabel", 1, 6, 8, 6, KNOTEN, [kabel_id * 10], [1], f"K{kabel_id}", False),
+            (kabel_id, kabeltyp, "Streckenkabel", 2, 6, 8, KNOTEN, 8, [kabel_id * 10 + 1], [2], f"K{kabel_id}", False)]
+
+
+def plan_288():
+    """Verteiler mit 288-Faser-Zubringer und abgehenden 144/48/48/4-Faser-Kabeln."""
+    rows = [kabel_zeile(1, 1), kabel_zeile(2, 2), kabel_zeile(3, 3), kabel_zeile(4, 3), kabel_zeile(5, 4)]
+    return SpleissPlan(KNOTEN).load_rows(rows, [], KABEL_TYPEN)
+
+
+class FaserStrukturTest(unittest.TestCase):
+
+    def test_bezeichnung(self):
+        self.assertEqual(faser_struktur(KABEL_TYPEN[1]), (288, 12))
+        self.assertEqual(faser_struktur(KABEL_TYPEN[4]), (4, 4))
+        self.assertEqual(faser_struktur({"ANZAHL_FASERN": 96, "FASERN_JE_BUENDEL": 8}), (96, 8))
+        self.assertEqual(faser_struktur(None)[0], 0)
+
+    def test_farben(self):
+        self.assertEqual(faser_farben(1), ("rot", "rot"))
+        self.assertEqual(faser_farben(14), ("grün", "grün"))
+        self.assertEqual(faser_farben(24), ("grün", "rosa"))
+
+
+class SpleissVorschlagTest(unittest.TestCase):
+
+    def test_farbe_auf_farbe(self):
+        plan = plan_288()
+        vorschlag = plan.vorschlag()
+        self.assertEqual(len(vorschlag), 144 + 48 + 48 + 4)
+        for (zk, zf), (k, f) in vorschlag:
+            self.assertEqual(zk, 1)
+            self.assertEqual(faser_farben(zf)[1], faser_farben(f, plan.kabel[k].je_buendel)[1])
+        # keine Zubringer-Faser doppelt
+        self.assertEqual(len({a for a, _ in vorschlag}), len(vorschlag))
+
+    def test_ganze_buendel(self):
+        plan = plan_288()
+        vorschlag = dict((b, a) for a, b in plan.vorschlag())
+        # Bündel 1 von Kabel 2 liegt komplett in einem Zubringer-Bündel
+        buendel = {(vorschlag[(2, f)][1] - 1) // 12 for f in range(1, 13)}
+        self.assertEqual(len(buendel), 1)
+
+    def test_vorhandene_spleisse_bleiben(self):
+        rows = [kabel_zeile(1, 3), kabel_zeile(2, 3)]
+        plan = SpleissPlan(KNOTEN).load_rows(rows, [(1, 1, 2, 1)], KABEL_TYPEN)
+        vorschlag = plan.vorschlag()
+        self.assertNotIn(((1, 1), (2, 1)), vorschlag)
+        self.assertEqual(len(vorschlag), 47)
+        plan.uebernehmen(vorschlag)
+        self.assertEqual(plan.frei(2), [])
+        with self.assertRaises(ValueError):
+            plan.verbinde((1, 1), (2, 2))
+
+    def test_diff(self):
+        rows = [kabel_zeile(1, 3), kabel_zeile(2, 3)]
+        plan = SpleissPlan(KNOTEN).load_rows(rows, [(1, 1, 2, 1)], KABEL_TYPEN)
+        plan.trenne((2, 1))
+        plan.verbinde((1, 2), (2, 2))
+        self.assertEqual(plan.diff(), ([((1, 1), (2, 1))], [((1, 2), (2, 2))]))
+
+    def test_durchgehendes_kabel(self):
+        rows = [kabel_zeile(1, 3), kabel_zeile(2, 3)] + durchgehend_zeilen(3, 1)
+        plan = SpleissPlan(KNOTEN).load_rows(rows, [], KABEL_TYPEN)
+        self.assertEqual(sorted(plan.kabel), [1, 2])
+        self.assertEqual(sorted(plan.durchgehend), [3])
+        self.assertEqual(plan.durchgehend[3].leerrohre, [30, 31])
+        # das 288-Faser-Kabel läuft durch: kein Zubringer, kein Vorschlag dafür
+        self.assertEqual(plan.zubringer(), 1)
+        vorschlag = plan.vorschlag()
+        self.assertEqual(len(vorschlag), 48)
+        self.assertFalse(any(k == 3 for a, b in vorschlag for k, _ in (a, b)))
+        with self.assertRaises(ValueError):
+            plan.verbinde((1, 1), (3, 1))
+
+    def test_288_fasern_schnell(self):
+        t0 = time.perf_counter()
+        plan = plan_288()
+        plan.uebernehmen(plan.vorschlag())
+        plan.diff()
+        self.assertLess(time.perf_counter() - t0, 0.5)
+
+
+# Synthetische Kabel für den Lade-Test:
+# (KABEL_ID, SEGMENT_ID, STARTKNOTEN, ENDKNOTEN, VONKNOTEN, NACHKNOTEN, VIRTUELLER_KNOTEN, ID_LEERROHR)
+KABEL_VERLEGT = [
+    (990001, 1, KNOTEN, 6, KNOTEN, 6, None, [9900011]),       # beginnt am Knoten
+    (990002, 1, 6, 8, 6, KNOTEN, None, [9900021]),            # läuft mit zwei Segmenten durch
+    (990002, 2, 6, 8, KNOTEN, 8, None, [9900022]),
+    (990003, 1, 6, 8, 6, 8, KNOTEN, [9900031]),               # endet am virtuellen Knoten
+    (990004, 1, 6, 8, 6, 8, None, [9900041]),                 # nicht am Knoten
+]
+
+
+@unittest.skipUnless(os.environ.get("LWL_TEST_DSN"), "LWL_TEST_DSN nicht gesetzt")
+class SpleissSpeichernTest(unittest.TestCase):
+
+    def test_laden_nur_endende_kabel(self):
+        import psycopg2
+
+        conn = psycopg2.connect(os.environ["LWL_TEST_DSN"])
+        try:
+            with conn.cursor() as cur:
+                cur.execute('SELECT min(id) FROM lwl."LWL_Kabel_Typ"')
+                kabeltyp = cur.fetchone()[0]
+                for kid, seg, start, ende, von, nach, virtuell, leerrohre in KABEL_VERLEGT:
+                    cur.execute("""
+                        INSERT INTO lwl."LWL_Kabel_Verlegt"
+                        ("KABEL_ID", "KABELTYP", "TYP", "SEGMENT_ID", "STARTKNOTEN", "ENDKNOTEN",
+                         "VONKNOTEN", "NACHKNOTEN", "VIRTUELLER_KNOTEN", "ID_LEERROHR", "ID_TRASSE",
+                         "BEZEICHNUNG_INTERN")
+                        VALUES (%s, %s, 'Streckenkabel', %s, %s, %s, %s, %s, %s,
+                                CAST(%s AS bigint[]), CAST(%s AS bigint[]), %s)
+                    """, (kid, kabeltyp, seg, start, ende, von, nach, virtuell, leerrohre, [1], f"K{kid}"))
+
+                plan = SpleissPlan(KNOTEN).load(cur, KABEL_TYPEN)
+                self.assertEqual(sorted(plan.kabel), [990001, 990003])
+                self.assertEqual(sorted(plan.durchgehend), [990002])
+                self.assertEqual(plan.durchgehend[990002].leerrohre, [9900021, 9900022])
+                self.assertTrue(plan.tabelle_vorhanden)
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_speichern_und_laden(self):
+        import psycopg2
+
+        conn = psycopg2.connect(os.environ["LWL_TEST_DSN"])
+        try:
+            with conn.cursor() as cur:
+                plan = plan_288()
+                plan.uebernehmen(plan.vorschlag())
+                self.assertEqual(plan.speichern(cur, "test"), (0, 244))
+                # Bestand erst nach dem Commit (hier: gespeichert()) übernehmen
+                self.assertEqual(plan.diff()[1][:1], plan.paare()[:1])
+                plan.gespeichert()
+                self.assertEqual(plan.diff(), ([], []))
+
+                neu = SpleissPlan(KNOTEN)
+                cur.execute('SELECT "KABEL_1", "FASER_1", "KABEL_2", "FASER_2" FROM lwl."LWL_Spleiss" '
+                            'WHERE "ID_KNOTEN" = %s', (KNOTEN,))
+                neu.load_rows([kabel_zeile(i, t) for i, t in ((1, 1), (2, 2), (3, 3), (4, 3), (5, 4))],
+                              cur.fetchall(), KABEL_TYPEN)
+                self.assertEqual(neu.paare(), plan.paare())
+
+                neu.trenne((5, 1))
+                self.assertEqual(neu.speichern(cur, "test"), (1, 0))
+                # veralteter Stand wird abgewiesen
+                with self.assertRaises(Exception):
+                    plan.speichern(cur, "test")
+        finally:
+            conn.rollback()
+            conn.close()
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite([unittest.makeSuite(FaserStrukturTest),
+                                unittest.makeSuite(SpleissVorschlagTest),
+                                unittest.makeSuite(SpleissSpeichernTest)])
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,50 @@
+# coding=utf-8
+"""Tests für das synthetische Benchmark-Netz (ohne QGIS/Datenbank)."""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import unittest
+
+from tools.common.rohr_graph import RohrGraph
+from tools.common.trassen_graph import TrassenGraph
+
+from .benchmark.synthetic_network import SyntheticNetwork
+
+
+class SyntheticNetworkTest(unittest.TestCase):
+    """Reproduzierbarkeit und Zusammenspiel mit den Graph-Engines."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.net = SyntheticNetwork(knoten=120, seed=3)
+
+    def test_reproduzierbar(self):
+        self.assertEqual(SyntheticNetwork(knoten=120, seed=3).stats(), self.net.stats())
+        self.assertEqual(SyntheticNetwork(knoten=120, seed=3).trassen_rows(), self.net.trassen_rows())
+
+    def test_leerrohre_folgen_trassen(self):
+        graph = TrassenGraph()
+        graph.load_rows(self.net.trassen_rows())
+        for lr in self.net.leerrohre.values():
+            knoten = [lr["von"]]
+            for tid, reverse in lr["trassen"]:
+                von, nach, _ = self.net.trassen[tid]
+                self.assertEqual(knoten[-1], nach if reverse else von)
+                knoten.append(von if reverse else nach)
+            self.assertEqual(knoten[-1], lr["nach"])
+
+    def test_rohrgraph(self):
+        graph = RohrGraph().load_rows(*self.net.rohr_graph_rows())
+        self.assertEqual(len(graph.rohre), self.net.stats()["rohre"])
+        he = self.net.hauseinfuehrungen[0]
+        status = graph.rohrstatus(he[1], self.net.leerrohre[he[1]]["vkg"], self.net.he_positions(he[1]))
+        self.assertIsNotNone(status)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(SyntheticNetworkTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
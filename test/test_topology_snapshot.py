@@ -0,0 +1,91 @@
+# coding=utf-8
+"""Tests für den Topologie-Schnappschuss (SQLite je Umgebung).
+
+Der Abgleich mit der Datenbank läuft nur mit ``LWL_TEST_DSN`` (psycopg2-DSN).
+"""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import closing
+
+from tools.common.topology_snapshot import TopologySnapshot
+
+
+class TopologySnapshotDateiTest(unittest.TestCase):
+    """Schreiben, Wiederladen und Abfragen ohne Datenbank."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "topologie_Test.sqlite")
+        snap = TopologySnapshot(self.path)
+        trassen = [(1, 10, 11, 5.0), (2, 11, 12, 7.5)]
+        snap.meta = {"trasse": {"hwm": "2025-01-01 00:00:00", "anzahl": 2, "voll_am": 1.0}}
+        snap._apply("trasse", trassen)
+        snap._write("trasse", trassen)
+
+    def tearDown(self):
+        """Runs after each test."""
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_wiederladen(self):
+        snap = TopologySnapshot(self.path)
+        self.assertTrue(snap.load())
+        self.assertEqual(sorted(snap.trassen_rows()), [(1, 10, 11, 5.0), (2, 11, 12, 7.5)])
+        self.assertEqual(snap.meta["trasse"]["hwm"], "2025-01-01 00:00:00")
+
+    def test_entfernen(self):
+        snap = TopologySnapshot(self.path)
+        snap.load()
+        snap.remove_ids("trasse", [1])
+        snap = TopologySnapshot(self.path)
+        snap.load()
+        self.assertEqual(snap.trassen_rows(), [(2, 11, 12, 7.5)])
+
+    def test_altes_format_verworfen(self):
+        with closing(sqlite3.connect(self.path)) as db:
+            db.execute("PRAGMA user_version = 1")
+        self.assertFalse(TopologySnapshot(self.path).load())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_ohne_datei(self):
+        self.assertFalse(TopologySnapshot(os.path.join(self.tmp, "fehlt.sqlite")).load())
+
+
+@unittest.skipUnless(os.environ.get("LWL_TEST_DSN"), "LWL_TEST_DSN nicht gesetzt")
+class TopologySnapshotDbTest(unittest.TestCase):
+    """Voller und inkrementeller Abgleich liefern denselben Stand wie die DB."""
+
+    def test_abgleich(self):
+        import psycopg2
+        tmp = tempfile.mkdtemp()
+        conn = psycopg2.connect(os.environ["LWL_TEST_DSN"])
+        try:
+            path = os.path.join(tmp, "topologie_Test.sqlite")
+            with conn.cursor() as cur:
+                TopologySnapshot(path).refresh(cur)
+                snap = TopologySnapshot(path)
+                self.assertTrue(snap.load())
+                changed = snap.refresh(cur)
+                cur.execute('SELECT id, "VONKNOTEN", "NACHKNOTEN", "LAENGE" FROM lwl."LWL_Trasse"')
+                erwartet = {int(r[0]) for r in cur.fetchall()}
+            self.assertEqual(set(snap.rows["trasse"]), erwartet)
+            self.assertEqual(changed["trasse"], 0)
+        finally:
+            conn.close()
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    suite = unittest.TestSuite()
+    suite.addTests(unittest.makeSuite(TopologySnapshotDateiTest))
+    suite.addTests(unittest.makeSuite(TopologySnapshotDbTest))
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
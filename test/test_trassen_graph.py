@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Tests für den In-Memory-Trassengraphen (k-kürzeste Wege wie pgr_ksp)."""
+
+__author__ = 'Marcel.Kelterer@gmail.com'
+__date__ = '2025-01-20'
+__copyright__ = 'Copyright 2025, Siegele Connect'
+
+import unittest
+
+from tools.common.trassen_graph import TrassenGraph
+
+
+# (id, VONKNOTEN, NACHKNOTEN, LAENGE) – kleines Netz mit Parallel-Trasse 2/7
+TRASSEN = [
+    (1, 1, 2, 1.0),
+    (2, 2, 3, 1.0),
+    (3, 1, 3, 3.0),
+    (4, 3, 4, 1.0),
+    (5, 2, 4, 4.0),
+    (6, 1, 4, 10.0),
+    (7, 2, 3, 1.5),
+]
+
+
+class TrassenGraphTest(unittest.TestCase):
+    """Yen-Routing im Trassengraphen."""
+
+    def setUp(self):
+        """Runs before each test."""
+        self.graph = TrassenGraph()
+        self.graph.load_rows(TRASSEN)
+
+    def test_k_shortest_paths(self):
+        """Die drei günstigsten Routen, aufsteigend nach Länge."""
+        routes = self.graph.k_shortest_paths(1, 4, 3)
+        self.assertEqual([r[1] for r in routes], [[1, 2, 4], [1, 7, 4], [3, 4]])
+        self.assertEqual([r[0] for r in routes], [3.0, 3.5, 4.0])
+
+    def test_ungerichtet(self):
+        """Trassen sind in beide Richtungen befahrbar."""
+        routes = self.graph.k_shortest_paths(4, 1, 1)
+        self.assertEqual(routes[0][1], [4, 2, 1])
+
+    def test_excluded_edges(self):
+        """Ausgeschlossene Trassen (z.B. Parent-Leerrohr) werden nicht verwendet."""
+        routes = self.graph.k_shortest_paths(1, 4, 3, excluded_edges={1})
+        for _, trassen in routes:
+            self.assertNotIn(1, trassen)
+        self.assertEqual(routes[0][1], [3, 4])
+
+    def test_kein_pfad(self):
+        """Unbekannte Knoten liefern keine Route."""
+        self.assertEqual(self.graph.k_shortest_paths(1, 99, 3), [])
+
+    def test_remove_edge(self):
+        """Entfernte Trassen tauchen in keiner Route mehr auf."""
+        self.graph.remove_edge(4)
+        routes = self.graph.k_shortest_paths(1, 4, 3)
+        self.assertEqual(routes[0][1], [1, 5])
+
+    def test_aenderung_waehrend_routing(self):
+        """Layer-Änderungen während Yen ersetzen den Graphen; die Suche rechnet auf ihrem Stand weiter."""
+        stand = self.graph.snapshot()
+
+        def aendern():
+            self.graph.remove_edge(4)
+            self.graph.add_edge(8, 1, 4, 0.5)
+            return False
+
+        routes = stand.k_shortest_paths(1, 4, 3, abbruch=aendern)
+        self.assertEqual([r[1] for r in routes], [[1, 2, 4], [1, 7, 4], [3, 4]])
+        self.assertIn(4, stand.edges)
+        self.assertNotIn(8, stand.adj[1])
+        self.assertEqual(self.graph.k_shortest_paths(1, 4, 1)[0][1], [8])
+
+    def test_via_sortiert_nach_laenge(self):
+        """Via-Routen laufen über den Zwischenknoten und sind nach Länge sortiert."""
+        routes = self.graph.k_shortest_paths_via(1, [2], 4, 3)
+        self.assertEqual([r[1] for r in routes], [[1, 2, 4], [1, 7, 4], [1, 5]])
+        self.assertEqual([r[0] for r in routes], [3.0, 3.5, 5.0])
+
+    def test_via_keine_trasse_doppelt(self):
+        """Hin- und Rückweg über dieselbe Trasse sind keine gültige Via-Route."""
+        routes = self.graph.k_shortest_paths_via(1, [4], 3, 5)
+        for _, trassen in routes:
+            self.assertEqual(len(trassen), len(set(trassen)))
+        self.assertEqual(routes[0], (6.0, [1, 5, 4]))
+
+    def test_abbruch(self):
+        """Nach einem Abbruch (z.B. QgsTask.isCanceled) endet die Suche nach der ersten Route."""
+        routes = self.graph.k_shortest_paths(1, 4, 3, abbruch=lambda: True)
+        self.assertEqual([r[1] for r in routes], [[1, 2, 4]])
+        routes = self.graph.k_shortest_paths_via(1, [2], 4, 3, abbruch=lambda: True)
+        self.assertEqual(len(routes), 1)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TrassenGraphTest)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,2 @@
+# Diese Datei markiert diesen Ordner als Python-Modul.
+# Gemeinsame Dienste (DB-Pool, Caches, ...), die von allen Tools genutzt werden.
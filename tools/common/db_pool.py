@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+Gemeinsamer Verbindungs-Pool für alle Tools der Toolbox.
+
+Statt für jede Abfrage ``psycopg2.connect(...)`` aufzurufen (TCP + Auth pro
+Query), leihen sich die Tools Verbindungen aus einem Pool, der vom
+ToolBoxSiegeleCoPlugin gehalten wird (``iface.plugin.db_pools``).
+
+- ein Pool je Umgebung/Benutzer (Test/Produktiv)
+- Health-Check beim Ausleihen (nach Leerlauf ``SELECT 1``), defekte
+  Verbindungen werden verworfen und neu aufgebaut
+- Zähler für Handshakes, Ausleihen und Verbindungszeit; ``measure()`` loggt
+  die Ersparnis pro Aktion (z.B. "Route berechnen")
+- jede Anweisung läuft über ``TimingCursor`` und landet mit Dauer und
+  Zeilenzahl in ``instrumentation.metrics``
+
+Verwendung (ersetzt ``with psycopg2.connect(**db) as conn``)::
+
+    with self.db_pool.connection() as conn, conn.cursor() as cur:
+        cur.execute(...)
+"""
+
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from .instrumentation import metrics, record_sql
+
+logger = logging.getLogger(__name__)
+
+UMGEBUNG_HOSTS = {
+    "Testumgebung": "172.30.0.4",
+    "Produktivumgebung": "172.30.0.3",
+}
+
+
+def umgebung_for_host(host):
+    """Liefert den Umgebungsnamen zu einem DB-Host (oder den Host selbst)."""
+    for name, h in UMGEBUNG_HOSTS.items():
+        if h == host:
+            return name
+    return host or "unbekannt"
+
+
+class TimingCursor(psycopg2.extensions.cursor):
+    """Cursor, der Dauer und Zeilenzahl jeder Anweisung an ``instrumentation`` meldet."""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_sql(query, time.perf_counter() - t0, self.rowcount)
+
+    def executemany(self, query, vars_list):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_sql(query, time.perf_counter() - t0, self.rowcount)
+
+
+class PoolStats:
+    """Einfache Zähler für einen Pool (threadsicher über den Pool-Lock)."""
+
+    FIELDS = ("handshakes", "handshake_seconds", "borrows", "reused",
+              "health_checks", "health_failures", "discarded")
+
+    def __init__(self):
+        self.handshakes = 0          # neu aufgebaute Verbindungen
+        self.handshake_seconds = 0.0 # Zeit in psycopg2.connect()
+        self.borrows = 0             # Ausleihen insgesamt
+        self.reused = 0              # Ausleihen ohne neuen Handshake
+        self.health_checks = 0
+        self.health_failures = 0
+        self.discarded = 0
+
+    def snapshot(self):
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+
+class DbPool:
+    """Pool von psycopg2-Verbindungen für genau einen Satz Verbindungsparameter."""
+
+    HEALTH_CHECK_AFTER = 30.0   # Sekunden Leerlauf, danach SELECT 1 vor Ausgabe
+
+    def __init__(self, db_params, umgebung=None, maxconn=8):
+        self.db_params = dict(db_params)
+        self.umgebung = umgebung or umgebung_for_host(self.db_params.get("host"))
+        self.maxconn = maxconn
+        self.stats = PoolStats()
+        self._lock = threading.Lock()
+        self._idle = []              # [(conn, zeitpunkt_rueckgabe)]
+        self._in_use = set()
+        self._closed = False
+
+    # ---------- Verbindungen ----------
+    def _open(self):
+        t0 = time.perf_counter()
+        conn = psycopg2.connect(cursor_factory=TimingCursor, **self.db_params)
+        dt = time.perf_counter() - t0
+        with self._lock:
+            self.stats.handshakes += 1
+            self.stats.handshake_seconds += dt
+        logger.debug("DB-Pool %s: neue Verbindung in %.1f ms", self.umgebung, dt * 1000.0)
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.stats.discarded += 1
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status if hasattr(conn, "info") else None
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - idle_since < self.HEALTH_CHECK_AFTER:
+            return True
+        with self._lock:
+            self.stats.health_checks += 1
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            with self._lock:
+                self.stats.health_failures += 1
+            return False
+
+    def getconn(self):
+        """Leiht eine geprüfte Verbindung aus (neu aufgebaut, falls nötig)."""
+        if self._closed:
+            raise psycopg2.InterfaceError("DB-Pool ist geschlossen")
+        while True:
+            with self._lock:
+                entry = self._idle.pop() if self._idle else None
+                if entry is None and len(self._in_use) >= self.maxconn:
+                    raise psycopg2.OperationalError(
+                        f"DB-Pool {self.umgebung}: alle {self.maxconn} Verbindungen in Benutzung")
+            if entry is None:
+                conn = self._open()
+                reused = False
+                break
+            conn, idle_since = entry
+            if self._healthy(conn, idle_since):
+                reused = True
+                break
+            logger.info("DB-Pool %s: defekte Verbindung verworfen, baue neu auf", self.umgebung)
+            self._discard(conn)
+        with self._lock:
+            self._in_use.add(conn)
+            self.stats.borrows += 1
+            if reused:
+                self.stats.reused += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        """Gibt eine Verbindung zurück; offene Transaktionen werden zurückgerollt."""
+        with self._lock:
+            self._in_use.discard(conn)
+        if close or self._closed or conn.closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            if conn.autocommit:
+                conn.autocommit = False
+        except psycopg2.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        """
+        Verhält sich wie ``with psycopg2.connect(...) as conn``: Commit bei
+        Erfolg, Rollback bei Fehler – die Verbindung geht danach zurück in den
+        Pool statt geschlossen zu werden.
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+            if not conn.closed and not conn.autocommit:
+                conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except BaseException:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def closeall(self):
+        with self._lock:
+            idle = [c for c, _ in self._idle]
+            busy = list(self._in_use)
+            self._idle = []
+            self._in_use = set()
+            self._closed = True
+        for conn in idle + busy:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    # ---------- Messung ----------
+    @contextmanager
+    def measure(self, aktion):
+        """Loggt Handshakes/Ausleihen, die innerhalb des Blocks anfallen."""
+        vorher = self.stats.snapshot()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.record(aktion, time.perf_counter() - t0)
+            nachher = self.stats.snapshot()
+            handshakes = nachher["handshakes"] - vorher["handshakes"]
+            borrows = nachher["borrows"] - vorher["borrows"]
+            hs_ms = (nachher["handshake_seconds"] - vorher["handshake_seconds"]) * 1000.0
+            logger.info(
+                "%s [%s]: %.0f ms gesamt, %d Ausleihen, %d Handshakes (%.0f ms), %d Handshakes gespart",
+                aktion, self.umgebung, (time.perf_counter() - t0) * 1000.0,
+                borrows, handshakes, hs_ms, borrows - handshakes)
+
+
+def measure_db(aktion):
+    """Methoden-Dekorator: misst DB-Handshakes über ``self.db_pool`` (falls vorhanden)."""
+    def deco(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            pool = getattr(self, "db_pool", None)
+            if pool is None:
+                return func(self, *args, **kwargs)
+            with pool.measure(aktion):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return deco
+
+
+class DbPoolManager:
+    """Hält je Umgebung/Benutzer einen DbPool; gehört dem ToolBoxSiegeleCoPlugin."""
+
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(db_params):
+        return (db_params.get("host"), str(db_params.get("port")),
+                db_params.get("dbname"), db_params.get("user"))
+
+    def get_pool(self, db_params, umgebung=None):
+        """Liefert den Pool zu den Verbindungsparametern (legt ihn bei Bedarf an)."""
+        key = self._key(db_params)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is not None and pool.db_params != dict(db_params):
+                # z.B. neues Passwort -> alten Pool verwerfen
+                pool.closeall()
+                pool = None
+            if pool is None or pool._closed:
+                pool = DbPool(db_params, umgebung=umgebung)
+                self._pools[key] = pool
+            return pool
+
+    def stats(self):
+        """{umgebung/benutzer: Zähler} für alle Pools."""
+        with self._lock:
+            return {f"{p.umgebung}/{k[3]}": p.stats.snapshot() for k, p in self._pools.items()}
+
+    def closeall(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for p in pools:
+            p.closeall()
+
+
+# Fallback, falls ein Tool ohne Plugin-Instanz (z.B. in Tests) gestartet wird
+_fallback_manager = DbPoolManager()
+
+
+def get_db_pool(iface, db_params, umgebung=None):
+    """Pool für ``db_params`` aus dem Plugin-Manager (``iface.plugin.db_pools``)."""
+    if not db_params:
+        return None
+    plugin = getattr(iface, "plugin", None)
+    manager = getattr(plugin, "db_pools", None) or _fallback_manager
+    return manager.get_pool(db_params, umgebung=umgebung)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Objektsuche für Kartenklicks auf beliebigen Layern (Linien, Punkte, Flächen).
+
+Ein ``FeatureLocator`` hält je Layer einen QgsSpatialIndex mit gespeicherten
+Geometrien. Ein Klick fragt nur das Toleranz-Rechteck ab und bewertet die
+Kandidaten nach echter Distanz – statt alle Features über den Provider zu
+lesen. Änderungen am Layer (Bearbeitung oder gespeichert) verwerfen den
+Index; er wird beim nächsten Klick neu aufgebaut.
+"""
+
+import logging
+import time
+
+from qgis.core import QgsFeatureRequest, QgsGeometry, QgsPointXY, QgsRectangle, QgsSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureLocator:
+    """Räumlicher Index über die Geometrien eines Layers."""
+
+    # Signale, nach denen der Index veraltet ist
+    SIGNALS = (
+        "featureAdded", "featureDeleted", "geometryChanged", "afterRollBack",
+        "committedFeaturesAdded", "committedFeaturesRemoved", "committedGeometriesChanges",
+        "dataChanged",
+    )
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.index = None
+        self._watched = False
+
+    def _build(self):
+        t0 = time.perf_counter()
+        req = QgsFeatureRequest()
+        req.setNoAttributes()
+        self.index = QgsSpatialIndex(self.layer.getFeatures(req), None,
+                                     QgsSpatialIndex.FlagStoreFeatureGeometries)
+        logger.info("Objektindex %s aufgebaut in %.0f ms",
+                    self.layer.name(), (time.perf_counter() - t0) * 1000.0)
+
+    def invalidate(self, *_):
+        self.index = None
+
+    def watch(self):
+        if self._watched:
+            return
+        for name in self.SIGNALS:
+            signal = getattr(self.layer, name, None)
+            if signal is not None:
+                signal.connect(self.invalidate)
+        self._watched = True
+
+    def nearest(self, point, tolerance):
+        """(fid, distanz) des nächsten Objekts innerhalb ``tolerance`` oder None."""
+        if self.index is None:
+            self._build()
+        point = QgsPointXY(point)
+        point_geom = QgsGeometry.fromPointXY(point)
+        rect = QgsRectangle(point.x() - tolerance, point.y() - tolerance,
+                            point.x() + tolerance, point.y() + tolerance)
+        best = None
+        for fid in self.index.intersects(rect):
+            geom = self.index.geometry(fid)
+            if geom is None or geom.isEmpty():
+                continue
+            dist = geom.distance(point_geom)
+            if dist <= tolerance and (best is None or dist < best[1]):
+                best = (fid, dist)
+        return best
+
+    def feature(self, fid):
+        """Feature (mit Attributen) zu einer Feature-ID oder None."""
+        return next(self.layer.getFeatures(QgsFeatureRequest(fid)), None)
+
+
+_locators = {}
+
+
+def get_feature_locator(layer):
+    """Sitzungs-Index je Layer (wird beim ersten Klick aufgebaut)."""
+    loc = _locators.get(layer.id())
+    if loc is None or loc.layer is not layer:
+        loc = FeatureLocator(layer)
+        loc.watch()
+        _locators[layer.id()] = loc
+    return loc
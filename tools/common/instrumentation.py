@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Logging und Zeitmessung für alle Tools (ersetzt ``print("DEBUG: ...")``).
+
+- ``get_tool_logger("leerrohr_verlegen")``: Logger ``lwl.<tool>``; die Stufe
+  kommt aus ``LWL_LOG_LEVEL`` bzw. QSettings ``SiegeleCo/ToolBox/log_level``
+  (Standard INFO). Meldungen mit %-Argumenten werden nur formatiert, wenn
+  die Stufe aktiv ist; für teure Ausgaben gibt es ``lazy(fn)``.
+- ``timed("Route berechnen")``: Dekorator oder Kontextmanager für heiße Pfade.
+- ``record_sql``: Dauer und Zeilenzahl je SQL-Anweisung (vom Verbindungs-Pool
+  für jede Abfrage aufgerufen, siehe ``db_pool.TimingCursor``).
+- ``metrics``: sammelt die Dauern je Vorgang der Sitzung; ``summary()`` mit
+  p50/p95, ``log_summary()`` und ``export(pfad)`` (JSON) beim Beenden.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+ROOT_LOGGER = "lwl"
+MAX_SAMPLES = 2000          # je Vorgang (ältere fallen heraus)
+
+
+def _configured_level():
+    level = os.environ.get("LWL_LOG_LEVEL")
+    if not level:
+        try:
+            from PyQt5.QtCore import QSettings
+            level = QSettings("SiegeleCo", "ToolBox").value("log_level", "")
+        except Exception:
+            level = ""
+    level = str(level or "INFO").upper()
+    return getattr(logging, level, logging.INFO) if not level.isdigit() else int(level)
+
+
+def get_tool_logger(tool):
+    """Logger ``lwl.<tool>``; die Stufe wird einmal am Wurzel-Logger ``lwl`` gesetzt."""
+    root = logging.getLogger(ROOT_LOGGER)
+    if not getattr(root, "_lwl_configured", False):
+        root.setLevel(_configured_level())
+        root._lwl_configured = True
+    return logging.getLogger(f"{ROOT_LOGGER}.{tool}")
+
+
+class lazy:
+    """Wird erst beim Formatieren ausgewertet: ``log.debug("%s", lazy(lambda: teuer()))``."""
+
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+    __repr__ = __str__
+
+
+def short(value, limit=200):
+    """Gekürzte Darstellung großer Werte (Abfrageergebnisse, Listen) fürs Log."""
+    if isinstance(value, (list, tuple)) and len(value) > 5:
+        text = f"{len(value)} Einträge, erste: {list(value[:3])!r}"
+    else:
+        text = repr(value)
+    return text if len(text) <= limit else text[:limit] + " …"
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Metrics:
+    """Dauern (und Zeilenzahlen) je Vorgang für die laufende Sitzung."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}     # vorgang -> deque[sekunden]
+        self._counts = {}      # vorgang -> [aufrufe, zeilen, summe_s]
+        self.started_at = time.time()
+
+    def record(self, vorgang, seconds, rows=None):
+        with self._lock:
+            samples = self._samples.get(vorgang)
+            if samples is None:
+                samples = self._samples[vorgang] = deque(maxlen=MAX_SAMPLES)
+                self._counts[vorgang] = [0, 0, 0.0]
+            samples.append(seconds)
+            c = self._counts[vorgang]
+            c[0] += 1
+            c[1] += rows or 0
+            c[2] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._counts = {}
+            self.started_at = time.time()
+
+    def summary(self):
+        """{vorgang: {anzahl, zeilen, summe_ms, p50_ms, p95_ms, max_ms}}."""
+        with self._lock:
+            items = [(k, sorted(v), list(self._counts[k])) for k, v in self._samples.items()]
+        out = {}
+        for vorgang, values, (anzahl, zeilen, summe) in items:
+            out[vorgang] = {
+                "anzahl": anzahl,
+                "zeilen": zeilen,
+                "summe_ms": round(summe * 1000.0, 1),
+                "p50_ms": round(_percentile(values, 0.50) * 1000.0, 1),
+                "p95_ms": round(_percentile(values, 0.95) * 1000.0, 1),
+                "max_ms": round(values[-1] * 1000.0, 1),
+            }
+        return out
+
+    def log_summary(self, logger=None, top=30):
+        """Loggt die Vorgänge mit der größten Gesamtzeit."""
+        rows = sorted(self.summary().items(), key=lambda kv: kv[1]["summe_ms"], reverse=True)
+        if not rows:
+            return
+        lines = "\n".join(
+            f"  {s['anzahl']:6d}x  p50 {s['p50_ms']:8.1f}  p95 {s['p95_ms']:8.1f}  max {s['max_ms']:8.1f}  "
+            f"summe {s['summe_ms']:9.1f} ms  {name}"
+            for name, s in rows[:top])
+        (logger or logging.getLogger(ROOT_LOGGER)).info("Laufzeiten der Sitzung (ms):\n%s", lines)
+
+    def export(self, path):
+        """Schreibt die Zusammenfassung als JSON."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"gestartet": self.started_at, "exportiert": time.time(),
+                       "vorgaenge": self.summary()}, fh, indent=1, ensure_ascii=False)
+        return path
+
+
+metrics = Metrics()
+
+
+class timed:
+    """
+    Misst einen Vorgang und trägt ihn in ``metrics`` ein; als Dekorator
+    (``@timed("Route berechnen")``) oder Kontextmanager (``with timed(...):``).
+    """
+
+    def __init__(self, vorgang, logger=None):
+        self.vorgang = vorgang
+        self.logger = logger
+        self._t0 = None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = time.perf_counter() - self._t0
+        metrics.record(self.vorgang, dt)
+        log = self.logger or logging.getLogger(ROOT_LOGGER)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s: %.1f ms", self.vorgang, dt * 1000.0)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.vorgang, self.logger):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+_sql_log = logging.getLogger(f"{ROOT_LOGGER}.sql")
+_ws = re.compile(r"\s+")
+
+
+def sql_key(statement, limit=90):
+    """Gleichbleibender Schlüssel für eine Anweisung (Whitespace zusammengefasst)."""
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    text = _ws.sub(" ", str(statement)).strip()
+    return "SQL " + (text if len(text) <= limit else text[:limit] + " …")
+
+
+def record_sql(statement, seconds, rows=None):
+    """Trägt eine ausgeführte SQL-Anweisung ein (Dauer, Zeilen)."""
+    key = sql_key(statement)
+    metrics.record(key, seconds, rows if rows is not None and rows >= 0 else None)
+    if _sql_log.isEnabledFor(logging.DEBUG):
+        _sql_log.debug("%.1f ms, %s Zeilen: %s", seconds * 1000.0, rows, key[4:])
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Vergabe der KABEL_ID für lwl."LWL_Kabel_Verlegt".
+
+Bisher wurde vor jedem Import ``MAX("KABEL_ID") + 1`` gelesen – eine Abfrage
+über die ganze Tabelle, und zwei gleichzeitige Importe bekamen dieselbe ID.
+Jetzt kommen die IDs aus einer Datenbank-Sequenz: ``nextval`` ist atomar,
+gilt transaktionsübergreifend und vergibt keine Nummer zweimal.
+
+Die IDs werden blockweise geholt (eine Abfrage je ``BLOCK`` IDs) und im
+Speicher vorgehalten; Serienimporte brauchen daher in der Regel gar keine
+Abfrage. Nicht verbrauchte IDs eines Blocks verfallen beim Beenden (Lücken
+wie beim CACHE einer Sequenz).
+
+Die Sequenz ist die der Spalte (``pg_get_serial_sequence``), sonst
+``lwl."LWL_Kabel_Verlegt_KABEL_ID_seq"``. Angelegt und hinter die höchste
+vorhandene KABEL_ID gestellt wird sie von der Migration
+``sql/001_kabel_id_sequenz.sql``; zur Laufzeit gibt es nur ``nextval``.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'lwl."LWL_Kabel_Verlegt"'
+# pg_get_serial_sequence nimmt den Spaltennamen wörtlich (ohne Anführungszeichen)
+COLUMN = "KABEL_ID"
+DEFAULT_SEQUENCE = 'lwl."LWL_Kabel_Verlegt_KABEL_ID_seq"'
+MIGRATION = "sql/001_kabel_id_sequenz.sql"
+
+BLOCK = 20
+
+
+class KabelIdAllocator:
+    """KABEL_IDs aus der Sequenz, blockweise im Speicher vorgehalten."""
+
+    def __init__(self, pool, block=BLOCK):
+        self.pool = pool
+        self.block = block
+        self.sequence = None
+        self._frei = []
+        self._lock = threading.Lock()
+
+    def _find_sequence(self, cur):
+        """Sequenz der Spalte bzw. die Standard-Sequenz (einmal je Sitzung); fehlt sie -> RuntimeError."""
+        cur.execute("SELECT coalesce(pg_get_serial_sequence(%s, %s), to_regclass(%s)::text)",
+                    (TABLE, COLUMN, DEFAULT_SEQUENCE))
+        sequence = cur.fetchone()[0]
+        if sequence is None:
+            raise RuntimeError(f"Sequenz {DEFAULT_SEQUENCE} fehlt – bitte die Migration {MIGRATION} einspielen.")
+        return sequence
+
+    def _fill(self, anzahl):
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            if self.sequence is None:
+                self.sequence = self._find_sequence(cur)
+            cur.execute("SELECT nextval(%s::regclass) FROM generate_series(1, %s)", (self.sequence, anzahl))
+            ids = [int(r[0]) for r in cur.fetchall()]
+        logger.debug("KABEL_IDs reserviert: %s..%s", ids[0], ids[-1])
+        return ids
+
+    def take(self, anzahl=1):
+        """``anzahl`` neue, nie vergebene KABEL_IDs (aufsteigend)."""
+        with self._lock:
+            if len(self._frei) < anzahl:
+                self._frei.extend(self._fill(max(self.block, anzahl - len(self._frei))))
+            ids, self._frei = self._frei[:anzahl], self._frei[anzahl:]
+        return ids
+
+    def next_id(self):
+        return self.take(1)[0]
+
+    def reset(self):
+        """Verwirft vorgehaltene IDs und die ermittelte Sequenz (z.B. nach Umgebungswechsel)."""
+        with self._lock:
+            self._frei = []
+            self.sequence = None
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_kabel_id_allocator(pool):
+    """Allocator je Datenbank (Host/Port/DB des Pools), lebt für die Sitzung."""
+    p = pool.db_params
+    key = (p.get("host"), str(p.get("port")), p.get("dbname"))
+    with _allocators_lock:
+        allocator = _allocators.get(key)
+        if allocator is None:
+            allocator = KabelIdAllocator(pool)
+            _allocators[key] = allocator
+        else:
+            allocator.pool = pool
+        return allocator
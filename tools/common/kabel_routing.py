@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Automatischer Kabelverlauf durch das Leerrohrnetz ("Verlauf berechnen").
+
+``KabelRoutingGraph`` hält die Leerrohre (VONKNOTEN/NACHKNOTEN, TYP 1–4,
+PARENT_LEERROHR_ID, SUBTYP) und die Anzahl der darin verlegten Kabel.
+``route`` liefert die kürzeste Leerrohrfolge (wenigste Leerrohre, bei
+Gleichstand die kleineren IDs) vom Start- zum Endknoten, optional über
+Zwischenknoten, die nur Leerrohre mit freier Kapazität nutzt.
+
+- Streckenkabel laufen in Leerrohren vom TYP 1 und 2, Hauseinführungskabel
+  in TYP 3 und zum Schluss in einer Hauseinführung (TYP 4). Eine
+  Hauseinführung ist nur vom Leerrohr aus erreichbar, von dem sie abzweigt
+  (PARENT_LEERROHR_ID), und endet an ihrem Knoten.
+- Kapazität eines Leerrohrs: Anzahl der Rohre laut ROHR_DEFINITION seines
+  Subtyps (ohne Definition 1); jedes verlegte Kabel belegt ein Rohr.
+- Der gewählte LWL_Kabel_Typ ändert den Bedarf nicht: LWL_Kabel_Typ führt
+  keinen Rohrbedarf, jedes Kabel – gleich welcher Faserzahl – liegt in genau
+  einem Rohr (wie ``BELEGUNG_SQL`` zählt). Der Bedarf eines neuen Kabels ist
+  daher ``KABEL_BEDARF`` = 1 freies Rohr je Leerrohr.
+
+Gesucht wird mit Dijkstra über die Zustände (Leerrohr, Austrittsknoten), so
+dass ein Leerrohr in beiden Richtungen befahren werden kann und die
+Abzweig-Regel der Hauseinführungen ohne Sonderfälle gilt.
+"""
+
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ein Kabel je Rohr (siehe oben)
+KABEL_BEDARF = 1
+
+KABEL_LEERROHR_TYPEN = {
+    "Streckenkabel": (1, 2),
+    "Hauseinführungskabel": (3, 4),
+}
+
+LEERROHR_SQL = """
+    SELECT id, "VONKNOTEN", "NACHKNOTEN", "TYP", "PARENT_LEERROHR_ID", "SUBTYP"
+    FROM lwl."LWL_Leerrohr"
+    WHERE "TYP" IN (1, 2, 3, 4)
+"""
+
+BELEGUNG_SQL = """
+    SELECT lr, count(DISTINCT "KABEL_ID")
+    FROM lwl."LWL_Kabel_Verlegt", unnest("ID_LEERROHR") AS lr
+    GROUP BY lr
+"""
+
+
+def _int(v):
+    return int(v) if v is not None else None
+
+
+def kapazitaet_aus_katalog(catalog):
+    """Kapazität je Subtyp (Anzahl Rohre laut ROHR_DEFINITION, sonst 1) aus dem Nachschlage-Katalog."""
+    cache = {}
+
+    def kapazitaet(subtyp_id):
+        if subtyp_id not in cache:
+            try:
+                cache[subtyp_id] = max(1, len(catalog.rohr_liste(subtyp_id)[0]))
+            except (ValueError, TypeError):
+                cache[subtyp_id] = 1
+        return cache[subtyp_id]
+    return kapazitaet
+
+
+class KabelRoutingGraph:
+    """Leerrohre als Kanten zwischen Knoten plus Abzweige der Hauseinführungen."""
+
+    def __init__(self):
+        self.leerrohre = {}      # lr_id -> (von, nach, typ, parent, subtyp)
+        self.by_knoten = {}      # knoten -> [lr_id] (TYP 1–3, nach id)
+        self.children = {}       # parent lr_id -> [lr_id] (TYP 4, nach id)
+        self.belegung = {}       # lr_id -> Anzahl Kabel
+        self.loaded_at = None
+
+    # ---------- Aufbau ----------
+    def load_rows(self, leerrohre, belegung=()):
+        """Baut den Graphen aus Zeilen wie von ``LEERROHR_SQL`` / ``BELEGUNG_SQL``."""
+        self.leerrohre, self.by_knoten, self.children = {}, {}, {}
+        for lr_id, von, nach, typ, parent, subtyp in leerrohre:
+            lr = (_int(von), _int(nach), _int(typ), _int(parent), _int(subtyp))
+            self.leerrohre[int(lr_id)] = lr
+        for lr_id in sorted(self.leerrohre):
+            von, nach, typ, parent, _ = self.leerrohre[lr_id]
+            if typ == 4:
+                if parent is not None:
+                    self.children.setdefault(parent, []).append(lr_id)
+                continue
+            for k in {von, nach} - {None}:
+                self.by_knoten.setdefault(k, []).append(lr_id)
+        self.set_belegung(belegung)
+        self.loaded_at = time.monotonic()
+        return self
+
+    def load(self, cur):
+        cur.execute(LEERROHR_SQL)
+        leerrohre = cur.fetchall()
+        cur.execute(BELEGUNG_SQL)
+        return self.load_rows(leerrohre, cur.fetchall())
+
+    def set_belegung(self, rows):
+        self.belegung = {int(lr): int(n) for lr, n in rows if lr is not None}
+
+    def refresh_belegung(self, cur):
+        """Liest nur die Kabelbelegung neu (eine Abfrage, vor jeder Berechnung)."""
+        cur.execute(BELEGUNG_SQL)
+        self.set_belegung(cur.fetchall())
+
+    # ---------- Abfragen ----------
+    def frei(self, lr_id, kapazitaet=None):
+        """Freie Plätze im Leerrohr."""
+        subtyp = self.leerrohre[lr_id][4]
+        gesamt = kapazitaet(subtyp) if kapazitaet else 1
+        return gesamt - self.belegung.get(lr_id, 0)
+
+    def _end_knoten(self, lr_id, eintritt):
+        von, nach, typ, _, _ = self.leerrohre[lr_id]
+        if typ == 4:
+            # Hauseinführung: endet am Knoten, der nicht am Abzweig liegt
+            return nach if nach is not None else von
+        if eintritt == von:
+            return nach
+        if eintritt == nach:
+            return von
+        return None
+
+    def route(self, start, ziel, typen=(1, 2), via=(), kapazitaet=None, bedarf=KABEL_BEDARF, excluded=()):
+        """
+        Kürzeste Leerrohrfolge ``start`` -> (``via`` ...) -> ``ziel`` über die
+        Leerrohr-Typen ``typen`` mit mindestens ``bedarf`` freien Rohren
+        (ein Kabel belegt ein Rohr, unabhängig vom Kabeltyp).
+        Rückgabe: [lr_id, ...] in Verlaufsrichtung oder None.
+        """
+        stationen = [start] + [v for v in via if v is not None] + [ziel]
+        verlauf = []
+        for a, b in zip(stationen, stationen[1:]):
+            teil = self._route(a, b, set(typen), kapazitaet, bedarf, set(excluded) | set(verlauf))
+            if teil is None:
+                return None
+            verlauf.extend(teil)
+        return verlauf
+
+    def _route(self, start, ziel, typen, kapazitaet, bedarf, excluded):
+        def nutzbar(lr_id):
+            return lr_id not in excluded and self.leerrohre[lr_id][2] in typen and \
+                self.frei(lr_id, kapazitaet) >= bedarf
+
+        if start == ziel:
+            return []
+        # Zustand: (Leerrohr, Austrittsknoten); Kosten = Anzahl Leerrohre
+        heap, best, prev = [], {}, {}
+        for lr_id in self.by_knoten.get(start, ()):
+            if nutzbar(lr_id):
+                state = (lr_id, self._end_knoten(lr_id, start))
+                best[state] = 1
+                prev[state] = None
+                heapq.heappush(heap, (1, lr_id, state[1]))
+        while heap:
+            kosten, lr_id, knoten = heapq.heappop(heap)
+            state = (lr_id, knoten)
+            if kosten > best.get(state, kosten):
+                continue
+            if knoten == ziel:
+                out = []
+                while state is not None:
+                    out.append(state[0])
+                    state = prev[state]
+                return out[::-1]
+            nachfolger = [(nb, self._end_knoten(nb, knoten)) for nb in self.by_knoten.get(knoten, ()) if nb != lr_id]
+            nachfolger += [(kind, self._end_knoten(kind, None)) for kind in self.children.get(lr_id, ())]
+            for nb, aus in nachfolger:
+                if aus is None or not nutzbar(nb):
+                    continue
+                nxt = (nb, aus)
+                if kosten + 1 < best.get(nxt, float("inf")):
+                    best[nxt] = kosten + 1
+                    prev[nxt] = state
+                    heapq.heappush(heap, (kosten + 1, nb, aus))
+        return None
+
+    def verlauf_knoten(self, start, verlauf):
+        """Knotenfolge eines Verlaufs (für Prüfung und Vorschau)."""
+        knoten = [start]
+        for lr_id in verlauf:
+            knoten.append(self._end_knoten(lr_id, knoten[-1]))
+        return knoten
+
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def _pool_key(pool):
+    p = pool.db_params
+    return (p.get("host"), str(p.get("port")), p.get("dbname"))
+
+
+def get_kabel_routing_graph(pool, max_age=600.0):
+    """
+    Liefert den gecachten Leerrohrgraphen der Umgebung; die Leerrohre werden
+    beim ersten Zugriff oder nach ``max_age`` Sekunden geladen, die
+    Kabelbelegung bei jedem Aufruf (eine Abfrage).
+    """
+    key = _pool_key(pool)
+    with _lock:
+        graph = _graphs.get(key)
+        stale = graph is None or graph.loaded_at is None or \
+            (max_age is not None and time.monotonic() - graph.loaded_at > max_age)
+        t0 = time.perf_counter()
+        with pool.connection() as conn, conn.cursor() as cur:
+            if stale:
+                graph = graph or KabelRoutingGraph()
+                graph.load(cur)
+                _graphs[key] = graph
+                logger.info("Leerrohrgraph für das Kabelrouting geladen: %d Leerrohre in %.0f ms",
+                            len(graph.leerrohre), (time.perf_counter() - t0) * 1000.0)
+            else:
+                graph.refresh_belegung(cur)
+        return graph
+
+
+def invalidate_kabel_routing_graph(pool=None):
+    """Verwirft den Cache (eine Umgebung oder alle), z.B. nach dem Verlegen von Leerrohren."""
+    with _lock:
+        if pool is None:
+            _graphs.clear()
+        else:
+            _graphs.pop(_pool_key(pool), None)
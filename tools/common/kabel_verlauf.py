@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Prüfung eines Kabelverlaufs (Leerrohrfolge) in einem Durchgang.
+
+Bisher wurde je Leerrohr des Verlaufs ein eigener ``QgsFeatureRequest``
+(``"id" = X``) abgesetzt, für die Hauseinführung zusätzlich der Hausanschluss
+im Schleifenrumpf, und die Prüfung brach beim ersten Fehler ab.
+``lade_leerrohre`` holt die Attribute aller Leerrohre des Verlaufs mit einer
+Abfrage (``"id" IN (...)``, ohne Geometrie); die ``pruefe_*``-Funktionen
+arbeiten nur noch im Speicher und liefern alle Fehler auf einmal.
+"""
+
+LEERROHR_FELDER = ["id", "VONKNOTEN", "NACHKNOTEN", "TYP", "PARENT_LEERROHR_ID"]
+
+
+def _wert(v):
+    """QGIS-NULL (QVariant) -> None."""
+    if v is None:
+        return None
+    is_null = getattr(v, "isNull", None)
+    return None if is_null is not None and is_null() else v
+
+
+def lade_attribute(layer, ids, felder):
+    """{id: {feld: wert}} für die Features mit ``"id" IN (ids)`` – eine Abfrage beim Provider."""
+    from qgis.core import QgsFeatureRequest
+
+    ids = sorted({int(i) for i in ids if i is not None})
+    if not ids:
+        return {}
+    request = QgsFeatureRequest().setFilterExpression(f'"id" IN ({", ".join(map(str, ids))})')
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(felder, layer.fields())
+    return {int(f["id"]): {feld: _wert(f[feld]) for feld in felder} for f in layer.getFeatures(request)}
+
+
+def lade_leerrohre(layer, ids):
+    return lade_attribute(layer, ids, LEERROHR_FELDER)
+
+
+def _kette(start, verlauf_ids, leerrohre, typen, fehler):
+    """
+    Geht die Leerrohre ab ``start`` durch und prüft die Anschlüsse.
+    Rückgabe: letzter Knoten. Nach einer Lücke wird in Erfassungsrichtung
+    (VON -> NACH) weitergeprüft, damit auch spätere Fehler gemeldet werden.
+    """
+    letzter = start
+    for lr_id in verlauf_ids:
+        lr = leerrohre.get(lr_id)
+        if lr is None:
+            fehler.append(f"Leerrohr {lr_id} nicht gefunden.")
+            letzter = None
+            continue
+        if lr["TYP"] not in typen:
+            fehler.append(f"Leerrohr {lr_id} hat TYP {lr['TYP']} (erlaubt: {', '.join(map(str, typen))}).")
+        von, nach = lr["VONKNOTEN"], lr["NACHKNOTEN"]
+        if letzter is not None and letzter not in (von, nach):
+            fehler.append(f"Lücke vor Leerrohr {lr_id}: letzter Knoten {letzter}, VON {von}, NACH {nach}.")
+        letzter = von if letzter == nach else nach
+    return letzter
+
+
+def pruefe_streckenkabel(start, ende, verlauf_ids, leerrohre, typen=(1, 2)):
+    """Alle Fehler des Verlaufs eines Streckenkabels (leere Liste = korrekt)."""
+    fehler = []
+    if not start or not ende or not verlauf_ids:
+        return ["Unvollständige Daten."]
+    letzter = _kette(start, verlauf_ids, leerrohre, typen, fehler)
+    if letzter is not None and letzter != ende:
+        fehler.append(f"Verlauf endet an Knoten {letzter}, nicht am Endknoten {ende}.")
+    return fehler
+
+
+def pruefe_hauseinfuehrung(start, virtueller_knoten, hausanschluss_id, verlauf_ids, leerrohre, hausanschluesse):
+    """
+    Alle Fehler des Verlaufs eines Hauseinführungskabels: Rohrverbände (TYP 3)
+    lückenlos ab dem VKG, danach die Hauseinführung (TYP 4), die vom letzten
+    Rohrverband abzweigt, und der Hausanschluss am virtuellen Knoten.
+    ``hausanschluesse``: {id: {"ID_KNOTEN": ...}} wie von ``lade_attribute``.
+    """
+    if not start or not virtueller_knoten or not hausanschluss_id or not verlauf_ids:
+        return ["Unvollständige Daten."]
+    fehler = []
+    he_pos = [i for i, lr_id in enumerate(verlauf_ids) if (leerrohre.get(lr_id) or {}).get("TYP") == 4]
+    rohrverbaende = [lr_id for lr_id in verlauf_ids if (leerrohre.get(lr_id) or {}).get("TYP") != 4]
+    _kette(start, rohrverbaende, leerrohre, (3,), fehler)
+
+    for i in he_pos:
+        lr_id = verlauf_ids[i]
+        parent = leerrohre[lr_id]["PARENT_LEERROHR_ID"]
+        if i == 0 or parent != verlauf_ids[i - 1]:
+            vorher = verlauf_ids[i - 1] if i > 0 else None
+            fehler.append(f"Hauseinführung {lr_id} zweigt von Leerrohr {parent} ab, nicht vom vorherigen {vorher}.")
+        if i != len(verlauf_ids) - 1:
+            fehler.append(f"Hauseinführung {lr_id} muss das letzte Leerrohr des Verlaufs sein.")
+    if len(he_pos) > 1:
+        fehler.append("Der Verlauf enthält mehr als eine Hauseinführung.")
+
+    hausanschluss = hausanschluesse.get(hausanschluss_id)
+    if hausanschluss is None:
+        fehler.append(f"Hausanschluss {hausanschluss_id} nicht gefunden.")
+    elif hausanschluss.get("ID_KNOTEN") != virtueller_knoten:
+        fehler.append(f"Der Hausanschluss liegt an Knoten {hausanschluss.get('ID_KNOTEN')}, "
+                      f"nicht am virtuellen Knoten {virtueller_knoten}.")
+    return fehler
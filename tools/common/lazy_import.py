@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Verzögertes Laden der Tool-Module und Messung der Importzeiten.
+
+Die Tool-Dialoge (inkl. kompilierter .ui-Module und psycopg2) werden erst
+beim ersten Klick in der Toolbar importiert (``import_attr``), nicht schon
+beim Laden des Plugins. Die Ladezeit jedes Tools wird immer geloggt.
+
+Profiler-Modus (Umgebungsvariable ``LWL_IMPORT_PROFILE=1`` oder QSettings
+``SiegeleCo/ToolBox/import_profile`` = true): ``ImportProfiler`` misst dabei
+jedes einzelne nachgeladene Modul (gesamt und ohne Untermodule) und loggt die
+teuersten – vergleichbar mit ``python -X importtime``, das sich in QGIS nicht
+setzen lässt.
+"""
+
+import importlib
+import importlib.abc
+import importlib.util
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Modul -> Sekunden, für alle über import_attr geladenen Tools
+IMPORT_TIMES = {}
+
+
+def profiling_enabled():
+    if os.environ.get("LWL_IMPORT_PROFILE", "").strip() not in ("", "0"):
+        return True
+    try:
+        from PyQt5.QtCore import QSettings
+        return str(QSettings("SiegeleCo", "ToolBox").value("import_profile", "false")).lower() in ("1", "true")
+    except Exception:
+        return False
+
+
+class _TimedLoader:
+    """Hüllt einen Loader ein und misst ``exec_module``."""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        prof = self._profiler
+        prof._stack.append([module.__name__, time.perf_counter(), 0.0])
+        try:
+            self._loader.exec_module(module)
+        finally:
+            name, t0, kinder = prof._stack.pop()
+            gesamt = time.perf_counter() - t0
+            prof.results[name] = (gesamt, gesamt - kinder)
+            if prof._stack:
+                prof._stack[-1][2] += gesamt
+
+
+class ImportProfiler(importlib.abc.MetaPathFinder):
+    """
+    Kontextmanager: misst alle Module, die innerhalb des Blocks erstmals
+    importiert werden. ``results[name] -> (gesamt_s, eigen_s)``.
+    """
+
+    def __init__(self, label=""):
+        self.label = label
+        self.results = {}
+        self._stack = []
+        self._busy = False
+
+    def find_spec(self, fullname, path, target=None):
+        if self._busy:
+            return None
+        self._busy = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._busy = False
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+        return False
+
+    def report(self, top=25):
+        """Loggt die teuersten Module; Rückgabe: [(name, gesamt_ms, eigen_ms)]."""
+        rows = sorted(((n, g * 1000.0, e * 1000.0) for n, (g, e) in self.results.items()),
+                      key=lambda r: r[2], reverse=True)
+        if rows:
+            lines = "\n".join(f"  {e:8.1f} ms eigen {g:8.1f} ms gesamt  {n}" for n, g, e in rows[:top])
+            logger.info("Importprofil %s (%d Module, die teuersten %d):\n%s",
+                        self.label, len(rows), min(top, len(rows)), lines)
+        return rows
+
+
+def import_attr(module, attr, package=None):
+    """
+    Importiert ``module`` beim ersten Aufruf (danach aus ``sys.modules``) und
+    liefert dessen Attribut ``attr``.
+    """
+    name = importlib.util.resolve_name(module, package) if module.startswith(".") else module
+    mod = sys.modules.get(name)
+    if mod is None:
+        t0 = time.perf_counter()
+        if profiling_enabled():
+            with ImportProfiler(name) as prof:
+                mod = importlib.import_module(name)
+            prof.report()
+        else:
+            mod = importlib.import_module(name)
+        IMPORT_TIMES[name] = time.perf_counter() - t0
+        logger.info("Tool-Modul %s geladen in %.0f ms", name, IMPORT_TIMES[name] * 1000.0)
+    return getattr(mod, attr)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Index Trasse -> Leerrohre über "ID_TRASSE_NEU" von lwl."LWL_Leerrohr".
+
+Statt pro Knoten/Seite/Modus alle Leerrohre des Layers zu lesen und das
+JSONB in Python zu zerlegen, wird der Layer einmal pro Sitzung eingelesen:
+``by_trasse[trasse_id] -> [(lr_id, position, reverse)]``. Gespeicherte
+Änderungen am Layer werden über dessen committed*-Signale nachgeführt;
+per SQL geschriebene Leerrohre (Import, Abzweigung) verwerfen den Index über
+``invalidate_leerrohr_index``, Änderungen anderer Benutzer deckt ``max_age`` ab.
+"""
+
+import json
+import logging
+import time
+
+from qgis.core import QgsFeatureRequest
+
+logger = logging.getLogger(__name__)
+
+
+def parse_id_trasse_neu(val):
+    """
+    Zerlegt "ID_TRASSE_NEU" (JSON/JSONB, Liste von {"id", "index", "reverse"}
+    oder reine ID-Liste) in [(trasse_id, reverse)] in Verlaufsreihenfolge.
+    """
+    out = []
+    if val is None:
+        return out
+    try:
+        data = val
+        if isinstance(val, str):
+            data = json.loads(val)
+        if isinstance(data, dict) and "list" in data:
+            data = data["list"]
+        if isinstance(data, list):
+            for el in data:
+                # el kann dict {"id":123,"index":0,"reverse":false} sein
+                if isinstance(el, dict) and "id" in el:
+                    out.append((int(el["id"]), bool(el.get("reverse", False))))
+                elif isinstance(el, (int, str)):
+                    out.append((int(el), False))
+    except Exception:
+        pass
+    return out
+
+
+def _field(names, *candidates):
+    for c in candidates:
+        if c in names:
+            return c
+    return None
+
+
+class LeerrohrIndex:
+    """Leerrohre eines Layers, indiziert nach Trassen-ID."""
+
+    def __init__(self, layer, verbund_field=None):
+        self.layer = layer
+        names = [f.name() for f in layer.fields()]
+        self.id_nm = "id" if "id" in names else names[0]
+        self.from_nm = _field(names, "VONKNOTEN", "FROMNODE")
+        self.to_nm = _field(names, "NACHKNOTEN", "TONODE")
+        self.sub_nm = _field(names, "SUBTYP")
+        self.trneu_nm = _field(names, "ID_TRASSE_NEU")
+        self.verb_nm = verbund_field if verbund_field in names else None
+        self.entries = {}        # lr_id -> dict (id, fid, tr_list, reverse, VONKNOTEN, ...)
+        self.fid_to_lr = {}      # Feature-ID -> lr_id (für gelöschte Features)
+        self.by_trasse = {}      # trasse_id -> [(lr_id, position, reverse)]
+        self.loaded_at = None
+        self._slots = []
+
+    # ---------- Aufbau ----------
+    def _request(self):
+        req = QgsFeatureRequest()
+        if self.trneu_nm:
+            req.setFilterExpression(f'"{self.trneu_nm}" IS NOT NULL')
+        attrs = [n for n in (self.id_nm, self.from_nm, self.to_nm, self.sub_nm, self.trneu_nm, self.verb_nm) if n]
+        req.setSubsetOfAttributes(attrs, self.layer.fields())
+        req.setFlags(QgsFeatureRequest.NoGeometry)
+        return req
+
+    def _add_feature(self, f):
+        if not (self.trneu_nm and self.sub_nm):
+            return
+        lr_id = f[self.id_nm]
+        if lr_id in (None, ""):
+            return
+        lr_id = int(lr_id)
+        verlauf = parse_id_trasse_neu(f[self.trneu_nm])
+        entry = {
+            "id": lr_id,
+            "fid": f.id(),
+            "tr_list": [t for t, _ in verlauf],
+            "SUBTYP": f[self.sub_nm],
+            "VERBUND": f[self.verb_nm] if self.verb_nm else None,
+            "VONKNOTEN": f[self.from_nm] if self.from_nm else None,
+            "NACHKNOTEN": f[self.to_nm] if self.to_nm else None,
+        }
+        self.entries[lr_id] = entry
+        self.fid_to_lr[f.id()] = lr_id
+        for pos, (tid, rev) in enumerate(verlauf):
+            self.by_trasse.setdefault(tid, []).append((lr_id, pos, rev))
+
+    def _remove_lr(self, lr_id):
+        entry = self.entries.pop(lr_id, None)
+        if entry is None:
+            return
+        self.fid_to_lr.pop(entry["fid"], None)
+        for tid in set(entry["tr_list"]):
+            lst = [e for e in self.by_trasse.get(tid, []) if e[0] != lr_id]
+            if lst:
+                self.by_trasse[tid] = lst
+            else:
+                self.by_trasse.pop(tid, None)
+
+    def build(self):
+        t0 = time.perf_counter()
+        self.entries, self.fid_to_lr, self.by_trasse = {}, {}, {}
+        for f in self.layer.getFeatures(self._request()):
+            self._add_feature(f)
+        self.loaded_at = time.monotonic()
+        logger.info("Leerrohr-Index aufgebaut: %d Leerrohre, %d Trassen in %.0f ms",
+                    len(self.entries), len(self.by_trasse), (time.perf_counter() - t0) * 1000.0)
+        return self
+
+    # ---------- Abfragen ----------
+    def for_trasse(self, trasse_id):
+        """[(eintrag, position, reverse)] aller Leerrohre, die über die Trasse laufen."""
+        return [(self.entries[lr_id], pos, rev)
+                for lr_id, pos, rev in self.by_trasse.get(int(trasse_id), [])]
+
+    # ---------- Inkrementelle Pflege ----------
+    def refresh_fids(self, fids):
+        """Liest geänderte/neue Features neu ein."""
+        fids = list(fids)
+        for fid in fids:
+            lr_id = self.fid_to_lr.get(fid)
+            if lr_id is not None:
+                self._remove_lr(lr_id)
+        if not fids:
+            return
+        req = self._request()
+        req.setFilterFids(fids)
+        for f in self.layer.getFeatures(req):
+            lr_id = f[self.id_nm]
+            if lr_id not in (None, ""):
+                self._remove_lr(int(lr_id))
+            self._add_feature(f)
+
+    def remove_fids(self, fids):
+        for fid in fids:
+            lr_id = self.fid_to_lr.get(fid)
+            if lr_id is not None:
+                self._remove_lr(lr_id)
+
+    def watch(self):
+        """Hält den Index bei gespeicherten Layer-Änderungen aktuell."""
+        if self._slots:
+            return
+        self._slots = [
+            (self.layer.committedFeaturesAdded, lambda _lid, features: self.refresh_fids([f.id() for f in features])),
+            (self.layer.committedFeaturesRemoved, lambda _lid, fids: self.remove_fids(fids)),
+            (self.layer.committedAttributeValuesChanges, lambda _lid, changes: self.refresh_fids(changes.keys())),
+        ]
+        for signal, slot in self._slots:
+            signal.connect(slot)
+
+    def unwatch(self):
+        """Trennt die Layer-Signale (verworfener Index)."""
+        for signal, slot in self._slots:
+            try:
+                signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass  # Layer bereits gelöscht
+        self._slots = []
+
+
+_indexes = {}
+
+
+def get_leerrohr_index(layer, verbund_field=None, max_age=600.0):
+    """
+    Sitzungs-Index je Layer. Neu aufgebaut wird beim ersten Zugriff, nach
+    ``invalidate_leerrohr_index`` oder wenn der Stand älter als ``max_age``
+    Sekunden ist (Änderungen anderer Benutzer).
+    """
+    idx = _indexes.get(layer.id())
+    stale = idx is None or idx.layer is not layer or \
+        idx.verb_nm != (verbund_field if verbund_field in layer.fields().names() else None) or \
+        (max_age is not None and time.monotonic() - idx.loaded_at > max_age)
+    if stale:
+        if idx is not None:
+            idx.unwatch()
+        idx = LeerrohrIndex(layer, verbund_field).build()
+        idx.watch()
+        _indexes[layer.id()] = idx
+    return idx
+
+
+def invalidate_leerrohr_index(layer=None):
+    """Verwirft den Index (ein Layer oder alle)."""
+    if layer is None:
+        verworfen = list(_indexes.values())
+        _indexes.clear()
+    else:
+        verworfen = [idx for idx in [_indexes.pop(layer.id(), None)] if idx is not None]
+    for idx in verworfen:
+        idx.unwatch()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Lineare Referenzierung auf einer Leerrohr-Linie (Splitpunkt, HE-Intervalle).
+
+``LinearRef`` berechnet die kumulierten Segmentlängen einmal pro gewählter
+Linie. Danach kommen alle Abfragen ohne neue Geometrien aus:
+
+- ``locate``: Projektion über ``closestSegmentWithContext`` (C++) plus
+  kumulierte Länge bis zum Segmentanfang, also O(1) in Python.
+- ``interpolate``: per ``bisect`` in O(log n).
+
+Bisher wurde bei jeder Mausbewegung die Linie kopiert und mit
+``splitGeometry`` geteilt.
+"""
+
+from bisect import bisect_right
+from math import hypot
+
+from qgis.core import QgsGeometry, QgsPointXY
+
+
+class LinearRef:
+    """Kumulierte Längen einer (Multi-)Linie; Positionen als Länge oder Anteil 0..1."""
+
+    def __init__(self, geom, part=None):
+        """
+        geom: QgsGeometry (Linie/Multilinie) in dem KBS, in dem später abgefragt wird.
+        part: None = alle Teile (Länge wie ``geom.length()``), sonst nur dieser Teil.
+        """
+        parts = self._polyline_parts(geom)
+        if part is not None:
+            parts = parts[part:part + 1]
+            geom = QgsGeometry.fromPolylineXY(parts[0]) if parts else None
+        self.geom = geom
+        self.xs, self.ys, self.cum = [], [], []
+        # Teil-Anfänge: Sprünge zwischen Teilen zählen nicht zur Länge
+        self.part_starts = set()
+        run = 0.0
+        for pts in parts:
+            self.part_starts.add(len(self.xs))
+            for i, p in enumerate(pts):
+                if i > 0:
+                    run += hypot(p.x() - pts[i - 1].x(), p.y() - pts[i - 1].y())
+                self.xs.append(p.x())
+                self.ys.append(p.y())
+                self.cum.append(run)
+        self.length = run
+
+    @staticmethod
+    def _polyline_parts(g):
+        if not g or g.isEmpty():
+            return []
+        if g.isMultipart():
+            return [[QgsPointXY(p) for p in part] for part in (g.asMultiPolyline() or []) if part]
+        pl = g.asPolyline() or []
+        return [[QgsPointXY(p) for p in pl]] if pl else []
+
+    # ---------- Punkt -> Position ----------
+    def locate(self, map_pt):
+        """Länge vom Linienanfang bis zur Projektion von ``map_pt`` (0..length)."""
+        if self.length <= 0.0 or self.geom is None:
+            return 0.0
+        try:
+            _, snap, after_vertex, _ = self.geom.closestSegmentWithContext(QgsPointXY(map_pt))
+        except Exception:
+            return 0.0
+        i = int(after_vertex)
+        if i <= 0 or i >= len(self.cum) or i in self.part_starts:
+            return 0.0 if i <= 0 else self.length
+        d = self.cum[i - 1] + hypot(snap.x() - self.xs[i - 1], snap.y() - self.ys[i - 1])
+        return max(0.0, min(self.length, d))
+
+    def fraction(self, map_pt):
+        """Anteil 0..1 entlang der Linie."""
+        if self.length <= 0.0:
+            return 0.0
+        return max(0.0, min(1.0, self.locate(map_pt) / self.length))
+
+    # ---------- Position -> Punkt ----------
+    def interpolate(self, d):
+        """Punkt bei Länge ``d`` (geklemmt auf 0..length) – QgsPointXY oder None."""
+        if not self.cum:
+            return None
+        d = max(0.0, min(self.length, float(d)))
+        i = bisect_right(self.cum, d)
+        if i >= len(self.cum):
+            return QgsPointXY(self.xs[-1], self.ys[-1])
+        if i == 0:
+            return QgsPointXY(self.xs[0], self.ys[0])
+        seg = self.cum[i] - self.cum[i - 1]
+        t = (d - self.cum[i - 1]) / seg if seg > 0 else 0.0
+        return QgsPointXY(self.xs[i - 1] + t * (self.xs[i] - self.xs[i - 1]),
+                          self.ys[i - 1] + t * (self.ys[i] - self.ys[i - 1]))
+
+    def point_at_fraction(self, s):
+        return self.interpolate(float(s) * self.length)
+
+    # ---------- Intervalle ----------
+    @staticmethod
+    def clamp(s, interval):
+        """``s`` in das erlaubte Intervall (a, b) klemmen; None, wenn leer."""
+        a, b = interval
+        a = max(0.0, min(1.0, float(a)))
+        b = max(0.0, min(1.0, float(b)))
+        if a >= b:
+            return None
+        return max(a, min(b, s))
+
+    @staticmethod
+    def nearest_allowed(s, forbidden):
+        """Liegt ``s`` in einem verbotenen Intervall, auf den nächsten Rand klemmen."""
+        for a, b in forbidden or ():
+            if a <= s <= b:
+                return a if (s - a) <= (b - s) else b
+        return s
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Katalog der (weitgehend statischen) Nachschlagetabellen: Leerrohr-Subtypen,
+Rohrfarben, Status, Rohr-Status, Codierung, Kabeltypen, Auftraggeber.
+
+Die Tabellen werden je Umgebung einmal geladen und als JSON im Cache-Ordner
+abgelegt. Beim nächsten Start kommt der Katalog von der Platte; geprüft wird
+nur ein Fingerabdruck je Tabelle (Anzahl + Summe der Zeilen-Hashes, eine
+Abfrage). Neu geladen werden ausschließlich geänderte Tabellen.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Name -> Tabelle
+TABLES = {
+    "subtyp": 'lwl."LUT_Leerrohr_SubTyp"',
+    "rohr_beschreibung": 'lwl."LUT_Rohr_Beschreibung"',
+    "status": 'lwl."LUT_Status"',
+    "rohr_status": 'lwl."LUT_Rohr_Status"',
+    "codierung": 'lwl."LUT_Codierung"',
+    "kabel_typ": 'lwl."LWL_Kabel_Typ"',
+    "auftraggeber": '"Verwaltung_Intern"."Auftraggeber"',
+}
+
+
+def default_cache_dir():
+    """Cache-Ordner im QGIS-Profil (außerhalb von QGIS: ~/.cache)."""
+    try:
+        from qgis.core import QgsApplication
+        base = QgsApplication.qgisSettingsDirPath()
+    except Exception:
+        base = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "lwl_cache")
+
+
+def split_farbcode(farbcode):
+    """'#prim/#sek' -> (prim, sek); Sekundärfarbe leer oder #000000 -> None."""
+    if farbcode and "/" in farbcode:
+        prim, sek = farbcode.split("/", 1)
+        sek = None if not sek.strip() or sek.strip().strip("#") == "000000" else sek.strip()
+        return prim.strip(), sek
+    return farbcode, None
+
+
+class LookupCatalog:
+    """Nachschlagetabellen einer Datenbank als Listen von Zeilen-Dicts."""
+
+    def __init__(self, pool=None, cache_path=None):
+        self.pool = pool
+        self.cache_path = cache_path
+        self.tables = {}          # name -> [dict]
+        self.fingerprints = {}    # name -> [count, hashsum]
+        self.verified_at = None
+        self._derived = {}
+
+    # ---------- Laden / Prüfen ----------
+    @staticmethod
+    def _existing(cur):
+        cur.execute("SELECT n, to_regclass(t) IS NOT NULL FROM unnest(%s::text[], %s::text[]) AS x(n, t)",
+                    (list(TABLES), list(TABLES.values())))
+        return [n for n, ok in cur.fetchall() if ok]
+
+    @staticmethod
+    def _fingerprints(cur, names):
+        if not names:
+            return {}
+        sql = " UNION ALL ".join(
+            f"SELECT %s, count(*), coalesce(sum(hashtext(t::text)::bigint), 0) FROM {TABLES[n]} t"
+            for n in names)
+        cur.execute(sql, tuple(names))
+        return {n: [int(c), int(h)] for n, c, h in cur.fetchall()}
+
+    @staticmethod
+    def _load_table(cur, name):
+        cur.execute(f"SELECT * FROM {TABLES[name]} t ORDER BY 1")
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, row)) for row in cur.fetchall()]
+
+    def sync(self, cur):
+        """Vergleicht die Fingerabdrücke und lädt nur geänderte Tabellen neu."""
+        names = self._existing(cur)
+        current = self._fingerprints(cur, names)
+        changed = [n for n in names if self.fingerprints.get(n) != current[n] or n not in self.tables]
+        for n in changed:
+            self.tables[n] = self._load_table(cur, n)
+        for n in set(self.tables) - set(names):
+            self.tables.pop(n, None)
+        self.fingerprints = current
+        self.verified_at = time.monotonic()
+        if changed:
+            self._derived = {}
+            logger.info("Nachschlagetabellen neu geladen: %s", ", ".join(changed))
+        return changed
+
+    def load_file(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") != CACHE_VERSION:
+                return False
+            self.tables = data.get("tables", {})
+            self.fingerprints = data.get("fingerprints", {})
+            self._derived = {}
+            return True
+        except Exception as e:
+            logger.warning("Katalog-Cache %s unlesbar: %s", self.cache_path, e)
+            return False
+
+    def save_file(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"version": CACHE_VERSION, "tables": self.tables,
+                           "fingerprints": self.fingerprints}, fh, default=str)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            logger.warning("Katalog-Cache %s nicht schreibbar: %s", self.cache_path, e)
+
+    # ---------- Abfragen ----------
+    def rows(self, name):
+        return self.tables.get(name, [])
+
+    def by_id(self, name):
+        key = ("by_id", name)
+        if key not in self._derived:
+            self._derived[key] = {r.get("id"): r for r in self.rows(name)}
+        return self._derived[key]
+
+    def status_options(self):
+        """[(id, STATUS)] aus LUT_Status, nach id."""
+        return [(r["id"], r.get("STATUS")) for r in self.rows("status")]
+
+    def subtyp(self, subtyp_id):
+        return self.by_id("subtyp").get(int(subtyp_id)) if subtyp_id is not None else None
+
+    def rohr_beschreibung(self, subtyp_id):
+        """Zeilen aus LUT_Rohr_Beschreibung eines Subtyps, nach ROHRNUMMER."""
+        key = ("beschreibung", int(subtyp_id))
+        if key not in self._derived:
+            rows = [r for r in self.rows("rohr_beschreibung") if r.get("ID_SUBTYP") == int(subtyp_id)]
+            rows.sort(key=lambda r: (r.get("ROHRNUMMER") is None, r.get("ROHRNUMMER")))
+            self._derived[key] = rows
+        return self._derived[key]
+
+    def rohr_liste(self, subtyp_id):
+        """
+        Rohre eines Subtyps laut ROHR_DEFINITION mit Farben:
+        ([(nr, nr, durchmesser, farbe, prim_hex, sek_hex)], SUBTYP_char, ID_TYP).
+        """
+        st = self.subtyp(subtyp_id)
+        if not st:
+            raise ValueError(f"Subtyp-ID {subtyp_id} nicht gefunden.")
+        definition = st.get("ROHR_DEFINITION")
+        if not definition:
+            raise ValueError(f"ROHR_DEFINITION leer für {subtyp_id}.")
+        if isinstance(definition, str):
+            definition = json.loads(definition)
+        farben = self.rohr_beschreibung(subtyp_id)
+        rohre = []
+        rohr_nummer = 1
+        for group in definition:
+            anzahl = int(group.get("anzahl", 1))
+            durchmesser = int(group.get("durchmesser", 0))
+            for _ in range(anzahl):
+                if rohr_nummer <= len(farben):
+                    farbe = farben[rohr_nummer - 1].get("FARBE")
+                    prim, sek = split_farbcode(farben[rohr_nummer - 1].get("FARBCODE"))
+                else:
+                    # Fallback grau
+                    farbe, prim, sek = "grau", "#808080", None
+                rohre.append((rohr_nummer, rohr_nummer, durchmesser, farbe, prim, sek))
+                rohr_nummer += 1
+        return rohre, st.get("SUBTYP_char"), st.get("ID_TYP")
+
+    def kabel_typen(self, typ):
+        """[(id, BEZEICHNUNG)] aus LWL_Kabel_Typ mit "TYP" = typ."""
+        return [(r["id"], r.get("BEZEICHNUNG")) for r in self.rows("kabel_typ") if r.get("TYP") == typ]
+
+
+_catalogs = {}
+_lock = threading.Lock()
+
+
+def _pool_key(pool):
+    p = pool.db_params
+    return (p.get("host"), str(p.get("port")), p.get("dbname"))
+
+
+def _cache_file(key, cache_dir):
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", "_".join(str(k) for k in key))
+    return os.path.join(cache_dir, f"lookup_{name}.json")
+
+
+def get_lookup_catalog(pool, max_age=300.0, cache_dir=None):
+    """
+    Katalog der Umgebung. Beim ersten Zugriff aus dem Platten-Cache; die
+    Fingerabdrücke werden höchstens alle ``max_age`` Sekunden geprüft.
+    """
+    key = _pool_key(pool)
+    with _lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = LookupCatalog(pool, _cache_file(key, cache_dir or default_cache_dir()))
+            catalog.load_file()
+            _catalogs[key] = catalog
+        catalog.pool = pool
+        if catalog.verified_at is None or (max_age is not None and time.monotonic() - catalog.verified_at > max_age):
+            try:
+                with pool.connection() as conn, conn.cursor() as cur:
+                    changed = catalog.sync(cur)
+                if changed:
+                    catalog.save_file()
+            except Exception as e:
+                # DB nicht erreichbar: Platten-Stand weiterverwenden
+                if not catalog.tables:
+                    raise
+                logger.warning("Katalog-Prüfung fehlgeschlagen, verwende Cache: %s", e)
+        return catalog
+
+
+def invalidate_lookup_catalog(pool=None):
+    """Erzwingt die Prüfung beim nächsten Zugriff (z.B. nach Änderungen im Setup-Tool)."""
+    with _lock:
+        for key, catalog in _catalogs.items():
+            if pool is None or key == _pool_key(pool):
+                catalog.verified_at = None
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Nächster-Knoten-Suche für Kartenklicks (LWL_Knoten + Trassen-Endpunkte).
+
+Ein ``NodeLocator`` hält je Sitzung einen QgsSpatialIndex über alle Knoten
+(mit Geometrie) und – als Rückfall für Knoten ohne Feature – die Endpunkte
+aller Trassen (VONKNOTEN/NACHKNOTEN). Gesucht wird per ``nearestNeighbor``,
+also nach echter Distanz statt "erster Treffer im Puffer-Rechteck".
+Nach gespeicherten Layer-Änderungen wird der Index beim nächsten Zugriff
+neu aufgebaut.
+"""
+
+import logging
+import time
+from collections import namedtuple
+
+from qgis.core import QgsFeature, QgsFeatureRequest, QgsGeometry, QgsPointXY, QgsSpatialIndex
+
+logger = logging.getLogger(__name__)
+
+# Ergebnis einer Suche: Knoten-ID, "TYP" (oder None), Geometrie, Distanz, Feature-ID im Knoten-Layer
+NodeHit = namedtuple("NodeHit", "id typ geometry distance fid")
+
+
+def pixel_tolerance(canvas, pixels):
+    """Toleranz in Karteneinheiten für ``pixels`` Bildschirmpixel."""
+    return pixels * canvas.mapUnitsPerPixel()
+
+
+def _field(names, *candidates):
+    for c in candidates:
+        if c in names:
+            return c
+    return None
+
+
+class NodeLocator:
+    """Räumlicher Index über LWL_Knoten und die Endpunkte von LWL_Trasse."""
+
+    def __init__(self, knoten_layer, trasse_layer=None):
+        self.knoten_layer = knoten_layer
+        self.trasse_layer = trasse_layer
+        self._dirty = True
+        self._watched = set()
+
+    # ---------- Aufbau ----------
+    def _build(self):
+        t0 = time.perf_counter()
+        self.nodes = {}        # fid -> (knoten_id, typ, geometry)
+        self.fid_by_id = {}    # knoten_id -> fid
+        self.node_index = QgsSpatialIndex()
+        if self.knoten_layer is not None:
+            names = self.knoten_layer.fields().names()
+            id_nm = "id" if "id" in names else names[0]
+            typ_nm = _field(names, "TYP")
+            req = QgsFeatureRequest()
+            req.setSubsetOfAttributes([n for n in (id_nm, typ_nm) if n], self.knoten_layer.fields())
+            for f in self.knoten_layer.getFeatures(req):
+                geom = f.geometry()
+                if geom is None or geom.isEmpty() or f[id_nm] in (None, ""):
+                    continue
+                knoten_id = int(f[id_nm])
+                self.nodes[f.id()] = (knoten_id, f[typ_nm] if typ_nm else None, QgsGeometry(geom))
+                self.fid_by_id[knoten_id] = f.id()
+                self.node_index.addFeature(f.id(), geom.boundingBox())
+
+        # Trassen-Endpunkte (laufende Nummer -> (knoten_id, punkt))
+        self.endpoints = {}
+        self.endpoint_index = QgsSpatialIndex()
+        if self.trasse_layer is not None:
+            names = self.trasse_layer.fields().names()
+            from_nm = _field(names, "VONKNOTEN", "FROMNODE")
+            to_nm = _field(names, "NACHKNOTEN", "TONODE")
+            if from_nm and to_nm:
+                req = QgsFeatureRequest()
+                req.setSubsetOfAttributes([from_nm, to_nm], self.trasse_layer.fields())
+                n = 0
+                for f in self.trasse_layer.getFeatures(req):
+                    geom = f.geometry()
+                    if geom is None or geom.isEmpty():
+                        continue
+                    line = geom.constGet()
+                    parts = [line.geometryN(i) for i in range(line.numGeometries())] \
+                        if hasattr(line, "numGeometries") else [line]
+                    if not parts or not hasattr(parts[0], "startPoint"):
+                        continue
+                    for knoten, p in ((f[from_nm], parts[0].startPoint()), (f[to_nm], parts[-1].endPoint())):
+                        if knoten in (None, ""):
+                            continue
+                        n += 1
+                        pxy = QgsPointXY(p)
+                        self.endpoints[n] = (int(knoten), pxy)
+                        feat = QgsFeature(n)
+                        feat.setGeometry(QgsGeometry.fromPointXY(pxy))
+                        self.endpoint_index.addFeature(feat)
+        self._dirty = False
+        logger.info("NodeLocator aufgebaut: %d Knoten, %d Trassen-Endpunkte in %.0f ms",
+                    len(self.nodes), len(self.endpoints), (time.perf_counter() - t0) * 1000.0)
+
+    def _ensure(self):
+        if self._dirty:
+            self._build()
+
+    def invalidate(self):
+        self._dirty = True
+
+    def watch(self):
+        """Index nach gespeicherten Änderungen an Knoten/Trassen verwerfen."""
+        for layer in (self.knoten_layer, self.trasse_layer):
+            if layer is None or layer.id() in self._watched:
+                continue
+            layer.committedFeaturesAdded.connect(lambda *_: self.invalidate())
+            layer.committedFeaturesRemoved.connect(lambda *_: self.invalidate())
+            layer.committedAttributeValuesChanges.connect(lambda *_: self.invalidate())
+            layer.committedGeometriesChanges.connect(lambda *_: self.invalidate())
+            self._watched.add(layer.id())
+
+    # ---------- Suche ----------
+    def nearest(self, point, tolerance, typen=None):
+        """
+        Nächster Knoten innerhalb ``tolerance`` (Karteneinheiten), optional nur
+        mit "TYP" in ``typen``. Rückgabe: NodeHit oder None.
+        """
+        self._ensure()
+        point = QgsPointXY(point)
+        point_geom = QgsGeometry.fromPointXY(point)
+        k = 8
+        while True:
+            fids = self.node_index.nearestNeighbor(point, k, tolerance)
+            best = None
+            for fid in fids:
+                knoten_id, typ, geom = self.nodes[fid]
+                if typen is not None and typ not in typen:
+                    continue
+                dist = geom.distance(point_geom)
+                if dist <= tolerance and (best is None or dist < best.distance):
+                    best = NodeHit(knoten_id, typ, geom, dist, fid)
+            # Nur erweitern, wenn alle k Kandidaten durch den TYP-Filter fielen
+            if best is not None or len(fids) < k:
+                return best
+            k *= 4
+
+    def nearest_endpoint(self, point, tolerance):
+        """Knoten-ID des nächsten Trassen-Endpunkts innerhalb ``tolerance`` (oder None)."""
+        self._ensure()
+        point = QgsPointXY(point)
+        best = None
+        for n in self.endpoint_index.nearestNeighbor(point, 1, tolerance):
+            knoten_id, pxy = self.endpoints[n]
+            d = point.distance(pxy)
+            if d <= tolerance and (best is None or d < best[0]):
+                best = (d, knoten_id)
+        return best[1] if best else None
+
+    def nearest_id(self, point, tolerance, endpoint_tolerance=None, typen=None):
+        """Knoten-ID: bevorzugt aus LWL_Knoten, sonst über Trassen-Endpunkte."""
+        hit = self.nearest(point, tolerance, typen)
+        if hit is not None:
+            return hit.id
+        return self.nearest_endpoint(point, endpoint_tolerance if endpoint_tolerance is not None else tolerance)
+
+    def node(self, knoten_id):
+        """NodeHit (Distanz 0) für eine Knoten-ID oder None – ohne Layer-Scan."""
+        self._ensure()
+        fid = self.fid_by_id.get(int(knoten_id))
+        if fid is None:
+            return None
+        kid, typ, geom = self.nodes[fid]
+        return NodeHit(kid, typ, geom, 0.0, fid)
+
+
+_locators = {}
+
+
+def get_node_locator(knoten_layer, trasse_layer=None):
+    """Sitzungs-Locator je Layer-Kombination (wird lazy aufgebaut)."""
+    key = (knoten_layer.id() if knoten_layer else None, trasse_layer.id() if trasse_layer else None)
+    loc = _locators.get(key)
+    if loc is None or loc.knoten_layer is not knoten_layer or loc.trasse_layer is not trasse_layer:
+        loc = NodeLocator(knoten_layer, trasse_layer)
+        loc.watch()
+        _locators[key] = loc
+    return loc
+
+
+def invalidate_node_locator(knoten_layer=None):
+    """
+    Baut die Locators (eines Knoten-Layers oder alle) beim nächsten Zugriff neu
+    auf – für Knoten, die per SQL geschrieben wurden und daher keine
+    committed*-Signale des Layers auslösen.
+    """
+    for loc in _locators.values():
+        if knoten_layer is None or loc.knoten_layer is knoten_layer:
+            loc.invalidate()
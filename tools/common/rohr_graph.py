@@ -0,0 +1,537 @@
+# -*- coding: utf-8 -*-
+"""
+In-Memory-Verbindungsgraph der Leerrohre und Rohre für den Rohrstatus der
+Hauseinführung (Palette: frei / belegt / zum VKG durchgängig).
+
+Bisher lief bei jedem Zeichnen der Palette eine große ``WITH RECURSIVE``-Abfrage
+über lwl."LWL_Leerrohr_Leerrohr_rel" und lwl."LWL_Rohr_Rohr_rel" (inkl. einer
+unbeschränkten UNION-ALL-Suche für die Seite). ``RohrGraph`` lädt die
+Relationen einmal je Sitzung und Umgebung und beantwortet dieselben Fragen
+lokal (``rohrstatus``). Nur die HE-Positionen auf dem Start-Leerrohr
+(``ST_LineLocatePoint``) kommen weiterhin aus einer kleinen, nicht rekursiven
+Abfrage.
+
+Der Rohrstatus wird in Hintergrund-Aufgaben berechnet, während der
+Leerrohr-Verbinder den Graphen per ``refresh_relations`` nachführt. Alle
+lesenden und ändernden Zugriffe laufen daher unter ``RohrGraph.lock``; die
+Datenbank-Abfragen einer Nachführung laufen vorher, ohne die Sperre.
+
+``ROHRSTATUS_SQL`` ist die bisherige Abfrage; sie dient als Referenz für den
+Vergleichstest (test/test_rohr_graph.py). Rohre ohne ROHRNUMMER haben keinen
+Platz in der Palette; beide Seiten lassen sie aus.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EPS = 1e-9
+
+LEERROHR_SQL = 'SELECT id, "VONKNOTEN", "NACHKNOTEN", "VKG_LR" FROM lwl."LWL_Leerrohr"'
+
+LR_REL_SQL = """
+    SELECT id, "ID_LEERROHR_1", "ID_LEERROHR_2", "ID_KNOTEN"
+    FROM lwl."LWL_Leerrohr_Leerrohr_rel"
+    WHERE "ID_LEERROHR_1" IS NOT NULL AND "ID_LEERROHR_2" IS NOT NULL
+"""
+
+ROHR_SQL = 'SELECT id, "ID_LEERROHR", "ROHRNUMMER", "FROM_POS", "TO_POS" FROM lwl."LWL_Rohr"'
+
+ROHR_REL_SQL = """
+    SELECT "ID_ROHR_1", "ID_ROHR_2"
+    FROM lwl."LWL_Rohr_Rohr_rel"
+    WHERE "ID_ROHR_1" IS NOT NULL AND "ID_ROHR_2" IS NOT NULL
+"""
+
+HA_SQL = """
+    SELECT "ID_LEERROHR", "ROHRNUMMER", "VKG_LR"
+    FROM lwl."LWL_Hauseinfuehrung"
+    WHERE "ID_LEERROHR" IS NOT NULL AND "ROHRNUMMER" IS NOT NULL AND "VKG_LR" IS NOT NULL
+"""
+
+# Außenkanten der HEs auf dem Start-Leerrohr je Rohrnummer (geometrisch, bleibt in der DB)
+HE_POS_SQL = """
+    SELECT ha."ROHRNUMMER",
+           MIN(ST_LineLocatePoint(
+               ST_LineMerge(ST_CollectionExtract(ST_Force2D(l.geom), 2)),
+               ST_Force2D(kn.geom)))::float,
+           MAX(ST_LineLocatePoint(
+               ST_LineMerge(ST_CollectionExtract(ST_Force2D(l.geom), 2)),
+               ST_Force2D(kn.geom)))::float
+    FROM lwl."LWL_Hauseinfuehrung" ha
+    JOIN lwl."LWL_Leerrohr" l ON l.id = ha."ID_LEERROHR"
+    JOIN lwl."LWL_Knoten"  kn ON kn.id = ha."ID_KNOTEN"
+    WHERE ha."ID_LEERROHR" = %s
+    GROUP BY ha."ROHRNUMMER"
+"""
+
+
+class RohrGraph:
+    """Leerrohr- und Rohr-Relationen einer Datenbank als Adjazenzlisten."""
+
+    def __init__(self):
+        self.leerrohre = {}      # lr_id -> (VONKNOTEN, NACHKNOTEN, frozenset(VKG_LR))
+        self.lr_adj = {}         # lr_id -> [(rel_id, lr_1, lr_2, knoten)] nach rel_id sortiert
+        self.rohre = {}          # rohr_id -> (lr_id, rohrnummer, FROM_POS, TO_POS)
+        self.rohre_by_lr = {}    # lr_id -> [rohr_id]
+        self.rohr_adj = {}       # rohr_id -> {rohr_id}
+        self.ha_by_vkg = {}      # vkg -> {(lr_id, rohrnummer)}
+        self.loaded_at = None
+        self.lock = threading.RLock()
+
+    # ---------- Aufbau ----------
+    def load_rows(self, leerrohre, lr_rels, rohre, rohr_rels, hauseinfuehrungen):
+        """Baut den Graphen aus Zeilen wie von den *_SQL-Abfragen geliefert."""
+        with self.lock:
+            self.leerrohre = {}
+            for lr_id, von, nach, vkg in leerrohre:
+                self.leerrohre[int(lr_id)] = (von, nach, frozenset(vkg or ()))
+            self.lr_adj = {}
+            self._add_lr_rels(lr_rels)
+            self.rohre, self.rohre_by_lr = {}, {}
+            for rid, lr_id, rnr, von_pos, bis_pos in rohre:
+                self._add_rohr(rid, lr_id, rnr, von_pos, bis_pos)
+            self.rohr_adj = {}
+            self._add_rohr_rels(rohr_rels)
+            self.ha_by_vkg = {}
+            self._add_hauseinfuehrungen(hauseinfuehrungen)
+            self.loaded_at = time.monotonic()
+        return self
+
+    def load(self, cur):
+        rows = []
+        for sql in (LEERROHR_SQL, LR_REL_SQL, ROHR_SQL, ROHR_REL_SQL, HA_SQL):
+            cur.execute(sql)
+            rows.append(cur.fetchall())
+        return self.load_rows(*rows)
+
+    def _add_lr_rels(self, rels):
+        touched = set()
+        for rel_id, a, b, knoten in rels:
+            rel = (int(rel_id), int(a), int(b), knoten)
+            for lr in {rel[1], rel[2]}:
+                self.lr_adj.setdefault(lr, []).append(rel)
+                touched.add(lr)
+        # Reihenfolge wie in der DB (nach rel-id) – bestimmt bei gleich tiefen Treffern die Seite
+        for lr in touched:
+            self.lr_adj[lr].sort()
+
+    def _add_rohr(self, rid, lr_id, rnr, von_pos, bis_pos):
+        if lr_id is None:
+            return
+        rid, lr_id = int(rid), int(lr_id)
+        self.rohre[rid] = (lr_id, int(rnr) if rnr is not None else None,
+                           float(von_pos) if von_pos is not None else None,
+                           float(bis_pos) if bis_pos is not None else None)
+        self.rohre_by_lr.setdefault(lr_id, []).append(rid)
+
+    def _add_rohr_rels(self, rels):
+        for a, b in rels:
+            a, b = int(a), int(b)
+            self.rohr_adj.setdefault(a, set()).add(b)
+            self.rohr_adj.setdefault(b, set()).add(a)
+
+    def _add_hauseinfuehrungen(self, rows):
+        for lr_id, rnr, vkg in rows:
+            self.ha_by_vkg.setdefault(int(vkg), set()).add((int(lr_id), int(rnr)))
+
+    # ---------- Pflege nach Schreibvorgängen ----------
+    def refresh_hauseinfuehrungen(self, cur, vkg):
+        """Liest die Hauseinführungen eines VKG neu (nach Import/Tausch der Rohrnummer)."""
+        cur.execute(HA_SQL + ' AND "VKG_LR" = %s', (vkg,))
+        rows = cur.fetchall()
+        with self.lock:
+            self.ha_by_vkg.pop(int(vkg), None)
+            self._add_hauseinfuehrungen(rows)
+
+    def refresh_relations(self, cur, lr_ids):
+        """
+        Liest die Leerrohr- und Rohr-Relationen der angegebenen Leerrohre neu
+        (z.B. nach dem Import im Leerrohr-Verbinder).
+        """
+        lr_ids = sorted({int(x) for x in lr_ids})
+        if not lr_ids:
+            return
+        # erst lesen (ohne Sperre), dann unter der Sperre in einem Zug ersetzen
+        cur.execute(LR_REL_SQL + ' AND ("ID_LEERROHR_1" = ANY(%s) OR "ID_LEERROHR_2" = ANY(%s))',
+                    (lr_ids, lr_ids))
+        lr_rels = cur.fetchall()
+        cur.execute(ROHR_SQL + ' WHERE "ID_LEERROHR" = ANY(%s)', (lr_ids,))
+        rohre = cur.fetchall()
+        with self.lock:
+            alte_rids = {rid for lr in lr_ids for rid in self.rohre_by_lr.get(lr, ())}
+        rids = sorted(alte_rids | {int(row[0]) for row in rohre})
+        rohr_rels = []
+        if rids:
+            cur.execute(ROHR_REL_SQL + ' AND ("ID_ROHR_1" = ANY(%s) OR "ID_ROHR_2" = ANY(%s))', (rids, rids))
+            rohr_rels = cur.fetchall()
+
+        with self.lock:
+            for lr in lr_ids:
+                for rel in self.lr_adj.pop(lr, []):
+                    for other in (rel[1], rel[2]):
+                        if other in self.lr_adj:
+                            self.lr_adj[other] = [r for r in self.lr_adj[other] if r[0] != rel[0]]
+            self._add_lr_rels(lr_rels)
+
+            for lr in lr_ids:
+                for rid in self.rohre_by_lr.pop(lr, []):
+                    self.rohre.pop(rid, None)
+            for row in rohre:
+                self._add_rohr(*row)
+            for rid in rids:
+                for nb in self.rohr_adj.pop(rid, set()):
+                    self.rohr_adj.get(nb, set()).discard(rid)
+            self._add_rohr_rels(rohr_rels)
+
+    # ---------- Abfragen ----------
+    def lr_component(self, start_lr):
+        """Alle über Leerrohr-Relationen erreichbaren Leerrohre (inkl. Start)."""
+        seen = {start_lr}
+        stack = [start_lr]
+        while stack:
+            lr = stack.pop()
+            for _, a, b, _ in self.lr_adj.get(lr, ()):
+                nb = b if a == lr else a
+                if nb not in seen:
+                    seen.add(nb)
+                    stack.append(nb)
+        return seen
+
+    def rohr_component(self, rid):
+        seen = {rid}
+        stack = [rid]
+        while stack:
+            for nb in self.rohr_adj.get(stack.pop(), ()):
+                if nb not in seen:
+                    seen.add(nb)
+                    stack.append(nb)
+        return seen
+
+    def _has_vkg(self, lr_id, vkg):
+        lr = self.leerrohre.get(lr_id)
+        return lr is not None and vkg in lr[2]
+
+    def via_knoten(self, start_lr, vkg):
+        """
+        Knoten, über den der kürzeste Leerrohr-Weg vom Start zu einem Leerrohr
+        mit dem VKG abgeht (Breitensuche ohne direktes Zurückspringen – wie die
+        UNION-ALL-Suche ``walk`` im SQL, aber endlich auch bei Zyklen).
+        """
+        level = []
+        for _, a, b, knoten in self.lr_adj.get(start_lr, ()):
+            level.append((b if a == start_lr else a, start_lr, knoten))
+        seen = set(level)
+        while level:
+            for lr, _, knoten in level:
+                if self._has_vkg(lr, vkg):
+                    return knoten
+            nxt = []
+            for lr, prev, knoten in level:
+                for _, a, b, _ in self.lr_adj.get(lr, ()):
+                    if a == prev or b == prev:
+                        continue
+                    state = (b if a == lr else a, lr, knoten)
+                    if state not in seen:
+                        seen.add(state)
+                        nxt.append(state)
+            level = nxt
+        return None
+
+    def seite(self, start_lr, vkg):
+        """0 = VKG liegt Richtung VONKNOTEN, 1 = Richtung NACHKNOTEN, None = unbekannt."""
+        with self.lock:
+            lr = self.leerrohre.get(start_lr)
+            if lr is None:
+                return None
+            von, nach, vkgs = lr
+            if vkg in vkgs:
+                if vkg == von:
+                    return 0
+                if vkg == nach:
+                    return 1
+            via = self.via_knoten(start_lr, vkg)
+        if via is None:
+            return None
+        return 0 if via == von else 1 if via == nach else None
+
+    def rohrstatus(self, start_lr, vkg, he_pos=None):
+        """
+        Status je Rohrnummer am Start-Leerrohr wie ``ROHRSTATUS_SQL``.
+        he_pos: {rohrnummer: (min, max)} aus ``HE_POS_SQL``.
+        Rückgabe: ({rnr: {...}}, seite)
+        """
+        with self.lock:
+            return self._rohrstatus(start_lr, vkg, he_pos or {})
+
+    def _rohrstatus(self, start_lr, vkg, he_pos):
+        reach = self.lr_component(start_lr)
+        ziel = {lr for lr in reach if self._has_vkg(lr, vkg)}
+        seite = self.seite(start_lr, vkg)
+
+        segmente = {}            # rnr -> (mn_all, mx_all) wie MIN/MAX (NULL-ignorierend)
+        enable = set()
+        for rid in self.rohre_by_lr.get(start_lr, ()):
+            _, rnr, von_pos, bis_pos = self.rohre[rid]
+            if rnr is None:
+                continue
+            mn, mx = segmente.get(rnr, (None, None))
+            if von_pos is not None:
+                mn = von_pos if mn is None else min(mn, von_pos)
+            if bis_pos is not None:
+                mx = bis_pos if mx is None else max(mx, bis_pos)
+            segmente[rnr] = (mn, mx)
+            if rnr not in enable and ziel and any(
+                    r in self.rohre and self.rohre[r][0] in ziel for r in self.rohr_component(rid)):
+                enable.add(rnr)
+
+        ha = self.ha_by_vkg.get(vkg, set())
+        occ_same = {self.rohre[rid][1]
+                    for lr in reach for rid in self.rohre_by_lr.get(lr, ())
+                    if (lr, self.rohre[rid][1]) in ha}
+
+        status = {}
+        for rnr in sorted(segmente):
+            mn_all, mx_all = segmente[rnr]
+            mn_all = 1.0 if mn_all is None else mn_all
+            mx_all = 0.0 if mx_all is None else mx_all
+            occ_mn, occ_mx = he_pos.get(rnr, (None, None))
+            occ_mn = 1.0 if occ_mn is None else float(occ_mn)
+            occ_mx = 0.0 if occ_mx is None else float(occ_mx)
+            if seite == 0:
+                rest = occ_mn - 0.0
+                frei = max(rest, 0.0)
+            elif seite == 1:
+                rest = 1.0 - occ_mx
+                frei = max(rest, 0.0)
+            else:
+                # wie im SQL: ohne Seite keine Untergrenze 0
+                rest = frei = max(mn_all - 0.0, 1.0 - mx_all)
+            same = rnr in occ_same
+            status[rnr] = {
+                "enable": rnr in enable,
+                "occ_same_vkg": same,
+                "occ_mn_any": occ_mn,
+                "occ_mx_any": occ_mx,
+                "free_len_on_side_any": frei,
+                "final_belegt": same or rest <= EPS,
+            }
+        return status, seite
+
+
+def load_he_positions(cur, start_lr):
+    """{rohrnummer: (min, max)} der HE-Andockpunkte auf dem Start-Leerrohr."""
+    cur.execute(HE_POS_SQL, (start_lr,))
+    return {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+
+_graphs = {}
+_lock = threading.Lock()
+
+
+def _pool_key(pool):
+    p = pool.db_params
+    return (p.get("host"), str(p.get("port")), p.get("dbname"))
+
+
+def get_rohr_graph(pool, max_age=600.0):
+    """
+    Liefert den gecachten Rohrgraphen der Umgebung. Neu geladen wird beim
+    ersten Zugriff, nach ``invalidate_rohr_graph`` oder wenn der Stand älter
+    als ``max_age`` Sekunden ist (Änderungen anderer Benutzer).
+    """
+    key = _pool_key(pool)
+    with _lock:
+        graph = _graphs.get(key)
+        stale = graph is None or graph.loaded_at is None or \
+            (max_age is not None and time.monotonic() - graph.loaded_at > max_age)
+        if stale:
+            t0 = time.perf_counter()
+            graph = graph or RohrGraph()
+            with pool.connection() as conn, conn.cursor() as cur:
+                graph.load(cur)
+            _graphs[key] = graph
+            logger.info("Rohrgraph geladen: %d Leerrohre, %d Rohre in %.0f ms",
+                        len(graph.leerrohre), len(graph.rohre), (time.perf_counter() - t0) * 1000.0)
+        return graph
+
+
+def loaded_rohr_graph(pool):
+    """Der bereits geladene Graph der Umgebung oder None (für Nachführungen)."""
+    with _lock:
+        return _graphs.get(_pool_key(pool))
+
+
+def invalidate_rohr_graph(pool=None):
+    """Verwirft den Cache (eine Umgebung oder alle)."""
+    with _lock:
+        if pool is None:
+            _graphs.clear()
+        else:
+            _graphs.pop(_pool_key(pool), None)
+
+
+# Bisherige Abfrage (Referenz für den Vergleichstest)
+ROHRSTATUS_SQL = """
+WITH RECURSIVE
+params(start_lr, vkg) AS (VALUES (%s::bigint, %s::bigint)),
+
+reach_lr(lr_id) AS (
+SELECT start_lr FROM params
+UNION
+SELECT CASE WHEN rel."ID_LEERROHR_1"=r.lr_id THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END
+FROM reach_lr r
+JOIN lwl."LWL_Leerrohr_Leerrohr_rel" rel
+    ON rel."ID_LEERROHR_1"=r.lr_id OR rel."ID_LEERROHR_2"=r.lr_id
+),
+ziel_lr AS (
+SELECT lr.id
+FROM lwl."LWL_Leerrohr" lr
+WHERE lr.id = ANY(ARRAY(SELECT lr_id FROM reach_lr))
+    AND (SELECT vkg FROM params) = ANY(lr."VKG_LR")
+),
+
+ends AS (
+SELECT
+    l."VONKNOTEN" AS vonk,
+    l."NACHKNOTEN" AS nachk,
+    (SELECT vkg FROM params) AS vkg,
+    (SELECT start_lr FROM params) AS start_lr,
+    ((SELECT vkg FROM params) = ANY(l."VKG_LR")) AS start_has_vkg
+FROM lwl."LWL_Leerrohr" l
+WHERE l.id = (SELECT start_lr FROM params)
+),
+bfs_side AS (
+WITH RECURSIVE neighbors AS (
+    SELECT CASE WHEN rel."ID_LEERROHR_1"=(SELECT start_lr FROM ends)
+                THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END AS nb_lr,
+        rel."ID_KNOTEN" AS via_knoten
+    FROM lwl."LWL_Leerrohr_Leerrohr_rel" rel
+    WHERE rel."ID_LEERROHR_1"=(SELECT start_lr FROM ends)
+    OR rel."ID_LEERROHR_2"=(SELECT start_lr FROM ends)
+),
+walk(lr_id, via_knoten, prev_lr_id, depth) AS (
+    SELECT n.nb_lr, n.via_knoten, (SELECT start_lr FROM ends), 1 FROM neighbors n
+    UNION ALL
+    SELECT CASE WHEN rel."ID_LEERROHR_1"=w.lr_id THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END,
+        w.via_knoten, w.lr_id, w.depth+1
+    FROM walk w
+    JOIN lwl."LWL_Leerrohr_Leerrohr_rel" rel
+    ON rel."ID_LEERROHR_1"=w.lr_id OR rel."ID_LEERROHR_2"=w.lr_id
+    WHERE rel."ID_LEERROHR_1"<>w.prev_lr_id AND rel."ID_LEERROHR_2"<>w.prev_lr_id
+)
+SELECT w.via_knoten
+FROM walk w
+JOIN lwl."LWL_Leerrohr" lr ON lr.id = w.lr_id
+WHERE (SELECT vkg FROM ends) = ANY(lr."VKG_LR")
+ORDER BY depth
+LIMIT 1
+),
+side AS (
+SELECT
+    CASE
+    WHEN (SELECT start_has_vkg FROM ends) AND (SELECT vkg FROM ends) = (SELECT vonk  FROM ends) THEN 0
+    WHEN (SELECT start_has_vkg FROM ends) AND (SELECT vkg FROM ends) = (SELECT nachk FROM ends) THEN 1
+    ELSE CASE
+            WHEN (SELECT via_knoten FROM bfs_side) = (SELECT vonk  FROM ends) THEN 0
+            WHEN (SELECT via_knoten FROM bfs_side) = (SELECT nachk FROM ends) THEN 1
+            ELSE NULL
+        END
+    END AS seite
+),
+
+segments_all AS (
+SELECT "ROHRNUMMER" AS rnr,
+        COALESCE(MIN("FROM_POS"),1.0)::float AS mn_all,
+        COALESCE(MAX("TO_POS"),  0.0)::float AS mx_all
+FROM lwl."LWL_Rohr"
+WHERE "ID_LEERROHR" = (SELECT start_lr FROM params)
+  AND "ROHRNUMMER" IS NOT NULL
+GROUP BY "ROHRNUMMER"
+),
+enable_rnr AS (
+WITH RECURSIVE start_rohre(rid, rnr) AS (
+    SELECT r.id, r."ROHRNUMMER"
+    FROM lwl."LWL_Rohr" r
+    WHERE r."ID_LEERROHR" = (SELECT start_lr FROM params)
+),
+walk(rid, rnr) AS (
+    SELECT rid, rnr FROM start_rohre
+    UNION
+    SELECT CASE WHEN rel."ID_ROHR_1"=w.rid THEN rel."ID_ROHR_2" ELSE rel."ID_ROHR_1" END, w.rnr
+    FROM walk w
+    JOIN lwl."LWL_Rohr_Rohr_rel" rel
+    ON rel."ID_ROHR_1"=w.rid OR rel."ID_ROHR_2"=w.rid
+)
+SELECT DISTINCT w.rnr
+FROM walk w
+JOIN lwl."LWL_Rohr" r2 ON r2.id = w.rid
+WHERE r2."ID_LEERROHR" = ANY(ARRAY(SELECT id FROM ziel_lr))
+),
+targets_same AS (
+SELECT DISTINCT r2.id AS rid, r2."ROHRNUMMER" AS rnr
+FROM lwl."LWL_Rohr" r2
+JOIN lwl."LWL_Hauseinfuehrung" ha
+    ON ha."ID_LEERROHR"=r2."ID_LEERROHR" AND ha."ROHRNUMMER"=r2."ROHRNUMMER"
+WHERE ha."VKG_LR" = (SELECT vkg FROM params)
+    AND r2."ID_LEERROHR" = ANY(ARRAY(SELECT lr_id FROM reach_lr))
+),
+walk_back_same(rid, rnr) AS (
+SELECT rid, rnr FROM targets_same
+UNION
+SELECT CASE WHEN rel."ID_ROHR_1"=w.rid THEN rel."ID_ROHR_2" ELSE rel."ID_ROHR_1" END, w.rnr
+FROM walk_back_same w
+JOIN lwl."LWL_Rohr_Rohr_rel" rel
+    ON rel."ID_ROHR_1"=w.rid OR rel."ID_ROHR_2"=w.rid
+),
+occ_same_set AS ( SELECT DISTINCT rnr FROM walk_back_same ),
+
+he_pos_on_start AS (
+SELECT
+    ha."ROHRNUMMER" AS rnr,
+    ST_LineLocatePoint(
+    ST_LineMerge(ST_CollectionExtract(ST_Force2D(l.geom), 2)),
+    ST_Force2D(kn.geom)
+    )::float AS pos
+FROM lwl."LWL_Hauseinfuehrung" ha
+JOIN lwl."LWL_Leerrohr" l ON l.id = ha."ID_LEERROHR"
+JOIN lwl."LWL_Knoten"  kn ON kn.id = ha."ID_KNOTEN"
+WHERE ha."ID_LEERROHR" = (SELECT start_lr FROM params)
+),
+occ_on_start_any AS (
+SELECT rnr,
+        MIN(pos)::float AS occ_mn_any,
+        MAX(pos)::float AS occ_mx_any
+FROM he_pos_on_start
+GROUP BY rnr
+)
+
+SELECT
+sa.rnr,
+(sa.rnr = ANY(ARRAY(SELECT rnr FROM enable_rnr)))    AS enable_to_vkg,
+(sa.rnr = ANY(ARRAY(SELECT rnr FROM occ_same_set)))  AS occ_same_vkg,
+COALESCE(os.occ_mn_any, 1.0) AS occ_mn_any,
+COALESCE(os.occ_mx_any, 0.0) AS occ_mx_any,
+(SELECT seite FROM side)      AS seite,
+CASE (SELECT seite FROM side)
+    WHEN 0 THEN GREATEST(COALESCE(os.occ_mn_any,1.0) - 0.0, 0.0)
+    WHEN 1 THEN GREATEST(1.0 - COALESCE(os.occ_mx_any,0.0), 0.0)
+    ELSE GREATEST(sa.mn_all - 0.0, 1.0 - sa.mx_all)
+END AS free_len_on_side_any,
+(
+    (sa.rnr = ANY(ARRAY(SELECT rnr FROM occ_same_set)))
+    OR
+    (
+    CASE (SELECT seite FROM side)
+        WHEN 0 THEN (COALESCE(os.occ_mn_any,1.0) - 0.0) <= 1e-9
+        WHEN 1 THEN (1.0 - COALESCE(os.occ_mx_any,0.0)) <= 1e-9
+        ELSE (GREATEST(sa.mn_all - 0.0, 1.0 - sa.mx_all) <= 1e-9)
+    END
+    )
+) AS final_belegt
+FROM segments_all sa
+LEFT JOIN occ_on_start_any os ON os.rnr = sa.rnr
+ORDER BY sa.rnr;
+"""
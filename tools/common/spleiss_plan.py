@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Spleißplan eines Knotens (Muffe, Verteiler): welche Faser welches Kabels mit
+welcher Faser eines anderen Kabels verspleißt ist.
+
+- ``SpleissPlan.load(cur, kabel_typen)`` liest alle Kabel am Knoten
+  (lwl."LWL_Kabel_Verlegt", alle Segmente mit ihren Leerrohr- und
+  Trassenverläufen) und die vorhandenen Spleiße mit je einer Abfrage; die
+  Faseranzahl kommt aus den LWL_Kabel_Typ-Zeilen des Nachschlage-Katalogs.
+  Gespleißt werden nur Kabel, die am Knoten enden (STARTKNOTEN, ENDKNOTEN
+  oder VIRTUELLER_KNOTEN); Kabel, die nur mit einem Segment über den Knoten
+  laufen (VONKNOTEN/NACHKNOTEN), stehen getrennt in ``durchgehend``.
+- ``vorschlag()`` schlägt für die freien Fasern Spleiße nach Farb- und
+  Nummernregeln vor: die Fasern des Zubringers (standardmäßig das Kabel mit
+  den meisten Fasern) werden der Reihe nach auf die abgehenden Kabel verteilt,
+  bündelweise und Farbe auf Farbe (Faser n im Bündel -> Faser n im Bündel).
+  Ein Bündel des abgehenden Kabels erhält nach Möglichkeit ein ganzes Bündel
+  des Zubringers; wo das nicht geht, wird farbgleich, dann der Nummer nach
+  aufgefüllt.
+- ``speichern(cur, user)`` schreibt nur die Änderungen gegenüber dem geladenen
+  Stand mengenbasiert (Temp-Tabelle, je ein DELETE und INSERT) unter einem
+  Advisory-Lock je Knoten; hat ein anderer Benutzer den Plan inzwischen
+  geändert, wird abgebrochen. Erst nach dem Commit übernimmt
+  ``gespeichert()`` den Stand als neuen Bestand.
+
+Die Tabelle lwl."LWL_Spleiss" kommt aus der Migration ``sql/002_lwl_spleiss.sql``;
+fehlt sie, meldet ``speichern`` das mit ``SpleissTabelleFehlt``.
+
+Alles außer ``load``/``speichern`` läuft im Speicher; ein 288-Faser-Verteiler
+ist damit im Millisekundenbereich vorgeschlagen.
+"""
+
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+SPLEISS_TABLE = 'lwl."LWL_Spleiss"'
+MIGRATION = "sql/002_lwl_spleiss.sql"
+
+# Namensraum für pg_advisory_xact_lock(int, int)
+LOCK_NAMESPACE = "lwl.LWL_Spleiss"
+
+# ENDET: das Kabel beginnt/endet am Knoten (Spleiß-Kandidat), sonst läuft es durch
+KABEL_SQL = """
+    SELECT k."KABEL_ID", k."KABELTYP", k."TYP", k."SEGMENT_ID", k."STARTKNOTEN", k."ENDKNOTEN",
+           k."VONKNOTEN", k."NACHKNOTEN", k."ID_LEERROHR", k."ID_TRASSE", k."BEZEICHNUNG_INTERN",
+           bool_or(%(k)s IN (k."STARTKNOTEN", k."ENDKNOTEN", k."VIRTUELLER_KNOTEN"))
+               OVER (PARTITION BY k."KABEL_ID") AS "ENDET"
+    FROM lwl."LWL_Kabel_Verlegt" k
+    WHERE k."KABEL_ID" IN (
+        SELECT "KABEL_ID" FROM lwl."LWL_Kabel_Verlegt"
+        WHERE %(k)s IN ("STARTKNOTEN", "ENDKNOTEN", "VONKNOTEN", "NACHKNOTEN", "VIRTUELLER_KNOTEN")
+    )
+    ORDER BY k."KABEL_ID", k."SEGMENT_ID"
+"""
+
+SPLEISS_SQL = f"""
+    SELECT "KABEL_1", "FASER_1", "KABEL_2", "FASER_2"
+    FROM {SPLEISS_TABLE}
+    WHERE "ID_KNOTEN" = %s
+"""
+
+# Farbfolge nach DIN VDE 0888 / IEC 60304 (Fasern und Bündeladern)
+FASERFARBEN = ("rot", "grün", "blau", "gelb", "weiß", "grau",
+               "braun", "violett", "türkis", "schwarz", "orange", "rosa")
+FASERN_JE_BUENDEL = 12
+
+# Spalten in LWL_Kabel_Typ, die (falls vorhanden) die Faser-/Bündelzahl enthalten
+FASER_SPALTEN = ("ANZAHL_FASERN", "FASERANZAHL", "FASERN")
+BUENDEL_SPALTEN = ("FASERN_JE_BUENDEL", "FASERN_PRO_BUENDEL")
+
+_re_buendel = re.compile(r"(\d+)\s*[xX×]\s*(\d+)")
+_re_fasern = re.compile(r"(\d+)\s*(?:E9|G50|G62|F\b|Fasern|Fa\b)", re.IGNORECASE)
+
+
+def faser_struktur(kabel_typ):
+    """
+    (Fasern, Fasern je Bündel) eines LWL_Kabel_Typ-Dicts: aus einer der
+    ``FASER_SPALTEN``, sonst aus der Bezeichnung ("12x12E9/125" -> 144,
+    "A-DQ(ZN)B2Y 24E9/125" -> 24). Unbekannt -> (0, 12).
+    """
+    kabel_typ = kabel_typ or {}
+    je_buendel = next((int(kabel_typ[c]) for c in BUENDEL_SPALTEN if kabel_typ.get(c)), None)
+    fasern = next((int(kabel_typ[c]) for c in FASER_SPALTEN if kabel_typ.get(c)), None)
+    bezeichnung = str(kabel_typ.get("BEZEICHNUNG") or "")
+    if fasern is None:
+        m = _re_buendel.search(bezeichnung)
+        if m:
+            fasern = int(m.group(1)) * int(m.group(2))
+            je_buendel = je_buendel or int(m.group(2))
+        else:
+            m = _re_fasern.search(bezeichnung)
+            fasern = int(m.group(1)) if m else 0
+    return fasern, je_buendel or min(FASERN_JE_BUENDEL, fasern) or FASERN_JE_BUENDEL
+
+
+def faser_position(nr, je_buendel=FASERN_JE_BUENDEL):
+    """Faser ``nr`` (ab 1) -> (Bündel, Faser im Bündel), beide ab 1."""
+    return (nr - 1) // je_buendel + 1, (nr - 1) % je_buendel + 1
+
+
+def faser_farben(nr, je_buendel=FASERN_JE_BUENDEL, farben=FASERFARBEN):
+    """(Bündelfarbe, Faserfarbe) der Faser ``nr``."""
+    buendel, faser = faser_position(nr, je_buendel)
+    return farben[(buendel - 1) % len(farben)], farben[(faser - 1) % len(farben)]
+
+
+class SpleissTabelleFehlt(RuntimeError):
+    """lwl."LWL_Spleiss" ist nicht angelegt (Migration fehlt)."""
+
+    def __init__(self):
+        super().__init__(f"Tabelle {SPLEISS_TABLE} fehlt – bitte die Migration {MIGRATION} einspielen.")
+
+
+def _paar(a, b):
+    return (a, b) if a <= b else (b, a)
+
+
+class SpleissKabel:
+    """Ein Kabel am Knoten mit Faserstruktur und Verlauf."""
+
+    def __init__(self, kabel_id, kabeltyp=None, typ=None, fasern=0, je_buendel=FASERN_JE_BUENDEL,
+                 bezeichnung=None, leerrohre=(), trassen=()):
+        self.kabel_id = kabel_id
+        self.kabeltyp = kabeltyp
+        self.typ = typ
+        self.fasern = fasern
+        self.je_buendel = je_buendel
+        self.bezeichnung = bezeichnung
+        self.leerrohre = list(leerrohre)
+        self.trassen = list(trassen)
+
+    def __repr__(self):
+        return f"SpleissKabel({self.kabel_id}, {self.fasern} Fasern)"
+
+
+class SpleissPlan:
+    """Spleiße eines Knotens: ``verbindungen[(kabel, faser)] -> (kabel, faser)`` (symmetrisch)."""
+
+    def __init__(self, knoten):
+        self.knoten = knoten
+        self.kabel = {}              # kabel_id -> SpleissKabel (endet am Knoten)
+        self.durchgehend = {}        # kabel_id -> SpleissKabel (läuft durch, wird nicht gespleißt)
+        self.verbindungen = {}
+        self.bestand = set()         # Paare wie zuletzt geladen/gespeichert
+        self.tabelle_vorhanden = True
+
+    # ---------- Laden ----------
+    def load_rows(self, kabel_rows, spleiss_rows, kabel_typen=None):
+        """
+        ``kabel_rows`` wie ``KABEL_SQL`` (je Segment eine Zeile),
+        ``spleiss_rows`` wie ``SPLEISS_SQL``, ``kabel_typen``: {id: LWL_Kabel_Typ-Dict}.
+        """
+        kabel_typen = kabel_typen or {}
+        self.kabel = {}
+        self.durchgehend = {}
+        for kid, kabeltyp, typ, _seg, _start, _ende, _von, _nach, leerrohre, trassen, bez, endet in kabel_rows:
+            ziel = self.kabel if endet else self.durchgehend
+            k = ziel.get(kid)
+            if k is None:
+                fasern, je_buendel = faser_struktur(kabel_typen.get(kabeltyp))
+                k = ziel[kid] = SpleissKabel(kid, kabeltyp, typ, fasern, je_buendel, bez)
+            k.leerrohre.extend(lr for lr in (leerrohre or ()) if lr not in k.leerrohre)
+            k.trassen.extend(t for t in (trassen or ()) if t not in k.trassen)
+        self.verbindungen = {}
+        for k1, f1, k2, f2 in spleiss_rows:
+            self._setze((int(k1), int(f1)), (int(k2), int(f2)))
+        self.bestand = set(self.paare())
+        return self
+
+    def load(self, cur, kabel_typen=None):
+        cur.execute(KABEL_SQL, {"k": self.knoten})
+        kabel_rows = cur.fetchall()
+        spleiss_rows = []
+        vorhanden = _tabelle_vorhanden(cur)
+        if vorhanden:
+            cur.execute(SPLEISS_SQL, (self.knoten,))
+            spleiss_rows = cur.fetchall()
+        self.load_rows(kabel_rows, spleiss_rows, kabel_typen)
+        self.tabelle_vorhanden = vorhanden
+        return self
+
+    # ---------- Bearbeiten ----------
+    def _setze(self, a, b):
+        self.verbindungen[a] = b
+        self.verbindungen[b] = a
+
+    def verbinde(self, a, b):
+        """Spleißt Faser ``a`` = (kabel, nr) mit ``b``; beide müssen frei und vorhanden sein."""
+        for kabel_id, nr in (a, b):
+            k = self.kabel.get(kabel_id)
+            if k is None or not 1 <= nr <= k.fasern:
+                raise ValueError(f"Faser {nr} von Kabel {kabel_id} gibt es an diesem Knoten nicht.")
+        if a == b:
+            raise ValueError("Eine Faser kann nicht mit sich selbst verspleißt werden.")
+        belegt = [f for f in (a, b) if f in self.verbindungen]
+        if belegt:
+            raise ValueError(f"Faser {belegt[0][1]} von Kabel {belegt[0][0]} ist bereits verspleißt.")
+        self._setze(a, b)
+
+    def trenne(self, faser):
+        gegen = self.verbindungen.pop(faser, None)
+        if gegen is not None:
+            self.verbindungen.pop(gegen, None)
+        return gegen
+
+    def frei(self, kabel_id):
+        """Freie Fasernummern eines Kabels."""
+        k = self.kabel[kabel_id]
+        return [n for n in range(1, k.fasern + 1) if (kabel_id, n) not in self.verbindungen]
+
+    def paare(self):
+        """Alle Spleiße als sortierte Paare ((kabel, faser), (kabel, faser))."""
+        return sorted({_paar(a, b) for a, b in self.verbindungen.items()})
+
+    # ---------- Vorschlag ----------
+    def zubringer(self):
+        """Standard-Zubringer: das Kabel mit den meisten Fasern (bei Gleichstand die kleinste KABEL_ID)."""
+        if not self.kabel:
+            return None
+        return min(self.kabel.values(), key=lambda k: (-k.fasern, k.kabel_id)).kabel_id
+
+    def vorschlag(self, zubringer=None, abgehend=None):
+        """
+        Vorgeschlagene Spleiße [(zubringer_faser, abgehende_faser)] für die
+        freien Fasern; der Plan selbst wird nicht verändert (``uebernehmen``).
+        """
+        zubringer = zubringer if zubringer is not None else self.zubringer()
+        if zubringer is None:
+            return []
+        if abgehend is None:
+            abgehend = sorted(k for k in self.kabel if k != zubringer)
+        z = self.kabel[zubringer]
+        # freie Zubringer-Fasern je Bündel: {bündel: {faser_im_bündel: nr}}
+        z_frei = {}
+        for nr in self.frei(zubringer):
+            b, f = faser_position(nr, z.je_buendel)
+            z_frei.setdefault(b, {})[f] = nr
+
+        vorschlag = []
+        for kabel_id in abgehend:
+            k = self.kabel[kabel_id]
+            k_buendel = {}
+            for nr in self.frei(kabel_id):
+                b, f = faser_position(nr, k.je_buendel)
+                k_buendel.setdefault(b, {})[f] = nr
+            rest = []
+            for b in sorted(k_buendel):
+                bedarf = k_buendel[b]
+                # 1. ein Zubringer-Bündel, in dem alle benötigten Farben frei sind
+                passend = next((zb for zb in sorted(z_frei) if set(bedarf) <= set(z_frei[zb])), None)
+                if passend is not None:
+                    for f, nr in sorted(bedarf.items()):
+                        vorschlag.append(((zubringer, z_frei[passend].pop(f)), (kabel_id, nr)))
+                    if not z_frei[passend]:
+                        del z_frei[passend]
+                else:
+                    rest.extend(sorted(bedarf.items()))
+            # 2. farbgleich in irgendeinem Bündel, 3. der Nummer nach
+            offen = []
+            for f, nr in rest:
+                zb = next((zb for zb in sorted(z_frei) if f in z_frei[zb]), None)
+                if zb is None:
+                    offen.append(nr)
+                    continue
+                vorschlag.append(((zubringer, z_frei[zb].pop(f)), (kabel_id, nr)))
+                if not z_frei[zb]:
+                    del z_frei[zb]
+            for nr in offen:
+                if not z_frei:
+                    break
+                zb = min(z_frei)
+                vorschlag.append(((zubringer, z_frei[zb].pop(min(z_frei[zb]))), (kabel_id, nr)))
+                if not z_frei[zb]:
+                    del z_frei[zb]
+            if not z_frei:
+                break
+        return vorschlag
+
+    def uebernehmen(self, vorschlag):
+        for a, b in vorschlag:
+            self.verbinde(a, b)
+
+    # ---------- Speichern ----------
+    def diff(self):
+        """(zu_loeschen, neu) gegenüber dem geladenen Stand."""
+        aktuell = set(self.paare())
+        return sorted(self.bestand - aktuell), sorted(aktuell - self.bestand)
+
+    def speichern(self, cur, user=None):
+        """
+        Schreibt die Änderungen in der Transaktion von ``cur`` (Commit beim Aufrufer,
+        danach ``gespeichert()``). Rückgabe: (gelöscht, eingefügt).
+        """
+        if not _tabelle_vorhanden(cur):
+            raise SpleissTabelleFehlt()
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(%s::text))",
+                    (LOCK_NAMESPACE, self.knoten))
+        cur.execute(SPLEISS_SQL, (self.knoten,))
+        in_db = {_paar((int(k1), int(f1)), (int(k2), int(f2))) for k1, f1, k2, f2 in cur.fetchall()}
+        if in_db != self.bestand:
+            raise Exception("Der Spleißplan dieses Knotens wurde inzwischen geändert. Bitte neu laden.")
+
+        loeschen, neu = self.diff()
+        delta = [("D",) + a + b for a, b in loeschen] + [("I",) + a + b for a, b in neu]
+        if delta:
+            cur.execute("DROP TABLE IF EXISTS _spleiss_delta")
+            cur.execute("""
+                CREATE TEMP TABLE _spleiss_delta (op text, k1 bigint, f1 int, k2 bigint, f2 int)
+                ON COMMIT DROP
+            """)
+            cur.execute("""
+                INSERT INTO _spleiss_delta (op, k1, f1, k2, f2)
+                SELECT * FROM unnest(%s::text[], %s::bigint[], %s::int[], %s::bigint[], %s::int[])
+            """, tuple([d[i] for d in delta] for i in range(5)))
+            cur.execute(f"""
+                DELETE FROM {SPLEISS_TABLE} s
+                USING _spleiss_delta d
+                WHERE d.op = 'D' AND s."ID_KNOTEN" = %s
+                AND s."KABEL_1" = d.k1 AND s."FASER_1" = d.f1 AND s."KABEL_2" = d.k2 AND s."FASER_2" = d.f2
+            """, (self.knoten,))
+            cur.execute(f"""
+                INSERT INTO {SPLEISS_TABLE} ("ID_KNOTEN", "KABEL_1", "FASER_1", "KABEL_2", "FASER_2", "CREATEUSER")
+                SELECT %s, d.k1, d.f1, d.k2, d.f2, %s
+                FROM _spleiss_delta d
+                WHERE d.op = 'I'
+            """, (self.knoten, user))
+        logger.info("Spleißplan Knoten %s geschrieben: %d gelöscht, %d neu", self.knoten, len(loeschen), len(neu))
+        return len(loeschen), len(neu)
+
+    def gespeichert(self):
+        """Nach dem Commit von ``speichern``: aktueller Stand ist der neue Bestand."""
+        self.bestand = set(self.paare())
+
+
+def _tabelle_vorhanden(cur):
+    cur.execute("SELECT to_regclass(%s)", (SPLEISS_TABLE,))
+    return cur.fetchone()[0] is not None
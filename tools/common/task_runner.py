@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Hintergrund-Aufgaben der Tools (QgsTask).
+
+Routing, Importe und das Laden der Rohrbelegung liefen bisher im GUI-Thread;
+QGIS reagierte für die Dauer nicht ("Keine Rückmeldung"). ``TaskRunner``
+führt solche Arbeiten als ``QgsTask`` im Task-Manager von QGIS aus:
+
+- ``func(task, *args)`` läuft im Hintergrund; ``task.fortschritt(p)`` meldet
+  Fortschritt (0–100), ``task.pruefe_abbruch()`` bricht ab, wenn der Benutzer
+  die Aufgabe in der QGIS-Statusleiste abgebrochen hat.
+- Mit ``pool=`` erhält die Aufgabe eine eigene Verbindung aus dem Pool
+  (``task.conn``) für ihre ganze Laufzeit: Commit bei Erfolg, Rollback bei
+  Fehler oder Abbruch – wie ``pool.connection()``.
+- Ergebnis, Fehler und Abbruch kommen als Signale (``ergebnis``, ``fehler``,
+  ``abgebrochen``) im GUI-Thread an; nur dort dürfen Widgets angefasst werden.
+- Schreibende Aufgaben (``schreiben=True``) laufen je Tool nacheinander, so
+  dass zwei Importe desselben Tools nie gleichzeitig Transaktionen offen haben.
+- Aufgaben mit gleichem ``schluessel`` ersetzen einander: eine neue Routensuche
+  bricht die noch laufende ab, deren Ergebnis wird verworfen.
+"""
+
+import logging
+import threading
+from contextlib import nullcontext
+
+from PyQt5.QtCore import pyqtSignal
+from qgis.core import QgsApplication, QgsTask
+
+logger = logging.getLogger(__name__)
+
+
+class Abgebrochen(Exception):
+    """Die Aufgabe wurde vom Benutzer abgebrochen."""
+
+
+_schreibsperren = {}
+_schreibsperren_lock = threading.Lock()
+
+
+def schreibsperre(tool):
+    """Sperre für schreibende Aufgaben eines Tools (eine je Tool-Name)."""
+    with _schreibsperren_lock:
+        return _schreibsperren.setdefault(tool, threading.Lock())
+
+
+class ToolTask(QgsTask):
+    """Eine Hintergrund-Aufgabe; ``func(task, *args, **kwargs)`` läuft in ``run()``."""
+
+    ergebnis = pyqtSignal(object)
+    fehler = pyqtSignal(object)
+    abgebrochen = pyqtSignal()
+
+    def __init__(self, beschreibung, func, *args, pool=None, sperre=None, abbrechbar=True, **kwargs):
+        super().__init__(beschreibung, QgsTask.CanCancel if abbrechbar else QgsTask.Flags())
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.pool = pool
+        self.sperre = sperre
+        self.conn = None
+        self.result = None
+        self.exception = None
+
+    # ---------- im Hintergrund ----------
+    def fortschritt(self, wert):
+        self.setProgress(max(0.0, min(100.0, float(wert))))
+
+    def pruefe_abbruch(self):
+        if self.isCanceled():
+            raise Abgebrochen(self.description())
+
+    def run(self):
+        try:
+            with self.sperre or nullcontext():
+                self.pruefe_abbruch()
+                if self.pool is None:
+                    self.result = self.func(self, *self.args, **self.kwargs)
+                else:
+                    with self.pool.connection() as conn:
+                        self.conn = conn
+                        self.result = self.func(self, *self.args, **self.kwargs)
+                        # Abbruch während der Arbeit -> Rollback statt Commit
+                        self.pruefe_abbruch()
+            return True
+        except Abgebrochen:
+            logger.info("%s abgebrochen", self.description())
+            return False
+        except Exception as e:
+            self.exception = e
+            logger.exception("%s fehlgeschlagen", self.description())
+            return False
+        finally:
+            self.conn = None
+
+    # ---------- im GUI-Thread ----------
+    def finished(self, ok):
+        if ok:
+            self.ergebnis.emit(self.result)
+        elif self.exception is not None:
+            self.fehler.emit(self.exception)
+        else:
+            self.abgebrochen.emit()
+
+
+class TaskRunner:
+    """Startet und verwaltet die Hintergrund-Aufgaben eines Tools."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.tasks = {}          # id(task) -> task (Referenz halten, bis fertig)
+        self.laufend = {}        # schluessel -> task
+
+    def starte(self, beschreibung, func, *args, pool=None, schreiben=False, schluessel=None,
+               on_ergebnis=None, on_fehler=None, on_abbruch=None, on_fortschritt=None, **kwargs):
+        """
+        Startet ``func(task, *args, **kwargs)`` im Hintergrund und liefert den Task.
+        Die ``on_*``-Callbacks werden im GUI-Thread aufgerufen; das Ergebnis
+        einer durch ``schluessel`` ersetzten Aufgabe wird nicht mehr zugestellt.
+        """
+        if schluessel is not None:
+            self.abbrechen(schluessel)
+        task = ToolTask(f"{self.tool}: {beschreibung}", func, *args, pool=pool,
+                        sperre=schreibsperre(self.tool) if schreiben else None, **kwargs)
+
+        def aktuell():
+            return schluessel is None or self.laufend.get(schluessel) is task
+
+        def zustellen(callback):
+            def slot(*werte):
+                try:
+                    if callback is not None and aktuell():
+                        callback(*werte)
+                except RuntimeError as e:
+                    # Dialog inzwischen geschlossen und gelöscht (WA_DeleteOnClose)
+                    if "deleted" not in str(e):
+                        raise
+                    logger.debug("%s: Rückmeldung nicht zugestellt: %s", task.description(), e)
+                finally:
+                    self.tasks.pop(id(task), None)
+                    if schluessel is not None and self.laufend.get(schluessel) is task:
+                        del self.laufend[schluessel]
+            return slot
+
+        task.ergebnis.connect(zustellen(on_ergebnis))
+        task.fehler.connect(zustellen(on_fehler))
+        task.abgebrochen.connect(zustellen(on_abbruch))
+        if on_fortschritt is not None:
+            task.progressChanged.connect(lambda p: aktuell() and on_fortschritt(p))
+
+        self.tasks[id(task)] = task
+        if schluessel is not None:
+            self.laufend[schluessel] = task
+        QgsApplication.taskManager().addTask(task)
+        logger.debug("Aufgabe gestartet: %s", task.description())
+        return task
+
+    def laeuft(self, schluessel=None):
+        if schluessel is not None:
+            return schluessel in self.laufend
+        return bool(self.tasks)
+
+    def schliessen(self):
+        """
+        Beim Schließen des Tools: ersetzbare Aufgaben (mit ``schluessel``)
+        abbrechen; schreibende Aufgaben laufen zu Ende und werden committet.
+        """
+        for schluessel in list(self.laufend):
+            self.abbrechen(schluessel)
+
+    def abbrechen(self, schluessel=None):
+        """Bricht eine (``schluessel``) oder alle laufenden Aufgaben des Tools ab."""
+        if schluessel is not None:
+            task = self.laufend.pop(schluessel, None)
+            tasks = [task] if task is not None else []
+        else:
+            tasks = list(self.tasks.values())
+            self.laufend.clear()
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Lokaler Schnappschuss der Netztopologie (Trassen) als SQLite-Datei je
+Umgebung (Test/Produktiv); daraus wird der Trassengraph aufgebaut.
+
+Beim Start wird die Datei gelesen (keine DB-Abfrage). Abgeglichen wird
+inkrementell über die Hochwassermarke ``max("UPDATETIME")`` je Tabelle:
+nur Zeilen ab dieser Marke werden nachgeladen. Stimmt danach die Anzahl
+nicht mit der DB überein (gelöschte Zeilen, Zeilen ohne UPDATETIME), werden
+nur die IDs abgeglichen. Tabellen ohne UPDATETIME-Spalte werden vollständig
+geladen, alle Tabellen außerdem spätestens nach ``FULL_REFRESH_AFTER``.
+
+PostGIS bleibt die führende Quelle; der Schnappschuss ist nur ein Cache.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .lookup_catalog import default_cache_dir
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 2
+FULL_REFRESH_AFTER = 24 * 3600.0   # Sekunden; fängt Änderungen ohne UPDATETIME ab
+
+# Name -> (Tabelle, Spalten; die erste Spalte ist immer die ID)
+# Knoten und Leerrohre stehen bewusst nicht darin: NodeLocator und Rohrgraph
+# lesen aus Layer bzw. DB und würden einen Schnappschuss nicht nutzen.
+SOURCES = {
+    "trasse": ('lwl."LWL_Trasse"', 'id, "VONKNOTEN", "NACHKNOTEN", "LAENGE"'),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, hwm TEXT, anzahl INTEGER, voll_am REAL);
+CREATE TABLE IF NOT EXISTS trasse (id INTEGER PRIMARY KEY, von INTEGER, nach INTEGER, laenge REAL);
+"""
+
+
+def _int(v):
+    return int(v) if v is not None else None
+
+
+def _float(v):
+    return float(v) if v is not None else None
+
+
+class TopologySnapshot:
+    """Topologie einer Umgebung: ``rows[name][id] -> Tupel`` plus SQLite-Datei."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.rows = {name: {} for name in SOURCES}
+        self.meta = {}               # name -> {"hwm", "anzahl", "voll_am"}
+        self._has_updatetime = {}    # name -> bool (je Sitzung einmal geprüft)
+
+    # ---------- Datei ----------
+    def _db(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return closing(sqlite3.connect(self.path))
+
+    def load(self):
+        """Liest die Datei ein; False, wenn keine (passende) Datei vorhanden ist."""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        t0 = time.perf_counter()
+        try:
+            with self._db() as db:
+                veraltet = db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION
+                if not veraltet:
+                    self.meta = {n: {"hwm": h, "anzahl": a, "voll_am": v}
+                                 for n, h, a, v in db.execute("SELECT name, hwm, anzahl, voll_am FROM meta")}
+                    self.rows["trasse"] = {r[0]: r for r in db.execute(
+                        "SELECT id, von, nach, laenge FROM trasse")}
+        except sqlite3.Error as e:
+            logger.warning("Topologie-Schnappschuss %s unlesbar: %s", self.path, e)
+            self.rows = {name: {} for name in SOURCES}
+            self.meta = {}
+            return False
+        if veraltet:
+            # Datei eines älteren Formats: verwerfen, der nächste Abgleich lädt vollständig
+            logger.info("Topologie-Schnappschuss %s hat ein altes Format, wird neu aufgebaut", self.path)
+            os.remove(self.path)
+            return False
+        logger.info("Topologie-Schnappschuss geladen: %s in %.0f ms",
+                    ", ".join(f"{len(r)} {n}" for n, r in self.rows.items()),
+                    (time.perf_counter() - t0) * 1000.0)
+        return True
+
+    def _write(self, name, upserts=(), deletes=(), replace=False):
+        """Schreibt Änderungen einer Tabelle (und deren Meta-Zeile) in die Datei."""
+        if not self.path:
+            return
+        try:
+            with self._db() as db:
+                db.executescript(_SCHEMA)
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                with db:
+                    self._write_rows(db, name, upserts, deletes, replace)
+        except sqlite3.Error as e:
+            logger.warning("Topologie-Schnappschuss %s nicht schreibbar: %s", self.path, e)
+
+    def _write_rows(self, db, name, upserts, deletes, replace):
+        if replace:
+            db.execute(f"DELETE FROM {name}")
+        elif deletes:
+            db.executemany(f"DELETE FROM {name} WHERE id = ?", [(i,) for i in deletes])
+        if upserts:
+            marks = ", ".join("?" * len(upserts[0]))
+            db.executemany(f"INSERT OR REPLACE INTO {name} VALUES ({marks})", upserts)
+        m = self.meta.get(name) or {}
+        db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)",
+                   (name, m.get("hwm"), m.get("anzahl"), m.get("voll_am")))
+
+    # ---------- Abgleich mit der DB ----------
+    @staticmethod
+    def _row(name, r):
+        return (int(r[0]), _int(r[1]), _int(r[2]), _float(r[3]))
+
+    def _fetch(self, cur, name, where="", params=()):
+        table, cols = SOURCES[name]
+        cur.execute(f"SELECT {cols} FROM {table} {where}", params)
+        return [self._row(name, r) for r in cur.fetchall()]
+
+    def _updatetime(self, cur, name):
+        if name not in self._has_updatetime:
+            schema, table = [p.strip('"') for p in SOURCES[name][0].split(".")]
+            cur.execute("SELECT 1 FROM information_schema.columns "
+                        "WHERE table_schema = %s AND table_name = %s AND column_name = 'UPDATETIME'",
+                        (schema, table))
+            self._has_updatetime[name] = cur.fetchone() is not None
+        return self._has_updatetime[name]
+
+    def _apply(self, name, upserts=(), deletes=()):
+        rows = self.rows[name]
+        for i in deletes:
+            rows.pop(i, None)
+        for r in upserts:
+            rows[r[0]] = r
+
+    def refresh_table(self, cur, name, full=False):
+        """Gleicht eine Tabelle ab; Rückgabe: Anzahl geänderter/entfernter Zeilen."""
+        table = SOURCES[name][0]
+        has_ut = self._updatetime(cur, name)
+        if has_ut:
+            cur.execute(f'SELECT max("UPDATETIME")::text, count(*) FROM {table}')
+        else:
+            cur.execute(f"SELECT NULL, count(*) FROM {table}")
+        hwm, anzahl = cur.fetchone()
+        m = self.meta.get(name)
+        full = full or not has_ut or m is None or \
+            time.time() - (m.get("voll_am") or 0.0) > FULL_REFRESH_AFTER
+
+        if full:
+            rows = self._fetch(cur, name)
+            self.rows[name] = {}
+            self._apply(name, rows)
+            self.meta[name] = {"hwm": hwm, "anzahl": anzahl, "voll_am": time.time()}
+            self._write(name, rows, replace=True)
+            return len(rows)
+
+        upserts = []
+        if hwm is not None and hwm != m.get("hwm"):
+            if m.get("hwm") is None:
+                upserts = self._fetch(cur, name, 'WHERE "UPDATETIME" IS NOT NULL')
+            else:
+                # ">=": Zeilen mit genau der alten Marke könnten nach dem letzten Abgleich geschrieben sein
+                upserts = self._fetch(cur, name, 'WHERE "UPDATETIME" >= %s', (m["hwm"],))
+        self._apply(name, upserts)
+        deletes = []
+        if len(self.rows[name]) != anzahl:
+            # Gelöschte Zeilen bzw. neue Zeilen ohne UPDATETIME: nur IDs abgleichen
+            cur.execute(f"SELECT id FROM {table}")
+            remote = {int(r[0]) for r in cur.fetchall()}
+            deletes = list(set(self.rows[name]) - remote)
+            missing = list(remote - set(self.rows[name]))
+            added = self._fetch(cur, name, "WHERE id = ANY(%s)", (missing,)) if missing else []
+            self._apply(name, added, deletes)
+            upserts += added
+        self.meta[name] = {"hwm": hwm, "anzahl": anzahl, "voll_am": m.get("voll_am")}
+        if upserts or deletes or hwm != m.get("hwm") or anzahl != m.get("anzahl"):
+            self._write(name, upserts, deletes)
+        return len(upserts) + len(deletes)
+
+    def refresh(self, cur, names=None, full=False):
+        """Gleicht die Tabellen ``names`` (Standard: alle) ab -> {name: Änderungen}."""
+        t0 = time.perf_counter()
+        changed = {n: self.refresh_table(cur, n, full) for n in (names or SOURCES)}
+        logger.info("Topologie-Schnappschuss abgeglichen (%s) in %.0f ms",
+                    ", ".join(f"{n}: {c}" for n, c in changed.items()), (time.perf_counter() - t0) * 1000.0)
+        return changed
+
+    def refresh_ids(self, cur, name, ids):
+        """Liest einzelne Zeilen neu (z.B. nach gespeicherten Layer-Änderungen)."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        rows = self._fetch(cur, name, "WHERE id = ANY(%s)", (ids,))
+        deletes = set(ids) - {r[0] for r in rows}
+        self._apply(name, rows, deletes)
+        self._write(name, rows, deletes)
+
+    def remove_ids(self, name, ids):
+        ids = [int(i) for i in ids]
+        self._apply(name, (), ids)
+        self._write(name, (), ids)
+
+    # ---------- Abfragen ----------
+    def trassen_rows(self):
+        """(id, VONKNOTEN, NACHKNOTEN, LAENGE) wie ``TRASSEN_SQL``."""
+        return list(self.rows["trasse"].values())
+
+
+# ---------- Sitzungs-Cache ----------
+_snapshots = {}
+_lock = threading.Lock()
+
+
+def _snapshot_file(umgebung, cache_dir):
+    name = "".join(c if c.isalnum() or c in "_-" else "_" for c in str(umgebung or "unbekannt"))
+    return os.path.join(cache_dir, f"topologie_{name}.sqlite")
+
+
+def get_topology_snapshot(umgebung, cache_dir=None):
+    """Schnappschuss der Umgebung; beim ersten Zugriff aus der Datei gelesen."""
+    with _lock:
+        snap = _snapshots.get(umgebung)
+        if snap is None:
+            snap = TopologySnapshot(_snapshot_file(umgebung, cache_dir or default_cache_dir()))
+            snap.load()
+            _snapshots[umgebung] = snap
+        return snap
+
+
+def invalidate_topology_snapshot(umgebung=None):
+    """Erzwingt beim nächsten Abgleich ein vollständiges Neuladen."""
+    with _lock:
+        for key, snap in _snapshots.items():
+            if umgebung is None or key == umgebung:
+                snap.meta = {}
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+In-Memory-Graph des Trassennetzes (lwl."LWL_Trasse") mit lokalem
+k-kürzeste-Wege-Routing (Yen), als Ersatz für ``pgr_ksp`` pro Klick.
+
+Der Graph wird einmal pro Sitzung und Umgebung geladen
+(``get_trassen_graph``) und bei Layer-Änderungen inkrementell nachgeführt.
+Ergebnisse entsprechen ``pgr_ksp(..., directed := false)``: ungerichtete
+Kanten, Kosten = "LAENGE", Routen nach Gesamtkosten aufsteigend.
+
+Die Routensuche läuft als Hintergrund-Aufgabe, die Nachführung aus
+``watch_trassen_layer`` im GUI-Thread. Änderungen werden daher per
+Copy-on-write übernommen (``aendern``): ``edges``/``adj`` werden nach der
+Veröffentlichung nie mehr verändert, sondern durch neue Dicts ersetzt. Jede
+Routensuche rechnet auf einem festen Stand (``snapshot``), ohne Sperre.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .topology_snapshot import get_topology_snapshot
+
+logger = logging.getLogger(__name__)
+
+TRASSEN_SQL = 'SELECT id, "VONKNOTEN", "NACHKNOTEN", "LAENGE" FROM lwl."LWL_Trasse"'
+
+
+class TrassenGraph:
+    """Ungerichteter Multigraph: Knoten-ID -> {Trassen-ID: (Nachbar, Kosten)}."""
+
+    def __init__(self):
+        self.edges = {}      # trasse_id -> (von, nach, kosten)
+        self.adj = {}        # knoten_id -> {trasse_id: (nachbar, kosten)}
+        self.loaded_at = None
+        self.lock = threading.Lock()     # nur für Schreiber und snapshot()
+
+    # ---------- Aufbau / Pflege ----------
+    def aendern(self, neu=(), weg=()):
+        """
+        Übernimmt geänderte Trassen (``neu``: (id, VONKNOTEN, NACHKNOTEN, LAENGE),
+        ersetzt vorhandene mit gleicher ID) und entfernt ``weg`` (IDs) per
+        Copy-on-write; nur die betroffenen Nachbarlisten werden kopiert.
+        """
+        neu = list(neu)
+        with self.lock:
+            edges, adj = dict(self.edges), dict(self.adj)
+            kopiert = set()
+
+            def nachbarn(k):
+                if k not in kopiert or k not in adj:
+                    kopiert.add(k)
+                    adj[k] = dict(adj.get(k, ()))
+                return adj[k]
+
+            for tid in itertools.chain(weg, (row[0] for row in neu)):
+                _entfernen(edges, adj, nachbarn, int(tid))
+            for row in neu:
+                _einfuegen(edges, nachbarn, *row)
+            self.edges, self.adj = edges, adj
+
+    def add_edge(self, trasse_id, von, nach, kosten):
+        """Fügt eine Trasse ein (ersetzt eine vorhandene mit gleicher ID)."""
+        self.aendern(neu=[(trasse_id, von, nach, kosten)])
+
+    def remove_edge(self, trasse_id):
+        self.aendern(weg=[trasse_id])
+
+    def load_rows(self, rows):
+        """Baut den Graphen aus (id, VONKNOTEN, NACHKNOTEN, LAENGE)-Zeilen neu auf."""
+        edges, adj = {}, {}
+
+        def nachbarn(k):
+            return adj.setdefault(k, {})
+
+        for row in rows:
+            _entfernen(edges, adj, nachbarn, int(row[0]))
+            _einfuegen(edges, nachbarn, *row)
+        with self.lock:
+            self.edges, self.adj = edges, adj
+            self.loaded_at = time.monotonic()
+
+    def load(self, cur):
+        cur.execute(TRASSEN_SQL)
+        self.load_rows(cur.fetchall())
+
+    def refresh_edges(self, cur, trasse_ids):
+        """Liest einzelne Trassen neu aus der DB (nach Attribut-/Geometrieänderungen)."""
+        ids = [int(i) for i in trasse_ids]
+        if not ids:
+            return
+        cur.execute(TRASSEN_SQL + " WHERE id = ANY(%s)", (ids,))
+        rows = cur.fetchall()
+        found = {int(row[0]) for row in rows}
+        self.aendern(neu=rows, weg=set(ids) - found)
+
+    def snapshot(self):
+        """Fester Stand für eine Routensuche (teilt die unveränderlichen Dicts, O(1))."""
+        stand = TrassenGraph()
+        with self.lock:
+            stand.edges, stand.adj, stand.loaded_at = self.edges, self.adj, self.loaded_at
+        return stand
+
+    def edge_cost(self, trasse_id):
+        e = self.edges.get(trasse_id)
+        return e[2] if e else None
+
+    def path_cost(self, trasse_ids):
+        return sum(self.edges[t][2] for t in trasse_ids)
+
+    def non_positive_edges(self):
+        """Trassen mit Kosten <= 0 (für Abfragen mit "LAENGE" > 0)."""
+        return {t for t, (_, _, c) in self.edges.items() if c <= 0}
+
+    def has_node(self, knoten_id):
+        return knoten_id in self.adj
+
+    # ---------- Routing ----------
+    def _neighbors(self, knoten):
+        """(Kanten-Schlüssel, Nachbar, Kosten) für Dijkstra/Yen im Trassengraphen."""
+        for tid, (v, c) in self.adj.get(knoten, {}).items():
+            yield tid, v, c
+
+    def _dijkstra(self, source, target, neighbors, excluded_edges=(), excluded_nodes=()):
+        if source == target:
+            return (0.0, [source], [])
+        if source in excluded_nodes:
+            return None
+        dist = {source: 0.0}
+        prev = {}                    # knoten -> (vorgaenger, kante)
+        tie = itertools.count()
+        heap = [(0.0, next(tie), source)]
+        done = set()
+        while heap:
+            d, _, u = heapq.heappop(heap)
+            if u in done:
+                continue
+            if u == target:
+                break
+            done.add(u)
+            for key, v, c in neighbors(u):
+                if key in excluded_edges or v in excluded_nodes or v in done:
+                    continue
+                nd = d + c
+                if nd < dist.get(v, float("inf")):
+                    dist[v] = nd
+                    prev[v] = (u, key)
+                    heapq.heappush(heap, (nd, next(tie), v))
+        if target not in dist:
+            return None
+        nodes, edges = [target], []
+        k = target
+        while k != source:
+            k, key = prev[k]
+            nodes.append(k)
+            edges.append(key)
+        nodes.reverse()
+        edges.reverse()
+        return (dist[target], nodes, edges)
+
+    def _yen(self, source, target, neighbors, excluded_edges=(), abbruch=None):
+        """
+        Generator: schleifenfreie Wege (kosten, [knoten...], [kanten...]) in
+        aufsteigender Kostenreihenfolge (Yen). Der Aufrufer bricht nach k ab;
+        liefert ``abbruch()`` True, endet die Suche vorzeitig.
+        """
+        excluded_edges = set(excluded_edges)
+        first = self._dijkstra(source, target, neighbors, excluded_edges)
+        if first is None:
+            return
+        found = [first]
+        seen = {tuple(first[2])}
+        candidates = []
+        tie = itertools.count()
+        yield first
+
+        while True:
+            _, prev_nodes, prev_edges = found[-1]
+            for i in range(len(prev_nodes) - 1):
+                if abbruch is not None and abbruch():
+                    return
+                spur_node = prev_nodes[i]
+                root_nodes = prev_nodes[:i + 1]
+                root_edges = prev_edges[:i]
+
+                blocked_edges = set(excluded_edges)
+                for _, p_nodes, p_edges in found:
+                    if len(p_edges) > i and p_edges[:i] == root_edges:
+                        blocked_edges.add(p_edges[i])
+                blocked_nodes = set(root_nodes[:-1])
+
+                spur = self._dijkstra(spur_node, target, neighbors, blocked_edges, blocked_nodes)
+                if spur is None:
+                    continue
+                edges = root_edges + spur[2]
+                key = tuple(edges)
+                if key in seen:
+                    continue
+                seen.add(key)
+                nodes = root_nodes[:-1] + spur[1]
+                cost = sum(self._edge_costs(edges))
+                heapq.heappush(candidates, (cost, len(edges), next(tie), nodes, edges))
+            if not candidates:
+                return
+            cost, _, _, nodes, edges = heapq.heappop(candidates)
+            found.append((cost, nodes, edges))
+            yield found[-1]
+
+    def _edge_costs(self, keys):
+        # Kanten-Schlüssel sind Trassen-IDs oder (Trassen-ID, Etappe) beim Via-Routing
+        for key in keys:
+            tid = key[0] if isinstance(key, tuple) else key
+            yield self.edges[tid][2]
+
+    def shortest_path(self, source, target, excluded_edges=(), excluded_nodes=()):
+        """
+        Dijkstra. Rückgabe: (kosten, [knoten...], [trassen...]) oder None.
+        """
+        g = self.snapshot()
+        if source not in g.adj or target not in g.adj:
+            return None
+        return g._dijkstra(source, target, g._neighbors, excluded_edges, excluded_nodes)
+
+    def k_shortest_paths(self, source, target, k=3, excluded_edges=(), abbruch=None):
+        """
+        Yen's k-kürzeste schleifenfreie Wege (wie pgr_ksp, ungerichtet).
+        Rückgabe: Liste [(kosten, [trassen...])] aufsteigend nach Kosten.
+        ``abbruch``: optionale Funktion, die True liefert, wenn abgebrochen
+        werden soll (z.B. ``QgsTask.isCanceled``).
+        """
+        g = self.snapshot()
+        if source not in g.adj or target not in g.adj:
+            return []
+        routes = []
+        for cost, _, edges in g._yen(source, target, g._neighbors, excluded_edges, abbruch):
+            routes.append((cost, edges))
+            if len(routes) >= k:
+                break
+        return routes
+
+    def k_shortest_paths_via(self, source, via, target, k=3, excluded_edges=(), max_paths=200, abbruch=None):
+        """
+        k günstigste schleifenfreie Routen von ``source`` über die Zwischenknoten
+        ``via`` (in dieser Reihenfolge) nach ``target``, nach Gesamtlänge sortiert.
+
+        Gerechnet wird in einem Durchlauf auf dem Etappen-Graphen
+        (Knoten, Anzahl erreichter Zwischenknoten); Yen liefert dessen Wege nach
+        Kosten, verworfen werden solche, die eine Trasse oder einen Knoten
+        mehrfach nutzen. ``max_paths`` begrenzt die Suche in entarteten Netzen.
+        Rückgabe: Liste [(kosten, [trassen...])] wie ``k_shortest_paths``.
+        """
+        via = [v for v in via if v is not None]
+        g = self.snapshot()
+        if not via:
+            return g.k_shortest_paths(source, target, k, excluded_edges, abbruch)
+        if any(n not in g.adj for n in [source, target] + via):
+            return []
+        etappen = len(via)
+        excluded_edges = set(excluded_edges)
+
+        def neighbors(state):
+            u, s = state
+            for tid, (v, c) in g.adj.get(u, {}).items():
+                if tid in excluded_edges:
+                    continue
+                s2 = s + 1 if s < etappen and v == via[s] else s
+                yield (tid, s), (v, s2), c
+
+        routes = []
+        for n, (cost, states, keys) in enumerate(g._yen((source, 0), (target, etappen), neighbors, abbruch=abbruch)):
+            if n >= max_paths:
+                logger.info("Via-Routing: Suche nach %d Wegen abgebrochen (%d Routen)", max_paths, len(routes))
+                break
+            knoten = [u for u, _ in states]
+            trassen = [tid for tid, _ in keys]
+            if len(set(knoten)) != len(knoten) or len(set(trassen)) != len(trassen):
+                continue
+            routes.append((cost, trassen))
+            if len(routes) >= k:
+                break
+        return routes
+
+
+def _entfernen(edges, adj, nachbarn, trasse_id):
+    e = edges.pop(trasse_id, None)
+    if e is None:
+        return
+    von, nach, _ = e
+    for k in (von, nach):
+        if k in adj:
+            nb = nachbarn(k)
+            nb.pop(trasse_id, None)
+            if not nb:
+                del adj[k]
+
+
+def _einfuegen(edges, nachbarn, trasse_id, von, nach, kosten):
+    # pgr_ksp ignoriert Kanten ohne/mit negativen Kosten
+    if von is None or nach is None or kosten is None or kosten < 0:
+        return
+    trasse_id, von, nach, kosten = int(trasse_id), int(von), int(nach), float(kosten)
+    edges[trasse_id] = (von, nach, kosten)
+    nachbarn(von)[trasse_id] = (nach, kosten)
+    nachbarn(nach)[trasse_id] = (von, kosten)
+
+
+# ---------- Sitzungs-Cache ----------
+_graphs = {}
+_lock = threading.Lock()
+
+
+def _pool_key(pool):
+    p = pool.db_params
+    return (p.get("host"), str(p.get("port")), p.get("dbname"))
+
+
+def get_trassen_graph(pool, max_age=600.0):
+    """
+    Liefert den gecachten Trassengraphen für die Umgebung des Pools.
+    Neu geladen wird nur beim ersten Zugriff, nach ``invalidate_trassen_graph``
+    oder wenn der Stand älter als ``max_age`` Sekunden ist (Änderungen anderer
+    Benutzer). Die Trassen kommen aus dem Topologie-Schnappschuss der
+    Umgebung, der dabei nur inkrementell mit der DB abgeglichen wird.
+    """
+    key = _pool_key(pool)
+    with _lock:
+        graph = _graphs.get(key)
+        stale = graph is None or graph.loaded_at is None or \
+            (max_age is not None and time.monotonic() - graph.loaded_at > max_age)
+        if stale:
+            t0 = time.perf_counter()
+            graph = graph or TrassenGraph()
+            try:
+                snapshot = get_topology_snapshot(pool.umgebung)
+                with pool.connection() as conn, conn.cursor() as cur:
+                    snapshot.refresh(cur, ["trasse"])
+                graph.load_rows(snapshot.trassen_rows())
+            except Exception as e:
+                logger.warning("Topologie-Schnappschuss nicht nutzbar, lade Trassen direkt: %s", e)
+                with pool.connection() as conn, conn.cursor() as cur:
+                    graph.load(cur)
+            _graphs[key] = graph
+            logger.info("Trassengraph geladen: %d Trassen, %d Knoten in %.0f ms",
+                        len(graph.edges), len(graph.adj), (time.perf_counter() - t0) * 1000.0)
+        return graph
+
+
+def invalidate_trassen_graph(pool=None):
+    """Verwirft den Cache (eine Umgebung oder alle)."""
+    with _lock:
+        if pool is None:
+            _graphs.clear()
+        else:
+            _graphs.pop(_pool_key(pool), None)
+
+
+def watch_trassen_layer(layer, pool):
+    """
+    Hält den Graphen bei Bearbeitungen des Layers LWL_Trasse aktuell:
+    gespeicherte Änderungen werden gezielt nachgeladen statt alles neu zu laden.
+    Für PostGIS-Layer entspricht die Feature-ID dem Primärschlüssel "id".
+    """
+    if getattr(layer, "_trassen_graph_watched", False):
+        return
+    key = _pool_key(pool)
+
+    def _apply(fn):
+        with _lock:
+            graph = _graphs.get(key)
+        if graph is None:
+            return
+        try:
+            fn(graph)
+        except Exception as e:
+            logger.warning("Trassengraph-Aktualisierung fehlgeschlagen, lade neu: %s", e)
+            invalidate_trassen_graph(pool)
+
+    def _refresh(fids):
+        def fn(graph):
+            with pool.connection() as conn, conn.cursor() as cur:
+                graph.refresh_edges(cur, fids)
+                get_topology_snapshot(pool.umgebung).refresh_ids(cur, "trasse", fids)
+        _apply(fn)
+
+    def _removed(_layer_id, fids):
+        def fn(graph):
+            graph.aendern(weg=[int(fid) for fid in fids])
+            get_topology_snapshot(pool.umgebung).remove_ids("trasse", fids)
+        _apply(fn)
+
+    # "LAENGE" wird u.U. per Trigger berechnet -> neue Trassen aus der DB lesen
+    layer.committedFeaturesAdded.connect(lambda _lid, features: _refresh([f.id() for f in features]))
+    layer.committedFeaturesRemoved.connect(_removed)
+    layer.committedAttributeValuesChanges.connect(lambda _lid, changes: _refresh(list(changes.keys())))
+    layer.committedGeometriesChanges.connect(lambda _lid, changes: _refresh(list(changes.keys())))
+    layer._trassen_graph_watched = True
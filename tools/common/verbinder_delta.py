@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Mengenbasiertes Schreiben der Verbinder-Änderungen an einem Knoten.
+
+Das Delta (Rohr↔Rohr: löschen, Status ändern, neu) kommt mit einem
+Roundtrip per ``unnest`` in eine Temp-Tabelle; je Operation folgt ein
+DELETE/UPDATE/INSERT über die ganze Menge. Danach wird die LR↔LR-Relation
+je betroffenem Leerrohr-Paar aus den Rohr-Verbindungen abgeleitet.
+Ohne QGIS nutzbar (Leerrohr-Verbinder und Benchmarks).
+"""
+
+
+def schreibe_verbinder_delta(cur, kn, user, to_insert, to_delete, to_update, current_status, lr_pairs):
+    """
+    Schreibt das Delta in der laufenden Transaktion von ``cur`` (kein Commit).
+    ``to_*``: Mengen von Rohr-Paaren (a, b); ``current_status[(a, b)]``: Status
+    für neue/geänderte Paare; ``lr_pairs``: alle betroffenen Leerrohr-Paare
+    (vorher und nachher). ``kn``: ID_KNOTEN, ``user``: CREATEUSER/UPDATEUSER.
+    """
+    # --- Delta als Menge in eine Temp-Tabelle (ein Roundtrip) ---
+    delta = ([("D", a, b, None) for a, b in sorted(to_delete)]
+             + [("U", a, b, current_status[(a, b)]) for a, b in sorted(to_update)]
+             + [("I", a, b, current_status[(a, b)]) for a, b in sorted(to_insert)])
+    # ON COMMIT DROP; ein zweiter Aufruf in derselben Transaktion legt sie neu an
+    cur.execute("DROP TABLE IF EXISTS _verbinder_delta, _verbinder_lr")
+    cur.execute("""
+        CREATE TEMP TABLE _verbinder_delta (op text, a bigint, b bigint, status int)
+        ON COMMIT DROP
+    """)
+    if delta:
+        cur.execute("""
+            INSERT INTO _verbinder_delta (op, a, b, status)
+            SELECT * FROM unnest(%s::text[], %s::bigint[], %s::bigint[], %s::int[])
+        """, ([d[0] for d in delta], [d[1] for d in delta],
+              [d[2] for d in delta], [d[3] for d in delta]))
+
+    # --- DELETE (Rohr↔Rohr) ---
+    cur.execute("""
+        DELETE FROM lwl."LWL_Rohr_Rohr_rel" rel
+        USING _verbinder_delta d
+        WHERE d.op = 'D'
+        AND ( (rel."ID_ROHR_1"=d.a AND rel."ID_ROHR_2"=d.b)
+           OR (rel."ID_ROHR_1"=d.b AND rel."ID_ROHR_2"=d.a) )
+    """)
+
+    # --- UPDATE (Rohr↔Rohr) ---
+    cur.execute("""
+        UPDATE lwl."LWL_Rohr_Rohr_rel" rel
+        SET "STATUS"=d.status, "UPDATEUSER"=%s, "UPDATETIME"=now()
+        FROM _verbinder_delta d
+        WHERE d.op = 'U'
+        AND ( (rel."ID_ROHR_1"=d.a AND rel."ID_ROHR_2"=d.b)
+           OR (rel."ID_ROHR_1"=d.b AND rel."ID_ROHR_2"=d.a) )
+    """, (user,))
+
+    # --- INSERT (Rohr↔Rohr) ---
+    cur.execute("""
+        INSERT INTO lwl."LWL_Rohr_Rohr_rel"
+        ("ID_ROHR_1","ID_ROHR_2","STATUS","CREATEUSER","CREATETIME","ID_KNOTEN")
+        SELECT d.a, d.b, d.status, %s, now(), %s
+        FROM _verbinder_delta d
+        WHERE d.op = 'I'
+        AND NOT EXISTS (
+            SELECT 1 FROM lwl."LWL_Rohr_Rohr_rel" rel
+            WHERE (rel."ID_ROHR_1"=d.a AND rel."ID_ROHR_2"=d.b)
+               OR (rel."ID_ROHR_1"=d.b AND rel."ID_ROHR_2"=d.a)
+        )
+    """, (user, kn))
+
+    # --- LR↔LR-Relation: Aggregat-Status je LR-Paar ---
+    # einheitlicher Status -> dieser, sonst min(Status) == MIN("STATUS");
+    # n = 0 -> keine Rohr-Paare mehr -> LR-Relation löschen
+    lr_a = [min(x, y) for x, y in lr_pairs]
+    lr_b = [max(x, y) for x, y in lr_pairs]
+    lr_ids = sorted(set(lr_a) | set(lr_b))
+    cur.execute("""
+        CREATE TEMP TABLE _verbinder_lr ON COMMIT DROP AS
+        WITH p AS (
+            SELECT DISTINCT t.a, t.b
+            FROM unnest(%s::bigint[], %s::bigint[]) AS t(a, b)
+        ),
+        s AS (
+            SELECT LEAST(ra."ID_LEERROHR", rb."ID_LEERROHR") AS a,
+                   GREATEST(ra."ID_LEERROHR", rb."ID_LEERROHR") AS b,
+                   rel."STATUS"
+            FROM lwl."LWL_Rohr_Rohr_rel" rel
+            JOIN lwl."LWL_Rohr" ra ON ra.id = rel."ID_ROHR_1"
+            JOIN lwl."LWL_Rohr" rb ON rb.id = rel."ID_ROHR_2"
+            WHERE ra."ID_LEERROHR" = ANY(%s) AND rb."ID_LEERROHR" = ANY(%s)
+        )
+        SELECT p.a, p.b, MIN(s."STATUS") AS status, COUNT(s."STATUS") AS n
+        FROM p
+        LEFT JOIN s ON s.a = p.a AND s.b = p.b
+        GROUP BY p.a, p.b
+    """, (lr_a, lr_b, lr_ids, lr_ids))
+
+    cur.execute("""
+        DELETE FROM lwl."LWL_Leerrohr_Leerrohr_rel" rel
+        USING _verbinder_lr l
+        WHERE l.n = 0
+        AND ( (rel."ID_LEERROHR_1"=l.a AND rel."ID_LEERROHR_2"=l.b)
+           OR (rel."ID_LEERROHR_1"=l.b AND rel."ID_LEERROHR_2"=l.a) )
+    """)
+    cur.execute("""
+        UPDATE lwl."LWL_Leerrohr_Leerrohr_rel" rel
+        SET "STATUS"=u.status, "UPDATEUSER"=%s, "UPDATETIME"=now(), "ID_KNOTEN"=%s
+        FROM (
+            SELECT DISTINCT ON (l.a, l.b) x.id, l.status
+            FROM _verbinder_lr l
+            JOIN lwl."LWL_Leerrohr_Leerrohr_rel" x
+              ON (x."ID_LEERROHR_1"=l.a AND x."ID_LEERROHR_2"=l.b)
+              OR (x."ID_LEERROHR_1"=l.b AND x."ID_LEERROHR_2"=l.a)
+            WHERE l.n > 0
+            ORDER BY l.a, l.b, x.id
+        ) u
+        WHERE rel.id = u.id
+    """, (user, kn))
+    cur.execute("""
+        INSERT INTO lwl."LWL_Leerrohr_Leerrohr_rel"
+        ("ID_LEERROHR_1","ID_LEERROHR_2","STATUS","VERBUND_TYP","CREATEUSER","CREATETIME","ID_KNOTEN")
+        SELECT l.a, l.b, l.status, 'standard', %s, now(), %s
+        FROM _verbinder_lr l
+        WHERE l.n > 0
+        AND NOT EXISTS (
+            SELECT 1 FROM lwl."LWL_Leerrohr_Leerrohr_rel" x
+            WHERE (x."ID_LEERROHR_1"=l.a AND x."ID_LEERROHR_2"=l.b)
+               OR (x."ID_LEERROHR_1"=l.b AND x."ID_LEERROHR_2"=l.a)
+        )
+    """, (user, kn))
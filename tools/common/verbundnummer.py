@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Vergabe von Verbundnummern für Multirohre (lwl."LWL_Leerrohr", "TYP" = 3).
+
+Die belegten Nummern werden je VKG_LR-Knoten einmal geladen und im Speicher
+gehalten (Dropdown, Datenprüfung). Beim Import reserviert ``reserve`` die
+Nummern innerhalb der Import-Transaktion unter einem Advisory-Lock je Knoten
+und liest die Belegung dabei verbindlich neu – so kann kein paralleler Import
+dieselbe Nummer vergeben. Nach dem Commit wird der Knoten verworfen
+(``invalidate``).
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Namensraum für pg_advisory_xact_lock(int, int)
+LOCK_NAMESPACE = "lwl.LWL_Leerrohr.VERBUNDNUMMER"
+
+# Wie bisher im Dropdown: bis 10 Nummern über der höchsten belegten anbieten
+RESERVE_NUMMERN = 10
+
+
+class VerbundnummerAllocator:
+    """Belegte Verbundnummern je Startknoten (VKG_LR) einer Datenbank."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._belegt = {}            # knoten (oder None = alle) -> {leerrohr_id: nummer}
+        self._lock = threading.Lock()
+
+    # ---------- Laden ----------
+    @staticmethod
+    def _query(cur, knoten):
+        if knoten is None:
+            cur.execute("""
+                SELECT "id", "VERBUNDNUMMER"
+                FROM lwl."LWL_Leerrohr"
+                WHERE "TYP" = 3
+                AND "VERBUNDNUMMER" IS NOT NULL
+            """)
+        else:
+            cur.execute("""
+                SELECT "id", "VERBUNDNUMMER"
+                FROM lwl."LWL_Leerrohr"
+                WHERE "TYP" = 3
+                AND %s::bigint = ANY("VKG_LR")
+                AND "VERBUNDNUMMER" IS NOT NULL
+            """, (knoten,))
+        return {row[0]: int(row[1]) for row in cur.fetchall() if row[1] is not None}
+
+    def _belegung(self, knoten):
+        with self._lock:
+            belegt = self._belegt.get(knoten)
+        if belegt is None:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                belegt = self._query(cur, knoten)
+            with self._lock:
+                self._belegt[knoten] = belegt
+            logger.debug("Verbundnummern für Knoten %s geladen: %d belegt", knoten, len(belegt))
+        return belegt
+
+    # ---------- Abfragen (aus dem Cache) ----------
+    def used(self, knoten, exclude_id=None):
+        """Menge der belegten Nummern am Knoten (ohne das Leerrohr ``exclude_id``)."""
+        return {n for lid, n in self._belegung(knoten).items() if lid != exclude_id}
+
+    def free(self, knoten, exclude_id=None):
+        """Freie Nummern von 1 bis höchste belegte + RESERVE_NUMMERN."""
+        used = self.used(knoten, exclude_id)
+        return [n for n in range(1, max(used, default=0) + RESERVE_NUMMERN + 1) if n not in used]
+
+    # ---------- Reservierung (in der Import-Transaktion) ----------
+    def reserve(self, cur, knoten, count, first=None):
+        """
+        Reserviert ``count`` verschiedene Nummern am Knoten, beginnend mit
+        ``first`` (bzw. der ersten freien), danach jeweils die nächste freie.
+        Der Lock gilt bis Commit/Rollback der Transaktion von ``cur``.
+        """
+        if knoten is not None:
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(%s::text))",
+                        (LOCK_NAMESPACE, knoten))
+        belegt = self._query(cur, knoten)
+        with self._lock:
+            self._belegt[knoten] = belegt
+        used = set(belegt.values())
+        if first is None:
+            first = next(n for n in range(1, max(used, default=0) + 2) if n not in used)
+        elif first in used:
+            raise Exception(f"Verbundnummer {first} ist bereits vergeben.")
+        nummern = [first]
+        while len(nummern) < count:
+            n = nummern[-1] + 1
+            while n in used:
+                n += 1
+            nummern.append(n)
+        logger.debug("Verbundnummern am Knoten %s reserviert: %s", knoten, nummern)
+        return nummern
+
+    def invalidate(self, knoten=None):
+        """Verwirft die Belegung eines Knotens (oder aller) – nach Commit aufrufen."""
+        with self._lock:
+            if knoten is None:
+                self._belegt.clear()
+            else:
+                self._belegt.pop(knoten, None)
+                # Der "alle Knoten"-Eintrag ist damit ebenfalls veraltet
+                self._belegt.pop(None, None)
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_verbundnummer_allocator(pool):
+    """Allocator je Datenbank (Host/Port/DB des Pools), lebt für die Sitzung."""
+    p = pool.db_params
+    key = (p.get("host"), str(p.get("port")), p.get("dbname"))
+    with _allocators_lock:
+        allocator = _allocators.get(key)
+        if allocator is None:
+            allocator = VerbundnummerAllocator(pool)
+            _allocators[key] = allocator
+        else:
+            allocator.pool = pool
+        return allocator
@@ -9,10 +9,19 @@ from PyQt5.QtWidgets import QDialog, QGraphicsScene, QGraphicsSimpleTextItem, QG
 from qgis.core import QgsProject, Qgis, QgsFeatureRequest, QgsCoordinateTransform, QgsDataSourceUri, QgsWkbTypes, QgsGeometry, QgsPointXY, QgsVectorLayer, QgsFeature, QgsCoordinateReferenceSystem, QgsMessageLog
 from qgis.gui import QgsHighlight, QgsMapToolEmitPoint, QgsRubberBand, QgsMapTool
 from PyQt5.QtGui import QColor, QBrush, QFont, QPolygonF, QMouseEvent, QPen
-import psycopg2
 import base64
-import json
 from .hauseinfuehrung_verlegen_dialog import Ui_HauseinfuehrungsVerlegungsToolDialogBase
+from ..common.db_pool import get_db_pool, measure_db
+from ..common.node_locator import get_node_locator, pixel_tolerance
+from ..common.feature_locator import get_feature_locator
+from ..common.linear_ref import LinearRef
+from ..common.lookup_catalog import get_lookup_catalog
+from ..common.rohr_graph import get_rohr_graph, invalidate_rohr_graph, load_he_positions, loaded_rohr_graph
+from ..common.instrumentation import get_tool_logger, timed
+from ..common.task_runner import TaskRunner
+
+logger = get_tool_logger("hauseinfuehrung_verlegen")
+
 
 class GuidedStartLineTool(QgsMapTool):
     """
@@ -74,58 +83,27 @@ class GuidedStartLineTool(QgsMapTool):
         pl = g.asPolyline() or []
         return [[QgsPointXY(p) for p in pl]] if pl else []
 
-    def _line_length(self, pts):
-        d = 0.0
-        for i in range(1, len(pts)):
-            dx = pts[i].x()-pts[i-1].x(); dy = pts[i].y()-pts[i-1].y()
-            d += (dx*dx + dy*dy) ** 0.5
-        return d
+    def _lref(self, geom_line):
+        """LinearRef (erster Teil) je Geometrie – nur bei neuer Geometrie neu aufbauen."""
+        cached = getattr(self, "_lref_cache", None)
+        if cached is None or cached[0] is not geom_line:
+            cached = (geom_line, LinearRef(geom_line, part=0))
+            self._lref_cache = cached
+        return cached[1]
 
     def _project_fraction(self, geom_line, pt):
         """s ∈ [0..1] entlang geom_line (für clamping)."""
-        parts = self._polyline_parts(geom_line)
-        if not parts: return 0.0
-        p = self._closest_on(geom_line, pt)
-        seg = parts[0]
-        total = self._line_length(seg) or 1e-12
-        run = 0.0; best = 0.0; bestd = 1e18
-        for i in range(1, len(seg)):
-            a, b = seg[i-1], seg[i]
-            ax, ay, bx, by = a.x(), a.y(), b.x(), b.y()
-            vx, vy = bx-ax, by-ay
-            wx, wy = p.x()-ax, p.y()-ay
-            denom = (vx*vx + vy*vy) or 1e-12
-            t = max(0.0, min(1.0, (vx*wx + vy*wy)/denom))
-            cx, cy = ax + t*vx, ay + t*vy
-            d2 = (p.x()-cx)**2 + (p.y()-cy)**2
-            if d2 < bestd:
-                bestd = d2
-                best = (run + ( (vx*vx + vy*vy) ** 0.5 ) * t) / total
-            run += ((vx*vx + vy*vy) ** 0.5)
-        return max(0.0, min(1.0, best))
+        return self._lref(geom_line).fraction(pt)
 
     def _clamp_on_interval(self, geom_line, mappt):
         """Nur für mode='lr': projiziere auf Linie und clamp s in [a,b]."""
         if self.mode != "lr" or not self.free_interval or not geom_line or geom_line.isEmpty():
             return self._closest_on(geom_line, mappt)
-        a, b = self.free_interval
-        a = max(0.0, min(1.0, float(a))); b = max(0.0, min(1.0, float(b)))
-        if a >= b:
+        lref = self._lref(geom_line)
+        s = LinearRef.clamp(lref.fraction(mappt), self.free_interval)
+        if s is None:
             return None
-        s = self._project_fraction(geom_line, mappt)
-        s = max(a, min(b, s))
-        parts = self._polyline_parts(geom_line); seg = parts[0]
-        total = self._line_length(seg) or 1e-12
-        target = s * total
-        acc = 0.0
-        for i in range(1, len(seg)):
-            a0, a1 = seg[i-1], seg[i]
-            seglen = ((a1.x()-a0.x())**2 + (a1.y()-a0.y())**2) ** 0.5
-            if acc + seglen >= target:
-                t = (target - acc) / (seglen or 1e-12)
-                return QgsPointXY(a0.x() + t*(a1.x()-a0.x()), a0.y() + t*(a1.y()-a0.y()))
-            acc += seglen
-        return QgsPointXY(seg[-1])
+        return lref.point_at_fraction(s)
 
     # ---------- HA-Korridor (vom LR-Ende!) ----------
     def _pick_lr_end_index_for_ha(self, he_geom: QgsGeometry, lr_geom_hint: QgsGeometry):
@@ -320,7 +298,7 @@ class ClickSelector(QgsMapTool):
         self.setCursor(Qt.CrossCursor)
 
     def canvasReleaseEvent(self, event):
-        from qgis.core import QgsPointXY, QgsGeometry, QgsTolerance
+        from qgis.core import QgsTolerance
 
         point = self.canvas.getCoordinateTransform().toMapCoordinates(event.pos().x(), event.pos().y())
         closest_feature = None
@@ -329,17 +307,19 @@ class ClickSelector(QgsMapTool):
 
         tolerance = QgsTolerance.vertexSearchRadius(self.canvas.mapSettings())
 
+        # Nur das Toleranz-Rechteck je Layer abfragen (räumlicher Index), Rangfolge nach echter Distanz
+        closest_fid = None
         for layer in self.layers:
             if not layer.isValid():
                 continue
-            for feat in layer.getFeatures():
-                geom = feat.geometry()
-                if geom and not geom.isEmpty():
-                    dist = geom.distance(QgsGeometry.fromPointXY(QgsPointXY(point)))
-                    if dist < closest_dist and dist <= tolerance:
-                        closest_dist = dist
-                        closest_feature = feat
-                        closest_layer = layer
+            locator = get_feature_locator(layer)
+            hit = locator.nearest(point, tolerance)
+            if hit is not None and hit[1] < closest_dist:
+                closest_fid, closest_dist = hit
+                closest_layer = layer
+
+        if closest_layer is not None:
+            closest_feature = get_feature_locator(closest_layer).feature(closest_fid)
 
         if closest_feature:
             self.callback(closest_feature, closest_layer)
@@ -441,8 +421,11 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
 
         self.settings = QSettings("SiegeleCo", "ToolBox")
         self.db_details = None
+        self.db_pool = None
         self.is_connected = False
         self._no_free_interval_warned = False
+        # Rohrstatus wird als QgsTask im Hintergrund geladen
+        self.tasks = TaskRunner("Hauseinführung verlegen")
 
         self.scene = QGraphicsScene()
         self.ui.graphicsView_Farben_Rohre.setScene(self.scene)
@@ -472,14 +455,9 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
         self.ui.comboBox_Status.clear()
         self.status_dict = {}
         try:
-            conn = psycopg2.connect(**self.db_details)
-            cur = conn.cursor()
-            cur.execute("SELECT id, \"STATUS\" FROM lwl.\"LUT_Status\" ORDER BY id")
-            for row in cur.fetchall():
-                status_id, status_text = row
+            for status_id, status_text in get_lookup_catalog(self.db_pool).status_options():
                 self.ui.comboBox_Status.addItem(status_text)
                 self.status_dict[status_text] = status_id
-            conn.close()
         except Exception as e:
             self.iface.messageBar().pushMessage("Fehler", f"Status laden fehlgeschlagen: {e}", level=Qgis.Critical)
 
@@ -495,7 +473,7 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
 
     def load_setup_data(self):
         """Lädt Datenbankverbindung aus dem aktiven Setup."""
-        print("DEBUG: Lade Setup-Daten für Hauseinführung")
+        logger.debug("Lade Setup-Daten für Hauseinführung")
         username = self.settings.value("connection_username", "")
         password = base64.b64decode(self.settings.value("connection_password", "").encode()).decode() if self.settings.value("connection_password", "") else ""
         umgebung = self.settings.value("connection_umgebung", "")
@@ -507,9 +485,10 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
 
         # Datenbankverbindungsparameter setzen
         self.db_details = self.get_database_connection(username, password, umgebung)
+        self.db_pool = get_db_pool(self.iface, self.db_details, umgebung)
         try:
-            conn = psycopg2.connect(**self.db_details)
-            conn.close()
+            with self.db_pool.connection():
+                pass
             self.is_connected = True
             self.ui.pushButton_Import.setEnabled(True)
             QgsMessageLog.logMessage(f"Verbindung zu {umgebung} hergestellt.", "Hauseinfuehrung", Qgis.Info)
@@ -595,10 +574,10 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             self.gewaehlter_verteiler = self.get_attribute(feature, "VKG_LR")
             if self.gewaehlter_verteiler:
                 knoten_layer = QgsProject.instance().mapLayersByName("LWL_Knoten")[0]
-                vk_feat = next((f for f in knoten_layer.getFeatures() if f["id"] == self.gewaehlter_verteiler), None)
-                if vk_feat:
-                    self.ui.label_verteiler.setPlainText(f"Ausgewählt: {vk_feat['TYP']} (ID: {self.gewaehlter_verteiler})")
-                    self.highlight_geometry(vk_feat.geometry(), knoten_layer, QColor(Qt.red))
+                vk_hit = get_node_locator(knoten_layer).node(self.gewaehlter_verteiler)
+                if vk_hit:
+                    self.ui.label_verteiler.setPlainText(f"Ausgewählt: {vk_hit.typ} (ID: {self.gewaehlter_verteiler})")
+                    self.highlight_geometry(vk_hit.geometry, knoten_layer, QColor(Qt.red))
             
             self.startpunkt_id = self.get_attribute(feature, "ID_LEERROHR")
             self.abzweigung_id = self.get_attribute(feature, "ID_ABZWEIGUNG")
@@ -838,31 +817,24 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
         def on_vertex_selected(point):
             QgsMessageLog.logMessage("DEBUG: on_vertex_selected aufgerufen", "Hauseinfuehrung", Qgis.Info)
             try:
-                pixel_radius = 5
-                map_units_per_pixel = self.iface.mapCanvas().mapUnitsPerPixel()
-                search_radius = pixel_radius * map_units_per_pixel
-                point_geom = QgsGeometry.fromPointXY(point)
-                search_rect = point_geom.buffer(search_radius, 1).boundingBox()
-
-                request = QgsFeatureRequest().setFilterRect(search_rect)
-                features = [feature for feature in layer.getFeatures(request)]
+                search_radius = pixel_tolerance(self.iface.mapCanvas(), 5)
+                # Nächster Verteiler/Schacht/Ortszentrale über den räumlichen Index
+                hit = get_node_locator(layer).nearest(point, search_radius, ["Verteilerkasten", "Ortszentrale", "Schacht"])
 
-                for feature in features:
-                    if feature["TYP"] in ["Verteilerkasten", "Ortszentrale", "Schacht"]:
-                        verteiler_id = feature["id"]
+                if hit:
+                    verteiler_id = hit.id
 
-                        self.gewaehlter_verteiler = verteiler_id
-                        self.ui.label_verteiler.setPlainText(f"Ausgewählt: {feature['TYP']} (ID: {verteiler_id})")
-                        QgsMessageLog.logMessage(f"DEBUG: Verteiler ID={verteiler_id} ausgewählt", "Hauseinfuehrung", Qgis.Info)
+                    self.gewaehlter_verteiler = verteiler_id
+                    self.ui.label_verteiler.setPlainText(f"Ausgewählt: {hit.typ} (ID: {verteiler_id})")
+                    QgsMessageLog.logMessage(f"DEBUG: Verteiler ID={verteiler_id} ausgewählt", "Hauseinfuehrung", Qgis.Info)
 
-                        self.formular_initialisieren_fuer_verteilerwechsel()
+                    self.formular_initialisieren_fuer_verteilerwechsel()
 
-                        geom = feature.geometry()
-                        self.highlight_geometry(geom, layer)
+                    self.highlight_geometry(hit.geometry, layer)
 
-                        self.ui.pushButton_Import.setEnabled(False)  # Deaktiviere Import
-                        self.ui.pushButton_select_leerrohr.setEnabled(False)  # Deaktiviere Auswahl Hauseinführung
-                        return
+                    self.ui.pushButton_Import.setEnabled(False)  # Deaktiviere Import
+                    self.ui.pushButton_select_leerrohr.setEnabled(False)  # Deaktiviere Auswahl Hauseinführung
+                    return
 
                 self.iface.messageBar().pushMessage("Fehler", "Kein gültiges Objekt (Verteilerkasten, Ortszentrale oder Schacht) an dieser Stelle gefunden.", level=Qgis.Info)
 
@@ -949,194 +921,18 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
         self.click_selector = ClickSelector(self.iface.mapCanvas(), layers, on_feature_selected, self.iface)
         self.iface.mapCanvas().setMapTool(self.click_selector)
 
+    @timed("Hauseinführung: Rohrstatus laden", logger)
     def hole_rohrstatus_aus_db(self, start_lr_id: int, vkg_id: int):
         """
         Liefert pro Rohrnummer am Start-LR:
         rnr, enable_to_vkg, occ_same_vkg, occ_mn_any, occ_mx_any, seite, free_len_on_side_any, final_belegt
-        -> genau die Logik aus der geprüften pgAdmin-SQL.
-        """
-        import psycopg2
-        sql = """
-        WITH RECURSIVE
-        params(start_lr, vkg) AS (VALUES (%s::bigint, %s::bigint)),
-
-        reach_lr(lr_id) AS (
-        SELECT start_lr FROM params
-        UNION
-        SELECT CASE WHEN rel."ID_LEERROHR_1"=r.lr_id THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END
-        FROM reach_lr r
-        JOIN lwl."LWL_Leerrohr_Leerrohr_rel" rel
-            ON rel."ID_LEERROHR_1"=r.lr_id OR rel."ID_LEERROHR_2"=r.lr_id
-        ),
-        ziel_lr AS (
-        SELECT lr.id
-        FROM lwl."LWL_Leerrohr" lr
-        WHERE lr.id = ANY(ARRAY(SELECT lr_id FROM reach_lr))
-            AND (SELECT vkg FROM params) = ANY(lr."VKG_LR")
-        ),
-
-        ends AS (
-        SELECT
-            l."VONKNOTEN" AS vonk,
-            l."NACHKNOTEN" AS nachk,
-            (SELECT vkg FROM params) AS vkg,
-            (SELECT start_lr FROM params) AS start_lr,
-            ((SELECT vkg FROM params) = ANY(l."VKG_LR")) AS start_has_vkg
-        FROM lwl."LWL_Leerrohr" l
-        WHERE l.id = (SELECT start_lr FROM params)
-        ),
-        bfs_side AS (
-        WITH RECURSIVE neighbors AS (
-            SELECT CASE WHEN rel."ID_LEERROHR_1"=(SELECT start_lr FROM ends)
-                        THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END AS nb_lr,
-                rel."ID_KNOTEN" AS via_knoten
-            FROM lwl."LWL_Leerrohr_Leerrohr_rel" rel
-            WHERE rel."ID_LEERROHR_1"=(SELECT start_lr FROM ends)
-            OR rel."ID_LEERROHR_2"=(SELECT start_lr FROM ends)
-        ),
-        walk(lr_id, via_knoten, prev_lr_id, depth) AS (
-            SELECT n.nb_lr, n.via_knoten, (SELECT start_lr FROM ends), 1 FROM neighbors n
-            UNION ALL
-            SELECT CASE WHEN rel."ID_LEERROHR_1"=w.lr_id THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END,
-                w.via_knoten, w.lr_id, w.depth+1
-            FROM walk w
-            JOIN lwl."LWL_Leerrohr_Leerrohr_rel" rel
-            ON rel."ID_LEERROHR_1"=w.lr_id OR rel."ID_LEERROHR_2"=w.lr_id
-            WHERE rel."ID_LEERROHR_1"<>w.prev_lr_id AND rel."ID_LEERROHR_2"<>w.prev_lr_id
-        )
-        SELECT w.via_knoten
-        FROM walk w
-        JOIN lwl."LWL_Leerrohr" lr ON lr.id = w.lr_id
-        WHERE (SELECT vkg FROM ends) = ANY(lr."VKG_LR")
-        ORDER BY depth
-        LIMIT 1
-        ),
-        side AS (
-        SELECT
-            CASE
-            WHEN (SELECT start_has_vkg FROM ends) AND (SELECT vkg FROM ends) = (SELECT vonk  FROM ends) THEN 0
-            WHEN (SELECT start_has_vkg FROM ends) AND (SELECT vkg FROM ends) = (SELECT nachk FROM ends) THEN 1
-            ELSE CASE
-                    WHEN (SELECT via_knoten FROM bfs_side) = (SELECT vonk  FROM ends) THEN 0
-                    WHEN (SELECT via_knoten FROM bfs_side) = (SELECT nachk FROM ends) THEN 1
-                    ELSE NULL
-                END
-            END AS seite
-        ),
-
-        segments_all AS (
-        SELECT "ROHRNUMMER" AS rnr,
-                COALESCE(MIN("FROM_POS"),1.0)::float AS mn_all,
-                COALESCE(MAX("TO_POS"),  0.0)::float AS mx_all
-        FROM lwl."LWL_Rohr"
-        WHERE "ID_LEERROHR" = (SELECT start_lr FROM params)
-        GROUP BY "ROHRNUMMER"
-        ),
-        enable_rnr AS (
-        WITH RECURSIVE start_rohre(rid, rnr) AS (
-            SELECT r.id, r."ROHRNUMMER"
-            FROM lwl."LWL_Rohr" r
-            WHERE r."ID_LEERROHR" = (SELECT start_lr FROM params)
-        ),
-        walk(rid, rnr) AS (
-            SELECT rid, rnr FROM start_rohre
-            UNION
-            SELECT CASE WHEN rel."ID_ROHR_1"=w.rid THEN rel."ID_ROHR_2" ELSE rel."ID_ROHR_1" END, w.rnr
-            FROM walk w
-            JOIN lwl."LWL_Rohr_Rohr_rel" rel
-            ON rel."ID_ROHR_1"=w.rid OR rel."ID_ROHR_2"=w.rid
-        )
-        SELECT DISTINCT w.rnr
-        FROM walk w
-        JOIN lwl."LWL_Rohr" r2 ON r2.id = w.rid
-        WHERE r2."ID_LEERROHR" = ANY(ARRAY(SELECT id FROM ziel_lr))
-        ),
-        targets_same AS (
-        SELECT DISTINCT r2.id AS rid, r2."ROHRNUMMER" AS rnr
-        FROM lwl."LWL_Rohr" r2
-        JOIN lwl."LWL_Hauseinfuehrung" ha
-            ON ha."ID_LEERROHR"=r2."ID_LEERROHR" AND ha."ROHRNUMMER"=r2."ROHRNUMMER"
-        WHERE ha."VKG_LR" = (SELECT vkg FROM params)
-            AND r2."ID_LEERROHR" = ANY(ARRAY(SELECT lr_id FROM reach_lr))
-        ),
-        walk_back_same(rid, rnr) AS (
-        SELECT rid, rnr FROM targets_same
-        UNION
-        SELECT CASE WHEN rel."ID_ROHR_1"=w.rid THEN rel."ID_ROHR_2" ELSE rel."ID_ROHR_1" END, w.rnr
-        FROM walk_back_same w
-        JOIN lwl."LWL_Rohr_Rohr_rel" rel
-            ON rel."ID_ROHR_1"=w.rid OR rel."ID_ROHR_2"=w.rid
-        ),
-        occ_same_set AS ( SELECT DISTINCT rnr FROM walk_back_same ),
-
-        he_pos_on_start AS (
-        SELECT
-            ha."ROHRNUMMER" AS rnr,
-            ST_LineLocatePoint(
-            ST_LineMerge(ST_CollectionExtract(ST_Force2D(l.geom), 2)),
-            ST_Force2D(kn.geom)
-            )::float AS pos
-        FROM lwl."LWL_Hauseinfuehrung" ha
-        JOIN lwl."LWL_Leerrohr" l ON l.id = ha."ID_LEERROHR"
-        JOIN lwl."LWL_Knoten"  kn ON kn.id = ha."ID_KNOTEN"
-        WHERE ha."ID_LEERROHR" = (SELECT start_lr FROM params)
-        ),
-        occ_on_start_any AS (
-        SELECT rnr,
-                MIN(pos)::float AS occ_mn_any,
-                MAX(pos)::float AS occ_mx_any
-        FROM he_pos_on_start
-        GROUP BY rnr
-        )
-
-        SELECT
-        sa.rnr,
-        (sa.rnr = ANY(ARRAY(SELECT rnr FROM enable_rnr)))    AS enable_to_vkg,
-        (sa.rnr = ANY(ARRAY(SELECT rnr FROM occ_same_set)))  AS occ_same_vkg,
-        COALESCE(os.occ_mn_any, 1.0) AS occ_mn_any,
-        COALESCE(os.occ_mx_any, 0.0) AS occ_mx_any,
-        (SELECT seite FROM side)      AS seite,
-        CASE (SELECT seite FROM side)
-            WHEN 0 THEN GREATEST(COALESCE(os.occ_mn_any,1.0) - 0.0, 0.0)
-            WHEN 1 THEN GREATEST(1.0 - COALESCE(os.occ_mx_any,0.0), 0.0)
-            ELSE GREATEST(sa.mn_all - 0.0, 1.0 - sa.mx_all)
-        END AS free_len_on_side_any,
-        (
-            (sa.rnr = ANY(ARRAY(SELECT rnr FROM occ_same_set)))
-            OR
-            (
-            CASE (SELECT seite FROM side)
-                WHEN 0 THEN (COALESCE(os.occ_mn_any,1.0) - 0.0) <= 1e-9
-                WHEN 1 THEN (1.0 - COALESCE(os.occ_mx_any,0.0)) <= 1e-9
-                ELSE (GREATEST(sa.mn_all - 0.0, 1.0 - sa.mx_all) <= 1e-9)
-            END
-            )
-        ) AS final_belegt
-        FROM segments_all sa
-        LEFT JOIN occ_on_start_any os ON os.rnr = sa.rnr
-        ORDER BY sa.rnr;
+        -> genau die Logik aus der geprüften pgAdmin-SQL (rohr_graph.ROHRSTATUS_SQL),
+           Verbindungen aus dem Sitzungs-Rohrgraphen, nur HE-Positionen aus der DB.
         """
-        rows = []
-        import psycopg2.extras
-        with psycopg2.connect(**self.db_details) as conn, conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-            cur.execute(sql, (start_lr_id, vkg_id))
-            rows = cur.fetchall()
-
-        status = {}
-        seite_val = None
-        for r in rows:
-            rnr = int(r["rnr"])
-            status[rnr] = {
-                "enable": bool(r["enable_to_vkg"]),
-                "occ_same_vkg": bool(r["occ_same_vkg"]),
-                "occ_mn_any": float(r["occ_mn_any"]),
-                "occ_mx_any": float(r["occ_mx_any"]),
-                "free_len_on_side_any": float(r["free_len_on_side_any"]),
-                "final_belegt": bool(r["final_belegt"]),
-            }
-            seite_val = int(r["seite"]) if r["seite"] is not None else None
-
-        return status, seite_val
+        graph = get_rohr_graph(self.db_pool)
+        with self.db_pool.connection() as conn, conn.cursor() as cur:
+            he_pos = load_he_positions(cur, start_lr_id)
+        return graph.rohrstatus(int(start_lr_id), int(vkg_id), he_pos)
 
     def zeichne_rohre(self, subtyp_id, farbschema, firma, is_abzweigung=False):
         """Zeichnet die Palette gemäß DB-Ergebnis (identisch zu pgAdmin-SQL)."""
@@ -1165,8 +961,7 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
         start_lr_id = None
         try:
             if is_abzweigung:
-                import psycopg2
-                with psycopg2.connect(**self.db_details) as conn, conn.cursor() as cur:
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
                     cur.execute('SELECT "PARENT_LEERROHR_ID" FROM lwl."LWL_Leerrohr_Abzweigung" WHERE id=%s', (self.abzweigung_id,))
                     r = cur.fetchone()
                     start_lr_id = int(r[0]) if r and r[0] is not None else None
@@ -1180,9 +975,22 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             return
         vkg_id = int(self.gewaehlter_verteiler)
 
-        # **Hier**: Status aus DB holen (identisch zu pgAdmin)
+        # **Hier**: Status aus DB holen (identisch zu pgAdmin) – im Hintergrund; eine neue
+        # Auswahl bricht die noch laufende Abfrage ab, gezeichnet wird nur das letzte Ergebnis
+        self.tasks.starte(
+            "Rohrstatus laden", self._lade_rohrstatus, start_lr_id, vkg_id,
+            schluessel="rohrstatus",
+            on_ergebnis=lambda ergebnis: self._rohrstatus_geladen(ergebnis, rohre, subtyp_char, typ, start_lr_id, vkg_id),
+            on_fehler=lambda e: self._msg("error", f"zeichne_rohre fehlgeschlagen: {e}"))
+
+    def _lade_rohrstatus(self, task, start_lr_id, vkg_id):
+        """Im Hintergrund: Rohrstatus am Start-LR (Rohrgraph + HE-Positionen)."""
+        return self.hole_rohrstatus_aus_db(start_lr_id, vkg_id)
+
+    def _rohrstatus_geladen(self, ergebnis, rohre, subtyp_char, typ, start_lr_id, vkg_id):
+        """Im GUI-Thread: Rohrstatus übernehmen und die Palette zeichnen."""
         try:
-            status, seite = self.hole_rohrstatus_aus_db(start_lr_id, vkg_id)
+            status, seite = ergebnis
             # Merken für Snappoint-Berechnung
             self._rohrstatus_cache = {"seite": seite, "map": status, "start_lr": start_lr_id, "vkg": vkg_id}
 
@@ -1475,41 +1283,9 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
 
         # Fallback: kleiner DB-Call nur für diese Rohrnummer (identische Logik der Außenkante)
         try:
-            import psycopg2
-            with psycopg2.connect(**self.db_details) as conn, conn.cursor() as cur:
-                # Seite bestimmen
-                cur.execute('SELECT "VONKNOTEN","NACHKNOTEN","VKG_LR" FROM lwl."LWL_Leerrohr" WHERE id=%s', (start_lr_id,))
-                vonk, nachk, vkg_arr = cur.fetchone()
-                if vkg_id in (vkg_arr or []):
-                    seite = 0 if vkg_id == vonk else 1 if vkg_id == nachk else None
-                else:
-                    cur.execute("""
-                    WITH RECURSIVE neighbors AS (
-                    SELECT CASE WHEN rel."ID_LEERROHR_1"=%s THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END AS nb_lr,
-                            rel."ID_KNOTEN" AS via_knoten
-                    FROM lwl."LWL_Leerrohr_Leerrohr_rel" rel
-                    WHERE rel."ID_LEERROHR_1"=%s OR rel."ID_LEERROHR_2"=%s
-                    ),
-                    walk(lr_id, via_knoten, prev_lr_id, depth) AS (
-                    SELECT n.nb_lr, n.via_knoten, %s::bigint, 1 FROM neighbors n
-                    UNION ALL
-                    SELECT CASE WHEN rel."ID_LEERROHR_1"=w.lr_id THEN rel."ID_LEERROHR_2" ELSE rel."ID_LEERROHR_1" END,
-                            w.via_knoten, w.lr_id, w.depth+1
-                    FROM walk w
-                    JOIN lwl."LWL_Leerrohr_Leerrohr_rel" rel
-                        ON rel."ID_LEERROHR_1"=w.lr_id OR rel."ID_LEERROHR_2"=w.lr_id
-                    WHERE rel."ID_LEERROHR_1"<>w.prev_lr_id AND rel."ID_LEERROHR_2"<>w.prev_lr_id
-                    )
-                    SELECT w.via_knoten
-                    FROM walk w
-                    JOIN lwl."LWL_Leerrohr" lr ON lr.id = w.lr_id
-                    WHERE %s = ANY(lr."VKG_LR")
-                    ORDER BY depth LIMIT 1
-                    """, (start_lr_id, start_lr_id, start_lr_id, start_lr_id, vkg_id))
-                    r = cur.fetchone()
-                    via = r[0] if r else None
-                    seite = 0 if via == vonk else 1 if via == nachk else None
-
+            # Seite aus dem Rohrgraphen
+            seite = get_rohr_graph(self.db_pool).seite(int(start_lr_id), int(vkg_id))
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
                 # Außenkanten aus HEs am Start-LR (nur diese Rohrnummer)
                 cur.execute("""
                     WITH he_pos AS (
@@ -1562,10 +1338,9 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             vkg_id = int(self.gewaehlter_verteiler)
             # Start-LR (bei Abzweig: Parent)
             if getattr(self, "abzweigung_id", None):
-                conn = psycopg2.connect(**self.db_details); cur = conn.cursor()
-                cur.execute('SELECT "PARENT_LEERROHR_ID" FROM lwl."LWL_Leerrohr_Abzweigung" WHERE "id"=%s', (self.abzweigung_id,))
-                row = cur.fetchone(); start_lr_id = row[0] if row else None
-                conn.close()
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
+                    cur.execute('SELECT "PARENT_LEERROHR_ID" FROM lwl."LWL_Leerrohr_Abzweigung" WHERE "id"=%s', (self.abzweigung_id,))
+                    row = cur.fetchone(); start_lr_id = row[0] if row else None
             else:
                 start_lr_id = self.startpunkt_id
 
@@ -1607,55 +1382,12 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             self.map_tool = None
 
     def lade_farben_und_rohrnummern(self, subtyp_id):
-        """Lädt Farben und Rohrnummern aus LUT_Leerrohr_SubTyp und LUT_Rohr_Beschreibung."""
-        print(f"DEBUG: Parsing ROHR_DEFINITION für Subtyp-ID: {subtyp_id}")
+        """Lädt Farben und Rohrnummern aus LUT_Leerrohr_SubTyp und LUT_Rohr_Beschreibung (Katalog-Cache)."""
+        logger.debug("Parsing ROHR_DEFINITION für Subtyp-ID: %s", subtyp_id)
         try:
-            conn = psycopg2.connect(**self.db_details)
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT ls."ROHR_DEFINITION"::text, ls."ID_CODIERUNG", ls."SUBTYP_char", ls."ID_TYP"
-                FROM lwl."LUT_Leerrohr_SubTyp" ls
-                WHERE ls."id" = %s
-            """, (subtyp_id,))
-            result = cur.fetchone()
-            if not result:
-                raise ValueError(f"Subtyp-ID {subtyp_id} nicht gefunden.")
-            rohr_definition, id_codierung, subtyp_char, typ = result
-            if not rohr_definition:
-                raise ValueError(f"ROHR_DEFINITION leer für {subtyp_id}.")
-            rohr_array = json.loads(rohr_definition)
-            cur.execute("""
-                SELECT "ROHRNUMMER", "FARBE", "FARBCODE"
-                FROM lwl."LUT_Rohr_Beschreibung"
-                WHERE "ID_SUBTYP" = %s
-                ORDER BY "ROHRNUMMER"
-            """, (subtyp_id,))
-            farben = cur.fetchall()
-            rohre = []
-            rohr_nummer = 1
-            for group in rohr_array:
-                anzahl = int(group.get("anzahl", 1))
-                durchmesser = int(group.get("durchmesser", 0))
-                for _ in range(anzahl):
-                    if rohr_nummer <= len(farben):
-                        _, farbe, farbcode = farben[rohr_nummer - 1]
-                        if '/' in farbcode:
-                            primary_farbcode, secondary_farbcode = farbcode.split('/')
-                            secondary_farbcode = None if not secondary_farbcode.strip() or secondary_farbcode.strip('#') == '000000' else secondary_farbcode
-                        else:
-                            primary_farbcode = farbcode
-                            secondary_farbcode = None
-                        rohre.append((rohr_nummer, rohr_nummer, durchmesser, farbe, primary_farbcode, secondary_farbcode))
-                    else:
-                        farbe = "grau"
-                        primary_farbcode = "#808080"
-                        secondary_farbcode = None
-                        rohre.append((rohr_nummer, rohr_nummer, durchmesser, farbe, primary_farbcode, secondary_farbcode))
-                    rohr_nummer += 1
-            conn.close()
-            return rohre, subtyp_char, typ
+            return get_lookup_catalog(self.db_pool).rohr_liste(subtyp_id)
         except Exception as e:
-            print(f"DEBUG: Fehler: {e}")
+            logger.warning("Fehler: %s", e)
             return [], None, None
 
     def aktion_verlauf(self):
@@ -1867,72 +1599,70 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
         # Nur wenn Parent & VKG da sind: Logikprüfungen (Belegung/Erreichbarkeit)
         if not self.ui.checkBox_direkt.isChecked() and not fehler:
             try:
-                conn = psycopg2.connect(**self.db_details)
-                cur = conn.cursor()
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
+
+                    is_abzweigung = hasattr(self, "abzweigung_id") and self.abzweigung_id is not None
+                    parent_id = self.abzweigung_id if is_abzweigung else self.startpunkt_id
+                    vkg_id = self.gewaehlter_verteiler
 
-                is_abzweigung = hasattr(self, "abzweigung_id") and self.abzweigung_id is not None
-                parent_id = self.abzweigung_id if is_abzweigung else self.startpunkt_id
-                vkg_id = self.gewaehlter_verteiler
+                    # 1) Belegung am gleichen VKG verbieten
+                    if is_abzweigung:
+                        cur.execute("""
+                            SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
+                            WHERE "ID_ABZWEIGUNG" = %s AND "VKG_LR" = %s AND "ROHRNUMMER" = %s
+                            LIMIT 1
+                        """, (parent_id, vkg_id, self.gewaehlte_rohrnummer))
+                    else:
+                        cur.execute("""
+                            SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
+                            WHERE "ID_LEERROHR" = %s AND "VKG_LR" = %s AND "ROHRNUMMER" = %s
+                            LIMIT 1
+                        """, (parent_id, vkg_id, self.gewaehlte_rohrnummer))
+                    if cur.fetchone():
+                        fehler.append(f"Rohrnummer {self.gewaehlte_rohrnummer} ist am gewählten Verteiler bereits durch eine HA belegt.")
+
+                    # 2) Erreichbarkeit zum gewählten VKG schnell prüfen (Ende am VKG?)
+                    #    (ausreichend, bis das Verbinder-Tool die volle Graph-Prüfung liefert)
+                    if is_abzweigung:
+                        cur.execute('SELECT "VONKNOTEN","NACHKNOTEN" FROM lwl."LWL_Leerrohr_Abzweigung" WHERE id=%s', (parent_id,))
+                    else:
+                        cur.execute('SELECT "VONKNOTEN","NACHKNOTEN" FROM lwl."LWL_Leerrohr" WHERE id=%s', (parent_id,))
+                    row = cur.fetchone()
+                    if row:
+                        vonk, nachk = row
+                        if vkg_id not in (vonk, nachk):
+                            hinweise.append("Hinweis: Das gewählte Leerrohr endet nicht direkt am gewählten Verteiler. Prüfe Verbindungen im Verbinder-Tool.")
+                    else:
+                        fehler.append("Parent-Objekt konnte nicht gelesen werden.")
+
+                    # 3) Zweiter VKG-Fall (gleiche Rohrnummer von der anderen Seite zulassen)
+                    #    Gibt es am *anderen* VKG bereits eine HA mit derselben Rohrnummer? -> OK, nur Hinweis.
+                    #    (Trim der Geometrie implementieren wir im nächsten Schritt bei daten_importieren)
+                    if row:
+                        andere_vkg_kandidaten = []
+                        # Welche Enden sind Verteiler?
+                        cur.execute('SELECT id FROM lwl."LWL_Knoten" WHERE "id" IN (%s,%s) AND "TYP" = %s', (vonk, nachk, 'Verteilerkasten'))
+                        end_vkgs = [r[0] for r in cur.fetchall()]
+                        for k in end_vkgs:
+                            if k != vkg_id:
+                                andere_vkg_kandidaten.append(k)
+
+                        if andere_vkg_kandidaten:
+                            if is_abzweigung:
+                                cur.execute("""
+                                    SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
+                                    WHERE "ID_ABZWEIGUNG" = %s AND "VKG_LR" = ANY(%s) AND "ROHRNUMMER" = %s
+                                    LIMIT 1
+                                """, (parent_id, andere_vkg_kandidaten, self.gewaehlte_rohrnummer))
+                            else:
+                                cur.execute("""
+                                    SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
+                                    WHERE "ID_LEERROHR" = %s AND "VKG_LR" = ANY(%s) AND "ROHRNUMMER" = %s
+                                    LIMIT 1
+                                """, (parent_id, andere_vkg_kandidaten, self.gewaehlte_rohrnummer))
+                            if cur.fetchone():
+                                hinweise.append("Hinweis: Gleiche Rohrnummer ist am anderen Verteiler bereits belegt – diese HA darf bis zum bestehenden virtuellen Knoten geführt werden (Trim erfolgt beim Import).")
 
-                # 1) Belegung am gleichen VKG verbieten
-                if is_abzweigung:
-                    cur.execute("""
-                        SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
-                        WHERE "ID_ABZWEIGUNG" = %s AND "VKG_LR" = %s AND "ROHRNUMMER" = %s
-                        LIMIT 1
-                    """, (parent_id, vkg_id, self.gewaehlte_rohrnummer))
-                else:
-                    cur.execute("""
-                        SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
-                        WHERE "ID_LEERROHR" = %s AND "VKG_LR" = %s AND "ROHRNUMMER" = %s
-                        LIMIT 1
-                    """, (parent_id, vkg_id, self.gewaehlte_rohrnummer))
-                if cur.fetchone():
-                    fehler.append(f"Rohrnummer {self.gewaehlte_rohrnummer} ist am gewählten Verteiler bereits durch eine HA belegt.")
-
-                # 2) Erreichbarkeit zum gewählten VKG schnell prüfen (Ende am VKG?)
-                #    (ausreichend, bis das Verbinder-Tool die volle Graph-Prüfung liefert)
-                if is_abzweigung:
-                    cur.execute('SELECT "VONKNOTEN","NACHKNOTEN" FROM lwl."LWL_Leerrohr_Abzweigung" WHERE id=%s', (parent_id,))
-                else:
-                    cur.execute('SELECT "VONKNOTEN","NACHKNOTEN" FROM lwl."LWL_Leerrohr" WHERE id=%s', (parent_id,))
-                row = cur.fetchone()
-                if row:
-                    vonk, nachk = row
-                    if vkg_id not in (vonk, nachk):
-                        hinweise.append("Hinweis: Das gewählte Leerrohr endet nicht direkt am gewählten Verteiler. Prüfe Verbindungen im Verbinder-Tool.")
-                else:
-                    fehler.append("Parent-Objekt konnte nicht gelesen werden.")
-
-                # 3) Zweiter VKG-Fall (gleiche Rohrnummer von der anderen Seite zulassen)
-                #    Gibt es am *anderen* VKG bereits eine HA mit derselben Rohrnummer? -> OK, nur Hinweis.
-                #    (Trim der Geometrie implementieren wir im nächsten Schritt bei daten_importieren)
-                if row:
-                    andere_vkg_kandidaten = []
-                    # Welche Enden sind Verteiler?
-                    cur.execute('SELECT id FROM lwl."LWL_Knoten" WHERE "id" IN (%s,%s) AND "TYP" = %s', (vonk, nachk, 'Verteilerkasten'))
-                    end_vkgs = [r[0] for r in cur.fetchall()]
-                    for k in end_vkgs:
-                        if k != vkg_id:
-                            andere_vkg_kandidaten.append(k)
-
-                    if andere_vkg_kandidaten:
-                        if is_abzweigung:
-                            cur.execute("""
-                                SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
-                                WHERE "ID_ABZWEIGUNG" = %s AND "VKG_LR" = ANY(%s) AND "ROHRNUMMER" = %s
-                                LIMIT 1
-                            """, (parent_id, andere_vkg_kandidaten, self.gewaehlte_rohrnummer))
-                        else:
-                            cur.execute("""
-                                SELECT 1 FROM lwl."LWL_Hauseinfuehrung"
-                                WHERE "ID_LEERROHR" = %s AND "VKG_LR" = ANY(%s) AND "ROHRNUMMER" = %s
-                                LIMIT 1
-                            """, (parent_id, andere_vkg_kandidaten, self.gewaehlte_rohrnummer))
-                        if cur.fetchone():
-                            hinweise.append("Hinweis: Gleiche Rohrnummer ist am anderen Verteiler bereits belegt – diese HA darf bis zum bestehenden virtuellen Knoten geführt werden (Trim erfolgt beim Import).")
-
-                conn.close()
             except Exception as e:
                 fehler.append(f"Logikprüfung fehlgeschlagen: {e}")
 
@@ -1994,24 +1724,22 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             alle_rohrnummern = [r[1] for r in rohre_def]  # Annahme: (rohr_id, rohr_nummer, ...)
 
             # 2) Belegte Rohrnummern am gewählten VKG aus HA lesen
-            conn = psycopg2.connect(**self.db_details)
-            cur = conn.cursor()
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
 
-            if is_abzweigung:
-                cur.execute("""
-                    SELECT DISTINCT ha."ROHRNUMMER"
-                    FROM "lwl"."LWL_Hauseinfuehrung" ha
-                    WHERE ha."ID_ABZWEIGUNG" = %s AND ha."VKG_LR" = %s
-                """, (parent_id, vkg_id))
-            else:
-                cur.execute("""
-                    SELECT DISTINCT ha."ROHRNUMMER"
-                    FROM "lwl"."LWL_Hauseinfuehrung" ha
-                    WHERE ha."ID_LEERROHR" = %s AND ha."VKG_LR" = %s
-                """, (parent_id, vkg_id))
+                if is_abzweigung:
+                    cur.execute("""
+                        SELECT DISTINCT ha."ROHRNUMMER"
+                        FROM "lwl"."LWL_Hauseinfuehrung" ha
+                        WHERE ha."ID_ABZWEIGUNG" = %s AND ha."VKG_LR" = %s
+                    """, (parent_id, vkg_id))
+                else:
+                    cur.execute("""
+                        SELECT DISTINCT ha."ROHRNUMMER"
+                        FROM "lwl"."LWL_Hauseinfuehrung" ha
+                        WHERE ha."ID_LEERROHR" = %s AND ha."VKG_LR" = %s
+                    """, (parent_id, vkg_id))
 
-            belegte_rohre = {row[0] for row in cur.fetchall() if row[0] is not None}
-            conn.close()
+                belegte_rohre = {row[0] for row in cur.fetchall() if row[0] is not None}
 
             # 3) Verfügbare = alle minus belegte
             verfuegbare = [n for n in alle_rohrnummern if n not in belegte_rohre]
@@ -2023,6 +1751,7 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             )
             return False
 
+    @measure_db("Hauseinführung importieren")
     def daten_importieren(self):
         QgsMessageLog.logMessage("DEBUG: Starte daten_importieren", "Hauseinfuehrung", Qgis.Info)
         self.direktmodus = self.ui.checkBox_direkt.isChecked()
@@ -2034,8 +1763,9 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             )
             return
 
+        conn = None
         try:
-            conn = psycopg2.connect(**self.db_details)
+            conn = self.db_pool.getconn()
             cur = conn.cursor()
 
             kommentar = self.ui.label_Kommentar.text() if isinstance(self.ui.label_Kommentar, QLineEdit) else self.ui.label_Kommentar.toPlainText()
@@ -2146,6 +1876,15 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
             conn.commit()
             self.iface.messageBar().pushMessage("Erfolg", "Daten erfolgreich importiert.", level=Qgis.Success)
 
+            # Rohrgraph: Hauseinführungen dieses VKG nachführen (Palette im Mehrfachimport)
+            graph = loaded_rohr_graph(self.db_pool)
+            if graph is not None and vkg_lr is not None:
+                try:
+                    graph.refresh_hauseinfuehrungen(cur, vkg_lr)
+                    conn.rollback()
+                except Exception:
+                    invalidate_rohr_graph(self.db_pool)
+
             layer = QgsProject.instance().mapLayersByName("LWL_Hauseinfuehrung")[0]
             if layer:
                 layer.dataProvider().reloadData()
@@ -2210,10 +1949,12 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
                 self.formular_initialisieren()
 
         except Exception as e:
-            conn.rollback()
+            if conn:
+                conn.rollback()
             self.iface.messageBar().pushMessage("Fehler", f"Fehler beim Importieren: {e}", level=Qgis.Critical)
         finally:
-            conn.close()
+            if conn:
+                self.db_pool.putconn(conn)
 
     def formular_initialisieren(self):
         """Setzt das Formular auf den Ausgangszustand zurück und entfernt Highlights."""
@@ -2312,5 +2053,6 @@ class HauseinfuehrungsVerlegungsTool(QDialog):
                 pass
         self.ausgewaehltes_rechteck = None
 
+        self.tasks.schliessen()
         HauseinfuehrungsVerlegungsTool.instance = None
         super().closeEvent(event)
@@ -10,9 +10,16 @@ from qgis.core import QgsProject, Qgis, QgsDataSourceUri, QgsVectorLayer, QgsFea
 from qgis.gui import QgsHighlight, QgsMapToolEmitPoint
 from PyQt5.QtCore import QVariant
 import os.path
-import psycopg2
 
 from .kabel_verlegen_dialog import Ui_KabelVerlegungsToolDialogBase
+from ..common.db_pool import get_db_pool
+from ..common.instrumentation import get_tool_logger, timed
+from ..common.kabel_id import get_kabel_id_allocator
+from ..common.kabel_routing import KABEL_BEDARF, KABEL_LEERROHR_TYPEN, get_kabel_routing_graph, kapazitaet_aus_katalog
+from ..common.kabel_verlauf import lade_attribute, lade_leerrohre, pruefe_hauseinfuehrung, pruefe_streckenkabel
+from ..common.lookup_catalog import get_lookup_catalog
+
+logger = get_tool_logger("kabel_verlegen")
 
 class KabelVerlegungsTool(QDialog):
     def __init__(self, iface, parent=None):
@@ -50,6 +57,8 @@ class KabelVerlegungsTool(QDialog):
         # Variablen für den ersten Tab (Streckenkabel)
         self.startpunkt_id = None
         self.endpunkt_id = None
+        self.zwischenknoten_id = None  # optional, für "Verlauf berechnen"
+        self.zwischenknoten_highlight = None
         self.verlauf_ids = []  # Liste für mehrere Verlaufseingaben
         self.highlights = []  # Liste für gespeicherte Highlight-Objekte
 
@@ -57,6 +66,7 @@ class KabelVerlegungsTool(QDialog):
         self.startpunkt_id_2 = None
         self.virtueller_knoten_id = None
         self.hausanschluss_id = None
+        self.endpunkt_id_2 = None  # Hausanschluss (Feature-ID), gesetzt in aktion_endpunkt_2
         self.verlauf_ids_2 = []
         self.highlights_2 = []
         self.startpunkt_bezeichnung = None
@@ -140,6 +150,8 @@ class KabelVerlegungsTool(QDialog):
             # Setup der Buttons und Verbindungen (Tab 1)
             self.ui.pushButton_startpunkt.clicked.connect(self.aktion_startknoten)
             self.ui.pushButton_endpunkt.clicked.connect(self.aktion_endpunkt)
+            self.ui.pushButton_zwischenknoten.clicked.connect(self.aktion_zwischenknoten)
+            self.ui.pushButton_routing.clicked.connect(self.verlauf_berechnen)
             self.ui.pushButton_verlauf.clicked.connect(self.aktion_verlauf)
             self.ui.pushButton_Vorschau.clicked.connect(self.kabelverlauf_erstellen)
             self.ui.pushButton_Datenpruefung.clicked.connect(self.pruefe_verbindung)
@@ -189,7 +201,12 @@ class KabelVerlegungsTool(QDialog):
     
     def reset_form(self):
         """Setzt das gesamte Formular zurück und entfernt alle Highlights"""
-        
+        # Zuerst den Zustand zurücksetzen, damit kein alter Zwischenknoten in die nächste Routensuche gelangt
+        self.startpunkt_id = None
+        self.endpunkt_id = None
+        self.zwischenknoten_id = None
+        self.verlauf_ids = []
+
         # Entferne alle Highlights für Startknoten, Endknoten und Verlauf
         if self.startknoten_highlight:
             self.startknoten_highlight.hide()
@@ -198,14 +215,22 @@ class KabelVerlegungsTool(QDialog):
         if self.endknoten_highlight:
             self.endknoten_highlight.hide()
             self.endknoten_highlight = None
+
+        if self.zwischenknoten_highlight:
+            self.zwischenknoten_highlight.hide()
+            self.zwischenknoten_highlight = None
         
         for highlight in self.verlauf_highlights:
             highlight.hide()
         self.verlauf_highlights.clear()
         
         # Setze das gesamte Formular zurück
-        self.ui.label_startpunkt.clear()  # Startpunkt zurücksetzen
-        self.ui.label_endpunkt.clear()    # Endpunkt zurücksetzen
+        self.ui.label_gewaehlter_verteiler.setText("Verteiler wählen!")  # Startpunkt zurücksetzen
+        self.ui.label_gewaehlter_verteiler.setStyleSheet("background-color: lightcoral;")
+        self.ui.label_gewaehlter_verteiler_2.setText("Verteiler wählen!")  # Endpunkt zurücksetzen
+        self.ui.label_gewaehlter_verteiler_2.setStyleSheet("background-color: lightcoral;")
+        self.ui.label_gewaehlter_zwischenknoten.setText("Knoten wählen! (optional)")
+        self.ui.label_gewaehlter_zwischenknoten.setStyleSheet("background-color: grey;")
         self.ui.label_verlauf.clear()     # Verlauf zurücksetzen
         self.ui.tableView_Vorschau.setModel(None)  # Vorschau-Tabelle zurücksetzen
 
@@ -226,9 +251,6 @@ class KabelVerlegungsTool(QDialog):
         self.ui.label_Pruefung.setStyleSheet("")  # Entfernt alle Styles und setzt den Standardhintergrund
 
         self.ui.label_gewaehltes_kabel.clear()  # Label für gewähltes Kabel zurücksetzen
-        self.startpunkt_id = None
-        self.endpunkt_id = None
-        self.verlauf_ids = []
 
         # Import-Button deaktivieren
         self.ui.pushButton_Import.setEnabled(False)
@@ -277,6 +299,7 @@ class KabelVerlegungsTool(QDialog):
         self.startpunkt_id_2 = None
         self.virtueller_knoten_id = None
         self.hausanschluss_id = None
+        self.endpunkt_id_2 = None
         self.verlauf_ids_2 = []
 
         # Import-Button deaktivieren
@@ -294,59 +317,41 @@ class KabelVerlegungsTool(QDialog):
         
         raise Exception("Keine aktive PostgreSQL-Datenbankverbindung gefunden.")
 
+    def get_db_pool(self):
+        """Liefert den Plugin-Verbindungspool für die Verbindung des LWL_Kabel_Typ-Layers."""
+        uri = QgsDataSourceUri(self.get_database_connection())
+        db_params = {
+            "dbname": uri.database(),
+            "user": uri.username(),
+            "password": uri.password(),
+            "host": uri.host(),
+            "port": uri.port()
+        }
+        return get_db_pool(self.iface, db_params)
+
     def populate_kabel_typen(self):
         """Holt die Kabeltypen aus der Datenbank und füllt die ComboBox (Filter: Streckenkabel)."""
-        db_uri = self.get_database_connection()
-        uri = QgsDataSourceUri(db_uri)
-
         try:
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
-            cur = conn.cursor()
-            # Filter für Streckenkabel
-            cur.execute('SELECT "id", "BEZEICHNUNG" FROM "lwl"."LWL_Kabel_Typ" WHERE "TYP" = %s;', ("Streckenkabel",))
-            kabel_typen = cur.fetchall()
+            # Filter für Streckenkabel (Katalog-Cache statt Abfrage)
+            kabel_typen = get_lookup_catalog(self.get_db_pool()).kabel_typen("Streckenkabel")
 
             for typ in kabel_typen:
                 self.ui.comboBox_kabel_typ.addItem(f"{typ[1]}", typ[0])  # Text und ID hinzufügen
 
         except Exception as e:
             self.iface.messageBar().pushMessage("Fehler", str(e), level=Qgis.Critical)
-        finally:
-            if conn is not None:
-                conn.close()
 
     def populate_kabel_typen_2(self):
         """Holt die Kabeltypen aus der Datenbank und füllt die ComboBox (Filter: Hauseinführungskabel)."""
-        db_uri = self.get_database_connection()
-        uri = QgsDataSourceUri(db_uri)
-
         try:
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
-            cur = conn.cursor()
-            # Filter für Hauseinführungskabel
-            cur.execute('SELECT "id", "BEZEICHNUNG" FROM "lwl"."LWL_Kabel_Typ" WHERE "TYP" = %s;', ("Hauseinführungskabel",))
-            kabel_typen = cur.fetchall()
+            # Filter für Hauseinführungskabel (Katalog-Cache statt Abfrage)
+            kabel_typen = get_lookup_catalog(self.get_db_pool()).kabel_typen("Hauseinführungskabel")
 
             for typ in kabel_typen:
                 self.ui.comboBox_kabel_typ_2.addItem(f"{typ[1]}", typ[0])  # Text und ID hinzufügen
 
         except Exception as e:
             self.iface.messageBar().pushMessage("Fehler", str(e), level=Qgis.Critical)
-        finally:
-            if conn is not None:
-                conn.close()
 
     def update_selected_kabel_label(self):
         if self.ui.comboBox_kabel_typ.currentIndex() >= 0:
@@ -376,37 +381,8 @@ class KabelVerlegungsTool(QDialog):
             self.ui.label_gewaehltes_kabel_2.setText(f"{selected_kabel}")
 
     def get_next_kabel_id(self):
-        """Ermittelt die nächste verfügbare Kabel-ID."""
-        try:
-            # Hole die Datenbankverbindung
-            db_uri = self.get_database_connection()
-            uri = QgsDataSourceUri(db_uri)
-
-            # Verbinde zur PostgreSQL-Datenbank
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
-            cur = conn.cursor()
-
-            # Führe die Abfrage aus, um die maximale KABEL_ID zu erhalten
-            cur.execute('SELECT MAX("KABEL_ID") FROM "lwl"."LWL_Kabel_Verlegt";')
-            result = cur.fetchone()
-
-            # Wenn keine Kabel-ID existiert, starte mit 1, ansonsten erhöhe um 1
-            if result and result[0]:
-                return result[0] + 1
-            else:
-                return 1
-
-        except Exception as e:
-            self.iface.messageBar().pushMessage("Fehler", str(e), level=Qgis.Critical)
-        finally:
-            if conn is not None:
-                conn.close()
+        """Nächste freie Kabel-ID aus der KABEL_ID-Sequenz (blockweise vorgehalten, ohne MAX-Abfrage)."""
+        return get_kabel_id_allocator(self.get_db_pool()).next_id()
 
     def aktion_startknoten(self):
         """Aktion für den Startknoten - nur der aktuelle Startknoten wird gehighlighted"""
@@ -423,7 +399,8 @@ class KabelVerlegungsTool(QDialog):
             selected_features = layer.selectedFeatures()
             if selected_features:
                 startpunkt_id = selected_features[0].id()
-                self.ui.label_startpunkt.setText(f"Startknoten: {startpunkt_id}")
+                self.ui.label_gewaehlter_verteiler.setText(f"Startknoten: {startpunkt_id}")
+                self.ui.label_gewaehlter_verteiler.setStyleSheet("background-color: lightgreen;")
                 self.startpunkt_id = startpunkt_id
 
                 # Setzt Highlight für neuen Startknoten
@@ -455,7 +432,8 @@ class KabelVerlegungsTool(QDialog):
             selected_features = layer.selectedFeatures()
             if selected_features:
                 endpunkt_id = selected_features[0].id()
-                self.ui.label_endpunkt.setText(f"Endpunkt: {endpunkt_id}")
+                self.ui.label_gewaehlter_verteiler_2.setText(f"Endpunkt: {endpunkt_id}")
+                self.ui.label_gewaehlter_verteiler_2.setStyleSheet("background-color: lightgreen;")
                 self.endpunkt_id = endpunkt_id
 
                 # Setzt Highlight für neuen Endknoten
@@ -472,6 +450,92 @@ class KabelVerlegungsTool(QDialog):
             pass
         layer.selectionChanged.connect(onEndpunktSelected)
 
+    def aktion_zwischenknoten(self):
+        """Optionaler Zwischenknoten, über den "Verlauf berechnen" führen soll"""
+        self.iface.messageBar().pushMessage("Bitte wählen Sie den Zwischenknoten (optional)", level=Qgis.Info)
+        layer = QgsProject.instance().mapLayersByName("LWL_Knoten")[0]
+        self.iface.setActiveLayer(layer)
+        self.iface.actionSelect().trigger()
+
+        def onZwischenknotenSelected():
+            if self.zwischenknoten_highlight:
+                self.zwischenknoten_highlight.hide()
+                self.zwischenknoten_highlight = None
+
+            selected_features = layer.selectedFeatures()
+            if selected_features:
+                self.zwischenknoten_id = selected_features[0].id()
+                self.ui.label_gewaehlter_zwischenknoten.setText(f"Zwischenknoten: {self.zwischenknoten_id}")
+                self.ui.label_gewaehlter_zwischenknoten.setStyleSheet("background-color: lightgreen;")
+
+                geom = selected_features[0].geometry()
+                self.zwischenknoten_highlight = QgsHighlight(self.iface.mapCanvas(), geom, layer)
+                self.zwischenknoten_highlight.setColor(Qt.red)
+                self.zwischenknoten_highlight.setWidth(4)
+                self.zwischenknoten_highlight.show()
+
+        try:
+            layer.selectionChanged.disconnect()
+        except TypeError:
+            pass
+        layer.selectionChanged.connect(onZwischenknotenSelected)
+
+    @timed("Kabel: Verlauf berechnen", logger)
+    def verlauf_berechnen(self):
+        """
+        Berechnet den Verlauf (Leerrohrfolge) vom Start- zum Endknoten, optional
+        über den Zwischenknoten, durch Leerrohre mit einem freien Rohr. Der
+        Kabeltyp muss gewählt sein, bestimmt aber nicht den Bedarf: jedes Kabel
+        belegt genau ein Rohr (KABEL_BEDARF, siehe tools/common/kabel_routing.py).
+        """
+        if self.ui.comboBox_kabel_typ.currentIndex() == -1:
+            self.iface.messageBar().pushMessage("Fehler", "Kein Kabeltyp ausgewählt.", level=Qgis.Warning)
+            return
+        if not self.startpunkt_id or not self.endpunkt_id:
+            self.iface.messageBar().pushMessage("Fehler", "Bitte Start- und Endknoten wählen.", level=Qgis.Warning)
+            return
+
+        try:
+            pool = self.get_db_pool()
+            graph = get_kabel_routing_graph(pool)
+            kapazitaet = kapazitaet_aus_katalog(get_lookup_catalog(pool))
+        except Exception as e:
+            self.iface.messageBar().pushMessage("Fehler", f"Leerrohrnetz konnte nicht geladen werden: {e}", level=Qgis.Critical)
+            return
+
+        verlauf = graph.route(self.startpunkt_id, self.endpunkt_id, KABEL_LEERROHR_TYPEN["Streckenkabel"],
+                              via=[self.zwischenknoten_id], kapazitaet=kapazitaet, bedarf=KABEL_BEDARF)
+        logger.debug("Verlauf %s -> %s (über %s): %s", self.startpunkt_id, self.endpunkt_id,
+                     self.zwischenknoten_id, verlauf)
+
+        for highlight in self.verlauf_highlights:
+            highlight.hide()
+        self.verlauf_highlights.clear()
+        self.verlauf_ids = []
+        self.ui.label_verlauf.clear()
+        self.ui.pushButton_Import.setEnabled(False)
+
+        if not verlauf:
+            self.iface.messageBar().pushMessage(
+                "Fehler", "Kein Verlauf mit freier Kapazität zwischen Start- und Endknoten gefunden.",
+                level=Qgis.Warning)
+            return
+
+        self.verlauf_ids = verlauf
+        self.ui.label_verlauf.setText(f"Verlauf: {'; '.join(map(str, verlauf))}")
+        layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
+        id_liste = ", ".join(str(i) for i in verlauf)
+        request = QgsFeatureRequest().setFilterExpression(f'"id" IN ({id_liste})')
+        for feature in layer.getFeatures(request):
+            highlight = QgsHighlight(self.iface.mapCanvas(), feature.geometry(), layer)
+            highlight.setColor(Qt.red)
+            highlight.setWidth(3)
+            highlight.show()
+            self.verlauf_highlights.append(highlight)
+
+        self.iface.messageBar().pushMessage(
+            "Verlauf berechnet", f"{len(verlauf)} Leerrohre: {'; '.join(map(str, verlauf))}", level=Qgis.Success)
+
     def aktion_verlauf(self):
         """Aktion für den Verlauf"""
         # Setze das Verlauf-Label und die Verlaufs-IDs zurück
@@ -546,15 +610,12 @@ class KabelVerlegungsTool(QDialog):
             gefoerdert
         ])
         
-        # Verbindung der Leerrohre prüfen und darstellen
+        # Verbindung der Leerrohre darstellen (Attribute aller Leerrohre in einer Abfrage)
+        layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
+        leerrohre = lade_leerrohre(layer, self.verlauf_ids)
         for index, verlauf_id in enumerate(self.verlauf_ids, start=1):
-            layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
-            feature = next(layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"id" = {verlauf_id}')))
-            
-            von_knoten = feature["VONKNOTEN"]
-            nach_knoten = feature["NACHKNOTEN"]
-            
-            verbindung_text = f"VON: {von_knoten}, NACH: {nach_knoten}"
+            lr = leerrohre.get(verlauf_id, {})
+            verbindung_text = f"VON: {lr.get('VONKNOTEN')}, NACH: {lr.get('NACHKNOTEN')}"
             
             kabelverlauf_daten.append([
                 f'Leerrohr {index}', 
@@ -602,52 +663,29 @@ class KabelVerlegungsTool(QDialog):
             self.ui.label_Pruefung.setStyleSheet("background-color: lightcoral;")  # Hintergrund auf Rot setzen
             return
 
-        # Überprüfen, ob Start-, Endpunkt oder Verlauf fehlt
-        if not self.startpunkt_id or not self.endpunkt_id or not self.verlauf_ids:
-            self.ui.label_Pruefung.setText("Unvollständige Daten.")
-            self.ui.label_Pruefung.setStyleSheet("background-color: lightcoral;")  # Hintergrund auf Rot setzen
-            return
-
-        korrekt = True  # Variable korrekt initialisieren
-        letzter_knoten = self.startpunkt_id  # Starte mit dem Startknoten
-
-        for verlauf_id in self.verlauf_ids:
-            layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
-            feature = next(layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"id" = {verlauf_id}')))
-
-            von_knoten = feature["VONKNOTEN"]
-            nach_knoten = feature["NACHKNOTEN"]
-
-            # Prüfe, ob der letzte Knoten entweder mit dem VON- oder NACH-Knoten übereinstimmt
-            if letzter_knoten != von_knoten and letzter_knoten != nach_knoten:
-                korrekt = False
-                break
-
-            # Setze den neuen letzten Knoten, der entweder der VON- oder NACH-Knoten sein kann
-            letzter_knoten = nach_knoten if letzter_knoten == von_knoten else von_knoten
+        # Alle Leerrohre in einer Abfrage laden, dann vollständig im Speicher prüfen
+        layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
+        leerrohre = lade_leerrohre(layer, self.verlauf_ids)
+        fehler = pruefe_streckenkabel(self.startpunkt_id, self.endpunkt_id, self.verlauf_ids, leerrohre,
+                                      KABEL_LEERROHR_TYPEN["Streckenkabel"])
+        for meldung in fehler:
+            logger.warning("Prüfung Streckenkabel: %s", meldung)
 
-        # Am Ende prüfen, ob der letzte Knoten mit dem Endknoten übereinstimmt
-        if korrekt and letzter_knoten == self.endpunkt_id:
+        if not fehler:
             self.ui.label_Pruefung.setText("Verlauf ist korrekt verbunden. Daten können importiert werden")
             self.ui.label_Pruefung.setStyleSheet("background-color: lightgreen;")  # Hintergrund auf Grün setzen
             self.ui.pushButton_Import.setEnabled(True)  # Import-Button aktivieren
         else:
-            self.ui.label_Pruefung.setText("Verlauf ist nicht verbunden. Bitte überprüfen Sie die Auswahl")
+            self.ui.label_Pruefung.setText("\n".join(fehler))
             self.ui.label_Pruefung.setStyleSheet("background-color: lightcoral;")  # Hintergrund auf Rot setzen
+            self.ui.pushButton_Import.setEnabled(False)
 
     def get_kabeltyp_id(self, kabel_name):
         """Funktion, um die ID des Kabeltyps basierend auf dem Namen abzurufen"""
-        db_uri = self.get_database_connection()
-        uri = QgsDataSourceUri(db_uri)
-
+        pool = self.get_db_pool()
+        conn = None
         try:
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
+            conn = pool.getconn()
             cur = conn.cursor()
             cur.execute('SELECT id FROM "lwl"."LWL_Kabel_Typ" WHERE "BEZEICHNUNG" = %s;', (kabel_name,))
             kabeltyp_id = cur.fetchone()
@@ -661,12 +699,13 @@ class KabelVerlegungsTool(QDialog):
             self.iface.messageBar().pushMessage("Fehler", str(e), level=Qgis.Critical)
         finally:
             if conn is not None:
-                conn.close()
+                pool.putconn(conn)
 
         return None
 
     def daten_importieren(self):
         """Importiert die geprüften Daten in die Datenbank."""
+        conn = None
         try:
             QgsMessageLog.logMessage(f"DEBUG: Startknoten={self.startpunkt_id}, Endknoten={self.endpunkt_id} vor Datenimport", level=Qgis.Info)
 
@@ -680,16 +719,8 @@ class KabelVerlegungsTool(QDialog):
             datum_verlegt = self.ui.mDateTimeEdit_Strecke.dateTime().toString("yyyy-MM-dd HH:mm:ss")
 
             # Datenbankverbindung aufbauen
-            db_uri = self.get_database_connection()
-            uri = QgsDataSourceUri(db_uri)
-
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
+            pool = self.get_db_pool()
+            conn = pool.getconn()
             cur = conn.cursor()
             conn.autocommit = False
 
@@ -753,13 +784,14 @@ class KabelVerlegungsTool(QDialog):
 
         except Exception as e:
             QgsMessageLog.logMessage(f"DEBUG: Fehler während des Imports: {str(e)}", level=Qgis.Critical)
-            conn.rollback()
+            if conn is not None:
+                conn.rollback()
             self.iface.messageBar().pushMessage("Fehler", f"Import fehlgeschlagen: {str(e)}", level=Qgis.Critical)
 
         finally:
             if conn is not None:
                 try:
-                    conn.close()
+                    pool.putconn(conn)
                 except Exception as close_error:
                     QgsMessageLog.logMessage(f"Fehler beim Schließen der Verbindung: {str(close_error)}", level=Qgis.Critical)
 
@@ -946,15 +978,12 @@ class KabelVerlegungsTool(QDialog):
             gefoerdert
         ])
         
-        # Verbindung der Leerrohre prüfen und darstellen
+        # Verbindung der Leerrohre darstellen (Attribute aller Leerrohre in einer Abfrage)
+        layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
+        leerrohre = lade_leerrohre(layer, self.verlauf_ids_2)
         for index, verlauf_id in enumerate(self.verlauf_ids_2, start=1):
-            layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
-            feature = next(layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"id" = {verlauf_id}')))
-            
-            von_knoten = feature["VONKNOTEN"]
-            nach_knoten = feature["NACHKNOTEN"]
-            
-            verbindung_text = f"VON: {von_knoten}, NACH: {nach_knoten}"
+            lr = leerrohre.get(verlauf_id, {})
+            verbindung_text = f"VON: {lr.get('VONKNOTEN')}, NACH: {lr.get('NACHKNOTEN')}"
             
             kabelverlauf_daten.append([
                 f'Leerrohr {index}', 
@@ -994,83 +1023,31 @@ class KabelVerlegungsTool(QDialog):
 
     def pruefe_verbindung_2(self):
         """Prüft die Verbindung für den zweiten Tab (Hauseinführung)"""
-        if not self.startpunkt_id_2 or not self.virtueller_knoten_id or not self.endpunkt_id_2 or not self.verlauf_ids_2:
-            self.ui.label_Pruefung_2.setText("Unvollständige Daten.")
-            self.ui.label_Pruefung_2.setStyleSheet("background-color: lightcoral;")
-            return
-
-        korrekt = True
-        letzter_knoten = self.startpunkt_id_2  # Starte mit dem Startpunkt
+        # Leerrohre und Hausanschluss je in einer Abfrage laden, dann vollständig im Speicher prüfen
         layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")[0]
-
-        for idx, verlauf_id in enumerate(self.verlauf_ids_2):
-            feature_iter = layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"id" = {verlauf_id}'))
-            feature = next(feature_iter, None)
-
-            if feature is None:
-                QgsMessageLog.logMessage(f"Fehler: Leerrohr mit ID {verlauf_id} nicht gefunden.", level=Qgis.Critical)
-                korrekt = False
-                break
-
-            leerrohr_typ = feature["TYP"]
-
-            # Überprüfe Typ 3 Leerrohre
-            if leerrohr_typ == 3:
-                von_knoten = feature["VONKNOTEN"]
-                nach_knoten = feature["NACHKNOTEN"]
-
-                if letzter_knoten != von_knoten and letzter_knoten != nach_knoten:
-                    QgsMessageLog.logMessage(
-                        f"Fehler: Ungültige Verbindung bei Leerrohr ID {verlauf_id}. Letzter Knoten: {letzter_knoten}, VON: {von_knoten}, NACH: {nach_knoten}.", 
-                        level=Qgis.Critical)
-                    korrekt = False
-                    break
-
-                letzter_knoten = nach_knoten if letzter_knoten == von_knoten else von_knoten
-
-            # Überprüfe Typ 4 Leerrohr (Hauseinführung)
-            elif leerrohr_typ == 4:
-                # Verifiziere, dass die PARENT_LEERROHR_ID des Typ-4-Leerrohrs dem letzten Typ-3-Leerrohr entspricht
-                if feature["PARENT_LEERROHR_ID"] != self.verlauf_ids_2[idx - 1]:
-                    QgsMessageLog.logMessage(
-                        f"Fehler: Die Hauseinführung ist nicht korrekt mit dem letzten Leerrohr ID {self.verlauf_ids_2[idx - 1]} als PARENT_LEERROHR_ID verbunden.",
-                        level=Qgis.Critical)
-                    korrekt = False
-                    break
-
-                hausanschluss_layer = QgsProject.instance().mapLayersByName("LWL_Hausanschluss")[0]
-                anschluss_feature_iter = hausanschluss_layer.getFeatures(QgsFeatureRequest().setFilterExpression(f'"id" = {self.endpunkt_id_2}'))
-                anschluss_feature = next(anschluss_feature_iter, None)
-
-                if anschluss_feature and anschluss_feature["ID_KNOTEN"] != self.virtueller_knoten_id:
-                    QgsMessageLog.logMessage(
-                        f"Fehler: Der Hausanschlusspunkt stimmt nicht mit dem virtuellen Knoten überein.", 
-                        level=Qgis.Critical)
-                    korrekt = False
-                    break
-
-        if korrekt:
+        hausanschluss_layer = QgsProject.instance().mapLayersByName("LWL_Hausanschluss")[0]
+        leerrohre = lade_leerrohre(layer, self.verlauf_ids_2)
+        hausanschluesse = lade_attribute(hausanschluss_layer, [self.endpunkt_id_2], ["id", "ID_KNOTEN"])
+        fehler = pruefe_hauseinfuehrung(self.startpunkt_id_2, self.virtueller_knoten_id, self.endpunkt_id_2,
+                                        self.verlauf_ids_2, leerrohre, hausanschluesse)
+        for meldung in fehler:
+            QgsMessageLog.logMessage(f"Fehler: {meldung}", level=Qgis.Critical)
+
+        if not fehler:
             self.ui.label_Pruefung_2.setText("Verlauf ist korrekt verbunden. Daten können importiert werden")
             self.ui.label_Pruefung_2.setStyleSheet("background-color: lightgreen;")
             self.ui.pushButton_Import_2.setEnabled(True)
         else:
-            QgsMessageLog.logMessage("Fehler: Verlauf ist nicht korrekt verbunden.", level=Qgis.Critical)
-            self.ui.label_Pruefung_2.setText("Verlauf ist nicht verbunden. Bitte überprüfen Sie die Auswahl")
+            self.ui.label_Pruefung_2.setText("\n".join(fehler))
             self.ui.label_Pruefung_2.setStyleSheet("background-color: lightcoral;")
+            self.ui.pushButton_Import_2.setEnabled(False)
 
     def daten_importieren_2(self):
         """Importiert die geprüften Daten in die Datenbank für Tab 2 (Hauseinführung)."""
+        conn = None
         try:
-            db_uri = self.get_database_connection()
-            uri = QgsDataSourceUri(db_uri)
-
-            conn = psycopg2.connect(
-                dbname=uri.database(),
-                user=uri.username(),
-                password=uri.password(),
-                host=uri.host(),
-                port=uri.port()
-            )
+            pool = self.get_db_pool()
+            conn = pool.getconn()
             cur = conn.cursor()
             conn.autocommit = False
 
@@ -1145,9 +1122,10 @@ class KabelVerlegungsTool(QDialog):
             self.reset_form_2()
 
         except Exception as e:
-            conn.rollback()
+            if conn is not None:
+                conn.rollback()
             self.iface.messageBar().pushMessage("Fehler", f"Import fehlgeschlagen: {str(e)}", level=Qgis.Critical)
 
         finally:
             if conn is not None:
-                conn.close()
+                pool.putconn(conn)
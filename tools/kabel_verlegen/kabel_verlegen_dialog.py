@@ -100,12 +100,19 @@ class Ui_KabelVerlegungsToolDialogBase(object):
         self.pushButton_verlauf = QtWidgets.QPushButton(self.page_2)
         self.pushButton_verlauf.setGeometry(QtCore.QRect(40, 230, 141, 25))
         self.pushButton_verlauf.setObjectName("pushButton_verlauf")
+        self.label_verlauf = QtWidgets.QTextEdit(self.page_2)
+        self.label_verlauf.setGeometry(QtCore.QRect(190, 230, 291, 25))
+        self.label_verlauf.setObjectName("label_verlauf")
         self.pushButton_Vorschau = QtWidgets.QPushButton(self.page_2)
         self.pushButton_Vorschau.setGeometry(QtCore.QRect(50, 280, 141, 25))
         self.pushButton_Vorschau.setObjectName("pushButton_Vorschau")
         self.pushButton_Datenpruefung = QtWidgets.QPushButton(self.page_2)
         self.pushButton_Datenpruefung.setGeometry(QtCore.QRect(100, 340, 141, 25))
         self.pushButton_Datenpruefung.setObjectName("pushButton_Datenpruefung")
+        self.label_Pruefung = QtWidgets.QTextEdit(self.page_2)
+        self.label_Pruefung.setGeometry(QtCore.QRect(0, 372, 491, 51))
+        self.label_Pruefung.setReadOnly(True)
+        self.label_Pruefung.setObjectName("label_Pruefung")
         self.toolBox.addItem(self.page_2, "")
         self.page_3 = QtWidgets.QWidget()
         self.page_3.setObjectName("page_3")
@@ -286,9 +293,9 @@ class Ui_KabelVerlegungsToolDialogBase(object):
         self.pushButton_routing.setText(_translate("KabelVerlegungsToolDialogBase", "Routing"))
         self.pushButton_endpunkt.setText(_translate("KabelVerlegungsToolDialogBase", "Verteiler/Knoten"))
         self.label_gewaehlter_zwischenknoten.setText(_translate("KabelVerlegungsToolDialogBase", "Knoten wählen! (optional)"))
-        self.pushButton_verlauf.setText(_translate("KabelVerlegungsToolDialogBase", "Zwischenknoten"))
-        self.pushButton_Vorschau.setText(_translate("KabelVerlegungsToolDialogBase", "Zwischenknoten"))
-        self.pushButton_Datenpruefung.setText(_translate("KabelVerlegungsToolDialogBase", "Zwischenknoten"))
+        self.pushButton_verlauf.setText(_translate("KabelVerlegungsToolDialogBase", "Kabelverlauf"))
+        self.pushButton_Vorschau.setText(_translate("KabelVerlegungsToolDialogBase", "Vorschau erstellen"))
+        self.pushButton_Datenpruefung.setText(_translate("KabelVerlegungsToolDialogBase", "Daten Prüfen"))
         self.toolBox.setItemText(self.toolBox.indexOf(self.page_2), _translate("KabelVerlegungsToolDialogBase", "Verlauf Kabel:"))
         self.label_Kommentar.setPlaceholderText(_translate("KabelVerlegungsToolDialogBase", "Kommentar hier eingeben..."))
         self.label_14.setText(_translate("KabelVerlegungsToolDialogBase", "Berzeichung_intern:"))
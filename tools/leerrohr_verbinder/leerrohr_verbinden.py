@@ -11,24 +11,34 @@ Zusatz:
 - Alte Karten-Pick-Variante (Über Karte wählen) bleibt nutzbar.
 """
 
-import base64, json
+import base64
 from html import escape
 from PyQt5.QtPrintSupport import QPrinter
-from PyQt5.QtCore import Qt, QSettings, QPointF, QLineF, QObject, QEvent, QRectF, QSizeF, QMarginsF, QRect, pyqtSignal
+from PyQt5.QtCore import Qt, QSettings, QPointF, QLineF, QObject, QEvent, QRectF, QSizeF, QMarginsF, QRect, QTimer, pyqtSignal
 from PyQt5.QtGui import ( 
     QPainter, QPixmap, QTextDocument, QFont, QPageLayout, QPageSize, 
     QPen, QBrush, QColor, QPolygonF, QPainterPath, QFontMetricsF, QIcon
 )
 from PyQt5.QtWidgets import (
     QDialog, QListWidgetItem, QGraphicsScene, QGraphicsRectItem, QGraphicsPolygonItem, QFileDialog,
-    QGraphicsLineItem, QMenu, QAbstractItemView, QGraphicsPathItem, QGraphicsSimpleTextItem, QGraphicsItem
+    QGraphicsLineItem, QMenu, QAbstractItemView, QGraphicsPathItem, QGraphicsSimpleTextItem, QGraphicsItem,
+    QGraphicsTextItem
 )
 from qgis.core import QgsProject, QgsFeatureRequest, QgsGeometry, QgsPointXY, QgsWkbTypes, QgsCoordinateTransform
 from qgis.gui import QgsMapToolEmitPoint, QgsHighlight, QgsMapTool, QgsVertexMarker
-import psycopg2
 from . import resources_rc
+from ..common.db_pool import get_db_pool, measure_db
+from ..common.instrumentation import get_tool_logger, timed
+from ..common.leerrohr_index import get_leerrohr_index, parse_id_trasse_neu
+from ..common.node_locator import get_node_locator, invalidate_node_locator, pixel_tolerance
+from ..common.linear_ref import LinearRef
+from ..common.lookup_catalog import get_lookup_catalog
+from ..common.rohr_graph import invalidate_rohr_graph, loaded_rohr_graph
+from ..common.verbinder_delta import schreibe_verbinder_delta
+from ..common.task_runner import TaskRunner
 from .leerrohr_verbinder_dialog import Ui_KabelVerlegungsToolDialogBase
 
+logger = get_tool_logger("leerrohr_verbinder")
 
 # --------- klickbares Rohr-Kästchen ---------
 class ClickableRect(QGraphicsRectItem):
@@ -60,10 +70,12 @@ class _SplitPointPickTool(QgsMapTool):
     # Kompatibilitäts-Signal: existiert, damit alte disconnect()-Aufrufe nicht krachen
     canvasClicked = pyqtSignal()
 
-    def __init__(self, canvas, lr_geom_map_crs: QgsGeometry, on_fix, forbidden_ranges=None):
+    def __init__(self, canvas, lr_geom_map_crs: QgsGeometry, on_fix, forbidden_ranges=None, linear_ref=None):
         super().__init__(canvas)
         self.canvas = canvas
         self.lr_geom = lr_geom_map_crs
+        # kumulierte Längen einmal je Leerrohr (kein splitGeometry pro Mausbewegung)
+        self.lref = linear_ref or LinearRef(lr_geom_map_crs)
         self.on_fix = on_fix
         self.forbidden = list(forbidden_ranges or [])
         self.marker = QgsVertexMarker(self.canvas)
@@ -81,52 +93,27 @@ class _SplitPointPickTool(QgsMapTool):
             return map_pt
 
     def _length(self) -> float:
-        try:
-            return float(self.lr_geom.length() or 0.0)
-        except Exception:
-            return 0.0
+        return self.lref.length
 
     def _fraction01(self, map_pt) -> float:
         """
         0..1 entlang der Linie: Länge vom Start bis zum projizierten Punkt / Gesamtlänge
         """
-        L = self._length()
-        if L <= 0.0:
-            return 0.0
-        try:
-            pt = self.lr_geom.closestSegmentWithContext(map_pt)[1]
-            tmp = QgsGeometry(self.lr_geom)
-            _ = tmp.splitGeometry([pt], False)
-            l0 = float(tmp.length() or 0.0)
-            return max(0.0, min(1.0, l0 / L))
-        except Exception:
-            return 0.0
+        return self.lref.fraction(map_pt)
 
     def _nearest_allowed_fraction(self, s: float) -> float:
         """
         Liegt s in einem verbotenen Intervall, auf den nächsten Rand klemmen.
         """
-        if not self.forbidden:
-            return s
-        for a, b in self.forbidden:
-            if a <= s <= b:
-                # zum nahesten Rand springen
-                return a if (s - a) <= (b - s) else b
-        return s
+        return LinearRef.nearest_allowed(s, self.forbidden)
 
     def _point_at_fraction(self, s: float):
         """
         Erzeugt Punkt auf der Linie bei s (0..1).
         """
-        L = self._length()
-        if L <= 0.0:
-            return None
-        try:
-            d = max(0.0, min(L, s * L))
-            ptg = self.lr_geom.interpolate(d)
-            return ptg.asPoint() if ptg else None
-        except Exception:
+        if self._length() <= 0.0:
             return None
+        return self.lref.point_at_fraction(max(0.0, min(1.0, s)))
 
     def canvasMoveEvent(self, e):
         try:
@@ -243,8 +230,11 @@ class LeerrohrVerbindenTool(QDialog):
         # DB / Settings
         self.settings = QSettings("SiegeleCo", "ToolBox")
         self.db = None
+        self.db_pool = None
         self.is_connected = False
         self._load_db()
+        # Import läuft als QgsTask im Hintergrund
+        self.tasks = TaskRunner("Leerrohr verbinden")
 
         # Auswahl / Zustand
         self.map_tool = None
@@ -270,6 +260,16 @@ class LeerrohrVerbindenTool(QDialog):
         self.scene = QGraphicsScene()
         self.ui.graphicsView_Auswahl_Rrohr1.setScene(self.scene)
 
+        # Resize: Szene bleibt erhalten, nur entprellt neu anordnen
+        self._relayout_timer = QTimer(self)
+        self._relayout_timer.setSingleShot(True)
+        self._relayout_timer.setInterval(120)
+        self._relayout_timer.timeout.connect(self._relayout)
+
+        # Bestehende Rohr↔Rohr-Relationen: einmal je Knoten/Auswahl/Schreib-Generation
+        self._relations_cache = {}
+        self._relations_node = None
+
         # ListWidgets: Mehrfachauswahl, kein Live-Redraw
         self.ui.listWidget_Leerohr1.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.ui.listWidget_Leerohr2.setSelectionMode(QAbstractItemView.ExtendedSelection)
@@ -322,15 +322,16 @@ class LeerrohrVerbindenTool(QDialog):
 
     # --- NEU: persistente DB-Verbindung + Cursor-Helfer ---
     def _ensure_conn(self):
-        """Sorgt für eine langlebige psycopg2-Connection in self._conn."""
-        if not (self.is_connected and self.db):
+        """Sorgt für eine langlebige, aus dem Plugin-Pool geliehene Connection in self._conn."""
+        if not (self.is_connected and self.db_pool):
             self._conn = None
             return None
         try:
-            if getattr(self, "_conn", None) is None or self._conn.closed:
-                import psycopg2
-                self._conn = psycopg2.connect(**self.db)
-                self._conn.autocommit = False
+            if getattr(self, "_conn", None) is not None and self._conn.closed:
+                self.db_pool.putconn(self._conn, close=True)
+                self._conn = None
+            if getattr(self, "_conn", None) is None:
+                self._conn = self.db_pool.getconn()
             return self._conn
         except Exception:
             self._conn = None
@@ -349,9 +350,10 @@ class LeerrohrVerbindenTool(QDialog):
         return conn.cursor()
 
     def _close_conn(self):
+        """Gibt die langlebige Connection an den Pool zurück."""
         try:
-            if getattr(self, "_conn", None):
-                self._conn.close()
+            if getattr(self, "_conn", None) and self.db_pool:
+                self.db_pool.putconn(self._conn)
         except Exception:
             pass
         self._conn = None
@@ -365,9 +367,9 @@ class LeerrohrVerbindenTool(QDialog):
     # ---------- Event-Filter (Resize -> Redraw) ----------
     def eventFilter(self, obj: QObject, ev):
         if obj is self.ui.graphicsView_Auswahl_Rrohr1.viewport() and ev.type() == QEvent.Resize:
-            # nur neu zeichnen, wenn es bereits eine bestätigte Auswahl gibt
+            # nur neu anordnen, wenn es bereits eine bestätigte Auswahl gibt
             if self.sel_lr1_list or self.sel_lr2_list:
-                self._draw_all()
+                self._relayout_timer.start()
         return super().eventFilter(obj, ev)
 
     # ---------- Helper ----------
@@ -423,6 +425,9 @@ class LeerrohrVerbindenTool(QDialog):
         except Exception:
             pass
 
+        self._close_conn()
+        self.tasks.schliessen()
+
         # WICHTIG: Singleton freigeben
         try:
             type(self).instance = None
@@ -443,8 +448,9 @@ class LeerrohrVerbindenTool(QDialog):
         pwd = base64.b64decode(pw.encode()).decode() if pw else ""
         host = "172.30.0.4" if env=="Testumgebung" else "172.30.0.3"
         self.db = dict(dbname="qwc_services", user=u, password=pwd, host=host, port="5432", sslmode="disable")
+        self.db_pool = get_db_pool(self.iface, self.db, env)
         try:
-            with psycopg2.connect(**self.db) as _c: pass
+            with self.db_pool.connection() as _c: pass
             self.is_connected = True
         except Exception as e:
             self._status(f"DB-Fehler: {e}", ok=False)
@@ -468,12 +474,11 @@ class LeerrohrVerbindenTool(QDialog):
         lut = {}
         if self.is_connected and self.db:
             try:
-                with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
-                    cur.execute('SELECT "id","STATUS","WERT","BESCHREIBUNG" FROM lwl."LUT_Rohr_Status" ORDER BY "id"')
-                    for sid, status_txt, wert, beschr in cur.fetchall():
-                        name = (status_txt or f"Status {sid}").strip()
-                        hexcol = _status_color_by_name(name)
-                        lut[int(sid)] = (name, hexcol)
+                for row in get_lookup_catalog(self.db_pool).rows("rohr_status"):
+                    sid = row["id"]
+                    name = (row.get("STATUS") or f"Status {sid}").strip()
+                    hexcol = _status_color_by_name(name)
+                    lut[int(sid)] = (name, hexcol)
             except Exception:
                 pass
 
@@ -576,7 +581,7 @@ class LeerrohrVerbindenTool(QDialog):
         if not (self.is_connected and self.db):
             return out
         try:
-            with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
                 # 1) primär über ID_KNOTEN
                 cur.execute("""
                     SELECT "ID_LEERROHR_1","ID_LEERROHR_2","STATUS"
@@ -690,17 +695,20 @@ class LeerrohrVerbindenTool(QDialog):
             self._status(f"CRS-Transformation fehlgeschlagen: {e}", ok=False)
             return
 
+        # Lineare Referenz einmal je gewähltem Leerrohr
+        lref = LinearRef(g)
+
         # Verbotsintervalle berechnen (± 0,10 m um HE-Andockpunkte)
         forbidden = []
         try:
-            forbidden = self._compute_forbidden_ranges_for_he(lr_id, g) or []
+            forbidden = self._compute_forbidden_ranges_for_he(lr_id, g, lref) or []
         except Exception:
             forbidden = []
 
         # Fix-Callback
         def _fix(pt_map_xy):
             # Prozent (0..100) für UI-Feedback berechnen
-            perc = self._project_fraction(g, pt_map_xy)  # 0..100
+            perc = 100.0 * lref.fraction(pt_map_xy)  # 0..100
             key = "left" if side == 1 else "right"
             pos01 = max(0.0, min(1.0, (perc / 100.0)))
             self.split_position[key] = pos01
@@ -715,7 +723,7 @@ class LeerrohrVerbindenTool(QDialog):
 
         # MapTool starten (mit verbotenen Intervallen)
         canvas = self.iface.mapCanvas()
-        self.map_tool = _SplitPointPickTool(canvas, g, _fix, forbidden_ranges=forbidden)
+        self.map_tool = _SplitPointPickTool(canvas, g, _fix, forbidden_ranges=forbidden, linear_ref=lref)
         canvas.setMapTool(self.map_tool)
         self._status("Bewege das rote Kreuz entlang des Leerrohrs. Linksklick fixiert den Splitpunkt.")
 
@@ -724,21 +732,7 @@ class LeerrohrVerbindenTool(QDialog):
         projiziert Punkt auf Liniengeometrie und liefert 0..100 (%) entlang.
         """
         try:
-            res = line_geom_map_crs.closestSegmentWithContext(pt_map_xy)
-            snap_pt = res[1]
-            # Länge akkumulieren
-            l_total = line_geom_map_crs.length()
-            if l_total <= 0:
-                return 0.0
-            # Vom Start bis Snap messen: trick über splitAtPoint
-            tmp = QgsGeometry(line_geom_map_crs)
-            parts = tmp.splitGeometry([snap_pt], False)
-            # splitGeometry gibt (ok, [Geoms]) je nach Version; fallback:
-            g0 = tmp  # vor Split verbleibende Teilgeometrie
-            l0 = g0.length() if g0 else 0.0
-            # Sicherheit: clamp
-            frac = max(0.0, min(1.0, l0 / l_total))
-            return 100.0 * frac
+            return 100.0 * LinearRef(line_geom_map_crs).fraction(pt_map_xy)
         except Exception:
             return 0.0
 
@@ -786,17 +780,12 @@ class LeerrohrVerbindenTool(QDialog):
 
         label = None
         try:
-            with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
-                # versuche beide Schreibweisen + Fallbacks
-                for col in ("SUBTYP_char", "SUBTYP_CHAR", "BEZEICHNUNG", "NAME"):
-                    try:
-                        cur.execute(f'SELECT "{col}" FROM lwl."LUT_Leerrohr_SubTyp" WHERE "id"=%s', (sid,))
-                        row = cur.fetchone()
-                        if row and row[0]:
-                            label = row[0]
-                            break
-                    except Exception:
-                        continue
+            row = get_lookup_catalog(self.db_pool).subtyp(sid) or {}
+            # versuche beide Schreibweisen + Fallbacks
+            for col in ("SUBTYP_char", "SUBTYP_CHAR", "BEZEICHNUNG", "NAME"):
+                if row.get(col):
+                    label = row[col]
+                    break
         except Exception:
             pass
 
@@ -894,47 +883,14 @@ class LeerrohrVerbindenTool(QDialog):
         return lst[0] if lst else None
 
     def _find_nearest_node(self, pt):
-        """Findet Knoten-ID: bevorzugt aus 'LWL_Knoten', sonst via Trassen-Endpunkte."""
-        # 1) Direkter Treffer in LWL_Knoten
+        """Findet den nächsten Knoten: bevorzugt aus 'LWL_Knoten', sonst via Trassen-Endpunkte."""
         kn_layer = self._get_layer("LWL_Knoten")
-        if kn_layer:
-            mup = self.iface.mapCanvas().mapUnitsPerPixel(); radius = 10*mup
-            rect = QgsGeometry.fromPointXY(QgsPointXY(pt)).buffer(radius,1).boundingBox()
-            for f in kn_layer.getFeatures(QgsFeatureRequest().setFilterRect(rect)):
-                fid_name = "id" if "id" in f.fields().names() else f.fields().names()[0]
-                val = f[fid_name]
-                return int(val) if val not in (None,"") else None
-
-        # 2) Nächster Trassen-Endpunkt
         tr_layer = self._get_layer("LWL_Trasse")
-        if not tr_layer:
+        if not (kn_layer or tr_layer):
             return None
-        mup = self.iface.mapCanvas().mapUnitsPerPixel(); radius = 15*mup
-        bb = QgsGeometry.fromPointXY(QgsPointXY(pt)).buffer(radius, 1).boundingBox()
-        nearest = None
-        for f in tr_layer.getFeatures(QgsFeatureRequest().setFilterRect(bb)):
-            names = f.fields().names()
-            from_nm = "VONKNOTEN" if "VONKNOTEN" in names else ("FROMNODE" if "FROMNODE" in names else None)
-            to_nm   = "NACHKNOTEN" if "NACHKNOTEN" in names else ("TONODE" if "TONODE" in names else None)
-            if not (from_nm and to_nm): continue
-            # prüfe Distanz zum Linienende
-            geom = f.geometry()
-            if not geom or geom.isEmpty(): continue
-            try:
-                line = geom.constGet()  # QgsLineString/QgsGeometry intern
-            except Exception:
-                line = None
-            if line:
-                start = QgsPointXY(line.startPoint())
-                end   = QgsPointXY(line.endPoint())
-                pxy   = QgsPointXY(pt)
-                d1 = (pxy.x()-start.x())**2 + (pxy.y()-start.y())**2
-                d2 = (pxy.x()-end.x())**2 + (pxy.y()-end.y())**2
-                if nearest is None or d1 < nearest[0]:
-                    nearest = (d1, int(f[from_nm]))
-                if nearest is None or d2 < nearest[0]:
-                    nearest = (d2, int(f[to_nm]))
-        return nearest[1] if nearest else None
+        canvas = self.iface.mapCanvas()
+        locator = get_node_locator(kn_layer, tr_layer)
+        return locator.nearest_id(pt, pixel_tolerance(canvas, 10), endpoint_tolerance=pixel_tolerance(canvas, 15))
 
     def _load_trassen_for_node(self, node_id):
         """Lädt Trassen-Features, die am Knoten beginnen/enden. Rückgabe: [(id,label,geom), ...]"""
@@ -1077,7 +1033,7 @@ class LeerrohrVerbindenTool(QDialog):
         if not (self.is_connected and self.db):
             return out
         try:
-            with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
                 # 1) bevorzugt über ID_KNOTEN
                 cur.execute("""
                     SELECT "ID_LEERROHR_1","ID_LEERROHR_2","STATUS"
@@ -1141,6 +1097,7 @@ class LeerrohrVerbindenTool(QDialog):
             it.setData(Qt.UserRole, d)  # Dict bleibt unverändert für weitere Verarbeitung
             lw.addItem(it)
 
+    @measure_db("Auswahl bestätigen")
     def _on_confirm_click(self):
         """
         Bestätigen:
@@ -1238,7 +1195,6 @@ class LeerrohrVerbindenTool(QDialog):
         self.left_bars, self.right_bars = [], []
         self._warm_caches()
         self._draw_all()
-        self._draw_existing_relations()
 
         # 6) Buttons frei
         for bn in ("pushButton_automatisch","pushButton_verbindung_loeschen","pushButton_Datenpruefung","pushButton_Import"):
@@ -1268,25 +1224,7 @@ class LeerrohrVerbindenTool(QDialog):
     # =====================================================================
     def _parse_id_trasse_neu(self, val):
         """Gibt Liste der Trassen-IDs (int) aus ID_TRASSE_NEU zurück. Erwartet JSON/JSONB-ähnliche Struktur."""
-        out = []
-        if val is None:
-            return out
-        try:
-            data = val
-            if isinstance(val, str):
-                data = json.loads(val)
-            if isinstance(data, dict) and "list" in data:
-                data = data["list"]
-            if isinstance(data, list):
-                for el in data:
-                    # el kann dict {"id":123,"index":0,"reverse":false} sein
-                    if isinstance(el, dict) and "id" in el:
-                        out.append(int(el["id"]))
-                    elif isinstance(el, (int, str)):
-                        out.append(int(el))
-        except Exception:
-            pass
-        return out
+        return [tid for tid, _ in parse_id_trasse_neu(val)]
 
     def _leerrohre_for_trasse_and_mode(self, trasse_id, side, mode):
         """
@@ -1294,53 +1232,35 @@ class LeerrohrVerbindenTool(QDialog):
         - lotrecht: FROM/TO == node && (Trasse am Anfang/Ende ODER toleriert, falls Datenlage unklar)
         - parallel: NICHT FROM/TO == node && Trasse im Verlauf && echter Durchlauf über node
         Rückgabe-Dicts enthalten immer VONKNOTEN/NACHKNOTEN (Fallback: FROMNODE/TONODE).
+        Die Kandidaten kommen aus dem Sitzungs-Index Trasse -> Leerrohre (kein Layer-Scan).
         """
         result = []
         node_id = self.sel_node_id
-        if node_id is None:
+        if node_id is None or trasse_id is None:
             return result
 
         lr_layer = self._get_layer("LWL_Leerrohr")
         if not lr_layer:
             return result
 
-        names = [f.name() for f in lr_layer.fields()]
-        id_nm   = "id" if "id" in names else names[0]
-        from_nm = "VONKNOTEN" if "VONKNOTEN" in names else ("FROMNODE" if "FROMNODE" in names else None)
-        to_nm   = "NACHKNOTEN" if "NACHKNOTEN" in names else ("TONODE"   if "TONODE"   in names else None)
-        sub_nm  = "SUBTYP" if "SUBTYP" in names else None
-        verb_field  = self._find_verbund_field(lr_layer)
-        id_trneu_nm = "ID_TRASSE_NEU" if "ID_TRASSE_NEU" in names else None
-
-        req = QgsFeatureRequest()
-        if id_trneu_nm:
-            req = req.setFilterExpression(f'"{id_trneu_nm}" IS NOT NULL')
-
-        for f in lr_layer.getFeatures(req):
-            if id_nm not in f.fields().names() or (sub_nm is None):
-                continue
-
-            # Verlaufsliste
-            tr_list = self._parse_id_trasse_neu(f[id_trneu_nm]) if id_trneu_nm else []
-            if trasse_id not in tr_list:
-                continue
-
-            f_id = int(f[id_nm]) if f[id_nm] not in (None, "") else None
-            if f_id is None:
+        index = get_leerrohr_index(lr_layer, self._find_verbund_field(lr_layer))
+        seen = set()
+        for entry, _pos, _rev in index.for_trasse(trasse_id):
+            f_id = entry["id"]
+            if f_id in seen:
                 continue
+            seen.add(f_id)
+            tr_list = entry["tr_list"]
 
-            from_matches = (from_nm and f[from_nm] not in (None, "") and int(f[from_nm]) == node_id)
-            to_matches   = (to_nm   and f[to_nm]   not in (None, "") and int(f[to_nm])   == node_id)
+            von, nach = entry["VONKNOTEN"], entry["NACHKNOTEN"]
+            from_matches = von not in (None, "") and int(von) == node_id
+            to_matches   = nach not in (None, "") and int(nach) == node_id
             ends_at_node = bool(from_matches or to_matches)
 
             if mode == "lotrecht":
                 if not ends_at_node:
                     continue
-                # plausibel am Anfang/Ende der Trassenliste?
-                at_start = (len(tr_list) > 0 and int(tr_list[0]) == int(trasse_id))
-                at_end   = (len(tr_list) > 0 and int(tr_list[-1]) == int(trasse_id))
-                if not (at_start or at_end):
-                    pass  # tolerieren
+                # plausibel am Anfang/Ende der Trassenliste? – sonst tolerieren
             else:
                 # parallel: NICHT am Knoten enden/anfangen …
                 if ends_at_node:
@@ -1351,11 +1271,11 @@ class LeerrohrVerbindenTool(QDialog):
 
             d = {
                 "id": f_id,
-                "SUBTYP": f[sub_nm],
-                "SUBTYP_CHAR": self._get_subtyp_char(f[sub_nm]),
-                "VERBUND": f[verb_field] if verb_field in f.fields().names() else None,
-                "VONKNOTEN": f[from_nm] if from_nm in f.fields().names() else None,
-                "NACHKNOTEN": f[to_nm]   if to_nm   in f.fields().names() else None,
+                "SUBTYP": entry["SUBTYP"],
+                "SUBTYP_CHAR": self._get_subtyp_char(entry["SUBTYP"]),
+                "VERBUND": entry["VERBUND"],
+                "VONKNOTEN": von,
+                "NACHKNOTEN": nach,
             }
             result.append(d)
 
@@ -1531,26 +1451,22 @@ class LeerrohrVerbindenTool(QDialog):
             return {}
         if hasattr(self, "_farben_cache") and self._farben_cache.get(int(subtyp_id)):
             return dict(self._farben_cache[int(subtyp_id)])
-        # Fallback (wenn caches nicht warm sind): einmalig nachladen
-        with self._cursor() as cur:
-            res = {}
-            if cur is None:
-                return res
-            try:
-                cur.execute('SELECT "ROHRNUMMER","FARBCODE" FROM lwl."LUT_Rohr_Beschreibung" WHERE "ID_SUBTYP"=%s',
-                            (int(subtyp_id),))
-                for nr, farb in cur.fetchall():
-                    if farb and '/' in farb:
-                        p, s = [c.strip() for c in str(farb).split('/', 1)]
-                        s = None if (not s or s.strip('#') == '000000') else s
-                    else:
-                        p, s = farb, None
-                    res[int(nr)] = (p or "#808080", s)
-            except Exception:
-                pass
-            return res
+        # Fallback (wenn caches nicht warm sind): aus dem Katalog
+        res = {}
+        try:
+            for row in get_lookup_catalog(self.db_pool).rohr_beschreibung(int(subtyp_id)):
+                nr, farb = row.get("ROHRNUMMER"), row.get("FARBCODE")
+                if farb and '/' in farb:
+                    p, s = [c.strip() for c in str(farb).split('/', 1)]
+                    s = None if (not s or s.strip('#') == '000000') else s
+                else:
+                    p, s = farb, None
+                res[int(nr)] = (p or "#808080", s)
+        except Exception:
+            pass
+        return res
 
-    def _compute_forbidden_ranges_for_he(self, lr_id: int, lr_geom_map_crs) -> list:
+    def _compute_forbidden_ranges_for_he(self, lr_id: int, lr_geom_map_crs, linear_ref=None) -> list:
         """
         Verbotene s-Intervalle (0..1) entlang der LR-Geometrie:
         ±0,10 m um HE-Andockpunkte. Erkennt HEs sowohl
@@ -1569,18 +1485,7 @@ class LeerrohrVerbindenTool(QDialog):
         delta_s = 0.10 / total_len  # 10 cm → s
 
         # Helper: s-Fraction (0..1) eines Map-Punktes auf LR
-        def _fraction01(map_pt) -> float:
-            L = float(lr_geom_map_crs.length() or 0.0)
-            if L <= 0.0:
-                return 0.0
-            try:
-                pt = lr_geom_map_crs.closestSegmentWithContext(map_pt)[1]
-                tmp = QgsGeometry(lr_geom_map_crs)
-                _ = tmp.splitGeometry([pt], False)
-                l0 = float(tmp.length() or 0.0)
-                return max(0.0, min(1.0, l0 / L))
-            except Exception:
-                return 0.0
+        _fraction01 = (linear_ref or LinearRef(lr_geom_map_crs)).fraction
 
         # 1) Versuch über LWL_Rohr (ID_HAUSEINFÜHRUNG gesetzt)
         with self._cursor() as cur:
@@ -1656,7 +1561,7 @@ class LeerrohrVerbindenTool(QDialog):
         merged.append((ca, cb))
         return merged
 
-    # --- ERSATZ: nutzt _belegung_cache (lr_id->nr->(occupied,rid)) ---
+    # --- ERSATZ: nutzt _belegung_cache ((lr_id, node_id)->nr->(occupied,rid)) ---
     def get_freie_rohrnummern(self, lr_id):
         """Gibt sortierte Liste freier ROHRNUMMERN am aktuellen Knoten zurück."""
         belegung = self._get_rohr_belegung(lr_id)
@@ -1689,6 +1594,56 @@ class LeerrohrVerbindenTool(QDialog):
         except Exception:
             pass
 
+    def _belegung_cache_for_node(self, node_id):
+        """
+        Belegungs-Cache {(lr_id, node_id) -> {nr: (occupied, rid)}} für den Knoten
+        und die aktuelle Schreib-Generation (wird nach jedem Import erhöht).
+        """
+        key = (node_id, getattr(self, "_belegung_generation", 0))
+        if getattr(self, "_belegung_cache_key", None) != key or not hasattr(self, "_belegung_cache"):
+            self._belegung_cache = {}
+            self._belegung_cache_key = key
+        return self._belegung_cache
+
+    @timed("Leerrohr verbinden: Belegung laden", logger)
+    def _load_node_belegung(self, lr_ids):
+        """
+        Lädt die Belegung ALLER übergebenen Leerrohre am aktuellen Knoten mit EINER Abfrage:
+        je (Leerrohr, ROHRNUMMER) belegt-Flag (Rohr↔Rohr-Relation mit rr."ID_KNOTEN" == Knoten
+        für irgendein Segment der Nummer) und repräsentative Rohr-ID (kleinste).
+        """
+        node_id = getattr(self, "sel_node_id", None)
+        if node_id is None:
+            return
+        node_id = int(node_id)
+        cache = self._belegung_cache_for_node(node_id)
+        missing = sorted({int(i) for i in lr_ids if i is not None} - {k[0] for k in cache})
+        if not missing:
+            return
+
+        with self._cursor() as cur:
+            if cur is None:
+                return
+            cur.execute("""
+                SELECT r."ID_LEERROHR", r."ROHRNUMMER", MIN(r.id) AS repr_id,
+                       bool_or(rel.rohr_id IS NOT NULL) AS belegt
+                FROM lwl."LWL_Rohr" r
+                LEFT JOIN (
+                    SELECT "ID_ROHR_1" AS rohr_id FROM lwl."LWL_Rohr_Rohr_rel" WHERE "ID_KNOTEN" = %s
+                    UNION
+                    SELECT "ID_ROHR_2" FROM lwl."LWL_Rohr_Rohr_rel" WHERE "ID_KNOTEN" = %s
+                ) rel ON rel.rohr_id = r.id
+                WHERE r."ID_LEERROHR" = ANY(%s)
+                  AND r."ROHRNUMMER" IS NOT NULL
+                GROUP BY r."ID_LEERROHR", r."ROHRNUMMER"
+            """, (node_id, node_id, missing))
+            rows = cur.fetchall() or []
+
+        for lr_id in missing:
+            cache[(lr_id, node_id)] = {}
+        for lr_id, rnr, repr_id, belegt in rows:
+            cache[(int(lr_id), node_id)][int(rnr)] = (bool(belegt), int(repr_id) if repr_id is not None else None)
+
     def _get_rohr_belegung(self, lr_id):
         """
         Belegung je ROHRNUMMER für EIN Leerrohr am AKTUELL GEWÄHLTEN KNOTEN.
@@ -1696,75 +1651,33 @@ class LeerrohrVerbindenTool(QDialog):
         für irgendein Segment dieser Nummer mit rr."ID_KNOTEN" == self.sel_node_id.
         - Hauseinführungen an ANDEREN Knoten zählen NICHT.
         Rückgabe: { rohrnr:int -> (occupied:bool, repr_rohr_id:int|None) }
+        Normalerweise bereits durch _warm_caches für alle Leerrohre des Knotens geladen.
         """
-        res = {}
-
         # Knoten-Kontext ist Pflicht (pro Knoten unterschiedliche Belegung!)
         node_id = getattr(self, "sel_node_id", None)
         try:
             lr_id = int(lr_id)
             node_id = int(node_id) if node_id is not None else None
         except Exception:
-            return res
+            return {}
 
         if node_id is None:
             # kein Knoten gewählt → alles als frei behandeln
-            return res
+            return {}
 
-        # Node-spezifischer Cache
         key = (lr_id, node_id)
-        if getattr(self, "_belegung_cache", None) and key in self._belegung_cache:
-            return dict(self._belegung_cache[key])
-
-        with self._cursor() as cur:
-            if cur is None:
-                return res
-
-            # 1) Alle Rohr-Segmente des Leerrohrs sammeln: {nr -> set(rohr_ids)}
-            cur.execute("""
-                SELECT id, "ROHRNUMMER"
-                FROM lwl."LWL_Rohr"
-                WHERE "ID_LEERROHR" = %s
-                ORDER BY "ROHRNUMMER" NULLS LAST, id
-            """, (lr_id,))
-            ids_by_nr = {}
-            for rid, rnr in cur.fetchall() or []:
-                if rnr is None:
-                    continue
-                nr = int(rnr)
-                ids_by_nr.setdefault(nr, set()).add(int(rid))
-
-            if not ids_by_nr:
-                self._belegung_cache = getattr(self, "_belegung_cache", {})
-                self._belegung_cache[key] = res
-                return res
-
-            # 2) Flache ID-Liste
-            all_ids = sorted({rid for s in ids_by_nr.values() for rid in s})
-
-            # 3) Nur Relationen AM aktuellen Knoten berücksichtigen
-            cur.execute("""
-                SELECT "ID_ROHR_1", "ID_ROHR_2"
-                FROM lwl."LWL_Rohr_Rohr_rel"
-                WHERE "ID_KNOTEN" = %s
-                AND ("ID_ROHR_1" = ANY(%s) OR "ID_ROHR_2" = ANY(%s))
-            """, (node_id, all_ids, all_ids))
-            occupied_ids = set()
-            for a, b in cur.fetchall() or []:
-                if a is not None: occupied_ids.add(int(a))
-                if b is not None: occupied_ids.add(int(b))
-
-            # 4) Aggregation pro ROHRNUMMER (OR über alle Segmente der Nummer)
-            out = {}
-            for nr, idset in ids_by_nr.items():
-                occ = any(rid in occupied_ids for rid in idset)
-                repr_id = min(idset) if idset else None
-                out[nr] = (occ, repr_id)
-
-        # Cache speichern (pro (LR, Knoten))
-        self._belegung_cache = getattr(self, "_belegung_cache", {})
-        self._belegung_cache[key] = dict(out)
-        return out
+        cache = self._belegung_cache_for_node(node_id)
+        if key not in cache:
+            self._load_node_belegung([lr_id])
+            cache = self._belegung_cache_for_node(node_id)
+        return dict(cache.get(key, {}))
+
+    def _lut_rohr_beschreibung(self, subtyp, rohrnr, col):
+        """Spalte aus LUT_Rohr_Beschreibung für (Subtyp, Rohrnummer) aus dem Katalog."""
+        for row in get_lookup_catalog(self.db_pool).rohr_beschreibung(int(subtyp)):
+            if row.get("ROHRNUMMER") == int(rohrnr):
+                return row.get(col)
+        return None
 
     # --- ERSATZ: nutzt _color_hex_cache ---
     def _color_hexes_db(self, lr_id: int, rohrnr: int):
@@ -1779,12 +1692,10 @@ class LeerrohrVerbindenTool(QDialog):
                 if not row or row[0] is None:
                     return (None, None)
                 subtyp = int(row[0])
-                cur.execute('SELECT "FARBCODE" FROM lwl."LUT_Rohr_Beschreibung" WHERE "ID_SUBTYP"=%s AND "ROHRNUMMER"=%s LIMIT 1',
-                            (subtyp, int(rohrnr)))
-                r = cur.fetchone()
-                if not r or not r[0]:
+                r = self._lut_rohr_beschreibung(subtyp, rohrnr, "FARBCODE")
+                if not r:
                     return (None, None)
-                val = str(r[0]).strip()
+                val = str(r).strip()
                 if "/" in val:
                     p, s = [x.strip() or None for x in val.split("/", 1)]
                 else:
@@ -1806,12 +1717,10 @@ class LeerrohrVerbindenTool(QDialog):
                 if not row or row[0] is None:
                     return None
                 subtyp = int(row[0])
-                cur.execute('SELECT "FARBE" FROM lwl."LUT_Rohr_Beschreibung" WHERE "ID_SUBTYP"=%s AND "ROHRNUMMER"=%s LIMIT 1',
-                            (subtyp, int(rohrnr)))
-                r = cur.fetchone()
-                if not r or not r[0]:
+                r = self._lut_rohr_beschreibung(subtyp, rohrnr, "FARBE")
+                if not r:
                     return None
-                txt = str(r[0]).strip()
+                txt = str(r).strip()
                 if "/" in txt:
                     txt = txt.split("/", 1)[0].strip()
                 return None if txt.startswith("#") else txt
@@ -1856,13 +1765,13 @@ class LeerrohrVerbindenTool(QDialog):
         return lbl
 
     # --- NEU: Batch-Caches vor dem Zeichnen/Listenaufbau füllen ---
+    @timed("Leerrohr verbinden: Caches laden", logger)
     def _warm_caches(self):
-        """Lädt in einem Rutsch: Rohr-Farben (Hex + Name) je Subtyp und Belegung je Leerrohr."""
+        """Lädt in einem Rutsch: Rohr-Farben (Hex + Name) je Subtyp und Belegung je Leerrohr am Knoten."""
         # Ziel‑Caches
         self._farben_cache = {}        # {subtyp -> {nr: (prim_hex, sec_hex)}}
         self._color_hex_cache = {}     # {(lr_id, nr) -> (prim_hex, sec_hex)}
         self._color_name_cache = {}    # {(lr_id, nr) -> name}
-        self._belegung_cache = {}      # {lr_id -> {nr: (occupied_bool, rid)}}
 
         # benötigte IDs sammeln
         lr_ids = set()
@@ -1891,19 +1800,17 @@ class LeerrohrVerbindenTool(QDialog):
             except Exception:
                 lr_to_sub = {}
 
-        # LUT: Farbcodes + Farbnamen je Subtyp
+        # LUT: Farbcodes + Farbnamen je Subtyp (aus dem Katalog-Cache)
+        farbnamen = {}
         if subtyps:
-            with self._cursor() as cur:
-                try:
-                    cur.execute(
-                        'SELECT "ID_SUBTYP","ROHRNUMMER","FARBCODE","FARBE" '
-                        'FROM lwl."LUT_Rohr_Beschreibung" WHERE "ID_SUBTYP" = ANY(%s)',
-                        (list(subtyps),)
-                    )
-                    for sid, nr, farbcode, farbe in cur.fetchall():
-                        if sid is None or nr is None:
+            try:
+                catalog = get_lookup_catalog(self.db_pool)
+                for sid in subtyps:
+                    for row in catalog.rohr_beschreibung(sid):
+                        nr, farbcode, name = row.get("ROHRNUMMER"), row.get("FARBCODE"), row.get("FARBE")
+                        if nr is None:
                             continue
-                        sid = int(sid); nr = int(nr)
+                        nr = int(nr)
                         prim_hex, sec_hex = None, None
                         if farbcode:
                             val = str(farbcode).strip()
@@ -1914,24 +1821,14 @@ class LeerrohrVerbindenTool(QDialog):
                                 prim_hex = val
                         # Cache pro Subtyp
                         self._farben_cache.setdefault(sid, {})[nr] = (prim_hex, sec_hex)
-                        # Für alle Leerrohre dieses Subtyps später per (lr_id,nr) mappen
-                    # Farbnamen (Primär) für Text
-                    # (wir nutzen nur den Teil vor '/', analog bestehender Logik)
-                    cur.execute(
-                        'SELECT "ID_SUBTYP","ROHRNUMMER","FARBE" '
-                        'FROM lwl."LUT_Rohr_Beschreibung" WHERE "ID_SUBTYP" = ANY(%s)',
-                        (list(subtyps),)
-                    )
-                    farbnamen = {}
-                    for sid, nr, name in cur.fetchall():
-                        if sid is None or nr is None or not name:
-                            continue
-                        txt = str(name).strip()
-                        if "/" in txt:
-                            txt = txt.split("/", 1)[0].strip()
-                        farbnamen[(int(sid), int(nr))] = (None if txt.startswith("#") else txt)
-                except Exception:
-                    farbnamen = {}
+                        # Farbnamen (Primär) für Text – nur der Teil vor '/', analog bestehender Logik
+                        if name:
+                            txt = str(name).strip()
+                            if "/" in txt:
+                                txt = txt.split("/", 1)[0].strip()
+                            farbnamen[(sid, nr)] = (None if txt.startswith("#") else txt)
+            except Exception:
+                farbnamen = {}
 
             # nun (lr_id, nr) füllen
             for lr_id, sid in lr_to_sub.items():
@@ -1941,45 +1838,12 @@ class LeerrohrVerbindenTool(QDialog):
                     self._color_hex_cache[(lr_id, nr)] = (p, s)
                     self._color_name_cache[(lr_id, nr)] = farbnamen.get((sid, nr))
 
-        # Belegung: Rohre + vorhandene Rohr↔Rohr‑Relationen
+        # Belegung aller Leerrohre am Knoten (eine Abfrage, Cache je Knoten/Generation)
         if lr_ids:
-            with self._cursor() as cur:
-                try:
-                    # alle Röhrchen je Leerrohr
-                    cur.execute(
-                        'SELECT "id","ID_LEERROHR","ROHRNUMMER","STATUS" FROM lwl."LWL_Rohr" '
-                        'WHERE "ID_LEERROHR" = ANY(%s)',
-                        (list(lr_ids),)
-                    )
-                    rid_by_lr_nr = {}   # {(lr_id,nr) -> rid}
-                    used_by_rid = {}    # rid -> bool(VERWENDET)
-                    for rid, lr, nr, st in cur.fetchall():
-                        if lr is None or nr is None or rid is None:
-                            continue
-                        rid = int(rid); lr = int(lr); nr = int(nr)
-                        rid_by_lr_nr[(lr, nr)] = rid
-                        used_by_rid[rid] = (str(st).upper() == "VERWENDET") if st is not None else False
-
-                    # welche RIDs sind durch Relationen belegt?
-                    all_rids = list(used_by_rid.keys())
-                    related = set()
-                    if all_rids:
-                        # zwei Seiten prüfen, um Indexe optimal zu nutzen
-                        cur.execute(
-                            'SELECT "ID_ROHR_1","ID_ROHR_2" FROM lwl."LWL_Rohr_Rohr_rel" '
-                            'WHERE "ID_ROHR_1" = ANY(%s) OR "ID_ROHR_2" = ANY(%s)',
-                            (all_rids, all_rids)
-                        )
-                        for a, b in cur.fetchall():
-                            if a is not None: related.add(int(a))
-                            if b is not None: related.add(int(b))
-
-                    # beleg_cache je lr_id befüllen
-                    for (lr, nr), rid in rid_by_lr_nr.items():
-                        occ = (rid in related) or used_by_rid.get(rid, False)
-                        self._belegung_cache.setdefault(lr, {})[nr] = (occ, rid)
-                except Exception:
-                    pass
+            try:
+                self._load_node_belegung(lr_ids)
+            except Exception:
+                pass
 
     # ---------- Zeichnen (links oben, rechts unten) ----------
     def _simulate_bar(self, lr):
@@ -2008,17 +1872,36 @@ class LeerrohrVerbindenTool(QDialog):
         except Exception:
             bar_w = 120
 
-        # Viewbreite holen
+        fm = QFontMetricsF(font)
+
+        # mit weißem Halo (Pfad im Item-Ursprung, Position setzt _place_label)
+        path = QPainterPath(); path.addText(0.0, fm.ascent(), font, txt)
+        halo = QGraphicsPathItem(path)
+        halo.setPen(QPen(QColor("#ffffff"), 3))
+        halo.setBrush(QBrush(Qt.NoBrush))
+        halo.setZValue(9)
+        self.scene.addItem(halo)
+
+        label = QGraphicsSimpleTextItem(txt)
+        label.setFont(font)
+        label.setBrush(QBrush(Qt.black))
+        label.setZValue(10)
+        self.scene.addItem(label)
+
+        lab = {"halo": halo, "label": label, "tw": fm.horizontalAdvance(txt), "bar_w": bar_w, "right": right}
+        self._place_label(lab, base_x, base_y)
+        return lab
+
+    def _place_label(self, lab, base_x, base_y):
+        """Beschriftung an Bar ausrichten und horizontal auf die View-Breite clampen."""
         view = getattr(self.ui, "graphicsView_Auswahl_Rrohr1", None)
         W = max(300, view.viewport().width()) if view else 800
-
-        fm = QFontMetricsF(font)
-        tw = fm.horizontalAdvance(txt)
+        tw = lab["tw"]
         label_margin = getattr(self, "LABEL_MARGIN", 10)
 
-        if right:
+        if lab["right"]:
             # rechtsbündig an Bar
-            label_x = base_x + max(0.0, bar_w - tw)
+            label_x = base_x + max(0.0, lab["bar_w"] - tw)
         else:
             # linksbündig an Bar
             label_x = base_x
@@ -2031,22 +1914,8 @@ class LeerrohrVerbindenTool(QDialog):
 
         # Y leicht über Bar, nicht negativ
         y_top = max(2.0, base_y - 18.0)
-        y_base = y_top + fm.ascent()
-
-        # mit weißem Halo
-        path = QPainterPath(); path.addText(label_x, y_base, font, txt)
-        halo = QGraphicsPathItem(path)
-        halo.setPen(QPen(QColor("#ffffff"), 3))
-        halo.setBrush(QBrush(Qt.NoBrush))
-        halo.setZValue(9)
-        self.scene.addItem(halo)
-
-        label = QGraphicsSimpleTextItem(txt)
-        label.setFont(font)
-        label.setBrush(QBrush(Qt.black))
-        label.setZValue(10)
-        label.setPos(label_x, y_top)
-        self.scene.addItem(label)
+        lab["halo"].setPos(label_x, y_top)
+        lab["label"].setPos(label_x, y_top)
 
     def _draw_bar(self, base_x, base_y, side, bar_idx, lr):
         rects={}; ids={}
@@ -2099,8 +1968,8 @@ class LeerrohrVerbindenTool(QDialog):
             t1.setPen(QPen(Qt.NoPen))
             t2.setPen(QPen(Qt.NoPen))
 
-            # Nummer mittig
-            txt=self.scene.addText(str(nr), font_num)
+            # Nummer mittig (Kind des Kästchens -> wandert beim Neu-Anordnen mit)
+            txt=QGraphicsTextItem(str(nr), r); txt.setFont(font_num)
             bb=txt.boundingRect(); txt.setDefaultTextColor(Qt.black)
             txt.setPos(x+(sq-bb.width())/2, base_y+(sq-bb.height())/2)
 
@@ -2110,16 +1979,27 @@ class LeerrohrVerbindenTool(QDialog):
         width = (n*sq + (n-1)*gap) if n>0 else 0
         return rects, ids, width
 
+    def _view_size(self):
+        view = self.ui.graphicsView_Auswahl_Rrohr1.viewport()
+        return max(400, view.width()), max(240, view.height())
+
+    def _right_bar_origin(self, idx, n_right, width, W, H):
+        """Position (x, y) einer rechten Bar – unten rechtsbündig in der View."""
+        margin = 16
+        row_h = self.ROW_VSPACE
+        top_of_right = margin if n_right <= 0 else max(margin, H - margin - self.SQ - (n_right - 1) * row_h)
+        return max(self.LEFT_MARGIN + 10, W - self.RIGHT_MARGIN - width), top_of_right + idx * row_h
+
+    @timed("Leerrohr verbinden: Zeichnen", logger)
     def _draw_all(self):
+        self._relayout_timer.stop()
         self.scene.clear()
         self._clear_selection_highlight()
         self.paired.clear()
         self.sel_rect_left = None
         self.left_bars, self.right_bars = [], []
 
-        view = self.ui.graphicsView_Auswahl_Rrohr1.viewport()
-        W = max(400, view.width())
-        H = max(240, view.height())
+        W, H = self._view_size()
         margin = 16
         row_h = self.ROW_VSPACE
 
@@ -2134,8 +2014,8 @@ class LeerrohrVerbindenTool(QDialog):
         for idx, d in enumerate(items_left):
             y = y_left + idx * row_h
             rects, ids, width = self._draw_bar(self.LEFT_MARGIN, y, side=1, bar_idx=idx, lr=d)
-            self._label_bar(self.LEFT_MARGIN, y, d)
-            bar = {'lr': d, 'y': y, 'rects': rects, 'ids': ids, 'width': width}
+            lab = self._label_bar(self.LEFT_MARGIN, y, d)
+            bar = {'lr': d, 'x': self.LEFT_MARGIN, 'y': y, 'rects': rects, 'ids': ids, 'width': width, 'label': lab}
             if 'dir' in d: bar['dir'] = d['dir']
             self.left_bars.append(bar)
 
@@ -2146,14 +2026,12 @@ class LeerrohrVerbindenTool(QDialog):
             items_right = [dict(base, dir='A'), dict(base, dir='B')]
 
         nR = len(items_right)
-        top_of_right = margin if nR <= 0 else max(margin, H - margin - self.SQ - (nR - 1) * row_h)
         for idx, d in enumerate(items_right):
-            y = top_of_right + idx * row_h
             _, _, bw = self._simulate_bar(lr=d)
-            base_x = max(self.LEFT_MARGIN + 10, W - self.RIGHT_MARGIN - bw)
+            base_x, y = self._right_bar_origin(idx, nR, bw, W, H)
             rects, ids, _ = self._draw_bar(base_x, y, side=2, bar_idx=idx, lr=d)
-            self._label_bar(base_x, y, d, right=True)
-            bar = {'lr': d, 'y': y, 'rects': rects, 'ids': ids, 'width': bw}
+            lab = self._label_bar(base_x, y, d, right=True)
+            bar = {'lr': d, 'x': base_x, 'y': y, 'rects': rects, 'ids': ids, 'width': bw, 'label': lab}
             if 'dir' in d: bar['dir'] = d['dir']
             self.right_bars.append(bar)
 
@@ -2162,6 +2040,40 @@ class LeerrohrVerbindenTool(QDialog):
         # bestehende DB-Verbindungen einzeichnen
         self._draw_existing_relations()
 
+    def _relayout(self):
+        """
+        Nach Resize: vorhandene Bars, Beschriftungen und Linien nur neu anordnen.
+        Szene, Paarungen (self.paired) und Auswahl bleiben erhalten – keine DB-Abfrage.
+        """
+        if not (self.left_bars or self.right_bars):
+            if self.sel_lr1_list or self.sel_lr2_list:
+                self._draw_all()
+            return
+
+        W, H = self._view_size()
+
+        for bar in self.left_bars:
+            if bar.get('label'):
+                self._place_label(bar['label'], bar['x'], bar['y'])
+
+        nR = len(self.right_bars)
+        for idx, bar in enumerate(self.right_bars):
+            base_x, y = self._right_bar_origin(idx, nR, bar['width'], W, H)
+            dx, dy = base_x - bar['x'], y - bar['y']
+            if dx or dy:
+                for rect in bar['rects'].values():
+                    rect.moveBy(dx, dy)
+                bar['x'], bar['y'] = base_x, y
+            if bar.get('label'):
+                self._place_label(bar['label'], base_x, y)
+
+        for e in self.paired:
+            line = e.get("line")
+            if self._is_valid_graphics_item(line):
+                line.setLine(self._edge_points(e["left"], e["right"]))
+
+        self.scene.setSceneRect(0, 0, W, H)
+
     # ---------- Farbname für Liste ----------
     def _color_name(self, hexcode):
         if not hexcode: return "?"
@@ -2215,7 +2127,7 @@ class LeerrohrVerbindenTool(QDialog):
         # 2) Fallback: DB
         if self.is_connected and self.db:
             try:
-                with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
                     cur.execute('SELECT "BEZEICHNUNG" FROM lwl."LWL_Knoten" WHERE id=%s', (kid,))
                     row = cur.fetchone()
                     if row and row[0] not in (None, ""):
@@ -2381,6 +2293,31 @@ class LeerrohrVerbindenTool(QDialog):
         self._rebuild_list()
 
     # ---------- DB-Relationen nachzeichnen ----------
+    def _existing_relation_rows(self, left_ids, right_ids):
+        """
+        Rohr↔Rohr-Relationen zwischen linken und rechten Rohren – je Knoten,
+        Auswahl und Schreib-Generation nur einmal aus der DB.
+        """
+        if self._relations_node != self.sel_node_id:
+            self._relations_cache.clear()
+            self._relations_node = self.sel_node_id
+        key = (frozenset(left_ids), frozenset(right_ids), getattr(self, "_belegung_generation", 0))
+        rows = self._relations_cache.get(key)
+        if rows is None:
+            try:
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
+                    cur.execute('''
+                        SELECT "ID_ROHR_1","ID_ROHR_2","STATUS"
+                        FROM lwl."LWL_Rohr_Rohr_rel"
+                        WHERE ( "ID_ROHR_1" = ANY(%s) AND "ID_ROHR_2" = ANY(%s) )
+                        OR ( "ID_ROHR_1" = ANY(%s) AND "ID_ROHR_2" = ANY(%s) )
+                    ''', (list(left_ids), list(right_ids), list(right_ids), list(left_ids)))
+                    rows = cur.fetchall()
+            except Exception:
+                return []
+            self._relations_cache[key] = rows
+        return rows
+
     def _draw_existing_relations(self):
         """
         Bestehende Verbindungen zeichnen und Liste EINMAL zentral neu aufbauen.
@@ -2418,17 +2355,7 @@ class LeerrohrVerbindenTool(QDialog):
             self._rebuild_list()
             return
 
-        try:
-            with psycopg2.connect(**self.db) as conn, conn.cursor() as cur:
-                cur.execute('''
-                    SELECT "ID_ROHR_1","ID_ROHR_2","STATUS"
-                    FROM lwl."LWL_Rohr_Rohr_rel"
-                    WHERE ( "ID_ROHR_1" = ANY(%s) AND "ID_ROHR_2" = ANY(%s) )
-                    OR ( "ID_ROHR_1" = ANY(%s) AND "ID_ROHR_2" = ANY(%s) )
-                ''', (list(left_ids), list(right_ids), list(right_ids), list(left_ids)))
-                rows = cur.fetchall()
-        except Exception:
-            rows = []
+        rows = self._existing_relation_rows(left_ids, right_ids)
 
         seen_pairs_this_call = set()
 
@@ -2869,16 +2796,13 @@ class LeerrohrVerbindenTool(QDialog):
         except Exception as e:
             raise RuntimeError(f'Virtueller Knoten konnte nicht angelegt werden: {e}')
 
-    def _ensure_virtual_nodes_for_splits(self, cur):
+    def _split_auftraege(self):
         """
-        Erzeugt – falls gesetzt – für left/right je einen virtuellen Knoten in der DB.
-        Übergibt zusätzlich POSITION (0..1) an den Insert.
+        Liest die gesetzten Splitpunkte (GUI-Thread): [(side, lr_id, x, y, srid, position), ...].
         """
         canvas = self.iface.mapCanvas()
         map_srid = canvas.mapSettings().destinationCrs().postgisSrid()
 
-        self.split_virtual_node_ids = {"left": None, "right": None}
-
         if not getattr(self, "sel_node_id", None):
             raise RuntimeError("Es ist kein Knoten gewählt. Ohne Knoten keine Verbindung und keine virtuellen Knoten.")
 
@@ -2893,6 +2817,7 @@ class LeerrohrVerbindenTool(QDialog):
                 return data
             return None
 
+        auftraege = []
         for side in ("left", "right"):
             pt = (self.split_points.get(side) if hasattr(self, "split_points") else None)
             if not pt:
@@ -2905,17 +2830,28 @@ class LeerrohrVerbindenTool(QDialog):
             pos01 = None
             if hasattr(self, "split_position"):
                 pos01 = self.split_position.get(side)
+            auftraege.append((side, lr_id, pt.x(), pt.y(), map_srid, pos01))
+        return auftraege
 
-            kid = self._db_create_virtual_node(
+    def _ensure_virtual_nodes_for_splits(self, cur, auftraege, common_knoten_id):
+        """
+        Erzeugt – falls gesetzt – für left/right je einen virtuellen Knoten in der DB.
+        Übergibt zusätzlich POSITION (0..1) an den Insert. ``auftraege`` wie von
+        ``_split_auftraege`` (vorab im GUI-Thread gelesen, läuft im Import-Task).
+        Rückgabe: {"left": knoten_id | None, "right": knoten_id | None}
+        """
+        knoten = {"left": None, "right": None}
+        for side, lr_id, x, y, srid, pos01 in auftraege:
+            knoten[side] = self._db_create_virtual_node(
                 cur=cur,
                 lr_id=lr_id,
-                map_x=pt.x(),
-                map_y=pt.y(),
-                map_srid=map_srid,
-                common_knoten_id=int(self.sel_node_id),
+                map_x=x,
+                map_y=y,
+                map_srid=srid,
+                common_knoten_id=int(common_knoten_id),
                 position=pos01
             )
-            self.split_virtual_node_ids[side] = kid
+        return knoten
 
     def _start_split_pick(self, side: int):
         """
@@ -3021,6 +2957,10 @@ class LeerrohrVerbindenTool(QDialog):
             self._status("Import: Es ist kein Knoten gewählt (ID_KNOTEN fehlt).", ok=False)
             return
 
+        if self.tasks.laeuft():
+            self._status("Import läuft bereits …", ok=False)
+            return
+
         # --- aktuelle Szene in Sets überführen ---
         current_pairs = set()      # {(rid_min,rid_max)}
         current_status = {}        # {(rid_min,rid_max): status_id}
@@ -3049,124 +2989,70 @@ class LeerrohrVerbindenTool(QDialog):
                         if current_status.get(p) != initial_status.get(p))
 
         try:
-            import psycopg2
-            with psycopg2.connect(**self.db) as conn:
-                conn.autocommit = False
-                with conn.cursor() as cur:
-                    user = self.settings.value("connection_username", "unknown")
-
-                    # Session als Verbinder kennzeichnen (wirkt nur innerhalb der Tx)
-                    cur.execute("SET LOCAL application_name = 'leerrohr_verbinder'")
-
-                    # --- NEU: virtuelle Knoten für gesetzte Splitpunkte erzeugen ---
-                    # (macht nichts, wenn keine Splitpunkte gesetzt sind)
-                    self._ensure_virtual_nodes_for_splits(cur)
-
-                    # --- DELETE (Rohr↔Rohr) ---
-                    del_cnt = 0
-                    for a, b in to_delete:
-                        cur.execute("""
-                            DELETE FROM lwl."LWL_Rohr_Rohr_rel"
-                            WHERE LEAST("ID_ROHR_1","ID_ROHR_2")=%s
-                            AND GREATEST("ID_ROHR_1","ID_ROHR_2")=%s
-                        """, (a, b))
-                        del_cnt += cur.rowcount
-
-                    # --- UPDATE (Rohr↔Rohr) ---
-                    upd_cnt = 0
-                    for a, b in to_update:
-                        sid = current_status[(a, b)]
-                        cur.execute("""
-                            UPDATE lwl."LWL_Rohr_Rohr_rel"
-                            SET "STATUS"=%s, "UPDATEUSER"=%s, "UPDATETIME"=now()
-                            WHERE ( "ID_ROHR_1"=%s AND "ID_ROHR_2"=%s )
-                            OR ( "ID_ROHR_1"=%s AND "ID_ROHR_2"=%s )
-                        """, (sid, user, a, b, b, a))
-                        upd_cnt += cur.rowcount
-
-                    # --- INSERT (Rohr↔Rohr) ---
-                    ins_cnt = 0
-
-                    # Map (rid_min,rid_max) -> (lr_left, lr_right)
-                    rid_to_lr = {}
-                    for entry in self.paired:
-                        ra, rb = entry.get("rid_left"), entry.get("rid_right")
-                        if not (isinstance(ra, int) and isinstance(rb, int)):
-                            continue
-                        pair = (min(ra, rb), max(ra, rb))
-                        rid_to_lr[pair] = (entry["left"].lr_id, entry["right"].lr_id)
-
-                    # IMMER: ID_KNOTEN = gewählter Knoten
-                    kn = int(self.sel_node_id)
-
-                    for a, b in to_insert:
-                        sid = current_status[(a, b)]
-                        cur.execute("""
-                            INSERT INTO lwl."LWL_Rohr_Rohr_rel"
-                            ("ID_ROHR_1","ID_ROHR_2","STATUS","CREATEUSER","CREATETIME","ID_KNOTEN")
-                            SELECT %s,%s,%s,%s,now(),%s
-                            WHERE NOT EXISTS (
-                            SELECT 1 FROM lwl."LWL_Rohr_Rohr_rel"
-                            WHERE (("ID_ROHR_1"=%s AND "ID_ROHR_2"=%s) OR ("ID_ROHR_1"=%s AND "ID_ROHR_2"=%s))
-                            )
-                        """, (a, b, sid, user, kn, a, b, b, a))
-                        ins_cnt += cur.rowcount
-
-                    # --- LR↔LR-Relation: Aggregat-Status je LR-Paar ---
-                    lr_pairs_all = set(lr_pairs_current.keys()) | set(initial_lr_pairs)
-                    for lr_left, lr_right in lr_pairs_all:
-                        cur.execute("""
-                            SELECT DISTINCT rel."STATUS"
-                            FROM lwl."LWL_Rohr_Rohr_rel" rel
-                            JOIN lwl."LWL_Rohr" a ON a.id = rel."ID_ROHR_1"
-                            JOIN lwl."LWL_Rohr" b ON b.id = rel."ID_ROHR_2"
-                            WHERE (a."ID_LEERROHR"=%s AND b."ID_LEERROHR"=%s)
-                            OR (a."ID_LEERROHR"=%s AND b."ID_LEERROHR"=%s)
-                        """, (lr_left, lr_right, lr_right, lr_left))
-                        st_list = [int(x[0]) for x in cur.fetchall()]
-
-                        if not st_list:
-                            cur.execute("""
-                                DELETE FROM lwl."LWL_Leerrohr_Leerrohr_rel"
-                                WHERE ( "ID_LEERROHR_1"=%s AND "ID_LEERROHR_2"=%s )
-                                OR ( "ID_LEERROHR_1"=%s AND "ID_LEERROHR_2"=%s )
-                            """, (lr_left, lr_right, lr_right, lr_left))
-                            continue
-
-                        agg = st_list[0] if all(s == st_list[0] for s in st_list) else min(st_list)
-
-                        # IMMER: ID_KNOTEN = gewählter Knoten
-                        cur.execute("""
-                            SELECT id FROM lwl."LWL_Leerrohr_Leerrohr_rel"
-                            WHERE ( "ID_LEERROHR_1"=%s AND "ID_LEERROHR_2"=%s )
-                            OR ( "ID_LEERROHR_1"=%s AND "ID_LEERROHR_2"=%s )
-                            LIMIT 1
-                        """, (lr_left, lr_right, lr_right, lr_left))
-                        row = cur.fetchone()
-                        if row:
-                            cur.execute("""
-                                UPDATE lwl."LWL_Leerrohr_Leerrohr_rel"
-                                SET "STATUS"=%s, "UPDATEUSER"=%s, "UPDATETIME"=now(),
-                                    "ID_KNOTEN"=%s
-                                WHERE id=%s
-                            """, (agg, user, kn, row[0]))
-                        else:
-                            cur.execute("""
-                                INSERT INTO lwl."LWL_Leerrohr_Leerrohr_rel"
-                                ("ID_LEERROHR_1","ID_LEERROHR_2","STATUS","VERBUND_TYP","CREATEUSER","CREATETIME","ID_KNOTEN")
-                                VALUES (%s,%s,%s,%s,%s,now(),%s)
-                            """, (lr_left, lr_right, agg, "standard", user, kn))
-
-                conn.commit()
-
-            # neuen Ausgangszustand setzen
-            self.loaded_pairs_initial = set(current_pairs)
-            self.loaded_status_by_pair = dict(current_status)
-            self.loaded_lr_pairs_initial = set(lr_pairs_current.keys())
-
-            self._status("Import/Update ok. (Virtuelle Knoten wurden – falls vorhanden – angelegt.)")
+            auftraege = self._split_auftraege()
         except Exception as e:
             self._status(f"Import fehlgeschlagen: {e}", ok=False)
+            return
+
+        self._status("Verbindungen werden gespeichert …")
+        self.tasks.starte(
+            "Verbindungen importieren", self._schreibe_verbindungen,
+            int(self.sel_node_id), self.settings.value("connection_username", "unknown"), auftraege,
+            to_insert, to_delete, to_update, current_status, lr_pairs_current, initial_lr_pairs,
+            pool=self.db_pool, schreiben=True,
+            on_ergebnis=lambda ergebnis: self._verbindungen_gespeichert(
+                ergebnis, current_pairs, current_status, lr_pairs_current),
+            on_fehler=lambda e: self._status(f"Import fehlgeschlagen: {e}", ok=False),
+            on_abbruch=lambda: self._status("Import abgebrochen – nichts geschrieben.", ok=False))
+
+    @measure_db("Verbindungen importieren")
+    def _schreibe_verbindungen(self, task, kn, user, auftraege, to_insert, to_delete, to_update, current_status,
+                               lr_pairs_current, initial_lr_pairs):
+        """
+        Im Hintergrund: schreibt das Delta in der Transaktion des Tasks (Commit durch den Task).
+        ``kn``: ID_KNOTEN (gewählter Knoten). Rückgabe: (virtuelle Knoten, betroffene LR-Paare).
+        """
+        cur = task.conn.cursor()
+
+        # Session als Verbinder kennzeichnen (wirkt nur innerhalb der Tx)
+        cur.execute("SET LOCAL application_name = 'leerrohr_verbinder'")
+
+        # --- NEU: virtuelle Knoten für gesetzte Splitpunkte erzeugen ---
+        # (macht nichts, wenn keine Splitpunkte gesetzt sind)
+        virtuelle_knoten = self._ensure_virtual_nodes_for_splits(cur, auftraege, kn)
+        task.pruefe_abbruch()
+
+        # --- Delta mengenbasiert schreiben (Rohr↔Rohr, danach LR↔LR-Aggregat) ---
+        lr_pairs_all = set(lr_pairs_current.keys()) | set(initial_lr_pairs)
+        schreibe_verbinder_delta(cur, kn, user, to_insert, to_delete, to_update, current_status, lr_pairs_all)
+        return virtuelle_knoten, lr_pairs_all
+
+    def _verbindungen_gespeichert(self, ergebnis, current_pairs, current_status, lr_pairs_current):
+        """Im GUI-Thread nach dem Commit: Rohrgraph nachführen und neuen Ausgangszustand setzen."""
+        virtuelle_knoten, lr_pairs_all = ergebnis
+        self.split_virtual_node_ids = virtuelle_knoten
+        if any(virtuelle_knoten.values()):
+            # per SQL angelegte virtuelle Knoten: kein Layer-Signal -> Locator neu aufbauen
+            invalidate_node_locator()
+
+        # Rohrgraph (Hauseinführung) für die betroffenen Leerrohre nachführen
+        graph = loaded_rohr_graph(self.db_pool)
+        if graph is not None:
+            try:
+                with self.db_pool.connection() as conn, conn.cursor() as cur:
+                    graph.refresh_relations(cur, {lr for pair in lr_pairs_all for lr in pair})
+            except Exception:
+                invalidate_rohr_graph(self.db_pool)
+
+        # Belegung ist ab jetzt veraltet (neue Schreib-Generation)
+        self._belegung_generation = getattr(self, "_belegung_generation", 0) + 1
+
+        # neuen Ausgangszustand setzen
+        self.loaded_pairs_initial = set(current_pairs)
+        self.loaded_status_by_pair = dict(current_status)
+        self.loaded_lr_pairs_initial = set(lr_pairs_current.keys())
+
+        self._status("Import/Update ok. (Virtuelle Knoten wurden – falls vorhanden – angelegt.)")
 
     def _on_mode_changed(self, *_):
         """Reaktiviert die Leerrohrlisten beim Umschalten parallel/lotrecht nach bestätigter Trassenauswahl."""
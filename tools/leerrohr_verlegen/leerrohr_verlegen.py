@@ -1,22 +1,34 @@
 import re  # Hinzufügen des Imports für reguläre Ausdrücke
 import logging
-from qgis.core import QgsVectorLayer, QgsFeature, QgsProject, QgsDataSourceUri, Qgis, QgsGeometry, QgsFeatureRequest, QgsMessageLog, QgsProviderRegistry
+from qgis.core import QgsVectorLayer, QgsFeature, QgsProject, QgsDataSourceUri, Qgis, QgsGeometry, QgsFeatureRequest, QgsMessageLog, QgsProviderRegistry, QgsSpatialIndex, QgsRectangle
 from qgis.gui import QgsMapToolEmitPoint, QgsHighlight
 from qgis.PyQt.QtCore import Qt, QDate, QSettings, QPointF, QTimer
 from qgis.PyQt.QtGui import QColor, QBrush, QPen, QFont, QPolygonF, QTextOption
 from qgis.PyQt.QtWidgets import QDialog, QDialogButtonBox, QCheckBox, QMessageBox, QGraphicsScene, QGraphicsEllipseItem, QListWidget, QGraphicsPolygonItem, QGraphicsRectItem, QGraphicsLineItem, QAbstractItemView, QGraphicsTextItem, QGraphicsItem, QListWidgetItem
 from .leerrohr_verlegen_dialog import Ui_LeerrohrVerlegungsToolDialogBase
+from ..common.db_pool import get_db_pool, measure_db
+from ..common.trassen_graph import get_trassen_graph, watch_trassen_layer
+from ..common.kabel_routing import invalidate_kabel_routing_graph
+from ..common.leerrohr_index import invalidate_leerrohr_index
+from ..common.rohr_graph import invalidate_rohr_graph
+from ..common.verbundnummer import get_verbundnummer_allocator
+from ..common.node_locator import get_node_locator
+from ..common.lookup_catalog import get_lookup_catalog
+from ..common.instrumentation import get_tool_logger, lazy, short, timed
+from ..common.task_runner import TaskRunner
 import psycopg2
+import psycopg2.extras
 import json
 import base64
 import datetime
 
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = get_tool_logger("leerrohr_verlegen")
 
 class LeerrohrVerlegenTool(QDialog):
     def __init__(self, iface, parent=None):
-        print("DEBUG: Tool initialisiert")
+        logger.debug("Tool initialisiert")
         super().__init__(parent)
         self.iface = iface
         self.ui = Ui_LeerrohrVerlegungsToolDialogBase()
@@ -45,6 +57,7 @@ class LeerrohrVerlegenTool(QDialog):
         self.zwischenknoten_highlight = None
         self.selected_leerrohr = None
         self.route_highlights = []
+        self.trassen_geometrie_cache = {}  # trassen_id -> QgsGeometry (pro Routing-Sitzung)
         self.leerrohr_highlight = None
 
         # Setup-Settings initialisieren
@@ -53,18 +66,25 @@ class LeerrohrVerlegenTool(QDialog):
         self.is_connected = False
         self.conn = None
         self.cur = None
+        self.db_pool = None
+        self.verbundnummern = None
 
         # Persistente Verbindung aus Setup-Tool übernehmen
         if hasattr(self.iface, 'plugin') and hasattr(self.iface.plugin, 'conn') and self.iface.plugin.conn:
             self.conn = self.iface.plugin.conn
             self.cur = self.conn.cursor()
             self.is_connected = True
-            print("DEBUG: Persistente DB-Verbindung aus Setup-Tool übernommen")
+            logger.debug("Persistente DB-Verbindung aus Setup-Tool übernommen")
             self.db_details = self.get_database_connection()
+            self.db_pool = get_db_pool(self.iface, self.db_details, self.settings.value("connection_umgebung", "Testumgebung"))
+            self.verbundnummern = get_verbundnummer_allocator(self.db_pool)
         else:
-            print("DEBUG: Keine persistente Verbindung aus Setup-Tool verfügbar")
+            logger.debug("Keine persistente Verbindung aus Setup-Tool verfügbar")
             self.iface.messageBar().pushMessage("Fehler", "Keine DB-Verbindung. Bitte Setup öffnen.", level=Qgis.Critical)
 
+        # Routing und Import laufen als QgsTask im Hintergrund
+        self.tasks = TaskRunner("Leerrohr verlegen")
+
         # Neue Ergänzung: Dictionary für Subtyp-Quantitäten
         self.subtyp_quantities = {}  # subtyp_id -> quantity (int, Default: 1)
 
@@ -118,7 +138,7 @@ class LeerrohrVerlegenTool(QDialog):
         # Speichert Routen nach path_id für Farben
         self.routes_by_path_id = {}
 
-        print(f"DEBUG: Initialer Status von Verbundnummer: {self.ui.comboBox_Verbundnummer.currentText()}, Enabled: {self.ui.comboBox_Verbundnummer.isEnabled()}")
+        logger.debug("Initialer Status von Verbundnummer: %s, Enabled: %s", self.ui.comboBox_Verbundnummer.currentText(), self.ui.comboBox_Verbundnummer.isEnabled())
         QgsMessageLog.logMessage(str(dir(self.ui)), "Leerrohr-Tool", level=Qgis.Info)
 
     class DuplicateButtonItem(QGraphicsTextItem):
@@ -139,7 +159,7 @@ class LeerrohrVerlegenTool(QDialog):
                     self.parent_tool.subtyp_quantities[self.subtyp_id] += 1
                 else:
                     self.parent_tool.subtyp_quantities[self.subtyp_id] = 2  # Start bei 2, da 1 schon da ist
-                print(f"DEBUG: Subtyp {self.subtyp_id} dupliziert – neue Anzahl: {self.parent_tool.subtyp_quantities[self.subtyp_id]}")
+                logger.debug("Subtyp %s dupliziert – neue Anzahl: %s", self.subtyp_id, self.parent_tool.subtyp_quantities[self.subtyp_id])
                 
                 # Asynchroner Update-Aufruf, um Crash zu vermeiden
                 QTimer.singleShot(0, self.parent_tool.update_selected_leerrohr_subtyp)
@@ -147,7 +167,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def load_setup_data(self):
         """Lädt Subtypen aus self.iface.plugin.active_setup und befüllt ListWidgets."""
-        print(f"DEBUG: Lade Subtypen aus active_setup: leerrohr_subtyp = {self.iface.plugin.active_setup.get('leerrohr_subtyp', [])}, leerrohr_subtyp_data = {self.iface.plugin.active_setup.get('leerrohr_subtyp_data', [])}")
+        logger.debug("Lade Subtypen aus active_setup: leerrohr_subtyp = %s, leerrohr_subtyp_data = %s", self.iface.plugin.active_setup.get('leerrohr_subtyp', []), self.iface.plugin.active_setup.get('leerrohr_subtyp_data', []))
         if not hasattr(self.iface, 'plugin') or not hasattr(self.iface.plugin, 'active_setup') or not self.iface.plugin.active_setup:
             self.iface.messageBar().pushMessage("Fehler", "Kein aktives Setup gefunden. Bitte konfigurieren Sie das Setup.", level=Qgis.Critical)
             QgsMessageLog.logMessage("Kein aktives Setup in iface.plugin.active_setup", "Leerrohr-Tool", Qgis.Critical)
@@ -196,41 +216,41 @@ class LeerrohrVerlegenTool(QDialog):
     def debug_check(self):
         """Prüft den Zugriff auf UI-Elemente für Debugging-Zwecke."""
         try:
-            print("Prüfe Zugriff auf 'label_gewaehlter_verteiler'")
+            logger.debug("Prüfe Zugriff auf 'label_gewaehlter_verteiler'")
             verteiler_id_text = self.ui.label_gewaehlter_verteiler.text()
-            print(f"'label_gewaehlter_verteiler' Text: {verteiler_id_text}")
+            logger.debug("'label_gewaehlter_verteiler' Text: %s", verteiler_id_text)
         except AttributeError as e:
-            print(f"Fehler bei 'label_gewaehlter_verteiler': {e}")
+            logger.warning("Fehler bei 'label_gewaehlter_verteiler': %s", e)
 
         try:
-            print("Prüfe Zugriff auf 'label_verlauf'")
+            logger.debug("Prüfe Zugriff auf 'label_verlauf'")
             verlauf_text = self.ui.label_verlauf.text()
-            print(f"'label_verlauf' Text: {verlauf_text}")
+            logger.debug("'label_verlauf' Text: %s", verlauf_text)
         except AttributeError as e:
-            print(f"Fehler bei 'label_verlauf': {e}")
+            logger.warning("Fehler bei 'label_verlauf': %s", e)
 
         try:
-            print("Prüfe Zugriff auf 'label_Pruefung'")
+            logger.debug("Prüfe Zugriff auf 'label_Pruefung'")
             pruefung_text = self.ui.label_Pruefung.text()
-            print(f"'label_Pruefung' Text: {pruefung_text}")
+            logger.debug("'label_Pruefung' Text: %s", pruefung_text)
         except AttributeError as e:
-            print(f"Fehler bei 'label_Pruefung': {e}")
+            logger.warning("Fehler bei 'label_Pruefung': %s", e)
 
         try:
-            print("Prüfe Zugriff auf 'label_Kommentar'")
+            logger.debug("Prüfe Zugriff auf 'label_Kommentar'")
             kommentar_text = self.ui.label_Kommentar.text()
-            print(f"'label_Kommentar' Text: {kommentar_text}")
+            logger.debug("'label_Kommentar' Text: %s", kommentar_text)
         except AttributeError as e:
-            print(f"Fehler bei 'label_Kommentar': {e}")
+            logger.warning("Fehler bei 'label_Kommentar': %s", e)
 
         try:
-            print("Prüfe Zugriff auf 'label_Kommentar_2'")
+            logger.debug("Prüfe Zugriff auf 'label_Kommentar_2'")
             beschreibung_text = self.ui.label_Kommentar_2.text()
-            print(f"'label_Kommentar_2' Text: {beschreibung_text}")
+            logger.debug("'label_Kommentar_2' Text: %s", beschreibung_text)
         except AttributeError as e:
-            print(f"Fehler bei 'label_Kommentar_2': {e}")
+            logger.warning("Fehler bei 'label_Kommentar_2': %s", e)
 
-        print("Debugging abgeschlossen.")
+        logger.debug("Debugging abgeschlossen.")
 
     def get_database_connection(self, username=None, password=None, umgebung=None):
         """Gibt die Verbindungsinformationen für psycopg2 zurück."""
@@ -267,34 +287,25 @@ class LeerrohrVerlegenTool(QDialog):
     def db_execute(self, query):
         """Führt eine SQL-Abfrage gegen die PostgreSQL-Datenbank aus und gibt das Ergebnis zurück."""
         try:
-            db_params = self.get_database_connection()
-            conn = psycopg2.connect(**db_params)
-            cur = conn.cursor()
-            print(f"DEBUG: Führe Query aus: {query}")
-            cur.execute(query)
-            result = cur.fetchall()
-            print(f"DEBUG: Ergebnis aus Datenbank: {result}")
-            conn.close()
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(query)
+                result = cur.fetchall()
+                logger.debug("db_execute: %d Zeilen – %s", len(result), lazy(lambda: short(result)))
             return result
         except psycopg2.Error as e:
-            print(f"DEBUG: PostgreSQL-Fehler bei SQL-Query: {e}")
-            print(f"DEBUG: Fehlgeschlagene Query: {query}")
+            logger.warning("PostgreSQL-Fehler bei SQL-Query: %s", e)
+            logger.debug("Fehlgeschlagene Query: %s", query)
             QgsMessageLog.logMessage(f"PostgreSQL-Fehler: {e}", "Leerrohr-Tool", level=Qgis.Critical)
-            if 'conn' in locals():
-                conn.close()
             return None
         except Exception as e:
-            print(f"DEBUG: Allgemeiner Fehler bei SQL-Query: {e}")
-            print(f"DEBUG: Fehlgeschlagene Query: {query}")
+            logger.warning("Allgemeiner Fehler bei SQL-Query: %s", e)
+            logger.debug("Fehlgeschlagene Query: %s", query)
             QgsMessageLog.logMessage(f"Allgemeiner Fehler: {e}", "Leerrohr-Tool", level=Qgis.Critical)
-            if 'conn' in locals():
-                conn.close()
             return None
 
+    @timed("Leerrohr verlegen: Auswahl aus Liste", logger)
     def handle_leerrohr_selection_from_list(self, item):
         """Handhabt die Auswahl eines Leerrohrs aus dem ListWidget."""
-        import time
-        start_time = time.time()
         if item:
             selected_feature = item.data(Qt.UserRole)
             if selected_feature:
@@ -304,16 +315,15 @@ class LeerrohrVerlegenTool(QDialog):
                 if layer:
                     layer = layer[0]
                 else:
-                    print(f"DEBUG: Layer {layer_name} nicht gefunden in Handler")
+                    logger.debug("Layer %s nicht gefunden in Handler", layer_name)
                     return
                 self.process_selected_leerrohr(selected_feature, is_abzweigung, layer)
                 # Optional: ListWidget nach Auswahl leeren
                 self.ui.listWidget_Leerrohr.clear()
-        print(f"DEBUG: Zeit für List-Auswahl-Handler: {time.time() - start_time:.2f} Sekunden")
 
     def handle_subtyp_selection(self):
         """Handhabt die Auswahl eines Subtyps, indem andere Subtypen abgewählt werden."""
-        print("DEBUG: Starte handle_subtyp_selection")
+        logger.debug("Starte handle_subtyp_selection")
         if self.ui.radioButton_Abzweigung.isChecked() or self.selected_leerrohr:
             # Im Abzweigungs- oder Update-Modus: Nur ein Subtyp erlaubt
             sender = self.sender()  # ListWidget, das das Signal ausgelöst hat
@@ -330,7 +340,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def update_verlegungsmodus(self):
         """Aktiviert oder deaktiviert Felder je nach Auswahl von Hauptstrang/Abzweigung."""
-        print("DEBUG: Starte update_verlegungsmodus")
+        logger.debug("Starte update_verlegungsmodus")
         if self.ui.radioButton_Abzweigung.isChecked():
             # Einfachauswahl für ListWidgets im Abzweigungsmodus
             self.ui.listWidget_Zubringerrohr.setSelectionMode(QAbstractItemView.SingleSelection)
@@ -403,7 +413,7 @@ class LeerrohrVerlegenTool(QDialog):
         
     def select_verteiler(self):
         """Aktiviert das Map-Tool zum Auswählen des ersten Knotens."""
-        print("DEBUG: Starte Auswahl des ersten Knotens")
+        logger.debug("Starte Auswahl des ersten Knotens")
         if self.ui.radioButton_Abzweigung.isChecked():
             self.ui.label_gewaehlter_verteiler.setText("Wählen Sie den Start der Abzweigung")
         else:
@@ -423,7 +433,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def abzweigung_start_selected(self, point):
         """Speichert den gewählten Startknoten der Abzweigung und validiert ihn."""
-        print("DEBUG: Starte Auswahl des ersten Knotens")
+        logger.debug("Starte Auswahl des ersten Knotens")
         layer_name = "LWL_Knoten"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -435,20 +445,11 @@ class LeerrohrVerlegenTool(QDialog):
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 50 * (map_scale / (39.37 * 96))
 
-        nearest_feature = None
-        nearest_distance = float("inf")
-
-        buffer = QgsGeometry.fromPointXY(point).buffer(threshold_distance, 8)
-        request = QgsFeatureRequest().setFilterRect(buffer.boundingBox())
-
-        for feature in layer.getFeatures(request):
-            distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_feature = feature
+        # Echter nächster Knoten über den räumlichen Index (NodeLocator)
+        nearest_hit = get_node_locator(layer).nearest(point, threshold_distance)
 
-        if nearest_feature and nearest_distance <= threshold_distance:
-            knot_id = nearest_feature["id"]
+        if nearest_hit:
+            knot_id = nearest_hit.id
             self.selected_verteiler = knot_id
 
             if self.ui.radioButton_Abzweigung.isChecked():
@@ -467,7 +468,7 @@ class LeerrohrVerlegenTool(QDialog):
 
                 trasse_ids_str = "{" + ",".join(str(int(id)) for id in parent_trasse_ids) + "}"
                 try:
-                    with psycopg2.connect(**self.db_details) as conn:
+                    with self.db_pool.connection() as conn:
                         with conn.cursor() as cur:
                             cur.execute("""
                                 SELECT COUNT(*) 
@@ -481,7 +482,7 @@ class LeerrohrVerlegenTool(QDialog):
                                 self.ui.label_gewaehlter_verteiler.setStyleSheet("background-color: lightgreen;")
                                 if hasattr(self, "verteiler_highlight_1") and self.verteiler_highlight_1:
                                     self.verteiler_highlight_1.hide()
-                                self.verteiler_highlight_1 = QgsHighlight(self.iface.mapCanvas(), nearest_feature.geometry(), layer)
+                                self.verteiler_highlight_1 = QgsHighlight(self.iface.mapCanvas(), nearest_hit.geometry, layer)
                                 self.verteiler_highlight_1.setColor(Qt.blue)
                                 self.verteiler_highlight_1.setWidth(5)
                                 self.verteiler_highlight_1.show()
@@ -515,10 +516,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def verteiler_selected(self, point):
         """Speichert den gewählten ersten Verteiler/Knoten in `selected_verteiler`."""
-        import time
-        start_time = time.time()
-
-        print("DEBUG: Starte Knotenauswahl (Verteiler 1)")
+        logger.debug("Starte Knotenauswahl (Verteiler 1)")
         layer_name = "LWL_Knoten"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -530,31 +528,18 @@ class LeerrohrVerlegenTool(QDialog):
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 10 * (map_scale / (39.37 * 96))
 
-        nearest_feature = None
-        nearest_distance = float("inf")
-
-        buffer = QgsGeometry.fromPointXY(point).buffer(threshold_distance, 8)
-        request = QgsFeatureRequest().setFilterRect(buffer.boundingBox())
-
-        for feature in layer.getFeatures(request):
-            if feature["TYP"] not in ["Verteilerkasten", "Schacht", "Ortszentrale", "Hilfsknoten"]:
-                continue
-            distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_feature = feature
-
-        print(f"DEBUG: Anzahl der Features im Filterbereich: {sum(1 for _ in layer.getFeatures(request))}")
-        print(f"DEBUG: Zeit für Knotenauswahl: {time.time() - start_time} Sekunden")
+        # Echter nächster Knoten über den räumlichen Index (NodeLocator)
+        with timed("Leerrohr verlegen: Knotenauswahl", logger):
+            nearest_hit = get_node_locator(layer).nearest(point, threshold_distance, ["Verteilerkasten", "Schacht", "Ortszentrale", "Hilfsknoten"])
 
-        if nearest_feature and nearest_distance <= threshold_distance:
-            verteiler_id = nearest_feature["id"]
+        if nearest_hit:
+            verteiler_id = nearest_hit.id
             self.selected_verteiler = verteiler_id
             self.ui.label_gewaehlter_verteiler.setText(f"Verteiler/Knoten ID: {verteiler_id}")
             self.ui.label_gewaehlter_verteiler.setStyleSheet("background-color: lightgreen;")
             if self.verteiler_highlight_1:
                 self.verteiler_highlight_1.hide()
-            self.verteiler_highlight_1 = QgsHighlight(self.iface.mapCanvas(), nearest_feature.geometry(), layer)
+            self.verteiler_highlight_1 = QgsHighlight(self.iface.mapCanvas(), nearest_hit.geometry, layer)
             self.verteiler_highlight_1.setColor(Qt.red)
             self.verteiler_highlight_1.setWidth(5)
             self.verteiler_highlight_1.show()
@@ -568,7 +553,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def select_verteiler_2(self):
         """Aktiviert das Map-Tool zum Auswählen des zweiten Knotens."""
-        print("DEBUG: Starte Auswahl des zweiten Knotens")
+        logger.debug("Starte Auswahl des zweiten Knotens")
         if self.ui.radioButton_Abzweigung.isChecked():
             self.ui.label_gewaehlter_verteiler_2.setText("Wählen Sie das Ende der Abzweigung")
         else:
@@ -597,24 +582,16 @@ class LeerrohrVerlegenTool(QDialog):
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 50 * (map_scale / (39.37 * 96))
 
-        nearest_feature = None
-        nearest_distance = float("inf")
-        buffer = QgsGeometry.fromPointXY(point).buffer(threshold_distance, 8)
-        request = QgsFeatureRequest().setFilterRect(buffer.boundingBox())
+        # Echter nächster Knoten über den räumlichen Index (NodeLocator)
+        nearest_hit = get_node_locator(layer).nearest(point, threshold_distance)
 
-        for feature in layer.getFeatures(request):
-            distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_feature = feature
-
-        if nearest_feature:
-            self.selected_verteiler_2 = nearest_feature["id"]
+        if nearest_hit:
+            self.selected_verteiler_2 = nearest_hit.id
             self.ui.label_gewaehlter_verteiler_2.setText(f"Ende Abzweigung ID: {self.selected_verteiler_2}")
             self.ui.label_gewaehlter_verteiler_2.setStyleSheet("background-color: lightgreen;")
             if hasattr(self, "verteiler_2_highlight") and self.verteiler_2_highlight:
                 self.verteiler_2_highlight.hide()
-            self.verteiler_2_highlight = QgsHighlight(self.iface.mapCanvas(), nearest_feature.geometry(), layer)
+            self.verteiler_2_highlight = QgsHighlight(self.iface.mapCanvas(), nearest_hit.geometry, layer)
             self.verteiler_2_highlight.setColor(Qt.blue)
             self.verteiler_2_highlight.setWidth(5)
             self.verteiler_2_highlight.show()
@@ -628,10 +605,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def verteiler_2_selected(self, point):
         """Speichert den gewählten zweiten Verteiler/Knoten in `selected_verteiler_2`."""
-        import time
-        start_time = time.time()
-
-        print("DEBUG: Starte Knotenauswahl (Verteiler 2)")
+        logger.debug("Starte Knotenauswahl (Verteiler 2)")
         layer_name = "LWL_Knoten"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -643,31 +617,18 @@ class LeerrohrVerlegenTool(QDialog):
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 10 * (map_scale / (39.37 * 96))
 
-        nearest_feature = None
-        nearest_distance = float("inf")
-
-        buffer = QgsGeometry.fromPointXY(point).buffer(threshold_distance, 8)
-        request = QgsFeatureRequest().setFilterRect(buffer.boundingBox())
-
-        for feature in layer.getFeatures(request):
-            if feature["TYP"] not in ["Verteilerkasten", "Schacht", "Ortszentrale", "Hilfsknoten"]:
-                continue
-            distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_feature = feature
-
-        print(f"DEBUG: Anzahl der Features im Filterbereich: {sum(1 for _ in layer.getFeatures(request))}")
-        print(f"DEBUG: Zeit für Knotenauswahl: {time.time() - start_time} Sekunden")
+        # Echter nächster Knoten über den räumlichen Index (NodeLocator)
+        with timed("Leerrohr verlegen: Knotenauswahl", logger):
+            nearest_hit = get_node_locator(layer).nearest(point, threshold_distance, ["Verteilerkasten", "Schacht", "Ortszentrale", "Hilfsknoten"])
 
-        if nearest_feature and nearest_distance <= threshold_distance:
-            verteiler_id = nearest_feature["id"]
+        if nearest_hit:
+            verteiler_id = nearest_hit.id
             self.selected_verteiler_2 = verteiler_id
             self.ui.label_gewaehlter_verteiler_2.setText(f"Verteiler/Knoten ID: {verteiler_id}")
             self.ui.label_gewaehlter_verteiler_2.setStyleSheet("background-color: lightgreen;")
             if self.verteiler_highlight_2:
                 self.verteiler_highlight_2.hide()
-            self.verteiler_highlight_2 = QgsHighlight(self.iface.mapCanvas(), nearest_feature.geometry(), layer)
+            self.verteiler_highlight_2 = QgsHighlight(self.iface.mapCanvas(), nearest_hit.geometry, layer)
             self.verteiler_highlight_2.setColor(Qt.red)
             self.verteiler_highlight_2.setWidth(5)
             self.verteiler_highlight_2.show()
@@ -681,7 +642,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def select_parent_leerrohr(self):
         """Aktiviert das Map-Tool zum Auswählen eines Parent-Leerrohrs."""
-        print("DEBUG: Starte Auswahl eines Parent-Leerrohrs")
+        logger.debug("Starte Auswahl eines Parent-Leerrohrs")
         self.ui.label_Parent_Leerrohr.clear()
         if self.map_tool:
             try:
@@ -694,10 +655,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def parent_leerrohr_selected(self, point):
         """Speichert das gewählte Parent-Leerrohr."""
-        import time
-        start_time = time.time()
-
-        print("DEBUG: Verarbeite Auswahl des Parent-Leerrohrs")
+        logger.debug("Verarbeite Auswahl des Parent-Leerrohrs")
         layer_name = "LWL_Leerrohr"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -753,7 +711,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def select_zwischenknoten(self):
         """Aktiviert das Map-Tool zum Auswählen eines Zwischenknotens."""
-        print("DEBUG: Starte Auswahl des Zwischenknotens")
+        logger.debug("Starte Auswahl des Zwischenknotens")
         self.ui.label_gewaehlter_zwischenknoten.setText("Wählen Sie den Zwischenknoten")
         self.ui.label_gewaehlter_zwischenknoten.setStyleSheet("background-color: gray;")
         if self.map_tool:
@@ -767,7 +725,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def zwischenknoten_selected(self, point):
         """Speichert den gewählten Zwischenknoten und validiert ihn."""
-        print("DEBUG: Verarbeite Auswahl des Zwischenknotens")
+        logger.debug("Verarbeite Auswahl des Zwischenknotens")
         layer_name = "LWL_Knoten"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -779,20 +737,11 @@ class LeerrohrVerlegenTool(QDialog):
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 10 * (map_scale / (39.37 * 96))
 
-        nearest_feature = None
-        nearest_distance = float("inf")
+        # Echter nächster Knoten über den räumlichen Index (NodeLocator)
+        nearest_hit = get_node_locator(layer).nearest(point, threshold_distance)
 
-        buffer = QgsGeometry.fromPointXY(point).buffer(threshold_distance, 8)
-        request = QgsFeatureRequest().setFilterRect(buffer.boundingBox())
-
-        for feature in layer.getFeatures(request):
-            distance = feature.geometry().distance(QgsGeometry.fromPointXY(point))
-            if distance < nearest_distance:
-                nearest_distance = distance
-                nearest_feature = feature
-
-        if nearest_feature and nearest_distance <= threshold_distance:
-            zwischenknoten_id = nearest_feature["id"]
+        if nearest_hit:
+            zwischenknoten_id = nearest_hit.id
             # Prüfen, ob der Zwischenknoten weder Start- noch Endknoten ist
             if zwischenknoten_id == self.selected_verteiler or zwischenknoten_id == self.selected_verteiler_2:
                 self.ui.label_gewaehlter_zwischenknoten.setText("Zwischenknoten darf nicht Start- oder Endknoten sein!")
@@ -807,7 +756,7 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.label_gewaehlter_zwischenknoten.setStyleSheet("background-color: lightgreen;")
             if self.zwischenknoten_highlight:
                 self.zwischenknoten_highlight.hide()
-            self.zwischenknoten_highlight = QgsHighlight(self.iface.mapCanvas(), nearest_feature.geometry(), layer)
+            self.zwischenknoten_highlight = QgsHighlight(self.iface.mapCanvas(), nearest_hit.geometry, layer)
             self.zwischenknoten_highlight.setColor(Qt.yellow)  # Gelb für Zwischenknoten
             self.zwischenknoten_highlight.setWidth(5)
             self.zwischenknoten_highlight.show()
@@ -822,7 +771,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def select_leerrohr(self):
         """Aktiviert das Map-Tool zum Auswählen eines bestehenden Leerrohrs oder einer Abzweigung."""
-        print("DEBUG: Starte Auswahl eines bestehenden Leerrohrs/Abzweigung")
+        logger.debug("Starte Auswahl eines bestehenden Leerrohrs/Abzweigung")
         if self.ui.radioButton_Abzweigung.isChecked():
             self.ui.label_gewaehltes_leerrohr.setText("Abzweigung auswählen")
         else:
@@ -839,14 +788,14 @@ class LeerrohrVerlegenTool(QDialog):
 
     def leerrohr_selected(self, point):
         """Speichert das gewählte Leerrohr oder die Abzweigung und hebt ihre Knoten hervor."""
-        print("DEBUG: Verarbeite Auswahl von Leerrohr/Abzweigung")
+        logger.debug("Verarbeite Auswahl von Leerrohr/Abzweigung")
         is_abzweigung = self.ui.radioButton_Abzweigung.isChecked()
         layer_name = "LWL_Leerrohr_Abzweigung" if is_abzweigung else "LWL_Leerrohr"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
             self.ui.label_gewaehltes_leerrohr.setText(f"Layer '{layer_name}' nicht gefunden")
             self.ui.label_gewaehltes_leerrohr.setStyleSheet("background-color: gray;")
-            print(f"DEBUG: Layer {layer_name} nicht gefunden")
+            logger.debug("Layer %s nicht gefunden", layer_name)
             self.ui.pushButton_update_leerrohr.setEnabled(False)
             # Setze ListWidgets zurück auf MultiSelection
             for list_widget in [self.ui.listWidget_Zubringerrohr, self.ui.listWidget_Hauptrohr, self.ui.listWidget_Multirohr]:
@@ -858,7 +807,7 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.listWidget_Leerrohr.clear()  # Neues Widget leeren
             return
         layer = layer[0]
-        print(f"DEBUG: Layer {layer_name} erfolgreich geladen")
+        logger.debug("Layer %s erfolgreich geladen", layer_name)
 
         map_scale = self.iface.mapCanvas().scale()
         threshold_distance = 4 * (map_scale / (39.37 * 96))  # Skalierter Radius: Bei Zoom 1:1000
@@ -902,10 +851,9 @@ class LeerrohrVerlegenTool(QDialog):
         self.iface.mapCanvas().unsetMapTool(self.map_tool)
         self.map_tool = None
 
+    @timed("Leerrohr verlegen: Leerrohr laden", logger)
     def process_selected_leerrohr(self, feature, is_abzweigung, layer):
         """Verarbeitet ein ausgewähltes Leerrohr-Feature und updated UI-Elemente."""
-        import time
-        start_time = time.time()
         leerrohr_id = feature.attribute("id")
         fields = feature.fields()
         if is_abzweigung:
@@ -960,20 +908,18 @@ class LeerrohrVerlegenTool(QDialog):
         self.ui.label_gewaehlter_verteiler_2.setText(f"Endknoten: {self.selected_verteiler_2}")
         self.ui.label_gewaehltes_leerrohr.setStyleSheet("background-color: lightgreen;")
         self.ui.label_gewaehlter_verteiler_2.setStyleSheet("background-color: lightgreen;")
-        print(f"DEBUG: Basis-Setup Zeit: {time.time() - start_time:.2f} Sekunden")
 
         # Layer refresh
         layer.dataProvider().reloadData()
-        print("DEBUG: Layer refreshed")
+        logger.debug("Layer refreshed")
 
         # DB-Abfragen
-        db_start = time.time()
         count_db = feature.attribute("COUNT") or 0
         status_db = feature.attribute("STATUS") or 1
         verbundnummer_db = str(feature.attribute("VERBUNDNUMMER") or "0") if not is_abzweigung else None
         typ_db = feature.attribute("TYP") or None
         try:
-            print(f"DEBUG: DB-Abfrage für ID: {leerrohr_id}, Layer-COUNT: {count_db}")
+            logger.debug("DB-Abfrage für ID: %s, Layer-COUNT: %s", leerrohr_id, count_db)
 
             if self.cur:
                 if is_abzweigung:
@@ -987,7 +933,7 @@ class LeerrohrVerlegenTool(QDialog):
                         typ_db, count_db_temp, status_db = result
                         count_db = int(count_db_temp or count_db)
                         status_db = int(status_db or status_db)
-                        print(f"DEBUG: DB Abzweigung - COUNT: {count_db}")
+                        logger.debug("DB Abzweigung - COUNT: %s", count_db)
                 else:
                     self.cur.execute("""
                         SELECT "TYP", "VERBUNDNUMMER", "COUNT", "STATUS"
@@ -1000,9 +946,9 @@ class LeerrohrVerlegenTool(QDialog):
                         verbundnummer_db = str(verbundnummer_db_temp or verbundnummer_db)
                         count_db = int(count_db_temp or count_db)
                         status_db = int(status_db or status_db)
-                        print(f"DEBUG: DB Leerrohr - COUNT: {count_db}, Verbund: {verbundnummer_db}")
+                        logger.debug("DB Leerrohr - COUNT: %s, Verbund: %s", count_db, verbundnummer_db)
         except Exception as e:
-            print(f"DEBUG: DB-Error: {e} – Verwende Layer-Fallback")
+            logger.warning("DB-Error: %s – Verwende Layer-Fallback", e)
 
         # ComboBox-Ver bundnummer
         self.ui.comboBox_Verbundnummer.clear()
@@ -1021,13 +967,11 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.comboBox_Countwert.addItem(str(count_value))
         self.ui.comboBox_Countwert.setCurrentText(str(count_db))
         self.ui.comboBox_Countwert.setEnabled(True)
-        print(f"DEBUG: COUNT gesetzt: {count_db}")
+        logger.debug("COUNT gesetzt: %s", count_db)
 
         # Status
         self.populate_status(status_db)
 
-        print(f"DEBUG: DB-Zeit: {time.time() - db_start:.2f} Sekunden")
-
         # UI-Updates
         self.ui.checkBox_Foerderung.setChecked(self.selected_leerrohr.get("GEFOERDERT", False))
         self.ui.checkBox_Subduct.setChecked(self.selected_leerrohr.get("SUBDUCT", False))
@@ -1043,7 +987,7 @@ class LeerrohrVerlegenTool(QDialog):
             else:
                 self.ui.mDateTimeEdit_Strecke.setDate(QDate.currentDate())
         except Exception as e:
-            print(f"DEBUG: Datum-Error: {e}")
+            logger.warning("Datum-Error: %s", e)
             self.ui.mDateTimeEdit_Strecke.setDate(QDate.currentDate())
 
         # Subtyp-Auswahl
@@ -1098,7 +1042,7 @@ class LeerrohrVerlegenTool(QDialog):
         # KEIN Setzen von Update-Button hier – nur in pruefe_daten
         self.ui.pushButton_update_leerrohr.setEnabled(False)
         self.ui.pushButton_Import.setEnabled(False)
-        print("DEBUG: Buttons deaktiviert – Update nur nach Prüfung")
+        logger.debug("Buttons deaktiviert – Update nur nach Prüfung")
 
     def get_leerrohr_details_text(self, feature):
         """Erzeugt den Text für das ListWidget-Item aus dem Feature."""
@@ -1114,37 +1058,34 @@ class LeerrohrVerlegenTool(QDialog):
     
     def populate_status(self, current_status_id=None):
         """Füllt das comboBox_Status mit Werten aus LUT_Status und setzt den aktuellen Status."""
-        print("DEBUG: Starte populate_status")
+        logger.debug("Starte populate_status")
         self.ui.comboBox_Status.clear()
         try:
-            with psycopg2.connect(**self.db_details) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT "id", "STATUS"
-                        FROM lwl."LUT_Status"
-                        ORDER BY "id"
-                    """)
-                    status_options = cur.fetchall()
-                    for status_id, status_text in status_options:
-                        self.ui.comboBox_Status.addItem(status_text, status_id)
-                    if current_status_id is not None:
-                        index = self.ui.comboBox_Status.findData(current_status_id)
-                        if index != -1:
-                            self.ui.comboBox_Status.setCurrentIndex(index)
-                            print(f"DEBUG: STATUS gesetzt auf: {status_text} (ID: {current_status_id})")
-                        else:
-                            print(f"DEBUG: Kein passender STATUS für ID {current_status_id} gefunden, setze auf ersten Wert")
-                            self.ui.comboBox_Status.setCurrentIndex(0)
-                    else:
-                        self.ui.comboBox_Status.setCurrentIndex(0)  # Fallback auf ersten Wert
+            status_options = get_lookup_catalog(self.db_pool).status_options()
+            for status_id, status_text in status_options:
+                self.ui.comboBox_Status.addItem(status_text, status_id)
+            if current_status_id is not None:
+                index = self.ui.comboBox_Status.findData(current_status_id)
+                if index != -1:
+                    self.ui.comboBox_Status.setCurrentIndex(index)
+                    logger.debug("STATUS gesetzt auf: %s (ID: %s)", status_text, current_status_id)
+                else:
+                    logger.debug("Kein passender STATUS für ID %s gefunden, setze auf ersten Wert", current_status_id)
+                    self.ui.comboBox_Status.setCurrentIndex(0)
+            else:
+                self.ui.comboBox_Status.setCurrentIndex(0)  # Fallback auf ersten Wert
         except Exception as e:
-            print(f"DEBUG: Fehler beim Laden der Status-Werte: {e}")
+            logger.warning("Fehler beim Laden der Status-Werte: %s", e)
             self.ui.comboBox_Status.addItem("Fehler beim Laden")
             self.ui.comboBox_Status.setCurrentIndex(0)
 
     def start_routing(self):
-        """Startet das Routing und hebt bis zu 3 berechnete Routen hervor, berücksichtigt optional einen Zwischenknoten im Hauptstrangmodus."""
-        print(f"DEBUG: Starte Routing – selected_verteiler: {self.selected_verteiler}, selected_zwischenknoten: {self.selected_zwischenknoten}, selected_verteiler_2: {self.selected_verteiler_2}")
+        """
+        Prüft die gewählten Knoten und startet die Routensuche im Hintergrund
+        (``_berechne_routen``); bis zu 3 Routen werden danach hervorgehoben.
+        Berücksichtigt optional einen Zwischenknoten im Hauptstrangmodus.
+        """
+        logger.debug("Starte Routing – selected_verteiler: %s, selected_zwischenknoten: %s, selected_verteiler_2: %s", self.selected_verteiler, self.selected_zwischenknoten, self.selected_verteiler_2)
         
         # Lösche bestehende Highlights
         if self.route_highlights:
@@ -1154,6 +1095,7 @@ class LeerrohrVerlegenTool(QDialog):
         self.selected_trasse_ids = []
         self.selected_trasse_ids_flat = []
         self.routes_by_path_id = {}
+        self.trassen_geometrie_cache = {}
 
         is_abzweigung = self.ui.radioButton_Abzweigung.isChecked()
         if is_abzweigung:
@@ -1170,7 +1112,7 @@ class LeerrohrVerlegenTool(QDialog):
                 return
             trassen_ids = self.selected_parent_leerrohr["ID_TRASSE"]
             try:
-                with psycopg2.connect(**self.db_details) as conn:
+                with self.db_pool.connection() as conn:
                     with conn.cursor() as cur:
                         cur.execute("""
                             SELECT COUNT(*) 
@@ -1214,7 +1156,7 @@ class LeerrohrVerlegenTool(QDialog):
                         self.zwischenknoten_highlight = None
                     return
             try:
-                with psycopg2.connect(**self.db_details) as conn:
+                with self.db_pool.connection() as conn:
                     with conn.cursor() as cur:
                         cur.execute("SELECT \"TYP\" FROM lwl.\"LWL_Knoten\" WHERE id = %s", (start_id,))
                         typ = cur.fetchone()
@@ -1246,111 +1188,43 @@ class LeerrohrVerlegenTool(QDialog):
             self._set_status("Knoten-IDs müssen Zahlen sein!", error=True)
             return
 
-        routes = {}
-        if is_abzweigung:
-            trassen_ids = list(self.selected_parent_leerrohr["ID_TRASSE"])
-            sql = """
-                SELECT seq, path_id, edge AS trasse_id
-                FROM pgr_ksp(
-                    'SELECT id, "VONKNOTEN" AS source, "NACHKNOTEN" AS target, "LAENGE" AS cost 
-                    FROM lwl."LWL_Trasse" 
-                    WHERE "LAENGE" IS NOT NULL AND "LAENGE" > 0 
-                    AND id != ALL(%s)',
-                    %s, %s,
-                    3,
-                    false
-                )
-            """
-            params = (trassen_ids, start_id, end_id)
-            try:
-                with psycopg2.connect(**self.db_details) as conn:
-                    with conn.cursor() as cur:
-                        cur.execute(sql, params)
-                        result = cur.fetchall()
-            except Exception as e:
-                self._set_status(f"Datenbankfehler: {e}", error=True)
-                return
-            for seq, path_id, trasse_id in result:
-                if path_id not in routes:
-                    routes[path_id] = []
-                if trasse_id is not None and trasse_id != -1:
-                    routes[path_id].append(trasse_id)
+        trasse_layer = QgsProject.instance().mapLayersByName("LWL_Trasse")
+        if trasse_layer:
+            watch_trassen_layer(trasse_layer[0], self.db_pool)
+
+        # Trassen des Parent-Leerrohrs werden bei der Abzweigung ausgeschlossen
+        excluded = set(int(t) for t in self.selected_parent_leerrohr["ID_TRASSE"]) if is_abzweigung else None
+        via = [zwischenknoten_id] if not is_abzweigung and zwischenknoten_id else []
+        self._set_status("Route wird berechnet … (Abbruch über die QGIS-Statusleiste)")
+        self.tasks.starte(
+            "Route berechnen", self._berechne_routen, start_id, end_id, via, excluded,
+            schluessel="routing",
+            on_ergebnis=self._routen_berechnet,
+            on_fehler=lambda e: self._set_status(f"Fehler bei der Routenberechnung: {e}", error=True),
+            on_abbruch=lambda: self._set_status("Routenberechnung abgebrochen.", error=True))
+
+    @measure_db("Route berechnen")
+    def _berechne_routen(self, task, start_id, end_id, via, excluded):
+        """Im Hintergrund: Routing lokal im gecachten Trassengraphen (Yen, entspricht pgr_ksp ungerichtet)."""
+        # fester Stand: Layer-Änderungen im GUI-Thread ersetzen den Graphen, ändern ihn nicht
+        graph = get_trassen_graph(self.db_pool).snapshot()
+        task.fortschritt(20)
+        if excluded is not None:
+            # Abzweigung: zusätzlich Trassen ohne Länge ausschließen
+            result = graph.k_shortest_paths(start_id, end_id, 3, excluded_edges=excluded | graph.non_positive_edges(),
+                                            abbruch=task.isCanceled)
+        elif via:
+            # Via-Routing: die 3 günstigsten schleifenfreien Routen über den Zwischenknoten,
+            # keine Trasse doppelt, nach Gesamtlänge sortiert
+            result = graph.k_shortest_paths_via(start_id, via, end_id, 3, abbruch=task.isCanceled)
         else:
-            if zwischenknoten_id:
-                # Routing in zwei Schritten: Start -> Zwischenknoten, Zwischenknoten -> Ende
-                routes_step1 = {}
-                routes_step2 = {}
-                sql = """
-                    SELECT seq, path_id, edge AS trasse_id
-                    FROM pgr_ksp(
-                        'SELECT id, "VONKNOTEN" AS source, "NACHKNOTEN" AS target, "LAENGE" AS cost 
-                        FROM lwl."LWL_Trasse"',
-                        %s, %s,
-                        3,
-                        false
-                    )
-                """
-                # Schritt 1: Start -> Zwischenknoten
-                try:
-                    with psycopg2.connect(**self.db_details) as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql, (start_id, zwischenknoten_id))
-                            result = cur.fetchall()
-                    for seq, path_id, trasse_id in result:
-                        if path_id not in routes_step1:
-                            routes_step1[path_id] = []
-                        if trasse_id is not None and trasse_id != -1:
-                            routes_step1[path_id].append(trasse_id)
-                except Exception as e:
-                    self._set_status(f"Datenbankfehler (Start -> Zwischenknoten): {e}", error=True)
-                    return
-                # Schritt 2: Zwischenknoten -> Ende
-                try:
-                    with psycopg2.connect(**self.db_details) as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql, (zwischenknoten_id, end_id))
-                            result = cur.fetchall()
-                    for seq, path_id, trasse_id in result:
-                        if path_id not in routes_step2:
-                            routes_step2[path_id] = []
-                        if trasse_id is not None and trasse_id != -1:
-                            routes_step2[path_id].append(trasse_id)
-                except Exception as e:
-                    self._set_status(f"Datenbankfehler (Zwischenknoten -> Ende): {e}", error=True)
-                    return
-                # Kombiniere die Routen
-                for path_id1 in routes_step1:
-                    for path_id2 in routes_step2:
-                        combined_path_id = len(routes) + 1
-                        if combined_path_id <= 3:  # Begrenze auf 3 kombinierte Routen
-                            routes[combined_path_id] = routes_step1[path_id1] + routes_step2[path_id2]
-            else:
-                # Standard-Routing ohne Zwischenknoten
-                sql = """
-                    SELECT seq, path_id, edge AS trasse_id
-                    FROM pgr_ksp(
-                        'SELECT id, "VONKNOTEN" AS source, "NACHKNOTEN" AS target, "LAENGE" AS cost 
-                        FROM lwl."LWL_Trasse"',
-                        %s, %s,
-                        3,
-                        false
-                    )
-                """
-                params = (start_id, end_id)
-                try:
-                    with psycopg2.connect(**self.db_details) as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql, params)
-                            result = cur.fetchall()
-                    for seq, path_id, trasse_id in result:
-                        if path_id not in routes:
-                            routes[path_id] = []
-                        if trasse_id is not None and trasse_id != -1:
-                            routes[path_id].append(trasse_id)
-                except Exception as e:
-                    self._set_status(f"Datenbankfehler: {e}", error=True)
-                    return
+            # Standard-Routing ohne Zwischenknoten
+            result = graph.k_shortest_paths(start_id, end_id, 3, abbruch=task.isCanceled)
+        task.pruefe_abbruch()
+        return {i + 1: trassen for i, (_, trassen) in enumerate(result)}
 
+    def _routen_berechnet(self, routes):
+        """Im GUI-Thread: Routen übernehmen und hervorheben."""
         if not routes:
             self._set_status("Kein Pfad gefunden! Möglicherweise gibt es keine Route.", error=True)
             return
@@ -1373,11 +1247,11 @@ class LeerrohrVerlegenTool(QDialog):
         text_color = "white" if error else "black"
         self.ui.label_Status.setText(text)
         self.ui.label_Status.setStyleSheet(f"background-color: {color}; color: {text_color}; font-weight: bold; padding: 5px;")
-        print(f"DEBUG: Status gesetzt: {text}")
+        logger.debug("Status gesetzt: %s", text)
 
     def highlight_multiple_routes(self, routes):
         """Hebt eine oder mehrere Routen in unterschiedlichen Farben in QGIS hervor."""
-        print(f"DEBUG: Anzahl der Routen zum Highlighten: {len(routes)}")
+        logger.debug("Anzahl der Routen zum Highlighten: %s", len(routes))
         if self.route_highlights:
             for highlight in self.route_highlights:
                 highlight.setVisible(False)
@@ -1385,71 +1259,97 @@ class LeerrohrVerlegenTool(QDialog):
 
         layer_list = QgsProject.instance().mapLayersByName("LWL_Trasse")
         if not layer_list:
-            print("⚠ Fehler: Der Layer 'LWL_Trasse' wurde nicht gefunden!")
+            logger.warning("Fehler: Der Layer 'LWL_Trasse' wurde nicht gefunden!")
             return
 
         trasse_layer = layer_list[0]
-        if len(routes) == 1:
-            color = QColor(255, 0, 0, 150)
-            for trassen_id in routes[0]:
-                request = QgsFeatureRequest().setFilterExpression(f'"id" = {trassen_id}')
-                for feature in trasse_layer.getFeatures(request):
-                    highlight = QgsHighlight(self.iface.mapCanvas(), feature.geometry(), trasse_layer)
-                    highlight.setColor(color)
-                    highlight.setWidth(10)
-                    highlight.show()
-                    self.route_highlights.append(highlight)
-        else:
-            colors = [QColor(255, 0, 0, 150), QColor(0, 0, 255, 150), QColor(0, 255, 0, 150)]
-            for i, route in enumerate(routes):
-                for trassen_id in route:
-                    request = QgsFeatureRequest().setFilterExpression(f'"id" = {trassen_id}')
-                    for feature in trasse_layer.getFeatures(request):
-                        highlight = QgsHighlight(self.iface.mapCanvas(), feature.geometry(), trasse_layer)
-                        highlight.setColor(colors[i % len(colors)])
-                        highlight.setWidth(10)
-                        highlight.show()
-                        self.route_highlights.append(highlight)
-
-        print(f"DEBUG: {len(self.route_highlights)} Highlights gesetzt")
+        # Alle Trassen aller Routen mit einer Abfrage laden
+        self._fetch_trassen_geometries({tid for route in routes for tid in route})
+        colors = [QColor(255, 0, 0, 150), QColor(0, 0, 255, 150), QColor(0, 255, 0, 150)]
+        for i, route in enumerate(routes):
+            self._add_route_highlight(route, colors[i % len(colors)], trasse_layer)
+
+        logger.debug("%s Highlights gesetzt", len(self.route_highlights))
+
+    def _add_route_highlight(self, route, color, trasse_layer):
+        """Ein QgsHighlight pro Route aus der zusammengefassten Multi-Linie."""
+        geometries = [g for g in (self.trassen_geometrie_cache.get(tid) for tid in route) if g is not None]
+        if not geometries:
+            return
+        highlight = QgsHighlight(self.iface.mapCanvas(), QgsGeometry.collectGeometry(geometries), trasse_layer)
+        highlight.setColor(color)
+        highlight.setWidth(10)
+        highlight.show()
+        self.route_highlights.append(highlight)
 
     def activate_route_selection(self):
         """Aktiviert das MapTool zur Routenauswahl."""
-        print("DEBUG: Aktiviere MapTool zur Routenauswahl")
+        logger.debug("Aktiviere MapTool zur Routenauswahl")
 
         class RouteSelectionTool(QgsMapToolEmitPoint):
+            # Klick-Toleranz in Karteneinheiten (wie bisher: Abstand < 1)
+            TOLERANZ = 1.0
+
             def __init__(self, tool):
                 self.tool = tool
                 super().__init__(tool.iface.mapCanvas())
                 self.routes_by_path_id = tool.routes_by_path_id
+                # Räumlicher Index nur über die Trassen der angebotenen Routen
+                self.geometries = tool._fetch_trassen_geometries(
+                    {tid for route in self.routes_by_path_id.values() for tid in route})
+                self.index = QgsSpatialIndex()
+                for trassen_id, geom in self.geometries.items():
+                    self.index.addFeature(trassen_id, geom.boundingBox())
+
+            def _trasse_at(self, point):
+                """Nächstgelegene Routen-Trasse innerhalb der Toleranz (oder None)."""
+                rect = QgsRectangle(point.x() - self.TOLERANZ, point.y() - self.TOLERANZ,
+                                    point.x() + self.TOLERANZ, point.y() + self.TOLERANZ)
+                point_geom = QgsGeometry.fromPointXY(point)
+                best_id, best_dist = None, self.TOLERANZ
+                for trassen_id in self.index.intersects(rect):
+                    dist = self.geometries[trassen_id].distance(point_geom)
+                    if dist < best_dist:
+                        best_id, best_dist = trassen_id, dist
+                return best_id
 
             def canvasReleaseEvent(self, event):
-                point = event.mapPoint()
-                layer = QgsProject.instance().mapLayersByName("LWL_Trasse")[0]
-                for feature in layer.getFeatures():
-                    if feature.geometry().distance(QgsGeometry.fromPointXY(point)) < 1:
-                        trassen_id = feature["id"]
-                        for path_id, route in self.routes_by_path_id.items():
-                            if trassen_id in route:
-                                self.tool.selected_trasse_ids = [route]
-                                self.tool.selected_trasse_ids_flat = route
-                                self.tool.highlight_selected_route()
-                                self.tool.iface.mapCanvas().unsetMapTool(self)
-                                self.tool.ui.label_Status.setText(f"Route {path_id} ausgewählt – Import möglich!")
-                                self.tool.ui.label_Status.setStyleSheet("background-color: lightgreen; color: black; font-weight: bold; padding: 5px;")
-                                print(f"DEBUG: Gewählte Route: {self.tool.selected_trasse_ids_flat}")
-                                self.tool.update_route_view_selection()
-                                return
-                        break
+                trassen_id = self._trasse_at(event.mapPoint())
+                if trassen_id is not None:
+                    for path_id, route in self.routes_by_path_id.items():
+                        if trassen_id in route:
+                            self.tool.selected_trasse_ids = [route]
+                            self.tool.selected_trasse_ids_flat = route
+                            self.tool.highlight_selected_route()
+                            self.tool.iface.mapCanvas().unsetMapTool(self)
+                            self.tool.ui.label_Status.setText(f"Route {path_id} ausgewählt – Import möglich!")
+                            self.tool.ui.label_Status.setStyleSheet("background-color: lightgreen; color: black; font-weight: bold; padding: 5px;")
+                            logger.debug("Gewählte Route: %s", self.tool.selected_trasse_ids_flat)
+                            self.tool.update_route_view_selection()
+                            return
                 self.tool.ui.label_Status.setText("Kein gültiger Pfad ausgewählt!")
                 self.tool.ui.label_Status.setStyleSheet("background-color: lightcoral; color: white; font-weight: bold; padding: 5px;")
 
         self.map_tool = RouteSelectionTool(self)
         self.iface.mapCanvas().setMapTool(self.map_tool)
 
+    def _fetch_trassen_geometries(self, trassen_ids):
+        """
+        Liefert {trassen_id: QgsGeometry}. Fehlende Trassen werden mit einer
+        Abfrage ("id" IN (...)) nachgeladen und für die Routing-Sitzung gecacht.
+        """
+        ids = {int(t) for t in trassen_ids}
+        missing = sorted(ids - self.trassen_geometrie_cache.keys())
+        layer_list = QgsProject.instance().mapLayersByName("LWL_Trasse")
+        if missing and layer_list:
+            request = QgsFeatureRequest().setFilterExpression(f'"id" IN ({",".join(map(str, missing))})')
+            for feature in layer_list[0].getFeatures(request):
+                self.trassen_geometrie_cache[feature["id"]] = QgsGeometry(feature.geometry())
+        return {tid: self.trassen_geometrie_cache[tid] for tid in ids if tid in self.trassen_geometrie_cache}
+
     def highlight_selected_route(self):
         """Hebt die ausgewählte Route hervor."""
-        print(f"DEBUG: Hebe ausgewählte Route hervor – selected_trasse_ids: {self.selected_trasse_ids}")
+        logger.debug("Hebe ausgewählte Route hervor – selected_trasse_ids: %s", self.selected_trasse_ids)
         if self.route_highlights:
             for highlight in self.route_highlights:
                 highlight.setVisible(False)
@@ -1457,7 +1357,7 @@ class LeerrohrVerlegenTool(QDialog):
 
         layer_list = QgsProject.instance().mapLayersByName("LWL_Trasse")
         if not layer_list:
-            print("⚠ Fehler: Der Layer 'LWL_Trasse' wurde nicht gefunden!")
+            logger.warning("Fehler: Der Layer 'LWL_Trasse' wurde nicht gefunden!")
             return
 
         trasse_layer = layer_list[0]
@@ -1471,20 +1371,14 @@ class LeerrohrVerlegenTool(QDialog):
             path_id = 1
         color = colors.get(path_id, QColor(255, 0, 0, 150))
 
-        for trassen_id in self.selected_trasse_ids[0]:
-            request = QgsFeatureRequest().setFilterExpression(f'"id" = {trassen_id}')
-            for feature in trasse_layer.getFeatures(request):
-                highlight = QgsHighlight(self.iface.mapCanvas(), feature.geometry(), trasse_layer)
-                highlight.setColor(color)
-                highlight.setWidth(10)
-                highlight.show()
-                self.route_highlights.append(highlight)
+        self._fetch_trassen_geometries(self.selected_trasse_ids[0])
+        self._add_route_highlight(self.selected_trasse_ids[0], color, trasse_layer)
 
         self.update_route_view_selection()
 
     def update_route_view(self):
         """Aktualisiert die Darstellung der Routen im graphicsView_Auswahl_Route."""
-        print("DEBUG: Starte update_route_view")
+        logger.debug("Starte update_route_view")
         
         # Lösche die bestehende Szene im graphicsView_Auswahl_Route
         if self.ui.graphicsView_Auswahl_Route.scene():
@@ -1542,7 +1436,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def route_rect_clicked(self, path_id):
         """Wird aufgerufen, wenn ein Route-Viereck geklickt wird."""
-        print(f"DEBUG: Route {path_id} im Route-View geklickt")
+        logger.debug("Route %s im Route-View geklickt", path_id)
         self.selected_trasse_ids = [self.routes_by_path_id[path_id]]
         self.selected_trasse_ids_flat = self.routes_by_path_id[path_id]
         self.highlight_selected_route()
@@ -1550,7 +1444,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def update_route_view_selection(self):
         """Aktualisiert die Darstellung im Route-View basierend auf der ausgewählten Route."""
-        print("DEBUG: Starte update_route_view_selection")
+        logger.debug("Starte update_route_view_selection")
         selected_path_id = None
         for pid, route in self.routes_by_path_id.items():
             if route == self.selected_trasse_ids[0]:
@@ -1574,7 +1468,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def populate_verbundnummer(self):
         """Setzt die Verbundnummer basierend auf den ausgewählten Subtypen."""
-        print("DEBUG: Starte populate_verbundnummer")
+        logger.debug("Starte populate_verbundnummer")
         self.ui.comboBox_Verbundnummer.clear()
         selected_subtyp_ids = []
         is_multirohr = False
@@ -1593,105 +1487,67 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.comboBox_Verbundnummer.addItem("Deaktiviert")
             self.ui.comboBox_Verbundnummer.setCurrentIndex(0)
             self.ui.comboBox_Verbundnummer.setEnabled(False)
-            print("DEBUG: Kein Multirohr ausgewählt, Verbundnummer auf 'Deaktiviert' gesetzt")
+            logger.debug("Kein Multirohr ausgewählt, Verbundnummer auf 'Deaktiviert' gesetzt")
             return
 
         self.ui.comboBox_Verbundnummer.setEnabled(True)
         try:
-            with psycopg2.connect(**self.db_details) as conn:
-                with conn.cursor() as cur:
-                    # Wenn ein Leerrohr ausgewählt ist, dessen Verbundnummer berücksichtigen
-                    exclude_id = self.selected_leerrohr["id"] if self.selected_leerrohr else None
-                    verbundnummer_db = str(self.selected_leerrohr["VERBUNDNUMMER"]) if self.selected_leerrohr and self.selected_leerrohr["VERBUNDNUMMER"] is not None else None
-                    print(f"DEBUG: Ausgewähltes Leerrohr ID: {exclude_id}, Verbundnummer: {verbundnummer_db}")
-
-                    # Ermittle verwendete Verbundnummern basierend auf VKG_LR (Startknoten)
-                    startknoten = self.selected_verteiler if self.selected_verteiler else None
-                    if startknoten:
-                        if exclude_id:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND %s::bigint = ANY("VKG_LR")
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                                AND "id" != %s
-                            """, (startknoten, exclude_id))
-                        else:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND %s::bigint = ANY("VKG_LR")
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                            """, (startknoten,))
-                    else:
-                        # Fallback, wenn kein Startknoten ausgewählt ist
-                        if exclude_id:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                                AND "id" != %s
-                            """, (exclude_id,))
-                        else:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                            """)
-
-                    verwendete_nummern = {int(row[0]) for row in cur.fetchall() if row[0] is not None}
-                    max_nummer = max(verwendete_nummern, default=0)
-                    print(f"DEBUG: Verwendete Verbundnummern: {verwendete_nummern}, Max Nummer: {max_nummer}")
-
-                    # Fülle das Dropdown mit verfügbaren Verbundnummern
-                    freie_nummern = []
-                    for nummer in range(1, max_nummer + 11):
-                        self.ui.comboBox_Verbundnummer.addItem(str(nummer))
-                        if nummer in verwendete_nummern:
-                            index = self.ui.comboBox_Verbundnummer.count() - 1
-                            self.ui.comboBox_Verbundnummer.model().item(index).setEnabled(False)
-                        else:
-                            freie_nummern.append(nummer)
+            # Wenn ein Leerrohr ausgewählt ist, dessen Verbundnummer berücksichtigen
+            exclude_id = self.selected_leerrohr["id"] if self.selected_leerrohr else None
+            verbundnummer_db = str(self.selected_leerrohr["VERBUNDNUMMER"]) if self.selected_leerrohr and self.selected_leerrohr["VERBUNDNUMMER"] is not None else None
+            logger.debug("Ausgewähltes Leerrohr ID: %s, Verbundnummer: %s", exclude_id, verbundnummer_db)
+
+            # Verwendete Verbundnummern basierend auf VKG_LR (Startknoten) aus dem Allocator-Cache
+            startknoten = self.selected_verteiler if self.selected_verteiler else None
+            verwendete_nummern = self.verbundnummern.used(startknoten, exclude_id)
+            max_nummer = max(verwendete_nummern, default=0)
+            logger.debug("Verwendete Verbundnummern: %s, Max Nummer: %s", verwendete_nummern, max_nummer)
+
+            # Fülle das Dropdown mit verfügbaren Verbundnummern
+            freie_nummern = []
+            for nummer in range(1, max_nummer + 11):
+                self.ui.comboBox_Verbundnummer.addItem(str(nummer))
+                if nummer in verwendete_nummern:
+                    index = self.ui.comboBox_Verbundnummer.count() - 1
+                    self.ui.comboBox_Verbundnummer.model().item(index).setEnabled(False)
+                else:
+                    freie_nummern.append(nummer)
 
-                    # Setze die Verbundnummer basierend auf dem Kontext
-                    if self.selected_leerrohr and verbundnummer_db and verbundnummer_db.isdigit():
-                        # Für ausgewählte Leerrohre: Setze die aktuelle Verbundnummer
-                        self.ui.comboBox_Verbundnummer.setCurrentText(verbundnummer_db)
-                        print(f"DEBUG: Verbundnummer für ausgewähltes Leerrohr gesetzt: {verbundnummer_db}")
-                    else:
-                        # Für neuen Import: Wähle die erste freie Verbundnummer
-                        freie_nummer = freie_nummern[0] if freie_nummern else max_nummer + 1
-                        self.ui.comboBox_Verbundnummer.setCurrentText(str(freie_nummer))
-                        print(f"DEBUG: Erste freie Verbundnummer für Import gesetzt: {freie_nummer}")
-
-                    # Bei parallelem Import: Stelle sicher, dass nachfolgende Multirohre die nächsten freien Nummern erhalten
-                    if len([t for _, t in selected_subtyp_ids if t == 3]) > 1:
-                        print(f"DEBUG: Paralleler Import von {len([t for _, t in selected_subtyp_ids if t == 3])} Multirohren")
-                        for i, (subtyp_id, typ) in enumerate(selected_subtyp_ids):
-                            if typ == 3 and i > 0:  # Für nachfolgende Multirohre
-                                next_freie_nummer = next((n for n in freie_nummern if n > int(self.ui.comboBox_Verbundnummer.currentText())), max_nummer + i + 1)
-                                print(f"DEBUG: Nächste freie Verbundnummer für Multirohr {i+1}: {next_freie_nummer}")
-                                # Hinweis: Die Zuweisung erfolgt in importiere_daten, hier nur Logik vorbereiten
-
-                    print(f"DEBUG: Verfügbare Verbundnummern in comboBox: {[self.ui.comboBox_Verbundnummer.itemText(i) for i in range(self.ui.comboBox_Verbundnummer.count())]}")
+            # Setze die Verbundnummer basierend auf dem Kontext
+            if self.selected_leerrohr and verbundnummer_db and verbundnummer_db.isdigit():
+                # Für ausgewählte Leerrohre: Setze die aktuelle Verbundnummer
+                self.ui.comboBox_Verbundnummer.setCurrentText(verbundnummer_db)
+                logger.debug("Verbundnummer für ausgewähltes Leerrohr gesetzt: %s", verbundnummer_db)
+            else:
+                # Für neuen Import: Wähle die erste freie Verbundnummer
+                freie_nummer = freie_nummern[0] if freie_nummern else max_nummer + 1
+                self.ui.comboBox_Verbundnummer.setCurrentText(str(freie_nummer))
+                logger.debug("Erste freie Verbundnummer für Import gesetzt: %s", freie_nummer)
+
+            # Bei parallelem Import: Stelle sicher, dass nachfolgende Multirohre die nächsten freien Nummern erhalten
+            if len([t for _, t in selected_subtyp_ids if t == 3]) > 1:
+                logger.debug("Paralleler Import von %s Multirohren", lazy(lambda: len([t for _, t in selected_subtyp_ids if t == 3])))
+                for i, (subtyp_id, typ) in enumerate(selected_subtyp_ids):
+                    if typ == 3 and i > 0:  # Für nachfolgende Multirohre
+                        next_freie_nummer = next((n for n in freie_nummern if n > int(self.ui.comboBox_Verbundnummer.currentText())), max_nummer + i + 1)
+                        logger.debug("Nächste freie Verbundnummer für Multirohr %s: %s", i+1, next_freie_nummer)
+                        # Hinweis: Die Zuweisung erfolgt in importiere_daten, hier nur Logik vorbereiten
+
+            logger.debug("Verfügbare Verbundnummern in comboBox: %s", lazy(lambda: [self.ui.comboBox_Verbundnummer.itemText(i) for i in range(self.ui.comboBox_Verbundnummer.count())]))
         except Exception as e:
             self.ui.label_Status.setText(f"Fehler beim Abrufen der Verbundnummern: {e}")
             self.ui.label_Status.setStyleSheet("background-color: lightcoral;")
-            print(f"DEBUG: Fehler beim Abrufen der Verbundnummern: {e}")
+            logger.warning("Fehler beim Abrufen der Verbundnummern: %s", e)
 
     def populate_gefoerdert_subduct(self):
         """Setzt die CheckBoxen für 'Gefördert' und 'Subduct' auf Standardwerte."""
-        print("DEBUG: Starte populate_gefoerdert_subduct")
+        logger.debug("Starte populate_gefoerdert_subduct")
         self.ui.checkBox_Foerderung.setChecked(False)
         self.ui.checkBox_Subduct.setChecked(False)
 
     def update_subduct_button(self):
         """Aktiviert oder deaktiviert den Subduct-Button und das Subduct-Label."""
-        print("DEBUG: Starte update_subduct_button")
+        logger.debug("Starte update_subduct_button")
         is_subduct = self.ui.checkBox_Subduct.isChecked()
         self.ui.pushButton_subduct.setEnabled(is_subduct)
         self.ui.label_Subduct.setEnabled(is_subduct)
@@ -1703,7 +1559,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def select_subduct_parent(self):
         """Aktiviert das Map-Tool zum Auswählen eines Subduct-Parent-Leerrohrs."""
-        print("DEBUG: Starte Auswahl eines Subduct-Parent-Leerrohrs")
+        logger.debug("Starte Auswahl eines Subduct-Parent-Leerrohrs")
         self.ui.label_Subduct.clear()
         if self.map_tool:
             try:
@@ -1716,7 +1572,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def subduct_parent_selected(self, point):
         """Speichert das gewählte Subduct-Parent-Leerrohr."""
-        print("DEBUG: Verarbeite Auswahl des Subduct-Parent-Leerrohrs")
+        logger.debug("Verarbeite Auswahl des Subduct-Parent-Leerrohrs")
         layer_name = "LWL_Leerrohr"
         layer = QgsProject.instance().mapLayersByName(layer_name)
         if not layer:
@@ -1762,7 +1618,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def update_selected_leerrohr_subtyp(self):
         """Aktualisiert die Subtyp-Anzeige in der GraphicsView, inklusive Duplizieren-Button."""
-        print("DEBUG: Starte update_selected_leerrohr_subtyp")
+        logger.debug("Starte update_selected_leerrohr_subtyp")
         self.subtyp_scene.clear()  # Szene leeren
         selected_subtyp_ids = []
         belegte_rohre = set()  # Für belegte Rohre, falls nötig
@@ -1786,7 +1642,7 @@ class LeerrohrVerlegenTool(QDialog):
         for subtyp_id in selected_subtyp_ids:
             rohre, subtyp_char, typ = self.parse_rohr_definition(subtyp_id)
             if not rohre:
-                print(f"DEBUG: Keine Rohr-Definition für Subtyp {subtyp_id}")
+                logger.debug("Keine Rohr-Definition für Subtyp %s", subtyp_id)
                 continue
             quantity = self.subtyp_quantities.get(subtyp_id, 1)
             for q in range(quantity):
@@ -1878,7 +1734,7 @@ class LeerrohrVerlegenTool(QDialog):
                     button = self.DuplicateButtonItem(subtyp_id, self)
                     button.setPos(x_offset + 10, y_offset - square_size - 10)
                     self.subtyp_scene.addItem(button)
-                    print(f"DEBUG: Duplizieren-Button für Subtyp {subtyp_id} hinzugefügt")
+                    logger.debug("Duplizieren-Button für Subtyp %s hinzugefügt", subtyp_id)
 
         self.subtyp_scene.setSceneRect(0, 0, 491, y_offset + 20)
         self.ui.graphicsView_Auswahl_Subtyp.setScene(self.subtyp_scene)
@@ -1887,59 +1743,16 @@ class LeerrohrVerlegenTool(QDialog):
         self.update_combobox_states()
 
     def parse_rohr_definition(self, subtyp_id):
-        print(f"DEBUG: Parsing ROHR_DEFINITION für Subtyp-ID: {subtyp_id}")
+        logger.debug("Parsing ROHR_DEFINITION für Subtyp-ID: %s", subtyp_id)
         try:
-            with psycopg2.connect(**self.db_details) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT ls."ROHR_DEFINITION"::text, ls."ID_CODIERUNG", ls."SUBTYP_char", ls."ID_TYP"
-                        FROM lwl."LUT_Leerrohr_SubTyp" ls
-                        WHERE ls."id" = %s
-                    """, (subtyp_id,))
-                    result = cur.fetchone()
-                    if not result:
-                        raise ValueError(f"Subtyp-ID {subtyp_id} nicht gefunden.")
-                    rohr_definition, id_codierung, subtyp_char, typ = result
-                    if not rohr_definition:
-                        raise ValueError(f"ROHR_DEFINITION leer für {subtyp_id}.")
-                    rohr_array = json.loads(rohr_definition)
-                    cur.execute("""
-                        SELECT "ROHRNUMMER", "FARBE", "FARBCODE"
-                        FROM lwl."LUT_Rohr_Beschreibung"
-                        WHERE "ID_SUBTYP" = %s
-                        ORDER BY "ROHRNUMMER"
-                    """, (subtyp_id,))
-                    farben = cur.fetchall()
-                    rohre = []
-                    rohr_nummer = 1
-                    for group in rohr_array:
-                        anzahl = int(group.get("anzahl", 1))
-                        durchmesser = int(group.get("durchmesser", 0))  # Hole Durchmesser pro Gruppe
-                        for _ in range(anzahl):
-                            if rohr_nummer <= len(farben):
-                                _, farbe, farbcode = farben[rohr_nummer - 1]
-                                if '/' in farbcode:
-                                    primary_farbcode, secondary_farbcode = farbcode.split('/')
-                                    secondary_farbcode = None if not secondary_farbcode.strip() or secondary_farbcode.strip('#') == '000000' else secondary_farbcode
-                                else:
-                                    primary_farbcode = farbcode
-                                    secondary_farbcode = None
-                                rohre.append((rohr_nummer, rohr_nummer, durchmesser, farbe, primary_farbcode, secondary_farbcode))
-                            else:
-                                # Fallback grau
-                                farbe = "grau"
-                                primary_farbcode = "#808080"
-                                secondary_farbcode = None
-                                rohre.append((rohr_nummer, rohr_nummer, durchmesser, farbe, primary_farbcode, secondary_farbcode))
-                            rohr_nummer += 1
-                    return rohre, subtyp_char, typ
+            return get_lookup_catalog(self.db_pool).rohr_liste(subtyp_id)
         except Exception as e:
-            print(f"DEBUG: Fehler: {e}")
+            logger.warning("Fehler: %s", e)
             return [], None, None
 
     def update_combobox_states(self):
         """Aktiviert oder deaktiviert comboBox_Verbundnummer, comboBox_Countwert und comboBox_Status basierend auf den Subtypen und dem Modus."""
-        print("DEBUG: Starte update_combobox_states")
+        logger.debug("Starte update_combobox_states")
         is_multirohr = False
         for list_widget in [self.ui.listWidget_Zubringerrohr, self.ui.listWidget_Hauptrohr, self.ui.listWidget_Multirohr]:
             for item in list_widget.selectedItems():
@@ -1972,9 +1785,10 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.comboBox_Status.setEnabled(True)  # Aktiviert für manuellen Status beim Import
             self.populate_status()  # Setze auf ersten Wert als Fallback
 
+    @measure_db("Datenprüfung")
     def pruefe_daten(self):
         """Prüft, ob die Pflichtfelder korrekt gefüllt sind."""
-        print("DEBUG: Starte pruefe_daten")
+        logger.debug("Starte pruefe_daten")
         fehler = []
 
         selected_subtyp_ids = []
@@ -2001,7 +1815,7 @@ class LeerrohrVerlegenTool(QDialog):
             if parent_trasse_ids:
                 trasse_ids_str = "{" + ",".join(str(int(id)) for id in parent_trasse_ids) + "}"
                 try:
-                    with psycopg2.connect(**self.db_details) as conn:
+                    with self.db_pool.connection() as conn:
                         with conn.cursor() as cur:
                             cur.execute("""
                                 SELECT COUNT(*) 
@@ -2033,7 +1847,7 @@ class LeerrohrVerlegenTool(QDialog):
         elif self.selected_trasse_ids_flat:
             trassen_ids_list = list(set(self.selected_trasse_ids_flat))
             try:
-                with psycopg2.connect(**self.db_details) as conn:
+                with self.db_pool.connection() as conn:
                     with conn.cursor() as cur:
                         cur.execute("""
                             SELECT "VONKNOTEN", "NACHKNOTEN"
@@ -2059,37 +1873,16 @@ class LeerrohrVerlegenTool(QDialog):
                 fehler.append(f"Datenbankfehler bei der Trassenprüfung: {e}")
 
         if is_multirohr:
-            vorhandene_verbundnummern = set()
             try:
-                with psycopg2.connect(**self.db_details) as conn:
-                    with conn.cursor() as cur:
-                        # Prüfe Verbundnummern basierend auf VKG_LR (Startknoten)
-                        exclude_id = self.selected_leerrohr["id"] if self.selected_leerrohr else None
-                        if exclude_id:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND %s::bigint = ANY("VKG_LR")
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                                AND "id" != %s
-                            """, (self.selected_verteiler, exclude_id))
-                        else:
-                            cur.execute("""
-                                SELECT DISTINCT "VERBUNDNUMMER"
-                                FROM lwl."LWL_Leerrohr"
-                                WHERE "TYP" = 3 
-                                AND %s::bigint = ANY("VKG_LR")
-                                AND "VERBUNDNUMMER" IS NOT NULL
-                            """, (self.selected_verteiler,))
-                        vorhandene_verbundnummern = {int(row[0]) for row in cur.fetchall() if row[0] is not None}
-                        if verbundnummer and verbundnummer.isdigit() and int(verbundnummer) in vorhandene_verbundnummern:
-                            fehler.append(f"Verbundnummer {verbundnummer} ist bereits vergeben.")
-                        # Neue Ergänzung: Prüfe, ob genug freie Verbundnummern für Duplikate vorhanden
-                        max_nummer = max(vorhandene_verbundnummern, default=0)
-                        freie_nummern_count = len([n for n in range(1, max_nummer + 11) if n not in vorhandene_verbundnummern])
-                        if multirohr_quantities > freie_nummern_count:
-                            fehler.append(f"Nicht genug freie Verbundnummern für {multirohr_quantities} Multirohr-Instanzen (verfügbar: {freie_nummern_count}).")
+                # Prüfe Verbundnummern basierend auf VKG_LR (Startknoten), Belegung aus dem Allocator-Cache
+                exclude_id = self.selected_leerrohr["id"] if self.selected_leerrohr else None
+                vorhandene_verbundnummern = self.verbundnummern.used(self.selected_verteiler, exclude_id)
+                if verbundnummer and verbundnummer.isdigit() and int(verbundnummer) in vorhandene_verbundnummern:
+                    fehler.append(f"Verbundnummer {verbundnummer} ist bereits vergeben.")
+                # Neue Ergänzung: Prüfe, ob genug freie Verbundnummern für Duplikate vorhanden
+                freie_nummern_count = len(self.verbundnummern.free(self.selected_verteiler, exclude_id))
+                if multirohr_quantities > freie_nummern_count:
+                    fehler.append(f"Nicht genug freie Verbundnummern für {multirohr_quantities} Multirohr-Instanzen (verfügbar: {freie_nummern_count}).")
             except Exception as e:
                 fehler.append(f"Datenbankfehler bei der Verbundnummer-Prüfung: {e}")
 
@@ -2105,243 +1898,291 @@ class LeerrohrVerlegenTool(QDialog):
             if self.selected_leerrohr:
                 self.ui.pushButton_Import.setEnabled(False)
                 self.ui.pushButton_update_leerrohr.setEnabled(True)
-                print("DEBUG: Update-Button aktiviert, Import-Button deaktiviert")
+                logger.debug("Update-Button aktiviert, Import-Button deaktiviert")
             else:
                 self.ui.pushButton_Import.setEnabled(True)
                 self.ui.pushButton_update_leerrohr.setEnabled(False)
-                print("DEBUG: Import-Button aktiviert, Update-Button deaktiviert")
+                logger.debug("Import-Button aktiviert, Update-Button deaktiviert")
+
+    def _build_id_trasse_neu(self, cur, start_knoten, trassen_ids):
+        """
+        Baut die orientierte Trassenkette für "ID_TRASSE_NEU" ab ``start_knoten``.
+        Von-/Nachknoten aller Trassen werden mit einer Abfrage geladen.
+        """
+        cur.execute("""
+            SELECT id, "VONKNOTEN", "NACHKNOTEN"
+            FROM lwl."LWL_Trasse"
+            WHERE id = ANY(%s)
+        """, (list(trassen_ids),))
+        knoten_by_trasse = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+        trasse_list = []
+        current_knoten = start_knoten
+        for i, tid in enumerate(trassen_ids):
+            if tid not in knoten_by_trasse:
+                raise Exception(f"Trasse {tid} nicht gefunden!")
+            von, nach = knoten_by_trasse[tid]
+            reverse = False
+            if von != current_knoten:
+                if nach == current_knoten:
+                    reverse = True  # Flip, wenn rückwärts anknüpft
+                else:
+                    raise Exception(f"Trasse {tid} knüpft nicht an {current_knoten} an!")
+            current_knoten = nach if not reverse else von  # Nächster Knoten
+            trasse_list.append({
+                "index": i + 1,
+                "id": tid,
+                "reverse": reverse
+            })
+        return trasse_list
 
     def importiere_daten(self):
-        """Importiert die Daten aus dem Formular in die Tabelle lwl.LWL_Leerrohr oder lwl.LWL_Leerrohr_Abzweigung."""
-        print("DEBUG: Starte importiere_daten")
-        conn = None
+        """
+        Importiert die Daten aus dem Formular in die Tabelle lwl.LWL_Leerrohr oder lwl.LWL_Leerrohr_Abzweigung.
+        Das Formular wird hier gelesen, geschrieben wird im Hintergrund (``_schreibe_leerrohre``).
+        """
+        logger.debug("Starte importiere_daten")
         try:
-            conn = psycopg2.connect(**self.db_details)
-            cur = conn.cursor()
-            conn.autocommit = False
-
-            selected_subtyp_ids = []
-            for list_widget in [self.ui.listWidget_Zubringerrohr, self.ui.listWidget_Hauptrohr, self.ui.listWidget_Multirohr]:
-                print(f"DEBUG: Prüfe ListWidget: {list_widget.objectName()}")
-                for item in list_widget.selectedItems():
-                    try:
-                        item_text = item.text()
-                        print(f"DEBUG: Verarbeite ListWidget-Eintrag: '{item_text}'")
-                        parts = item_text.split(" - ")
-                        if len(parts) < 5:  # Mindestens 5 Teile erforderlich (ID, Typ, Subtyp, Codierung, Bemerkung)
-                            print(f"DEBUG: Ungültiges Format, zu wenige Teile in: '{item_text}'")
-                            continue
-                        subtyp_id = int(parts[0].strip())
-                        typ = int(parts[1].strip())
-                        subtyp_char = parts[2].strip()
-                        codierung = parts[3].strip()
-                        # Suche nach ID_CODIERUNG im letzten Teil oder mit regulärem Ausdruck
-                        id_codierung = None
-                        if len(parts) >= 6 and "(ID: " in parts[5]:
-                            id_codierung = int(parts[5].split("(ID: ")[1].rstrip(")"))
-                        elif "(ID: " in item_text:
-                            id_codierung_match = re.search(r'\(ID: (\d+)\)', item_text)
-                            if id_codierung_match:
-                                id_codierung = int(id_codierung_match.group(1))
-                        if id_codierung is None:
-                            print(f"DEBUG: Keine gültige ID_CODIERUNG in: '{item_text}'")
-                            continue
-                        selected_subtyp_ids.append((subtyp_id, typ, codierung, id_codierung))
-                        print(f"DEBUG: Subtyp hinzugefügt - ID: {subtyp_id}, Typ: {typ}, Codierung: {codierung}, ID_CODIERUNG: {id_codierung}")
-                    except (ValueError, IndexError) as e:
-                        print(f"DEBUG: Fehler beim Parsen von Subtyp-Daten: {e}, Eintrag: '{item_text}'")
+            formular = self._import_formular()
+        except Exception as e:
+            self.iface.messageBar().pushMessage("Fehler", f"Allgemeiner Fehler: {str(e)}", level=Qgis.Critical)
+            logger.warning("Allgemeiner Fehler: %s", e)
+            return
+        self.ui.pushButton_Import.setEnabled(False)
+        self._set_status("Leerrohre werden importiert …")
+        self.tasks.starte("Leerrohr importieren", self._schreibe_leerrohre, formular,
+                          pool=self.db_pool, schreiben=True,
+                          on_ergebnis=self._import_fertig,
+                          on_fehler=self._import_fehlgeschlagen,
+                          on_abbruch=lambda: self._import_fehlgeschlagen(None))
+
+    def _import_formular(self):
+        """Liest alle Eingaben für den Import (GUI-Thread); der Hintergrund-Task fasst keine Widgets an."""
+        selected_subtyp_ids = []
+        for list_widget in [self.ui.listWidget_Zubringerrohr, self.ui.listWidget_Hauptrohr, self.ui.listWidget_Multirohr]:
+            logger.debug("Prüfe ListWidget: %s", list_widget.objectName())
+            for item in list_widget.selectedItems():
+                try:
+                    item_text = item.text()
+                    logger.debug("Verarbeite ListWidget-Eintrag: '%s'", item_text)
+                    parts = item_text.split(" - ")
+                    if len(parts) < 5:  # Mindestens 5 Teile erforderlich (ID, Typ, Subtyp, Codierung, Bemerkung)
+                        logger.debug("Ungültiges Format, zu wenige Teile in: '%s'", item_text)
                         continue
+                    subtyp_id = int(parts[0].strip())
+                    typ = int(parts[1].strip())
+                    subtyp_char = parts[2].strip()
+                    codierung = parts[3].strip()
+                    # Suche nach ID_CODIERUNG im letzten Teil oder mit regulärem Ausdruck
+                    id_codierung = None
+                    if len(parts) >= 6 and "(ID: " in parts[5]:
+                        id_codierung = int(parts[5].split("(ID: ")[1].rstrip(")"))
+                    elif "(ID: " in item_text:
+                        id_codierung_match = re.search(r'\(ID: (\d+)\)', item_text)
+                        if id_codierung_match:
+                            id_codierung = int(id_codierung_match.group(1))
+                    if id_codierung is None:
+                        logger.debug("Keine gültige ID_CODIERUNG in: '%s'", item_text)
+                        continue
+                    selected_subtyp_ids.append((subtyp_id, typ, codierung, id_codierung))
+                    logger.debug("Subtyp hinzugefügt - ID: %s, Typ: %s, Codierung: %s, ID_CODIERUNG: %s", subtyp_id, typ, codierung, id_codierung)
+                except (ValueError, IndexError) as e:
+                    logger.warning("Fehler beim Parsen von Subtyp-Daten: %s, Eintrag: '%s'", e, item_text)
+                    continue
 
-            if not selected_subtyp_ids:
-                raise Exception("Keine gültigen Subtypen ausgewählt. Überprüfen Sie die Auswahl und das Format der ListWidget-Einträge.")
-
-            # Überprüfe, ob erforderliche Variablen definiert sind
-            print(f"DEBUG: selected_verteiler: {self.selected_verteiler}, selected_verteiler_2: {self.selected_verteiler_2}")
-            if not self.selected_verteiler or not self.selected_verteiler_2:
-                raise Exception("Start- oder Endknoten nicht ausgewählt.")
-
-            # Hole COUNT und STATUS aus den Dropdowns
-            count_value = 0  # Fallback-Wert, da COUNT beim Import deaktiviert ist und Trigger übernimmt
-            status_id = self.ui.comboBox_Status.currentData()  # Holt die ID des ausgewählten Status
-
-            # Ermittle freie Verbundnummern für parallelen Import
-            verwendete_nummern = set()
-            freie_nummern = []
-            if any(typ == 3 for _, typ, _, _ in selected_subtyp_ids):
-                cur.execute("""
-                    SELECT DISTINCT "VERBUNDNUMMER"
-                    FROM lwl."LWL_Leerrohr"
-                    WHERE "TYP" = 3 
-                    AND %s::bigint = ANY("VKG_LR")
-                    AND "VERBUNDNUMMER" IS NOT NULL
-                """, (self.selected_verteiler,))
-                verwendete_nummern = {int(row[0]) for row in cur.fetchall() if row[0] is not None}
-                max_nummer = max(verwendete_nummern, default=0)
-                freie_nummern = [n for n in range(1, max_nummer + 11) if n not in verwendete_nummern]
-                print(f"DEBUG: Freie Verbundnummern für Import: {freie_nummern}")
+        if not selected_subtyp_ids:
+            raise Exception("Keine gültigen Subtypen ausgewählt. Überprüfen Sie die Auswahl und das Format der ListWidget-Einträge.")
 
-            if self.ui.radioButton_Abzweigung.isChecked():
-                print("DEBUG: Abzweigungsmodus aktiviert")
-                trassen_ids_pg_array = "{" + ",".join(map(str, self.selected_trasse_ids_flat)) + "}"
-                # COUNT aus Parent übernehmen? (hier: count_value=0, Trigger/Update kann später setzen)
-                status = status_id if status_id is not None else self.selected_parent_leerrohr.get("STATUS", 1)
-                verfuegbare_rohre = self.selected_parent_leerrohr.get("VERFUEGBARE_ROHRE", "{1,2,3}")
-                parent_id = self.selected_parent_leerrohr["id"]
-                hilfsknoten_id = self.selected_verteiler
-                nach_knoten = self.selected_verteiler_2
-                # WICHTIG: VKG_LR von Parent erben (nicht vom Hilfsknoten!)
-                parent_vkg_lr = self.selected_parent_leerrohr.get("VKG_LR", None)
-
-                for subtyp_id, typ, codierung, id_codierung in selected_subtyp_ids:
-                    # Im Abzweigungs-Modus: Quantity=1 (keine Duplizierung)
-                    cur.execute(""" 
-                        SELECT COUNT(*) FROM lwl."LWL_Leerrohr_Abzweigung" 
-                        WHERE "ID_PARENT_LEERROHR" = %s AND "ID_HILFSKNOTEN" = %s AND "NACHKNOTEN" = %s
-                    """, (parent_id, hilfsknoten_id, nach_knoten))
-                    exists = cur.fetchone()[0]
-                    if exists > 0:
-                        raise Exception("Diese Abzweigung existiert bereits.")
-                    insert_query = """
-                        INSERT INTO lwl."LWL_Leerrohr_Abzweigung" (
-                            "ID_PARENT_LEERROHR", "ID_HILFSKNOTEN", "ID_TRASSE", "COUNT", "STATUS", 
-                            "VERFUEGBARE_ROHRE", "TYP", "CODIERUNG", "ID_CODIERUNG", "SUBTYP", "VKG_LR", "VONKNOTEN", "NACHKNOTEN"
-                        ) VALUES (%s, %s, %s::bigint[], %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """
-                    values = (
-                        parent_id, hilfsknoten_id, trassen_ids_pg_array, count_value, status,
-                        verfuegbare_rohre, typ, codierung, id_codierung, subtyp_id,
-                        parent_vkg_lr,  # geerbter VKG_LR
-                        hilfsknoten_id, nach_knoten
-                    )
-                    cur.execute(insert_query, values)
-                    print(f"DEBUG: Abzweigung eingefügt, Rows affected: {cur.rowcount}, COUNT: {count_value}, STATUS: {status}, ID_CODIERUNG: {id_codierung}")
-            else:
-                print("DEBUG: Hauptstrang-Modus aktiviert")
-                # ID_TRASSE_NEU korrekt aufbauen
-                id_trasse_jsonb = None
-                if self.selected_trasse_ids_flat:
-                    trasse_list = []
-                    current_knoten = self.selected_verteiler
-                    for i, tid in enumerate(self.selected_trasse_ids_flat):
-                        cur.execute("""
-                            SELECT "VONKNOTEN", "NACHKNOTEN"
-                            FROM lwl."LWL_Trasse"
-                            WHERE id = %s
-                        """, (tid,))
-                        von, nach = cur.fetchone()
-                        reverse = False
-                        if von != current_knoten:
-                            if nach == current_knoten:
-                                reverse = True  # Flip, wenn rückwärts anknüpft
-                            else:
-                                raise Exception(f"Trasse {tid} knüpft nicht an {current_knoten} an!")
-                        current_knoten = nach if not reverse else von  # Nächster Knoten
-                        trasse_list.append({
-                            "index": i + 1,
-                            "id": tid,
-                            "reverse": reverse
-                        })
-                    id_trasse_jsonb = json.dumps(trasse_list)
-                    print(f"DEBUG: ID_TRASSE_NEU gebaut: {id_trasse_jsonb}")
-                trassen_ids_pg_array = "{" + ",".join(map(str, set(self.selected_trasse_ids_flat))) + "}" if self.selected_trasse_ids_flat else None
-                status = status_id if status_id is not None else 1  # Nutze Dropdown oder Fallback
-                gefoerdert = self.ui.checkBox_Foerderung.isChecked()
-                subduct = self.ui.checkBox_Subduct.isChecked()
-                parent_leerrohr_id = self.selected_subduct_parent if subduct else None
-                firma_hersteller = self.settings.value("firma", "").split(", ")[0] or None
-                vonknoten = self.selected_verteiler
-                nachknoten = self.selected_verteiler_2
-                kommentar = self.ui.label_Kommentar.text().strip() or None
-                beschreibung = self.ui.label_Kommentar_2.text().strip() or None
-                verlegt_am = self.ui.mDateTimeEdit_Strecke.date().toString("yyyy-MM-dd")
-
-                multirohr_count = sum(1 for _, typ, _, _ in selected_subtyp_ids if typ == 3)
-                current_verbundnummer = int(self.ui.comboBox_Verbundnummer.currentText()) if self.ui.comboBox_Verbundnummer.currentText().isdigit() else freie_nummern[0] if freie_nummern else 1
-                for i, (subtyp_id, typ, codierung, id_codierung) in enumerate(selected_subtyp_ids):
-                    quantity = self.subtyp_quantities.get(subtyp_id, 1)  # Default 1
-                    print(f"DEBUG: Importiere Subtyp {subtyp_id} {quantity}-mal")
-                    cur.execute("""
-                        SELECT SUM((rohr->>'anzahl')::int) AS rohr_anzahl
-                        FROM lwl."LUT_Leerrohr_SubTyp" t,
-                        LATERAL jsonb_array_elements(t."ROHR_DEFINITION") AS rohr
-                        WHERE t."id" = %s
-                    """, (subtyp_id,))
-                    result = cur.fetchone()
-                    rohr_anzahl = int(result[0]) if result and result[0] else 1
-                    verfuegbare_rohre = (
-                        "{" + ",".join(map(str, range(1, rohr_anzahl + 1))) + "}" if rohr_anzahl > 1 else None
-                    )
-                    for q in range(quantity):
-                        # Für Hauptrohre (TYP=2) Verbundnummer auf 0 setzen
-                        verbundnummer_final = "0" if typ != 3 else str(current_verbundnummer)
-
-                        # >>> NEU: VKG_LR nur setzen, wenn Start Verteiler/Schacht/Ortszentrale ist
-                        cur.execute('SELECT "TYP" FROM lwl."LWL_Knoten" WHERE id = %s', (vonknoten,))
-                        start_typ_row = cur.fetchone()
-                        start_typ = start_typ_row[0] if start_typ_row else None
-                        if start_typ in ["Verteilerkasten", "Schacht", "Ortszentrale"]:
-                            vkg_lr_value = vonknoten
-                        else:
-                            vkg_lr_value = None
-                        # <<< NEU
-
-                        insert_query = """
-                            INSERT INTO lwl."LWL_Leerrohr" (
-                                "ID_TRASSE", "ID_TRASSE_NEU", "VERBUNDNUMMER", "VERFUEGBARE_ROHRE", "STATUS", "COUNT", "GEFOERDERT", "SUBDUCT", "PARENT_LEERROHR_ID", "TYP", "CODIERUNG", "ID_CODIERUNG", "SUBTYP", "FIRMA_HERSTELLER", "VONKNOTEN", "NACHKNOTEN", "KOMMENTAR", "BESCHREIBUNG", "VERLEGT_AM") VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """
-                        values = (
-                            trassen_ids_pg_array or '{}', id_trasse_jsonb or '{}', verbundnummer_final, verfuegbare_rohre, status, count_value, 
-                            gefoerdert, subduct, parent_leerrohr_id, typ, codierung, id_codierung, subtyp_id,
-                            firma_hersteller, vonknoten, nachknoten, kommentar, beschreibung, verlegt_am
-                        )
-                        cur.execute(insert_query, values)
-                        print(f"DEBUG: Instanz {q+1}/{quantity} von Subtyp {subtyp_id} eingefügt, Rows affected: {cur.rowcount}, Verbundnummer: {verbundnummer_final}, COUNT: {count_value}, STATUS: {status}, ID_CODIERUNG: {id_codierung}")
-                        # Für nachfolgende Multirohre die nächste freie Verbundnummer wählen
-                        if typ == 3 and multirohr_count > 1:
-                            current_verbundnummer = next((n for n in freie_nummern if n > current_verbundnummer), current_verbundnummer + 1)
-                            freie_nummern = [n for n in freie_nummern if n != current_verbundnummer]  # Entferne genutzte
-                            print(f"DEBUG: Nächste Verbundnummer für Multirohr {i+1}: {current_verbundnummer}")
+        # Überprüfe, ob erforderliche Variablen definiert sind
+        logger.debug("selected_verteiler: %s, selected_verteiler_2: %s", self.selected_verteiler, self.selected_verteiler_2)
+        if not self.selected_verteiler or not self.selected_verteiler_2:
+            raise Exception("Start- oder Endknoten nicht ausgewählt.")
 
-            conn.commit()
-            print("DEBUG: Commit erfolgreich")
-            self.iface.messageBar().pushMessage("Erfolg", "Daten erfolgreich importiert.", level=Qgis.Success)
-            self.initialisiere_formular()
-            # Initialisiere graphicsView_Auswahl_Route
-            self.clear_routing()
-            self.routes_by_path_id = {}
-            self.update_route_view()
-            print("DEBUG: graphicsView_Auswahl_Route nach Import initialisiert")
+        subduct = self.ui.checkBox_Subduct.isChecked()
+        return {
+            "subtypen": selected_subtyp_ids,
+            "abzweigung": self.ui.radioButton_Abzweigung.isChecked(),
+            "status_id": self.ui.comboBox_Status.currentData(),  # ID des ausgewählten Status
+            "vonknoten": self.selected_verteiler,
+            "nachknoten": self.selected_verteiler_2,
+            "trassen": list(self.selected_trasse_ids_flat or []),
+            "parent": dict(self.selected_parent_leerrohr) if self.selected_parent_leerrohr else None,
+            "gefoerdert": self.ui.checkBox_Foerderung.isChecked(),
+            "subduct": subduct,
+            "parent_leerrohr_id": self.selected_subduct_parent if subduct else None,
+            "firma_hersteller": self.settings.value("firma", "").split(", ")[0] or None,
+            "kommentar": self.ui.label_Kommentar.text().strip() or None,
+            "beschreibung": self.ui.label_Kommentar_2.text().strip() or None,
+            "verlegt_am": self.ui.mDateTimeEdit_Strecke.date().toString("yyyy-MM-dd"),
+            "verbundnummer": self.ui.comboBox_Verbundnummer.currentText(),
+            "mengen": dict(self.subtyp_quantities),
+        }
 
-        except psycopg2.Error as e:
-            if conn:
-                conn.rollback()
+    @measure_db("Leerrohr importieren")
+    def _schreibe_leerrohre(self, task, f):
+        """Im Hintergrund: schreibt die Leerrohre in der Transaktion des Tasks (Commit durch den Task)."""
+        cur = task.conn.cursor()
+        selected_subtyp_ids = f["subtypen"]
+
+        # Hole COUNT und STATUS aus den Dropdowns
+        count_value = 0  # Fallback-Wert, da COUNT beim Import deaktiviert ist und Trigger übernimmt
+        status_id = f["status_id"]
+
+        if f["abzweigung"]:
+            logger.debug("Abzweigungsmodus aktiviert")
+            trassen_ids_pg_array = "{" + ",".join(map(str, f["trassen"])) + "}"
+            parent = f["parent"]
+            # COUNT aus Parent übernehmen? (hier: count_value=0, Trigger/Update kann später setzen)
+            status = status_id if status_id is not None else parent.get("STATUS", 1)
+            verfuegbare_rohre = parent.get("VERFUEGBARE_ROHRE", "{1,2,3}")
+            parent_id = parent["id"]
+            hilfsknoten_id = f["vonknoten"]
+            nach_knoten = f["nachknoten"]
+            # WICHTIG: VKG_LR von Parent erben (nicht vom Hilfsknoten!)
+            parent_vkg_lr = parent.get("VKG_LR", None)
+
+            # Im Abzweigungs-Modus: Quantity=1 (keine Duplizierung)
+            cur.execute(""" 
+                SELECT COUNT(*) FROM lwl."LWL_Leerrohr_Abzweigung" 
+                WHERE "ID_PARENT_LEERROHR" = %s AND "ID_HILFSKNOTEN" = %s AND "NACHKNOTEN" = %s
+            """, (parent_id, hilfsknoten_id, nach_knoten))
+            if cur.fetchone()[0] > 0:
+                raise Exception("Diese Abzweigung existiert bereits.")
+            rows = [
+                (
+                    parent_id, hilfsknoten_id, trassen_ids_pg_array, count_value, status,
+                    verfuegbare_rohre, typ, codierung, id_codierung, subtyp_id,
+                    parent_vkg_lr,  # geerbter VKG_LR
+                    hilfsknoten_id, nach_knoten
+                )
+                for subtyp_id, typ, codierung, id_codierung in selected_subtyp_ids
+            ]
+            task.pruefe_abbruch()
+            inserted = psycopg2.extras.execute_values(cur, """
+                INSERT INTO lwl."LWL_Leerrohr_Abzweigung" (
+                    "ID_PARENT_LEERROHR", "ID_HILFSKNOTEN", "ID_TRASSE", "COUNT", "STATUS", 
+                    "VERFUEGBARE_ROHRE", "TYP", "CODIERUNG", "ID_CODIERUNG", "SUBTYP", "VKG_LR", "VONKNOTEN", "NACHKNOTEN"
+                ) VALUES %s
+                RETURNING id
+            """, rows, template="(%s, %s, %s::bigint[], %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)", fetch=True)
+            logger.debug("%s Abzweigung(en) eingefügt, COUNT: %s, STATUS: %s", len(inserted), count_value, status)
+        else:
+            logger.debug("Hauptstrang-Modus aktiviert")
+            # ID_TRASSE_NEU korrekt aufbauen (Orientierung aus einer Abfrage)
+            id_trasse_jsonb = None
+            if f["trassen"]:
+                id_trasse_jsonb = json.dumps(self._build_id_trasse_neu(cur, f["vonknoten"], f["trassen"]))
+                logger.debug("ID_TRASSE_NEU gebaut: %s", id_trasse_jsonb)
+            trassen_ids_pg_array = "{" + ",".join(map(str, set(f["trassen"]))) + "}" if f["trassen"] else None
+            status = status_id if status_id is not None else 1  # Nutze Dropdown oder Fallback
+            vonknoten = f["vonknoten"]
+            nachknoten = f["nachknoten"]
+            task.fortschritt(30)
+
+            # Rohranzahl je Subtyp – eine Abfrage für alle gewählten Subtypen
+            cur.execute("""
+                SELECT t."id", SUM((rohr->>'anzahl')::int) AS rohr_anzahl
+                FROM lwl."LUT_Leerrohr_SubTyp" t,
+                LATERAL jsonb_array_elements(t."ROHR_DEFINITION") AS rohr
+                WHERE t."id" = ANY(%s)
+                GROUP BY t."id"
+            """, (list({subtyp_id for subtyp_id, _, _, _ in selected_subtyp_ids}),))
+            rohr_anzahl_by_subtyp = {row[0]: int(row[1]) for row in cur.fetchall() if row[1]}
+
+            # Verbundnummern unter Advisory-Lock am Startknoten reservieren (verbindliche Belegung
+            # in dieser Transaktion). Mehrere Multirohre erhalten fortlaufend die nächste freie Nummer.
+            mengen = f["mengen"]
+            multirohr_count = sum(1 for _, typ, _, _ in selected_subtyp_ids if typ == 3)
+            verbundnummern = iter(())
+            if multirohr_count:
+                combo_text = f["verbundnummer"]
+                anzahl = sum(mengen.get(subtyp_id, 1) for subtyp_id, typ, _, _ in selected_subtyp_ids if typ == 3) if multirohr_count > 1 else 1
+                reserviert = self.verbundnummern.reserve(cur, vonknoten, anzahl, int(combo_text) if combo_text.isdigit() else None)
+                logger.debug("Reservierte Verbundnummern: %s", reserviert)
+                verbundnummern = iter(reserviert)
+            current_verbundnummer = None
+            rows = []
+            for i, (subtyp_id, typ, codierung, id_codierung) in enumerate(selected_subtyp_ids):
+                quantity = mengen.get(subtyp_id, 1)  # Default 1
+                logger.debug("Importiere Subtyp %s %s-mal", subtyp_id, quantity)
+                rohr_anzahl = rohr_anzahl_by_subtyp.get(subtyp_id, 1)
+                verfuegbare_rohre = (
+                    "{" + ",".join(map(str, range(1, rohr_anzahl + 1))) + "}" if rohr_anzahl > 1 else None
+                )
+                for q in range(quantity):
+                    # Für Hauptrohre (TYP=2) Verbundnummer auf 0 setzen
+                    if typ == 3 and (current_verbundnummer is None or multirohr_count > 1):
+                        current_verbundnummer = next(verbundnummern)
+                    verbundnummer_final = "0" if typ != 3 else str(current_verbundnummer)
+                    rows.append((
+                        trassen_ids_pg_array or '{}', id_trasse_jsonb or '{}', verbundnummer_final, verfuegbare_rohre, status, count_value, 
+                        f["gefoerdert"], f["subduct"], f["parent_leerrohr_id"], typ, codierung, id_codierung, subtyp_id,
+                        f["firma_hersteller"], vonknoten, nachknoten, f["kommentar"], f["beschreibung"], f["verlegt_am"]
+                    ))
+
+            # Alle Leerrohre mit einem mehrzeiligen INSERT schreiben
+            task.pruefe_abbruch()
+            task.fortschritt(60)
+            inserted = psycopg2.extras.execute_values(cur, """
+                INSERT INTO lwl."LWL_Leerrohr" (
+                    "ID_TRASSE", "ID_TRASSE_NEU", "VERBUNDNUMMER", "VERFUEGBARE_ROHRE", "STATUS", "COUNT", "GEFOERDERT", "SUBDUCT", "PARENT_LEERROHR_ID", "TYP", "CODIERUNG", "ID_CODIERUNG", "SUBTYP", "FIRMA_HERSTELLER", "VONKNOTEN", "NACHKNOTEN", "KOMMENTAR", "BESCHREIBUNG", "VERLEGT_AM") VALUES %s
+                RETURNING id
+            """, rows, page_size=max(len(rows), 1), fetch=True)
+            logger.debug("%s Leerrohr(e) eingefügt: %s, STATUS: %s", len(inserted), lazy(lambda: [r[0] for r in inserted]), status)
+        return f["vonknoten"]
+
+    def _import_fertig(self, vonknoten):
+        """Im GUI-Thread nach dem Commit: Caches verwerfen, Formular zurücksetzen."""
+        logger.debug("Commit erfolgreich")
+        self.verbundnummern.invalidate(vonknoten)
+        self._leerrohr_caches_verwerfen()
+        self.ui.pushButton_Import.setEnabled(True)
+        self.iface.messageBar().pushMessage("Erfolg", "Daten erfolgreich importiert.", level=Qgis.Success)
+        self._set_status("Daten erfolgreich importiert.")
+        self.initialisiere_formular()
+        # Initialisiere graphicsView_Auswahl_Route
+        self.clear_routing()
+        self.routes_by_path_id = {}
+        self.update_route_view()
+        logger.debug("graphicsView_Auswahl_Route nach Import initialisiert")
+        self._leerrohr_layer_neu_zeichnen()
+
+    def _leerrohr_caches_verwerfen(self):
+        """Nach per SQL geschriebenen Leerrohren (Import, Abzweigung, Update) die Sitzungs-Caches verwerfen."""
+        invalidate_kabel_routing_graph(self.db_pool)
+        invalidate_rohr_graph(self.db_pool)
+        invalidate_leerrohr_index()
+
+    def _import_fehlgeschlagen(self, e):
+        """Im GUI-Thread: Fehler oder Abbruch des Imports (die Transaktion ist zurückgerollt)."""
+        self.ui.pushButton_Import.setEnabled(True)
+        if e is None:
+            self._set_status("Import abgebrochen – nichts geschrieben.", error=True)
+        elif isinstance(e, psycopg2.Error):
             self.iface.messageBar().pushMessage("Fehler", f"Datenbankfehler: {str(e)}", level=Qgis.Critical)
-            print(f"DEBUG: Datenbankfehler: {str(e)}")
-        except Exception as e:
-            if conn:
-                conn.rollback()
+            logger.warning("Datenbankfehler: %s", e)
+            self._set_status(f"Datenbankfehler: {e}", error=True)
+        else:
             self.iface.messageBar().pushMessage("Fehler", f"Allgemeiner Fehler: {str(e)}", level=Qgis.Critical)
-            print(f"DEBUG: Allgemeiner Fehler: {str(e)}")
-        finally:
-            if conn:
-                conn.close()
-                print("DEBUG: Verbindung geschlossen")
+            logger.warning("Allgemeiner Fehler: %s", e)
+            self._set_status(f"Fehler: {e}", error=True)
+        self._leerrohr_layer_neu_zeichnen()
 
+    def _leerrohr_layer_neu_zeichnen(self):
         layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")
         if layer:
             layer[0].triggerRepaint()
-            print("DEBUG: Layer aktualisiert")
+            logger.debug("Layer aktualisiert")
 
     def update_leerrohr(self):
         """Aktualisiert die Daten des ausgewählten Leerrohrs in der Tabelle lwl.LWL_Leerrohr."""
-        print("DEBUG: Starte update_leerrohr")
+        logger.debug("Starte update_leerrohr")
         if not self.selected_leerrohr:
             self.iface.messageBar().pushMessage("Fehler", "Kein Leerrohr ausgewählt.", level=Qgis.Critical)
             return
 
         conn = None
         try:
-            conn = psycopg2.connect(**self.db_details)
+            conn = self.db_pool.getconn()
             cur = conn.cursor()
             conn.autocommit = False
 
@@ -2377,7 +2218,7 @@ class LeerrohrVerlegenTool(QDialog):
                             "reverse": reverse
                         })
                     id_trasse_jsonb = json.dumps(trasse_list)
-                    print(f"DEBUG: Erweitertes ID_TRASSE_NEU mit reverse-Flag: {id_trasse_jsonb}")
+                    logger.debug("Erweitertes ID_TRASSE_NEU mit reverse-Flag: %s", id_trasse_jsonb)
                 trassen_ids_pg_array = "{" + ",".join(map(str, set(self.selected_trasse_ids_flat))) + "}"
                 cur.execute("""
                     SELECT ST_AsText(ST_Union(geom))
@@ -2385,11 +2226,11 @@ class LeerrohrVerlegenTool(QDialog):
                     WHERE id = ANY(%s::bigint[])
                 """, (trassen_ids_pg_array,))
                 geom_wkt = cur.fetchone()[0] if cur.rowcount > 0 else None
-                print(f"DEBUG: Geometrie WKT: {geom_wkt}")
+                logger.debug("Geometrie WKT: %s", geom_wkt)
                 if not geom_wkt:
                     raise Exception("Keine gültige Geometrie für die ausgewählten Trassen gefunden.")
             else:
-                print("DEBUG: Kein neues Routing durchgeführt, Geometrie bleibt unverändert")
+                logger.debug("Kein neues Routing durchgeführt, Geometrie bleibt unverändert")
 
             verbundnummer = self.ui.comboBox_Verbundnummer.currentText().strip()
             count_value = int(self.ui.comboBox_Countwert.currentText())
@@ -2404,16 +2245,6 @@ class LeerrohrVerlegenTool(QDialog):
             beschreibung = self.ui.label_Kommentar_2.text().strip() or None
             verlegt_am = self.ui.mDateTimeEdit_Strecke.date().toString("yyyy-MM-dd")
 
-            # >>> NEU: VKG_LR bedingt setzen — nur wenn Startknoten Verteiler/Schacht/OZ ist
-            cur.execute('SELECT "TYP" FROM lwl."LWL_Knoten" WHERE id = %s', (vonknoten,))
-            start_typ_row = cur.fetchone()
-            start_typ = start_typ_row[0] if start_typ_row else None
-            if start_typ in ["Verteilerkasten", "Schacht", "Ortszentrale"]:
-                vkg_lr_value = vonknoten
-            else:
-                vkg_lr_value = None
-            # <<< NEU
-
             for subtyp_id, typ in selected_subtyp_ids:
                 cur.execute("""
                     SELECT SUM((rohr->>'anzahl')::int) AS rohr_anzahl
@@ -2457,8 +2288,8 @@ class LeerrohrVerlegenTool(QDialog):
                         vonknoten, nachknoten, kommentar, beschreibung, verlegt_am,
                         geom_wkt, self.selected_leerrohr["id"]
                     )
-                    print(f"DEBUG: Update-Query mit Geometrie: {update_query}")
-                    print(f"DEBUG: Values mit Geometrie: {values}")
+                    logger.debug("Update-Query mit Geometrie: %s", update_query)
+                    logger.debug("Values mit Geometrie: %s", values)
                 else:
                     update_query = """
                         UPDATE lwl."LWL_Leerrohr"
@@ -2485,25 +2316,27 @@ class LeerrohrVerlegenTool(QDialog):
                         vonknoten, nachknoten, kommentar, beschreibung, verlegt_am,
                         self.selected_leerrohr["id"]
                     )
-                    print(f"DEBUG: Update-Query ohne Geometrie: {update_query}")
-                    print(f"DEBUG: Values ohne Geometrie: {values}")
+                    logger.debug("Update-Query ohne Geometrie: %s", update_query)
+                    logger.debug("Values ohne Geometrie: %s", values)
 
                 cur.execute(update_query, values)
                 rows_affected = cur.rowcount
-                print(f"DEBUG: Leerrohr aktualisiert, Rows affected: {rows_affected}, COUNT: {count_value}, STATUS: {status}")
+                logger.debug("Leerrohr aktualisiert, Rows affected: %s, COUNT: %s, STATUS: %s", rows_affected, count_value, status)
 
                 if rows_affected == 0:
-                    print("DEBUG: WARNUNG: Keine Zeilen aktualisiert – prüfen Sie WHERE-Bedingung oder Datenbankzugriff!")
+                    logger.warning("Keine Zeilen aktualisiert – prüfen Sie WHERE-Bedingung oder Datenbankzugriff!")
 
             conn.commit()
-            print("DEBUG: Commit erfolgreich")
+            logger.debug("Commit erfolgreich")
+            self.verbundnummern.invalidate()
+            self._leerrohr_caches_verwerfen()
             self.iface.messageBar().pushMessage("Erfolg", "Leerrohr erfolgreich aktualisiert.", level=Qgis.Success)
             self.initialisiere_formular()
             # Initialisiere graphicsView_Auswahl_Route
             self.clear_routing()
             self.routes_by_path_id = {}  # Setze Routen zurück
             self.update_route_view()
-            print("DEBUG: graphicsView_Auswahl_Route nach Update initialisiert")
+            logger.debug("graphicsView_Auswahl_Route nach Update initialisiert")
 
             layer = QgsProject.instance().mapLayersByName("LWL_Leerrohr")
             if layer:
@@ -2511,7 +2344,7 @@ class LeerrohrVerlegenTool(QDialog):
                 layer[0].triggerRepaint()
                 QgsProject.instance().reloadAllLayers()  # Zusätzliche Sicherstellung, dass alle Layer aktualisiert werden
                 self.iface.mapCanvas().refresh()
-                print("DEBUG: Layer LWL_Leerrohr aktualisiert")
+                logger.debug("Layer LWL_Leerrohr aktualisiert")
                 # Debug: Lade die aktualisierten Daten direkt aus der Datenbank
                 try:
                     cur.execute("""
@@ -2522,31 +2355,31 @@ class LeerrohrVerlegenTool(QDialog):
                     result = cur.fetchone()
                     if result:
                         updated_verbundnummer, updated_count, updated_status, updated_vonknoten, updated_nachknoten = result
-                        print(f"DEBUG: Aktualisierte Werte aus Datenbank - Verbundnummer: {updated_verbundnummer}, COUNT: {updated_count}, STATUS: {updated_status}, VONKNOTEN: {updated_vonknoten}, NACHKNOTEN: {updated_nachknoten}")
+                        logger.debug("Aktualisierte Werte aus Datenbank - Verbundnummer: %s, COUNT: %s, STATUS: %s, VONKNOTEN: %s, NACHKNOTEN: %s", updated_verbundnummer, updated_count, updated_status, updated_vonknoten, updated_nachknoten)
                 except Exception as e:
-                    print(f"DEBUG: Fehler beim Laden der aktualisierten Werte: {e}")
+                    logger.warning("Fehler beim Laden der aktualisierten Werte: %s", e)
 
         except psycopg2.Error as e:
             if conn:
                 conn.rollback()
             self.iface.messageBar().pushMessage("Fehler", f"Datenbankfehler: {str(e)}", level=Qgis.Critical)
-            print(f"DEBUG: Datenbankfehler: {str(e)}")
+            logger.warning("Datenbankfehler: %s", e)
         except Exception as e:
             if conn:
                 conn.rollback()
             self.iface.messageBar().pushMessage("Fehler", f"Allgemeiner Fehler: {str(e)}", level=Qgis.Critical)
-            print(f"DEBUG: Allgemeiner Fehler: {str(e)}")
+            logger.warning("Allgemeiner Fehler: %s", e)
         finally:
             if conn:
-                conn.close()
-                print("DEBUG: Verbindung geschlossen")
+                self.db_pool.putconn(conn)
+                logger.debug("Verbindung an Pool zurückgegeben")
 
     def initialisiere_formular(self):
         """Setzt das Formular zurück, entfernt vorhandene Highlights, es sei denn, Mehrfachimport ist aktiviert."""
-        print("DEBUG: Starte initialisiere_formular")
+        logger.debug("Starte initialisiere_formular")
         if not hasattr(self.ui, 'checkBox_clearForm') or not self.ui.checkBox_clearForm.isChecked():
             if hasattr(self, "route_highlights"):
-                print(f"DEBUG: Anzahl der Highlights VOR Reset: {len(self.route_highlights)}")
+                logger.debug("Anzahl der Highlights VOR Reset: %s", len(self.route_highlights))
             self.selected_verteiler = None
             self.selected_verteiler_2 = None
             self.selected_zwischenknoten = None
@@ -2592,8 +2425,8 @@ class LeerrohrVerlegenTool(QDialog):
             self.ui.comboBox_Status.setEnabled(True)  # Aktiviert beim Zurücksetzen für Import
             self.populate_status()  # Setze auf ersten Wert als Fallback
             if hasattr(self, "route_highlights"):
-                print(f"DEBUG: Anzahl der Highlights NACH Reset: {len(self.route_highlights)}")
-            print("DEBUG: Formular wurde erfolgreich zurückgesetzt.")
+                logger.debug("Anzahl der Highlights NACH Reset: %s", len(self.route_highlights))
+            logger.debug("Formular wurde erfolgreich zurückgesetzt.")
             # Neue Ergänzung: Reset Quantities
             self.subtyp_quantities.clear()
         else:
@@ -2610,10 +2443,10 @@ class LeerrohrVerlegenTool(QDialog):
                     if is_multirohr:
                         break
             if is_multirohr:
-                print("DEBUG: Mehrfachimport aktiviert – aktualisiere Verbundnummer für Multi-Rohr")
+                logger.debug("Mehrfachimport aktiviert – aktualisiere Verbundnummer für Multi-Rohr")
                 self.populate_verbundnummer()
             else:
-                print("DEBUG: Mehrfachimport aktiviert, aber kein Multi-Rohr – keine Änderungen")
+                logger.debug("Mehrfachimport aktiviert, aber kein Multi-Rohr – keine Änderungen")
             self.ui.pushButton_Import.setEnabled(True)
             self.ui.listWidget_Leerrohr.clear()
             # Neue Ergänzung: Reset Quantities auch hier, falls nötig – aber bei Mehrfachimport behalten wir sie optional
@@ -2621,7 +2454,7 @@ class LeerrohrVerlegenTool(QDialog):
 
     def clear_trasse_selection(self):
         """Setzt die Trassenauswahl zurück."""
-        print("DEBUG: Starte clear_trasse_selection")
+        logger.debug("Starte clear_trasse_selection")
         self.ui.label_gewaehlter_verteiler.setText("Verteiler wählen!")
         self.ui.label_gewaehlter_verteiler.setStyleSheet("background-color: lightcoral;")
         self.ui.label_gewaehlter_verteiler_2.setText("Verteiler wählen!")
@@ -2637,7 +2470,7 @@ class LeerrohrVerlegenTool(QDialog):
         self.selected_zwischenknoten = None
         self.selected_leerrohr = None
         if not self.selected_parent_leerrohr and not self.ui.radioButton_Abzweigung.isChecked():
-            print("DEBUG: Kein Parent-Leerrohr und nicht im Abzweigungsmodus – Label zurücksetzen")
+            logger.debug("Kein Parent-Leerrohr und nicht im Abzweigungsmodus – Label zurücksetzen")
             self.ui.label_Parent_Leerrohr.setText("Parent-Leerrohr erfassen")
             self.ui.label_Parent_Leerrohr.setStyleSheet("")
         self.ui.label_Status.clear()
@@ -2657,29 +2490,31 @@ class LeerrohrVerlegenTool(QDialog):
         self.clear_routing()
         self.selected_trasse_ids = []
         self.selected_trasse_ids_flat = []
-        print(f"DEBUG: Anzahl der Highlights NACH Reset: {len(self.route_highlights)}")
+        logger.debug("Anzahl der Highlights NACH Reset: %s", len(self.route_highlights))
         # Neue Ergänzung: Reset Quantities
         self.subtyp_quantities.clear()
         self.ui.listWidget_Leerrohr.clear()
 
     def clear_routing(self):
         """Entfernt alle Routing-Highlights und bereitet graphicsView_Auswahl_Route vor."""
-        print("DEBUG: Starte clear_routing")
+        logger.debug("Starte clear_routing")
         if hasattr(self, "route_highlights") and self.route_highlights:
             for highlight in self.route_highlights:
                 highlight.hide()
             self.route_highlights.clear()
-            print(f"DEBUG: Alle Routing-Highlights entfernt: {len(self.route_highlights)}")
+            logger.debug("Alle Routing-Highlights entfernt: %s", len(self.route_highlights))
+        self.trassen_geometrie_cache = {}
         # Setze die Szene im graphicsView_Auswahl_Route zurück
         if self.ui.graphicsView_Auswahl_Route.scene():
             self.ui.graphicsView_Auswahl_Route.scene().clear()
         else:
             self.ui.graphicsView_Auswahl_Route.setScene(QGraphicsScene())
-        print("DEBUG: graphicsView_Auswahl_Route Szene zurückgesetzt")
+        logger.debug("graphicsView_Auswahl_Route Szene zurückgesetzt")
 
     def close_tool(self):
         """Schließt das Tool und löscht alle Highlights."""
-        print("DEBUG: Schließe Tool und entferne alle Highlights")
+        logger.debug("Schließe Tool und entferne alle Highlights")
+        self.tasks.schliessen()
         self.clear_trasse_selection()
         if self.map_tool:
             self.iface.mapCanvas().unsetMapTool(self.map_tool)
@@ -2687,40 +2522,40 @@ class LeerrohrVerlegenTool(QDialog):
         if hasattr(self, "verteiler_highlight_1") and self.verteiler_highlight_1:
             self.verteiler_highlight_1.hide()
             self.verteiler_highlight_1 = None
-            print("DEBUG: Startknoten-Highlight entfernt")
+            logger.debug("Startknoten-Highlight entfernt")
         if hasattr(self, "verteiler_highlight_2") and self.verteiler_highlight_2:
             self.verteiler_highlight_2.hide()
             self.verteiler_highlight_2 = None
-            print("DEBUG: Endknoten-Highlight entfernt")
+            logger.debug("Endknoten-Highlight entfernt")
         if hasattr(self, "zwischenknoten_highlight") and self.zwischenknoten_highlight:
             self.zwischenknoten_highlight.hide()
             self.zwischenknoten_highlight = None
-            print("DEBUG: Zwischenknoten-Highlight entfernt")
+            logger.debug("Zwischenknoten-Highlight entfernt")
         if hasattr(self, "leerrohr_highlight") and self.leerrohr_highlight:
             self.leerrohr_highlight.hide()
             self.leerrohr_highlight = None
-            print("DEBUG: Leerrohr-Highlight entfernt")
+            logger.debug("Leerrohr-Highlight entfernt")
         if hasattr(self, "parent_highlight") and self.parent_highlight:
             self.parent_highlight.hide()
             self.parent_highlight = None
-            print("DEBUG: Parent-Leerrohr-Highlight entfernt")
+            logger.debug("Parent-Leerrohr-Highlight entfernt")
         if hasattr(self, "subduct_highlight") and self.subduct_highlight:
             self.subduct_highlight.hide()
             self.subduct_highlight = None
-            print("DEBUG: Subduct-Parent-Highlight entfernt")
+            logger.debug("Subduct-Parent-Highlight entfernt")
         if hasattr(self, "route_highlights") and self.route_highlights:
             for highlight in self.route_highlights:
                 highlight.hide()
             self.route_highlights.clear()
-            print("DEBUG: Alle Routing-Highlights entfernt")
+            logger.debug("Alle Routing-Highlights entfernt")
         self.selected_trasse_ids = []
         self.selected_trasse_ids_flat = []
-        print("DEBUG: Verbindung bleibt offen für andere Tools")
+        logger.debug("Verbindung bleibt offen für andere Tools")
         self.close()
 
     def closeEvent(self, event):
         """Überschreibt das Schließen des Fensters über das rote 'X'."""
-        print("DEBUG: Starte closeEvent")
+        logger.debug("Starte closeEvent")
         self.close_tool()
         event.accept()
-        print("DEBUG: Fenster-Schließereignis akzeptiert")
\ No newline at end of file
+        logger.debug("Fenster-Schließereignis akzeptiert")
@@ -1057,6 +1057,9 @@ class SetupTool(QDialog):
 
     def disconnect_connection(self):
         self.is_connected = False
+        # Gepoolte Verbindungen der Tools ebenfalls trennen
+        if hasattr(self.iface, 'plugin') and hasattr(self.iface.plugin, 'db_pools'):
+            self.iface.plugin.db_pools.closeall()
         self.current_setup_id = None
         self.current_qgis_project_path = ""
         self.data_cache = {}
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Spleiss-Tool: Spleißplan eines Knotens anzeigen, vorschlagen und speichern.
+
+1) Knoten am Kartenfenster wählen -> alle dort endenden Kabel und die
+   vorhandenen Spleiße werden mit je einer Abfrage geladen; durchlaufende
+   Kabel werden nur aufgelistet.
+2) 'Spleiße vorschlagen' verteilt die freien Fasern des Zubringers nach
+   Farbe/Nummer auf die abgehenden Kabel (siehe tools/common/spleiss_plan.py).
+3) 'Speichern' schreibt nur die Änderungen in einer Transaktion; erst nach
+   dem Commit gilt der Stand als gespeichert.
+"""
+
+import base64
+from PyQt5.QtCore import Qt, QSettings
+from PyQt5.QtWidgets import QDialog, QListWidgetItem, QTableWidgetItem
+from qgis.core import QgsProject
+from qgis.gui import QgsMapToolEmitPoint
+from ..common.db_pool import get_db_pool, measure_db
+from ..common.instrumentation import get_tool_logger, timed
+from ..common.lookup_catalog import get_lookup_catalog
+from ..common.node_locator import get_node_locator, pixel_tolerance
+from ..common.spleiss_plan import MIGRATION, SPLEISS_TABLE, SpleissPlan, faser_farben
+from .spleiss_verwalten_dialog import Ui_SpleissVerwaltenDialogBase
+
+logger = get_tool_logger("spleiss_verwalten")
+
+SPALTEN = ["Kabel 1", "Faser 1", "Farbe 1", "Kabel 2", "Faser 2", "Farbe 2"]
+
+
+class SpleissVerwaltenTool(QDialog):
+    instance = None
+
+    def __init__(self, iface, parent=None):
+        super().__init__(parent)
+        self.setWindowFlag(Qt.WindowStaysOnTopHint, True)
+        self.iface = iface
+        self.ui = Ui_SpleissVerwaltenDialogBase()
+        self.ui.setupUi(self)
+        SpleissVerwaltenTool.instance = self
+
+        self.settings = QSettings("SiegeleCo", "ToolBox")
+        self.db = None
+        self.db_pool = None
+        self._load_db()
+
+        self.map_tool = None
+        self.plan = None
+
+        self.ui.tableWidget_Spleisse.setColumnCount(len(SPALTEN))
+        self.ui.tableWidget_Spleisse.setHorizontalHeaderLabels(SPALTEN)
+        self.ui.pushButton_Knoten.clicked.connect(self.start_pick_node)
+        self.ui.pushButton_Vorschlag.clicked.connect(self.vorschlagen)
+        self.ui.pushButton_Trennen.clicked.connect(self.trennen)
+        self.ui.pushButton_Speichern.clicked.connect(self.speichern)
+
+    def _status(self, msg, ok=True):
+        self.ui.label_Status.setText(msg)
+        self.ui.label_Status.setStyleSheet("background-color: lightgreen;" if ok else "background-color: lightcoral;")
+
+    def _load_db(self):
+        u = self.settings.value("connection_username", "")
+        pw = self.settings.value("connection_password", "")
+        env = self.settings.value("connection_umgebung", "Testumgebung")
+        if not (u and pw and env):
+            self._status("Kein Setup aktiv.", ok=False); return
+        pwd = base64.b64decode(pw.encode()).decode() if pw else ""
+        host = "172.30.0.4" if env == "Testumgebung" else "172.30.0.3"
+        self.db = dict(dbname="qwc_services", user=u, password=pwd, host=host, port="5432", sslmode="disable")
+        self.db_pool = get_db_pool(self.iface, self.db, env)
+
+    def showEvent(self, ev):
+        super().showEvent(ev); self.raise_(); self.activateWindow()
+
+    def closeEvent(self, event):
+        """Map-Tool abmelden und Singleton freigeben."""
+        if self.map_tool is not None:
+            try:
+                self.map_tool.canvasClicked.disconnect()
+                self.iface.mapCanvas().unsetMapTool(self.map_tool)
+            except Exception:
+                pass
+            self.map_tool = None
+        type(self).instance = None
+        super().closeEvent(event)
+
+    # ---------- Knoten wählen ----------
+    def _get_layer(self, name):
+        lst = QgsProject.instance().mapLayersByName(name)
+        return lst[0] if lst else None
+
+    def start_pick_node(self):
+        self._status("Karte klicken → Knoten wählen.")
+        if self.map_tool:
+            try: self.map_tool.canvasClicked.disconnect()
+            except TypeError: pass
+        self.map_tool = QgsMapToolEmitPoint(self.iface.mapCanvas())
+        self.map_tool.canvasClicked.connect(self._on_node_click)
+        self.iface.mapCanvas().setMapTool(self.map_tool)
+
+    def _on_node_click(self, pt):
+        kn_layer = self._get_layer("LWL_Knoten")
+        tr_layer = self._get_layer("LWL_Trasse")
+        canvas = self.iface.mapCanvas()
+        canvas.unsetMapTool(self.map_tool); self.map_tool = None
+        if not kn_layer:
+            self._status("Layer LWL_Knoten nicht gefunden.", ok=False); return
+        locator = get_node_locator(kn_layer, tr_layer)
+        node_id = locator.nearest_id(pt, pixel_tolerance(canvas, 10), endpoint_tolerance=pixel_tolerance(canvas, 15))
+        if not node_id:
+            self._status("Kein Knoten gefunden.", ok=False); return
+        self.ui.label_Knoten.setText(f"Knoten {node_id}")
+        self.load_plan(node_id)
+
+    # ---------- Laden / Anzeigen ----------
+    @timed("Spleiss: Plan laden", logger)
+    @measure_db("Spleißplan laden")
+    def load_plan(self, knoten_id):
+        if self.db_pool is None:
+            self._status("Keine Datenbankverbindung.", ok=False); return
+        try:
+            kabel_typen = {r["id"]: r for r in get_lookup_catalog(self.db_pool).rows("kabel_typ")}
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
+                self.plan = SpleissPlan(knoten_id).load(cur, kabel_typen)
+        except Exception as e:
+            logger.exception("Spleißplan für Knoten %s nicht geladen", knoten_id)
+            self._status(f"Fehler beim Laden: {e}", ok=False); return
+        self._fill_kabel()
+        self._fill_table()
+        if not self.plan.tabelle_vorhanden:
+            self._status(f"Tabelle {SPLEISS_TABLE} fehlt – bitte die Migration {MIGRATION} einspielen.", ok=False)
+            return
+        text = f"{len(self.plan.kabel)} Kabel, {len(self.plan.bestand)} Spleiße am Knoten {knoten_id}."
+        if self.plan.durchgehend:
+            text += f" {len(self.plan.durchgehend)} durchgehend."
+        self._status(text)
+
+    def _fill_kabel(self):
+        self.ui.listWidget_Kabel.clear()
+        self.ui.comboBox_Zubringer.clear()
+        for kid, k in sorted(self.plan.kabel.items()):
+            text = f"Kabel {kid} – {k.fasern} Fasern, frei: {len(self.plan.frei(kid))}"
+            if k.bezeichnung:
+                text += f" ({k.bezeichnung})"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, kid)
+            self.ui.listWidget_Kabel.addItem(item)
+            self.ui.comboBox_Zubringer.addItem(f"Kabel {kid} ({k.fasern} Fasern)", kid)
+        for kid, k in sorted(self.plan.durchgehend.items()):
+            text = f"Kabel {kid} – {k.fasern} Fasern, durchgehend"
+            if k.bezeichnung:
+                text += f" ({k.bezeichnung})"
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, kid)
+            item.setFlags(item.flags() & ~Qt.ItemIsSelectable)
+            self.ui.listWidget_Kabel.addItem(item)
+        zubringer = self.plan.zubringer()
+        if zubringer is not None:
+            self.ui.comboBox_Zubringer.setCurrentIndex(self.ui.comboBox_Zubringer.findData(zubringer))
+
+    def _fill_table(self):
+        table = self.ui.tableWidget_Spleisse
+        paare = self.plan.paare()
+        table.setRowCount(len(paare))
+        for row, (a, b) in enumerate(paare):
+            werte = []
+            for kabel_id, nr in (a, b):
+                buendel, faser = faser_farben(nr, self.plan.kabel[kabel_id].je_buendel) \
+                    if kabel_id in self.plan.kabel else ("", "")
+                werte += [str(kabel_id), str(nr), f"{buendel}/{faser}"]
+            for col, wert in enumerate(werte):
+                item = QTableWidgetItem(wert)
+                item.setData(Qt.UserRole, (a, b))
+                table.setItem(row, col, item)
+
+    # ---------- Bearbeiten ----------
+    def vorschlagen(self):
+        if self.plan is None:
+            self._status("Bitte zuerst einen Knoten wählen.", ok=False); return
+        zubringer = self.ui.comboBox_Zubringer.currentData()
+        vorschlag = self.plan.vorschlag(zubringer)
+        self.plan.uebernehmen(vorschlag)
+        self._fill_kabel()
+        self._fill_table()
+        self._status(f"{len(vorschlag)} Spleiße vorgeschlagen (noch nicht gespeichert).")
+
+    def trennen(self):
+        if self.plan is None:
+            return
+        paare = {item.data(Qt.UserRole) for item in self.ui.tableWidget_Spleisse.selectedItems()}
+        for a, _ in paare:
+            self.plan.trenne(a)
+        self._fill_kabel()
+        self._fill_table()
+        self._status(f"{len(paare)} Spleiße getrennt (noch nicht gespeichert).")
+
+    @measure_db("Spleißplan speichern")
+    def speichern(self):
+        if self.plan is None or self.db_pool is None:
+            return
+        try:
+            with self.db_pool.connection() as conn, conn.cursor() as cur:
+                geloescht, neu = self.plan.speichern(cur, self.db.get("user"))
+        except Exception as e:
+            logger.exception("Spleißplan für Knoten %s nicht gespeichert", self.plan.knoten)
+            self._status(f"Fehler beim Speichern: {e}", ok=False); return
+        # erst nach dem Commit (Verbindung zurück im Pool) ist der Stand der neue Bestand
+        self.plan.gespeichert()
+        self._status(f"Gespeichert: {neu} neu, {geloescht} gelöscht.")
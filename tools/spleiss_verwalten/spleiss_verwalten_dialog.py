@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'spleiss_verwalten_dialog_base.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.10
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtWidgets
+
+
+class Ui_SpleissVerwaltenDialogBase(object):
+    def setupUi(self, SpleissVerwaltenDialogBase):
+        SpleissVerwaltenDialogBase.setObjectName("SpleissVerwaltenDialogBase")
+        SpleissVerwaltenDialogBase.resize(640, 720)
+        self.verticalLayout = QtWidgets.QVBoxLayout(SpleissVerwaltenDialogBase)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.pushButton_Knoten = QtWidgets.QPushButton(SpleissVerwaltenDialogBase)
+        self.pushButton_Knoten.setObjectName("pushButton_Knoten")
+        self.horizontalLayout.addWidget(self.pushButton_Knoten)
+        self.label_Knoten = QtWidgets.QLabel(SpleissVerwaltenDialogBase)
+        self.label_Knoten.setObjectName("label_Knoten")
+        self.horizontalLayout.addWidget(self.label_Knoten)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.label_Zubringer = QtWidgets.QLabel(SpleissVerwaltenDialogBase)
+        self.label_Zubringer.setObjectName("label_Zubringer")
+        self.horizontalLayout_2.addWidget(self.label_Zubringer)
+        self.comboBox_Zubringer = QtWidgets.QComboBox(SpleissVerwaltenDialogBase)
+        self.comboBox_Zubringer.setObjectName("comboBox_Zubringer")
+        self.horizontalLayout_2.addWidget(self.comboBox_Zubringer)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.listWidget_Kabel = QtWidgets.QListWidget(SpleissVerwaltenDialogBase)
+        self.listWidget_Kabel.setMaximumSize(QtCore.QSize(16777215, 140))
+        self.listWidget_Kabel.setObjectName("listWidget_Kabel")
+        self.verticalLayout.addWidget(self.listWidget_Kabel)
+        self.tableWidget_Spleisse = QtWidgets.QTableWidget(SpleissVerwaltenDialogBase)
+        self.tableWidget_Spleisse.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableWidget_Spleisse.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tableWidget_Spleisse.setObjectName("tableWidget_Spleisse")
+        self.tableWidget_Spleisse.setColumnCount(0)
+        self.tableWidget_Spleisse.setRowCount(0)
+        self.verticalLayout.addWidget(self.tableWidget_Spleisse)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.pushButton_Vorschlag = QtWidgets.QPushButton(SpleissVerwaltenDialogBase)
+        self.pushButton_Vorschlag.setObjectName("pushButton_Vorschlag")
+        self.horizontalLayout_3.addWidget(self.pushButton_Vorschlag)
+        self.pushButton_Trennen = QtWidgets.QPushButton(SpleissVerwaltenDialogBase)
+        self.pushButton_Trennen.setObjectName("pushButton_Trennen")
+        self.horizontalLayout_3.addWidget(self.pushButton_Trennen)
+        self.pushButton_Speichern = QtWidgets.QPushButton(SpleissVerwaltenDialogBase)
+        self.pushButton_Speichern.setObjectName("pushButton_Speichern")
+        self.horizontalLayout_3.addWidget(self.pushButton_Speichern)
+        self.verticalLayout.addLayout(self.horizontalLayout_3)
+        self.label_Status = QtWidgets.QLabel(SpleissVerwaltenDialogBase)
+        self.label_Status.setText("")
+        self.label_Status.setObjectName("label_Status")
+        self.verticalLayout.addWidget(self.label_Status)
+
+        self.retranslateUi(SpleissVerwaltenDialogBase)
+        QtCore.QMetaObject.connectSlotsByName(SpleissVerwaltenDialogBase)
+
+    def retranslateUi(self, SpleissVerwaltenDialogBase):
+        _translate = QtCore.QCoreApplication.translate
+        SpleissVerwaltenDialogBase.setWindowTitle(_translate("SpleissVerwaltenDialogBase", "Spleiss Verwalten"))
+        self.pushButton_Knoten.setText(_translate("SpleissVerwaltenDialogBase", "Knoten wählen"))
+        self.label_Knoten.setText(_translate("SpleissVerwaltenDialogBase", "Kein Knoten gewählt"))
+        self.label_Zubringer.setText(_translate("SpleissVerwaltenDialogBase", "Zubringer:"))
+        self.pushButton_Vorschlag.setText(_translate("SpleissVerwaltenDialogBase", "Spleiße vorschlagen"))
+        self.pushButton_Trennen.setText(_translate("SpleissVerwaltenDialogBase", "Auswahl trennen"))
+        self.pushButton_Speichern.setText(_translate("SpleissVerwaltenDialogBase", "Speichern"))